@@ -1,4 +1,5 @@
-from .client import FeathrClient
+import importlib
+
 from .spark_provider.feathr_configurations import SparkExecutionConfiguration
 from .definition.feature_derivations import *
 from .definition.anchor import *
@@ -15,10 +16,38 @@ from .definition.query_feature_list import *
 from .definition.lookup_feature import *
 from .definition.aggregation import *
 from .definition.settings import *
-from .utils.job_utils import *
 from .utils.feature_printer import *
+from .udf.batch_preprocessing import pandas_preprocessing, arrow_preprocessing
 from .version import __version__
 
+# `FeathrClient` and the job utilities pull in pyspark, the cloud SDKs and the online store clients, so they're only
+# imported when they're accessed (PEP 562). E.g. `from feathr import Feature` doesn't need any of them.
+_LAZY_MODULES = {
+    "FeathrClient": ".client",
+}
+# Modules which used to be star-imported here. Their public names are resolved on first access.
+_LAZY_STAR_MODULES = [".utils.job_utils"]
+
+
+def __getattr__(name: str):
+    if name in _LAZY_MODULES:
+        value = getattr(importlib.import_module(_LAZY_MODULES[name], __name__), name)
+        globals()[name] = value
+        return value
+    if not name.startswith("_"):
+        for module_name in _LAZY_STAR_MODULES:
+            module = importlib.import_module(module_name, __name__)
+            if hasattr(module, name):
+                value = getattr(module, name)
+                globals()[name] = value
+                return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_MODULES) | set(__all__))
+
+
 # skipped class as they are internal methods:
 # RepoDefinitions, HoconConvertible,
 # expose the modules so docs can build
@@ -77,5 +106,7 @@ __all__ = [
     "ObservationSettings",
     "FeaturePrinter",
     "SparkExecutionConfiguration",
+    "pandas_preprocessing",
+    "arrow_preprocessing",
     __version__,
 ]
@@ -1,23 +1,21 @@
 import base64
 import copy
 import json
+from datetime import timedelta
 import logging
 import os
+from pathlib import Path
 import tempfile
 from typing import Any, Dict, List, Tuple, Union, Set, Optional
 
-from azure.identity import DefaultAzureCredential
-from jinja2 import Template
 from loguru import logger
 from pyhocon import ConfigFactory
-import redis
-from rediscluster import RedisCluster
-from pymongo import MongoClient
 
 from feathr.constants import *
 from feathr.definition._materialization_utils import _to_materialization_config
 from feathr.definition.anchor import FeatureAnchor
 from feathr.definition.config_helper import FeathrConfigHelper
+from feathr.definition.feathrconfig import compile_template
 from feathr.definition.feature import FeatureBase
 from feathr.definition.feature_derivations import DerivedFeature
 from feathr.definition.materialization_settings import MaterializationSettings
@@ -30,15 +28,13 @@ from feathr.definition.transformation import WindowAggTransformation
 from feathr.definition.typed_key import TypedKey
 from feathr.utils.crud import SinkCRUD, RedisCRUD, MongoDBCRUD
 from feathr.protobuf.featureValue_pb2 import FeatureValue
-from feathr.registry._feathr_registry_client import _FeatureRegistry, derived_feature_to_def, feature_to_def
-from feathr.registry._feature_registry_purview import _PurviewRegistry
-from feathr.spark_provider._databricks_submission import _FeathrDatabricksJobLauncher
-from feathr.spark_provider._localspark_submission import _FeathrLocalSparkJobLauncher
-from feathr.spark_provider._synapse_submission import _FeathrSynapseJobLauncher
+from feathr.spark_provider._abc import SparkJobLauncher
+from feathr.spark_provider._job_scheduler import JobHandle, JobScheduler
 from feathr.spark_provider.feathr_configurations import SparkExecutionConfiguration
 from feathr.udf._preprocessing_pyudf_manager import _PreprocessingPyudfManager
 from feathr.utils._env_config_reader import EnvConfigReader
 from feathr.utils._file_utils import write_to_file
+from feathr.utils._partition_planner import PartitionPlanner, parse_duration
 from feathr.utils.feature_printer import FeaturePrinter
 from feathr.utils.spark_job_params import FeatureGenerationJobParams, FeatureJoinJobParams
 from feathr.version import get_version
@@ -88,6 +84,9 @@ class FeathrClient(object):
         self._KEY_SEPARATOR = ":"
         self._COMPOSITE_KEY_SEPARATOR = "#"
         self.env_config = EnvConfigReader(config_path=config_path)
+        # List the Key Vault secrets once, so that the many config keys which are not in the Key Vault don't need a
+        # request each.
+        self.env_config.prefetch()
         if local_workspace_dir:
             self.local_workspace_dir = local_workspace_dir
         else:
@@ -116,7 +115,6 @@ class FeathrClient(object):
             self.redis_port = self.env_config.get("online_store__redis__port")
             self.redis_ssl_enabled = self.env_config.get("online_store__redis__ssl_enabled")
             self.redis_cluster_mode = self.env_config.get("online_store__redis__cluster_mode")
-            self._construct_redis_client()
 
         self.mongodb_enabled = bool(self.env_config.get("online_store__mongodb__host"))
 
@@ -129,9 +127,18 @@ class FeathrClient(object):
             self.mongodb_host = self.env_config.get("online_store__mongodb__host")
             self.mongodb_port = self.env_config.get("online_store__mongodb__port")
             self.mongodb_database = self.env_config.get("online_store__mongodb__database")
-            self._construct_mongodb_client()
-
 
+        # The online store clients and the Spark job launcher are created on first use, so that e.g. a serving process
+        # which only reads online features doesn't import and connect to everything else.
+        self._redis_client = None
+        self._mongodb_client = None
+        self._mongodb_db = None
+        self._feathr_spark_launcher = None
+        self._job_scheduler = None
+        self._debug_folder = debug_folder
+        self._job_retry = job_retry
+        self._job_retry_sec = job_retry_sec
+        self._partition_planner = None
 
         # Offline store enabled configs; false by default
         self.s3_enabled = self.env_config.get("offline_store__s3__s3_enabled")
@@ -153,48 +160,23 @@ class FeathrClient(object):
         self.spark_runtime = self.env_config.get("spark_config__spark_cluster")
 
         self.credential = credential
-        if self.spark_runtime not in {"azure_synapse", "databricks", "local"}:
+        if self.spark_runtime not in {"azure_synapse", "databricks"} | LOCAL_SPARK_RUNTIMES:
             raise RuntimeError(
-                f"{self.spark_runtime} is not supported. Only 'azure_synapse', 'databricks' and 'local' are currently supported."
+                f"{self.spark_runtime} is not supported. Only 'azure_synapse', 'databricks', 'local' and 'inprocess' are currently supported."
             )
         elif self.spark_runtime == "azure_synapse":
             # Feathr is a spark-based application so the feathr jar compiled from source code will be used in the
             # Spark job submission. The feathr jar hosted in cloud saves the time users needed to upload the jar from
             # their local env.
             self._FEATHR_JOB_JAR_PATH = self.env_config.get("spark_config__azure_synapse__feathr_runtime_location")
-
-            if self.credential is None:
-                self.credential = DefaultAzureCredential(exclude_interactive_browser_credential=False)
-
-            self.feathr_spark_launcher = _FeathrSynapseJobLauncher(
-                synapse_dev_url=self.env_config.get("spark_config__azure_synapse__dev_url"),
-                pool_name=self.env_config.get("spark_config__azure_synapse__pool_name"),
-                datalake_dir=self.env_config.get("spark_config__azure_synapse__workspace_dir"),
-                executor_size=self.env_config.get("spark_config__azure_synapse__executor_size"),
-                executors=self.env_config.get("spark_config__azure_synapse__executor_num"),
-                credential=self.credential,
-            )
         elif self.spark_runtime == "databricks":
             # Feathr is a spark-based application so the feathr jar compiled from source code will be used in the
             # Spark job submission. The feathr jar hosted in cloud saves the time users needed to upload the jar from
             # their local env.
             self._FEATHR_JOB_JAR_PATH = self.env_config.get("spark_config__databricks__feathr_runtime_location")
-
-            self.feathr_spark_launcher = _FeathrDatabricksJobLauncher(
-                workspace_instance_url=self.env_config.get("spark_config__databricks__workspace_instance_url"),
-                token_value=self.env_config.get_from_env_or_akv("DATABRICKS_WORKSPACE_TOKEN_VALUE"),
-                config_template=self.env_config.get("spark_config__databricks__config_template"),
-                databricks_work_dir=self.env_config.get("spark_config__databricks__work_dir"),
-            )
-        elif self.spark_runtime == "local":
+        elif self.spark_runtime in LOCAL_SPARK_RUNTIMES:
+            # 'inprocess' submits the jobs it can't run in the client process to local Spark
             self._FEATHR_JOB_JAR_PATH = self.env_config.get("spark_config__local__feathr_runtime_location")
-            self.feathr_spark_launcher = _FeathrLocalSparkJobLauncher(
-                workspace_path=self.env_config.get("spark_config__local__workspace"),
-                master=self.env_config.get("spark_config__local__master"),
-                debug_folder=debug_folder,
-                retry=job_retry,
-                retry_sec=job_retry_sec,
-            )
 
         self.secret_names = []
 
@@ -206,12 +188,20 @@ class FeathrClient(object):
         registry_endpoint = self.env_config.get("feature_registry__api_endpoint")
         azure_purview_name = self.env_config.get("feature_registry__purview__purview_name")
         if registry_endpoint:
+            from feathr.registry._feathr_registry_client import _FeatureRegistry
+
             self.registry = _FeatureRegistry(
-                self.project_name, endpoint=registry_endpoint, project_tags=project_registry_tag, credential=credential
+                self.project_name,
+                endpoint=registry_endpoint,
+                project_tags=project_registry_tag,
+                credential=credential,
+                cache_dir=self.env_config.get("feature_registry__cache_dir"),
             )
         elif azure_purview_name:
             registry_delimiter = self.env_config.get("feature_registry__purview__delimiter")
             # initialize the registry no matter whether we set purview name or not, given some of the methods are used there.
+            from feathr.registry._feature_registry_purview import _PurviewRegistry
+
             self.registry = _PurviewRegistry(
                 self.project_name,
                 azure_purview_name,
@@ -231,6 +221,122 @@ class FeathrClient(object):
 
         logger.info(f"Feathr client {get_version()} initialized successfully.")
 
+    @property
+    def feathr_spark_launcher(self) -> SparkJobLauncher:
+        """The launcher of the configured Spark runtime. Created on first use."""
+        if self._feathr_spark_launcher is None:
+            self._feathr_spark_launcher = self._construct_spark_launcher()
+        return self._feathr_spark_launcher
+
+    @feathr_spark_launcher.setter
+    def feathr_spark_launcher(self, launcher: SparkJobLauncher):
+        self._feathr_spark_launcher = launcher
+
+    @property
+    def partition_planner(self) -> PartitionPlanner:
+        """Plans the partitions of the time partitioned sources to read in each job. The partition directories found
+        are remembered across jobs, so that e.g. daily backfills don't check the same directories again."""
+        if self._partition_planner is None:
+            self._partition_planner = PartitionPlanner(dir_exists=self._cloud_dir_exists)
+        return self._partition_planner
+
+    def _cloud_dir_exists(self, dir_path: str) -> bool:
+        dir_exists = getattr(self.feathr_spark_launcher, "cloud_dir_exists", None)
+        # Launchers which can't check directories leave the partitions to the job
+        return dir_exists(dir_path) if dir_exists else True
+
+    @property
+    def job_scheduler(self) -> JobScheduler:
+        """All the jobs are submitted through the scheduler so that several jobs (e.g. one per backfill cutoff time)
+        can run concurrently and be waited on. Unlimited concurrency unless `max_concurrent_jobs` is configured."""
+        if self._job_scheduler is None:
+            self._job_scheduler = JobScheduler(
+                self.feathr_spark_launcher,
+                max_concurrent_jobs=self.env_config.get("spark_config__max_concurrent_jobs"),
+            )
+        return self._job_scheduler
+
+    @job_scheduler.setter
+    def job_scheduler(self, job_scheduler: JobScheduler):
+        self._job_scheduler = job_scheduler
+
+    @property
+    def redis_client(self):
+        """The Redis client of the online store. Created on first use."""
+        if self._redis_client is None:
+            if not hasattr(self, "redis_host"):
+                raise RuntimeError("Redis is not configured. Please set `online_store__redis__host` in the config.")
+            self._construct_redis_client()
+        return self._redis_client
+
+    @redis_client.setter
+    def redis_client(self, redis_client):
+        self._redis_client = redis_client
+
+    @property
+    def mongodb_client(self):
+        """The MongoDB client of the online store. Created on first use."""
+        if self._mongodb_client is None:
+            self._construct_mongodb_client()
+        return self._mongodb_client
+
+    @mongodb_client.setter
+    def mongodb_client(self, mongodb_client):
+        self._mongodb_client = mongodb_client
+
+    @property
+    def mongodb_db(self):
+        """The MongoDB database of the online store. Created on first use."""
+        if self._mongodb_db is None:
+            self._construct_mongodb_client()
+        return self._mongodb_db
+
+    @mongodb_db.setter
+    def mongodb_db(self, mongodb_db):
+        self._mongodb_db = mongodb_db
+
+    def _construct_spark_launcher(self) -> SparkJobLauncher:
+        """Constructs the Spark job launcher of the configured Spark runtime. Only the modules of that runtime are
+        imported."""
+        if self.spark_runtime == "azure_synapse":
+            from azure.identity import DefaultAzureCredential
+
+            from feathr.spark_provider._synapse_submission import _FeathrSynapseJobLauncher
+
+            if self.credential is None:
+                self.credential = DefaultAzureCredential(exclude_interactive_browser_credential=False)
+
+            return _FeathrSynapseJobLauncher(
+                synapse_dev_url=self.env_config.get("spark_config__azure_synapse__dev_url"),
+                pool_name=self.env_config.get("spark_config__azure_synapse__pool_name"),
+                datalake_dir=self.env_config.get("spark_config__azure_synapse__workspace_dir"),
+                executor_size=self.env_config.get("spark_config__azure_synapse__executor_size"),
+                executors=self.env_config.get("spark_config__azure_synapse__executor_num"),
+                credential=self.credential,
+            )
+        elif self.spark_runtime == "databricks":
+            from feathr.spark_provider._databricks_submission import _FeathrDatabricksJobLauncher
+
+            return _FeathrDatabricksJobLauncher(
+                workspace_instance_url=self.env_config.get("spark_config__databricks__workspace_instance_url"),
+                token_value=self.env_config.get_from_env_or_akv("DATABRICKS_WORKSPACE_TOKEN_VALUE"),
+                config_template=self.env_config.get("spark_config__databricks__config_template"),
+                databricks_work_dir=self.env_config.get("spark_config__databricks__work_dir"),
+            )
+        else:
+            if self.spark_runtime == "inprocess":
+                from feathr.spark_provider._inprocess_submission import _FeathrInProcessJobLauncher as launcher_class
+            else:
+                from feathr.spark_provider._localspark_submission import _FeathrLocalSparkJobLauncher as launcher_class
+
+            return launcher_class(
+                workspace_path=self.env_config.get("spark_config__local__workspace"),
+                master=self.env_config.get("spark_config__local__master"),
+                debug_folder=self._debug_folder,
+                retry=self._job_retry,
+                retry_sec=self._job_retry_sec,
+            )
+
     def _check_required_environment_variables_exist(self):
         """Checks if the required environment variables(form feathr_config.yaml) is set.
 
@@ -411,8 +517,38 @@ class FeathrClient(object):
         return feature_data
 
     def multi_get_online_features(
-            self, feature_table: str, keys: List[Any], feature_names: List[str], sink: Sink = None
+            self,
+            feature_table: str,
+            keys: List[Any],
+            feature_names: List[str],
+            sink: Sink = None,
+            derived_features: List[DerivedFeature] = None,
     ) -> Dict[str, List[Any] ]:
+        """Fetch online features for multiple keys.
+
+        Args:
+            feature_table: The name of the feature table.
+            keys: A list of keys for which features are to be retrieved.
+            feature_names: A list of feature names to retrieve.
+            sink (optional): The online store to read from. Default to Redis.
+            derived_features (optional): Derived features to compute from the fetched anchor features, without
+                materializing them. Their expressions are evaluated on all the keys at once, see
+                `feathr.utils.dsl.dsl_evaluator`. Their input anchor features must be in the feature table.
+
+        Returns:
+            A dictionary mapping keys to lists of feature values, in the order of `feature_names` followed by the
+            order of `derived_features`.
+        """
+        requested_feature_names = feature_names
+        evaluator = None
+        if derived_features:
+            from feathr.utils.dsl.dsl_evaluator import DerivedFeatureEvaluator
+
+            evaluator = DerivedFeatureEvaluator(derived_features)
+            feature_names = feature_names + [
+                name for name in evaluator.input_feature_names if name not in feature_names
+            ]
+
         feature_data = {}
         if sink is None or isinstance(sink, RedisSink):
             redis_crud = RedisCRUD(
@@ -437,6 +573,19 @@ class FeathrClient(object):
                 feature_names=feature_names
             )
 
+        if evaluator is not None and feature_data:
+            rows = list(feature_data.values())
+            derived_data = evaluator.evaluate(
+                {
+                    name: [row[feature_names.index(name)] for row in rows]
+                    for name in evaluator.input_feature_names
+                }
+            )
+            feature_data = {
+                key: row[: len(requested_feature_names)] + [derived_data[f.name][i] for f in derived_features]
+                for i, (key, row) in enumerate(feature_data.items())
+            }
+
         return feature_data
 
     def multi_get_online_features_by_crud(
@@ -601,8 +750,10 @@ class FeathrClient(object):
         cluster_mode = self.redis_cluster_mode
 
         if cluster_mode:
+            from rediscluster import RedisCluster
+
             startup_nodes = [{"host": host, "port": port}]
-            self.redis_client = RedisCluster(
+            self._redis_client = RedisCluster(
                 startup_nodes=startup_nodes,
                 password=password,
                 decode_responses=True,
@@ -611,13 +762,17 @@ class FeathrClient(object):
             )
             self.logger.info("Redis Cluster connected !!!")
         else:
-            self.redis_client = redis.Redis(
+            import redis
+
+            self._redis_client = redis.Redis(
                 host=host, port=port, password=password, ssl=self._str_to_bool(ssl_enabled, "ssl_enabled")
             )
             self.logger.info("Redis connection is successful and completed.")
 
     def _construct_mongodb_client(self):
         try:
+            from pymongo import MongoClient
+
             mongodb_user = self.env_config.get_from_env_or_akv("MONGODB_USER")
             mongodb_password = self.env_config.get_from_env_or_akv("MONGODB_PASSWORD")
 
@@ -632,7 +787,7 @@ class FeathrClient(object):
                 )
 
             if mongodb_user and mongodb_password:
-                self.mongodb_client = MongoClient(
+                self._mongodb_client = MongoClient(
                     host=self.mongodb_host,
                     port=int(self.mongodb_port),
                     username=mongodb_user,
@@ -640,18 +795,18 @@ class FeathrClient(object):
                 )
             else:
                 logger.warning("MongoDB connection is being established without authentication.")
-                self.mongodb_client = MongoClient(
+                self._mongodb_client = MongoClient(
                     host=self.mongodb_host,
                     port=int(self.mongodb_port)
                 )
 
-            if self.mongodb_database not in self.mongodb_client.list_database_names():
+            if self.mongodb_database not in self._mongodb_client.list_database_names():
                 logger.info(f"Database '{self.mongodb_database}' does not exist. Creating the database...")
-                self.mongodb_db = self.mongodb_client[self.mongodb_database]
-                self.mongodb_db.create_collection("default_collection")
+                self._mongodb_db = self._mongodb_client[self.mongodb_database]
+                self._mongodb_db.create_collection("default_collection")
                 logger.info(f"Database '{self.mongodb_database}' and a default collection have been created.")
             else:
-                self.mongodb_db = self.mongodb_client[self.mongodb_database]
+                self._mongodb_db = self._mongodb_client[self.mongodb_database]
                 logger.info(f"Successfully connected to existing MongoDB database: {self.mongodb_database}.")
         except Exception as e:
             logger.error(f"Error during MongoDB client construction: {e}")
@@ -711,8 +866,17 @@ class FeathrClient(object):
 
         udf_files = _PreprocessingPyudfManager.prepare_pyspark_udf_files(feature_names, self.local_workspace_dir)
 
+        source_paths = None
+        # The windows end at the observation time minus the simulated delay
+        delay = parse_duration(observation_settings.simulate_time_delay or "0s")
+        if observation_settings.observation_time_range and delay is not None and "anchor_list" in dir(self):
+            start, end = observation_settings.observation_time_range
+            source_paths = self.partition_planner.plan(
+                self.anchor_list, self.derived_feature_list, feature_names, start - delay, end
+            )
+
         # produce join config
-        tm = Template(
+        tm = compile_template(
             """
             {{observation_settings.to_feature_config()}}
             featureList: [
@@ -733,7 +897,7 @@ class FeathrClient(object):
         # in build_features it will assign anchor_list and derived_feature_list variable, hence we are checking if those two variables exist to make sure the above condition is met
         if "anchor_list" in dir(self) and "derived_feature_list" in dir(self):
             self.config_helper.save_to_feature_config_from_context(
-                self.anchor_list, self.derived_feature_list, self.local_workspace_dir
+                self.anchor_list, self.derived_feature_list, self.local_workspace_dir, source_paths=source_paths
             )
         else:
             raise RuntimeError("Please call FeathrClient.build_features() first in order to get offline features")
@@ -787,7 +951,7 @@ class FeathrClient(object):
         """
 
         # submit the jars
-        return self.feathr_spark_launcher.submit_feathr_job(
+        return self.job_scheduler.submit(
             job_name=self.project_name + "_feathr_feature_join_job",
             main_jar_path=self._FEATHR_JOB_JAR_PATH,
             python_files=cloud_udf_paths,
@@ -831,25 +995,49 @@ class FeathrClient(object):
 
     def get_job_result_uri(self, block=True, timeout_sec=300) -> str:
         """Gets the job output URI"""
+        # Use the handle of the latest job if any, so that the job tags are fetched only once after the job finished
+        latest_job = self.job_scheduler.latest_handle
         if not block:
-            return self.feathr_spark_launcher.get_job_result_uri()
+            return latest_job.get_job_result_uri() if latest_job else self.feathr_spark_launcher.get_job_result_uri()
         # Block the API by pooling the job status and wait for complete
-        if self.feathr_spark_launcher.wait_for_completion(timeout_sec):
-            return self.feathr_spark_launcher.get_job_result_uri()
+        if latest_job:
+            succeeded = latest_job.wait_for_completion(timeout_sec)
+        else:
+            succeeded = self.feathr_spark_launcher.wait_for_completion(timeout_sec)
+        if succeeded:
+            return latest_job.get_job_result_uri() if latest_job else self.feathr_spark_launcher.get_job_result_uri()
         else:
             raise RuntimeError("Spark job failed so output cannot be retrieved.")
 
     def get_job_tags(self) -> Dict[str, str]:
         """Gets the job tags"""
-        return self.feathr_spark_launcher.get_job_tags()
+        latest_job = self.job_scheduler.latest_handle
+        return latest_job.get_job_tags() if latest_job else self.feathr_spark_launcher.get_job_tags()
 
     def wait_job_to_finish(self, timeout_sec: int = 300):
         """Waits for the job to finish in a blocking way unless it times out"""
-        if self.feathr_spark_launcher.wait_for_completion(timeout_sec):
+        # The latest job may still be queued in the scheduler, waiting on its handle submits it first
+        latest_job = self.job_scheduler.latest_handle
+        if latest_job:
+            succeeded = latest_job.wait_for_completion(timeout_sec)
+        else:
+            succeeded = self.feathr_spark_launcher.wait_for_completion(timeout_sec)
+        if succeeded:
             return
         else:
             raise RuntimeError("Spark job failed.")
 
+    def wait_all_jobs_to_finish(self, jobs: List[JobHandle] = None, timeout_sec: Optional[int] = None):
+        """Waits for all the submitted jobs (including the queued ones) to finish in a blocking way unless it times out
+
+        Args:
+            jobs (optional): Job handles to wait for, e.g. the ones returned by `materialize_features`. Defaults to all
+                the jobs submitted by this client.
+            timeout_sec (optional): Time out secs for all the jobs. Wait forever if not set.
+        """
+        if not self.job_scheduler.wait_all(jobs, timeout_seconds=timeout_sec):
+            raise RuntimeError("One or more Spark jobs failed.")
+
     def monitor_features(
         self,
         settings: MonitoringSettings,
@@ -917,6 +1105,8 @@ class FeathrClient(object):
         execution_configurations: Union[SparkExecutionConfiguration, Dict[str, str]] = {},
         verbose: bool = False,
         allow_materialize_non_agg_feature: bool = False,
+        backfill_windows_per_job: Optional[int] = None,
+        prune_partitions: bool = True,
     ):
         """Materialize feature data
 
@@ -924,6 +1114,12 @@ class FeathrClient(object):
             settings: Feature materialization settings
             execution_configurations: a dict that will be passed to spark job when the job starts up, i.e. the "spark configurations". Note that not all of the configuration will be honored since some of the configurations are managed by the Spark platform, such as Databricks or Azure Synapse. Refer to the [spark documentation](https://spark.apache.org/docs/latest/configuration.html) for a complete list of spark configurations.
             allow_materialize_non_agg_feature: Materializing non-aggregated features (the features without WindowAggTransformation) doesn't output meaningful results so it's by default set to False, but if you really want to materialize non-aggregated features, set this to True.
+            backfill_windows_per_job (optional): Number of backfill cutoff times to materialize in one Spark application. By default every cutoff time is materialized by its own Spark job. When set, the PySpark driver runs the windows one after another in the same SparkSession, loading and preprocessing the sources only once. The status of every window can be retrieved with `get_backfill_window_statuses`.
+            prune_partitions (optional): Pass the partitions of the time partitioned sources covered by the backfill cutoff times and the feature windows to the jobs as an explicit path list, so that the jobs don't list all the partitions. Only applies to the sources of sliding window aggregation features. True by default.
+
+        Returns:
+            A list of `JobHandle`, one per Spark job. Use `wait_all_jobs_to_finish` to wait for all of them.
+            At most `spark_config__max_concurrent_jobs` jobs run at the same time, the rest are queued.
         """
         feature_list = settings.feature_names
         if len(feature_list) > 0:
@@ -967,8 +1163,32 @@ class FeathrClient(object):
                 # Note, for now we only cache one output path from one of HdfsSinks (if one passed multiple sinks).
                 output_path = sink.output_path
 
-        results = []
-        # produce materialization config
+        if backfill_windows_per_job is not None and int(backfill_windows_per_job) < 1:
+            raise ValueError(f"backfill_windows_per_job should be a positive number, but got {backfill_windows_per_job}.")
+
+        # make sure `FeathrClient.build_features()` is called before getting offline features/materialize features in the python SDK
+        # otherwise users will be confused on what are the available features
+        # in build_features it will assign anchor_list and derived_feature_list variable, hence we are checking if those two variables exist to make sure the above condition is met
+        if "anchor_list" in dir(self) and "derived_feature_list" in dir(self):
+            source_paths = None
+            if prune_partitions:
+                cutoff_times = settings.get_backfill_cutoff_time()
+                # The features of a cutoff time cover the whole day or hour of the cutoff time
+                end = max(cutoff_times) + (timedelta(days=1) if settings.resolution == "DAILY" else timedelta(hours=1))
+                source_paths = self.partition_planner.plan(
+                    self.anchor_list,
+                    self.derived_feature_list,
+                    feature_list,
+                    min(cutoff_times),
+                    end - timedelta(microseconds=1),
+                )
+            self.config_helper.save_to_feature_config_from_context(
+                self.anchor_list, self.derived_feature_list, self.local_workspace_dir, source_paths=source_paths
+            )
+        else:
+            raise RuntimeError("Please call FeathrClient.build_features() first in order to materialize the features")
+
+        # produce materialization config, one per backfill cutoff time
         import copy
         hdfs_sinks = []
         non_hdfs_sinks = []
@@ -977,8 +1197,9 @@ class FeathrClient(object):
                 hdfs_sinks.append(sink)
             else:
                 non_hdfs_sinks.append(sink)
-        count = 0
-        for end in sorted(settings.get_backfill_cutoff_time()):
+        cutoff_times = sorted(settings.get_backfill_cutoff_time())
+        config_file_paths = []
+        for count, end in enumerate(cutoff_times):
             settings.backfill_time.end = end
             copy_settings = copy.copy(settings)
             if len(hdfs_sinks) > 0:
@@ -989,36 +1210,38 @@ class FeathrClient(object):
                     rename_store_name_sinks.append(copy_s)
                 copy_settings.sinks = non_hdfs_sinks + rename_store_name_sinks
             config = _to_materialization_config(copy_settings)
-            count+=1
             config_file_name = "feature_gen_conf/auto_gen_config_{}.conf".format(end.timestamp())
             config_file_path = os.path.join(self.local_workspace_dir, config_file_name)
             write_to_file(content=config, full_file_name=config_file_path)
+            config_file_paths.append(config_file_path)
 
-            # make sure `FeathrClient.build_features()` is called before getting offline features/materialize features in the python SDK
-            # otherwise users will be confused on what are the available features
-            # in build_features it will assign anchor_list and derived_feature_list variable, hence we are checking if those two variables exist to make sure the above condition is met
-            if "anchor_list" in dir(self) and "derived_feature_list" in dir(self):
-                self.config_helper.save_to_feature_config_from_context(
-                    self.anchor_list, self.derived_feature_list, self.local_workspace_dir
-                )
-            else:
-                raise RuntimeError(
-                    "Please call FeathrClient.build_features() first in order to materialize the features"
-                )
+        # the batched backfill mode is implemented in the PySpark driver, so it's needed even without UDFs
+        batched = backfill_windows_per_job is not None
+        udf_files = _PreprocessingPyudfManager.prepare_pyspark_udf_files(
+            settings.feature_names, self.local_workspace_dir, force_pyspark=batched
+        )
 
-            udf_files = _PreprocessingPyudfManager.prepare_pyspark_udf_files(
-                settings.feature_names, self.local_workspace_dir
-            )
+        windows_per_job = int(backfill_windows_per_job) if batched else 1
+        results = []
+        for start in range(0, len(config_file_paths), windows_per_job):
+            job_config_file_paths = config_file_paths[start : start + windows_per_job]
+            backfill_status_path = self._get_backfill_status_path(settings.name, cutoff_times[start]) if batched else None
             # CLI will directly call this so the experience won't be broken
             result = self._materialize_features_with_config(
-                feature_gen_conf_path=config_file_path,
+                feature_gen_conf_path=job_config_file_paths[0],
                 execution_configurations=execution_configurations,
                 udf_files=udf_files,
                 secrets=secrets,
                 output_path=output_path,
+                batched_gen_conf_paths=job_config_file_paths if batched else None,
+                backfill_status_path=backfill_status_path,
             )
-            if os.path.exists(config_file_path) and self.spark_runtime != "local":
-                os.remove(config_file_path)
+            if batched:
+                result.backfill_cutoff_times = cutoff_times[start : start + windows_per_job]
+                result.backfill_status_path = backfill_status_path
+            for config_file_path in job_config_file_paths:
+                if os.path.exists(config_file_path) and self.spark_runtime not in LOCAL_SPARK_RUNTIMES:
+                    os.remove(config_file_path)
             results.append(result)
 
         # Pretty print feature_names of materialized features
@@ -1028,6 +1251,39 @@ class FeathrClient(object):
 
         return results
 
+    def _get_backfill_status_path(self, settings_name: str, first_cutoff_time) -> str:
+        """Where the PySpark driver writes the per-window status of a batched backfill job to"""
+        status_dir = "backfill_status/{}_{}".format(settings_name, int(first_cutoff_time.timestamp()))
+        if self.spark_runtime == "azure_synapse":
+            return self.env_config.get("spark_config__azure_synapse__workspace_dir").rstrip("/") + "/" + status_dir
+        elif self.spark_runtime == "databricks":
+            return self.env_config.get("spark_config__databricks__work_dir").rstrip("/") + "/" + status_dir
+        return os.path.abspath(os.path.join(self.local_workspace_dir, status_dir))
+
+    def get_backfill_window_statuses(self, job: JobHandle) -> List[Dict[str, Any]]:
+        """Get the status of every backfill window of a job submitted by `materialize_features` with
+        `backfill_windows_per_job`. The statuses are written by the job at the end, so wait for the job to finish first.
+
+        Returns:
+            One dict per window with `end_time`, `generation_config`, `status` (`SUCCESS` or `FAILED`),
+            `duration_seconds` and `error`.
+        """
+        status_path = getattr(job, "backfill_status_path", None)
+        if status_path is None:
+            raise RuntimeError("The job is not a batched backfill job submitted by `materialize_features`.")
+        if self.spark_runtime in LOCAL_SPARK_RUNTIMES:
+            local_dir = status_path
+        else:
+            local_dir = tempfile.TemporaryDirectory().name
+            self.feathr_spark_launcher.download_result(result_path=status_path, local_folder=local_dir)
+        statuses = []
+        for status_file in sorted(Path(local_dir).glob("*.json")):
+            with open(status_file) as f:
+                statuses.extend(json.loads(line) for line in f if line.strip())
+        for status in statuses:
+            status["end_time"] = job.backfill_cutoff_times[status["window"]]
+        return sorted(statuses, key=lambda status: status["window"])
+
     def _materialize_features_with_config(
         self,
         feature_gen_conf_path: str = "feature_gen_conf/feature_gen.conf",
@@ -1035,6 +1291,8 @@ class FeathrClient(object):
         udf_files: List = [],
         secrets: List = [],
         output_path: str = None,
+        batched_gen_conf_paths: List[str] = None,
+        backfill_status_path: str = None,
     ):
         """Materializes feature data based on the feature generation config. The feature
         data will be materialized to the destination specified in the feature generation config.
@@ -1045,6 +1303,8 @@ class FeathrClient(object):
             udf_files: UDF files.
             secrets: Secrets to access sinks.
             output_path: The output path of the materialized features when using an offline sink.
+            batched_gen_conf_paths: Generation configs of all the backfill windows to run in this job, in the batched backfill mode. Requires the PySpark driver in `udf_files`.
+            backfill_status_path: Where the PySpark driver writes the per-window status to, in the batched backfill mode.
         """
         cloud_udf_paths = [
             self.feathr_spark_launcher.upload_or_get_cloud_path(udf_local_path) for udf_local_path in udf_files
@@ -1092,7 +1352,19 @@ class FeathrClient(object):
         if monitoring_config_str:
             arguments.append("--monitoring-config")
             arguments.append(monitoring_config_str)
-        return self.feathr_spark_launcher.submit_feathr_job(
+        if batched_gen_conf_paths:
+            # Driver-only arguments, see `feathr_pyspark_driver_template.submit_batched_generation_job`
+            arguments.append(BATCHED_GENERATION_CONFIGS_ARG)
+            arguments.append(
+                ",".join(
+                    self.feathr_spark_launcher.upload_or_get_cloud_path(os.path.abspath(path))
+                    for path in batched_gen_conf_paths
+                )
+            )
+            if backfill_status_path:
+                arguments.append(BACKFILL_STATUS_PATH_ARG)
+                arguments.append(backfill_status_path)
+        return self.job_scheduler.submit(
             job_name=self.project_name + "_feathr_feature_materialization_job",
             main_jar_path=self._FEATHR_JOB_JAR_PATH,
             python_files=cloud_udf_paths,
@@ -1104,13 +1376,6 @@ class FeathrClient(object):
             properties=self._collect_secrets(secrets),
         )
 
-    def wait_job_to_finish(self, timeout_sec: int = 300):
-        """Waits for the job to finish in a blocking way unless it times out"""
-        if self.feathr_spark_launcher.wait_for_completion(timeout_sec):
-            return
-        else:
-            raise RuntimeError("Spark job failed.")
-
     def _getRedisConfigStr(self):
         """Construct the Redis config string. The host, port, credential and other parameters can be set via environment
         variables."""
@@ -1285,6 +1550,8 @@ class FeathrClient(object):
                 feature_dict[feature.name] = feature
                 key_dict[feature.name] = feature.key
                 if verbose:
+                    from feathr.registry._feathr_registry_client import feature_to_def
+
                     logger.info(json.dumps(feature_to_def(feature), indent=2))
         if verbose and registry_derived_feature_list:
             logger.info("Get derived features from registry: ")
@@ -1292,13 +1559,15 @@ class FeathrClient(object):
             feature_dict[feature.name] = feature
             key_dict[feature.name] = feature.key
             if verbose:
+                from feathr.registry._feathr_registry_client import derived_feature_to_def
+
                 logger.info(json.dumps(derived_feature_to_def(feature), indent=2))
         if return_keys:
             return feature_dict, key_dict
         return feature_dict
 
     def _reshape_config_str(self, config_str: str):
-        if self.spark_runtime == "local":
+        if self.spark_runtime in LOCAL_SPARK_RUNTIMES:
             return "'{" + config_str + "}'"
         else:
             return config_str
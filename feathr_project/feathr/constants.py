@@ -29,5 +29,14 @@ TYPEDEF_ARRAY_DERIVED_FEATURE = f"array<feathr_derived_feature_{REGISTRY_TYPEDEF
 TYPEDEF_ARRAY_ANCHOR_FEATURE = f"array<feathr_anchor_feature_{REGISTRY_TYPEDEF_VERSION}>"
 
 
+# Spark runtimes which run the jobs on this machine and write the results to the local file system.
+# 'inprocess' runs small feature join jobs in the client process and submits the other jobs to local Spark.
+LOCAL_SPARK_RUNTIMES = {"local", "inprocess"}
+
 JOIN_CLASS_NAME = "com.linkedin.feathr.offline.job.FeatureJoinJob"
 GEN_CLASS_NAME = "com.linkedin.feathr.offline.job.FeatureGenJob"
+
+# Driver-only arguments of the PySpark driver for running several backfill windows in one Spark application.
+# Keep them in sync with `feathr/udf/feathr_pyspark_driver_template.py`.
+BATCHED_GENERATION_CONFIGS_ARG = "--feathr-batched-generation-configs"
+BACKFILL_STATUS_PATH_ARG = "--feathr-backfill-status-path"
@@ -1,20 +1,24 @@
+import os
 from pathlib import Path
 from tempfile import TemporaryDirectory
 from threading import local
+from typing import List
 from urllib.parse import urlparse
 
 import pandas as pd
 from pyspark.sql import DataFrame, SparkSession
 
 from feathr.datasets import NYC_TAXI_SMALL_URL
-from feathr.datasets.utils import maybe_download
+from feathr.datasets.utils import maybe_convert_to_parquet, maybe_download, read_parquet
 from feathr.utils.platform import is_databricks
 
 
 def get_pandas_df(
     local_cache_path: str = None,
+    columns: List[str] = None,
 ) -> pd.DataFrame:
     """Get NYC taxi fare prediction data samples as a pandas DataFrame.
+    The data set is converted to parquet next to the downloaded file once, and loaded from the parquet file after.
 
     Refs:
         https://www1.nyc.gov/site/tlc/about/tlc-trip-record-data.page
@@ -22,6 +26,7 @@ def get_pandas_df(
     Args:
         local_cache_path (optional): Local cache file path to download the data set.
             If local_cache_path is a directory, the source file name will be added.
+        columns (optional): Columns to load. Default to load all the columns.
 
     Returns:
         pandas DataFrame
@@ -38,7 +43,7 @@ def get_pandas_df(
 
     maybe_download(src_url=NYC_TAXI_SMALL_URL, dst_filepath=local_cache_path)
 
-    pdf = pd.read_csv(local_cache_path)
+    pdf = read_parquet(maybe_convert_to_parquet(local_cache_path), columns=columns)
 
     return pdf
 
@@ -46,8 +51,10 @@ def get_pandas_df(
 def get_spark_df(
     spark: SparkSession,
     local_cache_path: str,
+    columns: List[str] = None,
 ) -> DataFrame:
     """Get NYC taxi fare prediction data samples as a spark DataFrame.
+    The data set is converted to parquet next to the downloaded file once, and loaded from the parquet file after.
 
     Refs:
         https://www1.nyc.gov/site/tlc/about/tlc-trip-record-data.page
@@ -56,6 +63,7 @@ def get_spark_df(
         spark: Spark session.
         local_cache_path: Local cache file path to download the data set.
             If local_cache_path is a directory, the source file name will be added.
+        columns (optional): Columns to load. Default to load all the columns.
 
     Returns:
         Spark DataFrame
@@ -85,7 +93,10 @@ def get_spark_df(
         python_local_cache_path = local_cache_path
 
     maybe_download(src_url=NYC_TAXI_SMALL_URL, dst_filepath=python_local_cache_path)
+    maybe_convert_to_parquet(python_local_cache_path)
 
-    df = spark.read.option("header", True).csv(local_cache_path)
+    df = spark.read.parquet(f"{os.path.splitext(local_cache_path)[0]}.parquet")
+    if columns:
+        df = df.select(*columns)
 
     return df
@@ -1,20 +1,41 @@
 """Dataset utilities
 """
+import hashlib
 import logging
-import math
+import time
 from pathlib import Path
+from typing import List, Optional
+
 import requests
-from urllib.parse import urlparse
 
 from tqdm import tqdm
 
 
 log = logging.getLogger(__name__)
 
+# Downloads are streamed in blocks of this size
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+# Number of times an interrupted download is resumed before giving up
+DEFAULT_RETRIES = 3
+# Seconds to wait for the server to respond or send more data
+_TIMEOUT_SECONDS = 60
+_RETRYABLE_ERRORS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+
 
-def maybe_download(src_url: str, dst_filepath: str, expected_bytes=None) -> bool:
+def maybe_download(
+    src_url: str,
+    dst_filepath: str,
+    expected_bytes: int = None,
+    expected_sha256: str = None,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    retries: int = DEFAULT_RETRIES,
+) -> bool:
     """Check if file exists. If not, download and return True. Else, return False.
 
+    The file is downloaded into `{dst_filepath}.part` first and renamed once it's complete and verified. If the
+    download is interrupted, it's resumed from where it stopped with an HTTP range request, either right away (up to
+    `retries` times) or by the next call.
+
     Refs:
         https://github.com/microsoft/recommenders/blob/main/recommenders/datasets/download_utils.py
 
@@ -22,6 +43,9 @@ def maybe_download(src_url: str, dst_filepath: str, expected_bytes=None) -> bool
         src_url: Source file URL.
         dst_filepath: Destination file path.
         expected_bytes (optional): Expected bytes of the file to verify.
+        expected_sha256 (optional): Expected SHA-256 hex digest of the file to verify.
+        block_size (optional): Size of the blocks the file is streamed in.
+        retries (optional): Number of times to resume an interrupted download.
 
     Returns:
         bool: Whether the file was downloaded or not
@@ -34,31 +58,97 @@ def maybe_download(src_url: str, dst_filepath: str, expected_bytes=None) -> bool
 
     # Check dir if exists. If not, create one
     dst_filepath.parent.mkdir(parents=True, exist_ok=True)
+    part_filepath = dst_filepath.with_name(dst_filepath.name + ".part")
+
+    for attempt in range(retries + 1):
+        try:
+            _download(src_url, part_filepath, block_size)
+            break
+        except _RETRYABLE_ERRORS as e:
+            if attempt == retries:
+                raise
+            log.warning(f"Downloading {src_url} was interrupted, resuming: {e}")
+            time.sleep(min(2**attempt, 30))
+
+    # Verify the file size and checksum. Delete the file if they're not the same as the expected ones.
+    if expected_bytes is not None and expected_bytes != part_filepath.stat().st_size:
+        part_filepath.unlink()
+        raise IOError(f"Failed to verify {str(dst_filepath)}. Maybe interrupted while downloading?")
+    if expected_sha256 is not None and expected_sha256.lower() != get_sha256(part_filepath):
+        part_filepath.unlink()
+        raise IOError(f"Failed to verify the checksum of {str(dst_filepath)}.")
+
+    part_filepath.replace(dst_filepath)
+    return True
 
-    response = requests.get(src_url, stream=True)
-    if response.status_code == 200:
+
+def _download(src_url: str, part_filepath: Path, block_size: int):
+    """Download the file into `part_filepath`, or the rest of it if it's partially downloaded"""
+    offset = part_filepath.stat().st_size if part_filepath.is_file() else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+    with requests.get(src_url, stream=True, headers=headers, timeout=_TIMEOUT_SECONDS) as response:
+        if offset and response.status_code == 416:
+            # Range not satisfiable, i.e. the file was already complete
+            return
+        if response.status_code not in (200, 206):
+            response.raise_for_status()
+            # If not HTTPError yet still cannot download
+            raise Exception(f"Problem downloading {src_url}")
+        if response.status_code == 200:
+            # The server doesn't support range requests, so start over
+            offset = 0
         log.info(f"Downloading {src_url}")
-        total_size = int(response.headers.get("content-length", 0))
-        block_size = 1024
-        num_iterables = math.ceil(total_size / block_size)
-        with open(str(dst_filepath.resolve()), "wb") as file:
-            for data in tqdm(
-                response.iter_content(block_size),
-                total=num_iterables,
-                unit="KB",
-                unit_scale=True,
-            ):
+        total_size = offset + int(response.headers.get("content-length", 0))
+        with open(part_filepath, "ab" if offset else "wb") as file, tqdm(
+            total=total_size, initial=offset, unit="B", unit_scale=True
+        ) as progress:
+            for data in response.iter_content(block_size):
                 file.write(data)
+                progress.update(len(data))
+
+
+def get_sha256(filepath: str, block_size: int = DEFAULT_BLOCK_SIZE) -> str:
+    """Get the SHA-256 hex digest of a file"""
+    sha256 = hashlib.sha256()
+    with open(filepath, "rb") as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def maybe_convert_to_parquet(src_filepath: str, dst_filepath: str = None) -> Path:
+    """Convert a csv file to parquet, unless it's already converted. The parquet file is much faster to load than
+    parsing the csv file, and it can be loaded with a subset of the columns.
+
+    The csv file is parsed by pandas, so the data types are the same as `pd.read_csv`.
+
+    Args:
+        src_filepath: Csv file path.
+        dst_filepath (optional): Parquet file path. Default to the csv file path with `.parquet` suffix.
+
+    Returns:
+        Path: The parquet file path.
+    """
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    src_filepath = Path(src_filepath)
+    dst_filepath = Path(dst_filepath) if dst_filepath else src_filepath.with_suffix(".parquet")
+    # Converted again if the csv file is downloaded again
+    if dst_filepath.is_file() and dst_filepath.stat().st_mtime >= src_filepath.stat().st_mtime:
+        return dst_filepath
+
+    log.info(f"Converting {str(src_filepath)} to {str(dst_filepath)}")
+    table = pa.Table.from_pandas(pd.read_csv(src_filepath), preserve_index=False)
+    tmp_filepath = dst_filepath.with_name(dst_filepath.name + ".tmp")
+    pq.write_table(table, str(tmp_filepath))
+    tmp_filepath.replace(dst_filepath)
+    return dst_filepath
+
+
+def read_parquet(filepath: str, columns: Optional[List[str]] = None):
+    """Read a parquet file as a pandas DataFrame, only the given columns if any"""
+    import pyarrow.parquet as pq
 
-        # Verify the file size
-        if expected_bytes is not None and expected_bytes != dst_filepath.stat().st_size:
-            # Delete the file since the size is not the same as the expected one.
-            dst_filepath.unlink()
-            raise IOError(f"Failed to verify {str(dst_filepath)}. Maybe interrupted while downloading?")
-        else:
-            return True
-
-    else:
-        response.raise_for_status()
-        # If not HTTPError yet still cannot download
-        raise Exception(f"Problem downloading {src_url}")
+    return pq.read_table(str(filepath), columns=columns).to_pandas()
@@ -1,10 +1,10 @@
-from jinja2 import Template
+from feathr.definition.feathrconfig import compile_template
 from feathr.definition.materialization_settings import MaterializationSettings
 
 
 def _to_materialization_config(settings: MaterializationSettings):
     # produce materialization config
-    tm = Template(
+    tm = compile_template(
         """
             operational: {
             name: {{ settings.name }}
@@ -2,9 +2,8 @@ from typing import List, Optional, Dict
 from feathr.definition.feature import Feature
 from feathr.definition.source import Source
 from feathr.definition.typed_key import DUMMY_KEY
-from jinja2 import Template
+from feathr.definition.feathrconfig import HoconConvertible, compile_template, memoize_feature_config
 from feathr.definition.source import INPUT_CONTEXT
-from feathr.definition.feathrconfig import HoconConvertible
 
 
 class FeatureAnchor(HoconConvertible):
@@ -49,8 +48,9 @@ class FeatureAnchor(HoconConvertible):
                         f"should be explicitly specified and not left blank."
                     )
 
+    @memoize_feature_config
     def to_feature_config(self) -> str:
-        tm = Template(
+        tm = compile_template(
             """
             {{anchor_name}}: {
                 source: {{source.name}}
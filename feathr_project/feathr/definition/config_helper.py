@@ -12,11 +12,12 @@ from feathr.definition.typed_key import TypedKey
 from feathr.registry.feature_registry import FeathrRegistry
 from feathr.definition.repo_definitions import RepoDefinitions
 from pathlib import Path
-from jinja2 import Template
+from feathr.definition.feathrconfig import compile_template
 import sys
 from feathr.utils._file_utils import write_to_file
 import importlib
 import os
+from typing import Dict, List
 
 
 class FeathrConfigHelper(object):
@@ -104,16 +105,22 @@ class FeathrConfigHelper(object):
         self._save_anchored_feature_config(repo_definitions, config_save_dir)
         self._save_derived_feature_config(repo_definitions, config_save_dir)
 
-    def save_to_feature_config_from_context(self, anchor_list, derived_feature_list, local_workspace_dir: Path):
-        """Save feature definition within the workspace into HOCON feature config files from current context, rather than reading from python files"""
+    def save_to_feature_config_from_context(
+        self, anchor_list, derived_feature_list, local_workspace_dir: Path, source_paths: Dict[str, List[str]] = None
+    ):
+        """Save feature definition within the workspace into HOCON feature config files from current context, rather than reading from python files
+
+        Args:
+            source_paths: Paths to read for some of the `HdfsSource`s, keyed by source name, see `PartitionPlanner`.
+        """
         repo_definitions = self._extract_features_from_context(anchor_list, derived_feature_list, local_workspace_dir)
         self._save_request_feature_config(repo_definitions, local_workspace_dir)
-        self._save_anchored_feature_config(repo_definitions, local_workspace_dir)
+        self._save_anchored_feature_config(repo_definitions, local_workspace_dir, source_paths)
         self._save_derived_feature_config(repo_definitions, local_workspace_dir)
 
     def _save_request_feature_config(self, repo_definitions: RepoDefinitions, local_workspace_dir="./"):
         config_file_name = "feature_conf/auto_generated_request_features.conf"
-        tm = Template(
+        tm = compile_template(
             """
 // THIS FILE IS AUTO GENERATED. PLEASE DO NOT EDIT.
 anchors: {
@@ -128,12 +135,14 @@ anchors: {
 
         request_feature_configs = tm.render(feature_anchors=repo_definitions.feature_anchors)
         config_file_path = os.path.join(local_workspace_dir, config_file_name)
-        write_to_file(content=request_feature_configs, full_file_name=config_file_path)
+        write_to_file(content=request_feature_configs, full_file_name=config_file_path, skip_unchanged=True)
 
     @classmethod
-    def _save_anchored_feature_config(self, repo_definitions: RepoDefinitions, local_workspace_dir="./"):
+    def _save_anchored_feature_config(
+        self, repo_definitions: RepoDefinitions, local_workspace_dir="./", source_paths: Dict[str, List[str]] = None
+    ):
         config_file_name = "feature_conf/auto_generated_anchored_features.conf"
-        tm = Template(
+        tm = compile_template(
             """
 // THIS FILE IS AUTO GENERATED. PLEASE DO NOT EDIT.
 anchors: {
@@ -146,7 +155,9 @@ anchors: {
 
 sources: {
     {% for source in sources%}
-        {% if not source.name == "PASSTHROUGH" %}
+        {% if source.name in source_paths %}
+            {{source.to_feature_config(paths=source_paths[source.name])}}
+        {% elif not source.name == "PASSTHROUGH" %}
             {{source.to_feature_config()}}
         {% endif %}
     {% endfor %}
@@ -154,15 +165,17 @@ sources: {
 """
         )
         anchored_feature_configs = tm.render(
-            feature_anchors=repo_definitions.feature_anchors, sources=repo_definitions.sources
+            feature_anchors=repo_definitions.feature_anchors,
+            sources=repo_definitions.sources,
+            source_paths=source_paths or {},
         )
         config_file_path = os.path.join(local_workspace_dir, config_file_name)
-        write_to_file(content=anchored_feature_configs, full_file_name=config_file_path)
+        write_to_file(content=anchored_feature_configs, full_file_name=config_file_path, skip_unchanged=True)
 
     @classmethod
     def _save_derived_feature_config(self, repo_definitions: RepoDefinitions, local_workspace_dir="./"):
         config_file_name = "feature_conf/auto_generated_derived_features.conf"
-        tm = Template(
+        tm = compile_template(
             """
 anchors: {}
 derivations: {
@@ -174,4 +187,4 @@ derivations: {
         )
         derived_feature_configs = tm.render(derived_features=repo_definitions.derived_features)
         config_file_path = os.path.join(local_workspace_dir, config_file_name)
-        write_to_file(content=derived_feature_configs, full_file_name=config_file_path)
+        write_to_file(content=derived_feature_configs, full_file_name=config_file_path, skip_unchanged=True)
@@ -1,4 +1,11 @@
 from abc import ABC, abstractmethod
+from enum import Enum
+from functools import lru_cache, wraps
+
+from jinja2 import Template
+
+# Name of the instance attribute holding the memoized config, see `memoize_feature_config`
+_FEATURE_CONFIG_CACHE = "_feature_config_cache"
 
 
 class HoconConvertible(ABC):
@@ -8,3 +15,68 @@ class HoconConvertible(ABC):
     def to_feature_config(self) -> str:
         """Convert the feature anchor definition into internal HOCON format. (For internal use ony)"""
         pass
+
+
+@lru_cache(maxsize=None)
+def compile_template(source: str) -> Template:
+    """Compile a jinja2 template only once. `Template(source)` compiles the source on every call, which adds up
+    when generating the config of thousands of features."""
+    return Template(source)
+
+
+def memoize_feature_config(to_feature_config):
+    """Memoize the result of `to_feature_config` on the object. The cached config is reused as long as the state of
+    the object, including the objects it references like the features of an anchor, is unchanged. Checking the state
+    is much cheaper than rendering the templates again.
+    """
+
+    @wraps(to_feature_config)
+    def wrapper(self, *args, **kwargs):
+        state = (_get_state(self), args, tuple(sorted(kwargs.items())))
+        cache = self.__dict__.setdefault(_FEATURE_CONFIG_CACHE, {})
+        # Keyed by the function as well, since a subclass may override `to_feature_config` and call the parent one
+        key = to_feature_config.__qualname__
+        if key in cache and cache[key][0] == state:
+            return cache[key][1]
+        config = to_feature_config(self, *args, **kwargs)
+        cache[key] = (state, config)
+        return config
+
+    return wrapper
+
+
+_SCALAR_TYPES = frozenset({str, int, float, bool, type(None)})
+
+
+def _get_state(value, _memo: dict = None):
+    """Get a comparable snapshot of the value. Objects are compared by their attributes rather than `__eq__`, e.g.
+    sources are equal if their names are equal."""
+    if type(value) in _SCALAR_TYPES:
+        return value
+    _memo = _memo if _memo is not None else {}
+    # Objects shared by many features (e.g. keys and feature types) are only visited once. This also stops at
+    # reference cycles.
+    key = id(value)
+    if key in _memo:
+        return _memo[key]
+    _memo[key] = ("cycle", key)
+
+    if isinstance(value, Enum):
+        state = value
+    elif isinstance(value, (list, tuple)):
+        state = (type(value), tuple([_get_state(item, _memo) for item in value]))
+    elif isinstance(value, (set, frozenset)):
+        state = (type(value), tuple(sorted((_get_state(item, _memo) for item in value), key=repr)))
+    elif isinstance(value, dict):
+        state = (dict, tuple([(k, _get_state(item, _memo)) for k, item in value.items() if k != _FEATURE_CONFIG_CACHE]))
+    elif hasattr(value, "__dict__") and not callable(value):
+        state = (type(value), _get_state(vars(value), _memo))
+    else:
+        # Functions (e.g. preprocessing UDFs), datetimes, etc.
+        try:
+            hash(value)
+            state = value
+        except TypeError:
+            state = ("id", key)
+    _memo[key] = state
+    return state
@@ -2,12 +2,11 @@ import re
 from copy import deepcopy
 from typing import List, Optional, Union, Dict
 
-from jinja2 import Template
+from feathr.definition.feathrconfig import HoconConvertible, compile_template, memoize_feature_config
 
 from feathr.definition.dtype import FeatureType
 from feathr.definition.transformation import ExpressionTransformation, Transformation, WindowAggTransformation
 from feathr.definition.typed_key import DUMMY_KEY, TypedKey
-from feathr.definition.feathrconfig import HoconConvertible
 
 
 class FeatureBase(HoconConvertible):
@@ -127,8 +126,9 @@ class Feature(FeatureBase):
     ):
         super(Feature, self).__init__(name, feature_type, transform, key, registry_tags)
 
+    @memoize_feature_config
     def to_feature_config(self) -> str:
-        tm = Template(
+        tm = compile_template(
             """
             {{feature.name}}: {
                 {{feature.transform.to_feature_config()}}
@@ -1,6 +1,6 @@
 from typing import List, Optional, Union, Dict
 
-from jinja2 import Template
+from feathr.definition.feathrconfig import compile_template, memoize_feature_config
 
 from feathr.definition.dtype import FeatureType
 from feathr.definition.feature import FeatureBase
@@ -57,8 +57,9 @@ class DerivedFeature(FeatureBase):
                 key_alias, self.name, input_feature_key_alias
             )
 
+    @memoize_feature_config
     def to_feature_config(self) -> str:
-        tm = Template(
+        tm = compile_template(
             """
             {{derived_feature.name}}: {
                 key: [{{','.join(derived_feature.key_alias)}}]
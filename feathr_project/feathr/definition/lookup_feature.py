@@ -1,7 +1,7 @@
 from copy import copy, deepcopy
 from typing import List, Optional, Union, Dict
 
-from jinja2 import Template
+from feathr.definition.feathrconfig import compile_template, memoize_feature_config
 
 from feathr.definition.dtype import FeatureType
 from feathr.definition.feature_derivations import DerivedFeature
@@ -51,8 +51,9 @@ class LookupFeature(DerivedFeature):
         self.expansion_feature = expansion_feature
         self.aggregation = aggregation
 
+    @memoize_feature_config
     def to_feature_config(self) -> str:
-        tm = Template(
+        tm = compile_template(
             """
             {{lookup_feature.name}}: {
                 key: [{{','.join(lookup_feature.key_alias)}}]
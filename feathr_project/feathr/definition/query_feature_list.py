@@ -1,9 +1,8 @@
 from typing import List, Optional, Union
 
-from jinja2 import Template
+from feathr.definition.feathrconfig import HoconConvertible, compile_template
 
 from feathr.definition.typed_key import TypedKey
-from feathr.definition.feathrconfig import HoconConvertible
 
 
 class FeatureQuery(HoconConvertible):
@@ -29,7 +28,7 @@ class FeatureQuery(HoconConvertible):
             self.overrideTimeDelay = override_time_delay
 
     def to_feature_config(self) -> str:
-        tm = Template(
+        tm = compile_template(
             """
             {
                 key: [{{key_columns}}]
@@ -1,7 +1,7 @@
-from typing import Optional
-from jinja2 import Template
+from datetime import datetime
+from typing import Optional, Tuple
+from feathr.definition.feathrconfig import HoconConvertible, compile_template
 from loguru import logger
-from feathr.definition.feathrconfig import HoconConvertible
 
 
 class ConflictsAutoCorrection:
@@ -21,7 +21,7 @@ class ConflictsAutoCorrection:
         self.suffix = suffix
 
     def to_feature_config(self) -> str:
-        tm = Template(
+        tm = compile_template(
             """
             {% if auto_correction.rename_features %}
             renameFeatures: True
@@ -49,6 +49,9 @@ class ObservationSettings(HoconConvertible):
         is_file_path: if the 'observation_path' is a path of file (instead of a directory). Default as 'True'
         conflicts_auto_correction: settings about auto-correct feature names conflicts.
                                    Default as None which means do not enable it.
+        observation_time_range (Optional[Tuple[datetime, datetime]]): the earliest and the latest event timestamps
+            of the observation data. If set, the job only reads the partitions of time partitioned sources covered
+            by the sliding windows of the requested features, instead of listing all the partitions.
     """
 
     def __init__(
@@ -60,6 +63,7 @@ class ObservationSettings(HoconConvertible):
         conflicts_auto_correction: ConflictsAutoCorrection = None,
         file_format: str = "csv",
         is_file_path: bool = True,
+        observation_time_range: Optional[Tuple[datetime, datetime]] = None,
     ) -> None:
         self.event_timestamp_column = event_timestamp_column
         self.simulate_time_delay = simulate_time_delay
@@ -73,9 +77,10 @@ class ObservationSettings(HoconConvertible):
         self.file_format = file_format
         self.is_file_path = is_file_path
         self.conflicts_auto_correction = conflicts_auto_correction
+        self.observation_time_range = observation_time_range
 
     def to_feature_config(self) -> str:
-        tm = Template(
+        tm = compile_template(
             """
                 {% if setting.event_timestamp_column is not none %}
                 settings: {
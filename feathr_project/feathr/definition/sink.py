@@ -2,8 +2,7 @@ from abc import abstractmethod
 import copy
 import json
 from typing import Dict, List, Optional
-from jinja2 import Template
-from feathr.definition.feathrconfig import HoconConvertible
+from feathr.definition.feathrconfig import HoconConvertible, compile_template, memoize_feature_config
 
 
 class Sink(HoconConvertible):
@@ -37,7 +36,7 @@ class MonitoringSqlSink(Sink):
 
     def to_feature_config(self) -> str:
         """Produce the config used in feature monitoring"""
-        tm = Template(
+        tm = compile_template(
             """  
             {
                 name: MONITORING
@@ -74,9 +73,10 @@ class RedisSink(Sink):
         self.streaming = streaming
         self.streamingTimeoutMs = streamingTimeoutMs
 
+    @memoize_feature_config
     def to_feature_config(self) -> str:
         """Produce the config used in feature materialization"""
-        tm = Template(
+        tm = compile_template(
             """  
             {
                 name: REDIS
@@ -146,9 +146,10 @@ class HdfsSink(Sink):
     #     ]
     # }
     # features: [mockdata_a_ct_gen, mockdata_a_sample_gen]
+    @memoize_feature_config
     def to_feature_config(self) -> str:
         """Produce the config used in feature materialization"""
-        tm = Template(
+        tm = compile_template(
             """  
             {
                 name: HDFS
@@ -205,7 +206,7 @@ class JdbcSink(Sink):
 
     def to_feature_config(self) -> str:
         """Produce the config used in feature materialization"""
-        tm = Template(
+        tm = compile_template(
             """  
             {
                 name: JDBC
@@ -270,7 +271,7 @@ class MongoDbSink(Sink):
 
     def to_feature_config(self) -> str:
         """Produce the config used in feature materialization"""
-        tm = Template(
+        tm = compile_template(
             """  
             {
                 name: MONGODB
@@ -1,9 +1,8 @@
 from abc import abstractmethod
 import copy
 from typing import Callable, Dict, List, Optional
-from feathr.definition.feathrconfig import HoconConvertible
+from feathr.definition.feathrconfig import HoconConvertible, compile_template, memoize_feature_config
 
-from jinja2 import Template
 from loguru import logger
 from urllib.parse import urlparse, parse_qs
 import json
@@ -21,7 +20,7 @@ class AvroJsonSchema(SourceSchema):
 
     def to_feature_config(self):
         """Convert the feature anchor definition into internal HOCON format."""
-        tm = Template(
+        tm = compile_template(
             """
         schema: {
             type = "avro"
@@ -98,7 +97,7 @@ class HdfsSource(Source):
     Attributes:
         name (str): name of the source
         path (str): The location of the source data.
-        preprocessing (Optional[Callable]): A preprocessing python function that transforms the source data for further feature transformation.
+        preprocessing (Optional[Callable]): A preprocessing python function that transforms the source data for further feature transformation. Decorate it with `pandas_preprocessing` or `arrow_preprocessing` to apply it on Arrow batches instead of a PySpark DataFrame.
         event_timestamp_column (Optional[str]): The timestamp field of your record. As sliding window aggregation feature assume each record in the source data should have a timestamp column.
         timestamp_format (Optional[str], optional): The format of the timestamp field. Defaults to "epoch". Possible values are:
                                                     - `epoch` (seconds since epoch), for example `1647737463`
@@ -143,10 +142,20 @@ class HdfsSource(Source):
                 path,
             )
 
-    def to_feature_config(self) -> str:
-        tm = Template(
+    @memoize_feature_config
+    def to_feature_config(self, paths: Optional[List[str]] = None) -> str:
+        """Convert the source definition into internal HOCON format.
+
+        Args:
+            paths (optional): Paths to read instead of `path`, e.g. the partition directories a job needs. If set,
+                the job reads exactly those paths and doesn't look up the partitions by `time_partition_pattern`.
+        """
+        tm = compile_template(
             """  
             {{source.name}}: {
+                {% if paths %}
+                location: {type: "pathlist", paths: {{paths | tojson}}}
+                {% else %}
                 location: {path: "{{source.path}}"}
                 {% if source.time_partition_pattern %}
                 timePartitionPattern: "{{source.time_partition_pattern}}"
@@ -154,6 +163,7 @@ class HdfsSource(Source):
                 {% if source.postfix_path %}
                 postfixPath: "{{source.postfix_path}}"
                 {% endif %}
+                {% endif %}
                 {% if source.event_timestamp_column %}
                     timeWindowParameters: {
                         timestampColumn: "{{source.event_timestamp_column}}"
@@ -163,7 +173,7 @@ class HdfsSource(Source):
             } 
         """
         )
-        msg = tm.render(source=self)
+        msg = tm.render(source=self, paths=paths)
         return msg
 
     def __str__(self):
@@ -237,8 +247,9 @@ class SnowflakeSource(Source):
         updated_dict = {key: parsed_queries[key][0] for key in parsed_queries}
         return updated_dict
 
+    @memoize_feature_config
     def to_feature_config(self) -> str:
-        tm = Template(
+        tm = compile_template(
             """  
             {{source.name}}: {
                 type: SNOWFLAKE
@@ -306,8 +317,9 @@ class JdbcSource(Source):
         elif self.auth == "TOKEN":
             return ["%s_TOKEN" % self.name.upper()]
 
+    @memoize_feature_config
     def to_feature_config(self) -> str:
-        tm = Template(
+        tm = compile_template(
             """  
             {{source.name}}: {
                 location: {
@@ -391,8 +403,9 @@ class MongoDbSource(Source):
     def get_required_properties(self):
         return ["%s_USER" % self.name.upper(), "%s_PASSWORD" % self.name.upper()]
 
+    @memoize_feature_config
     def to_feature_config(self) -> str:
-        tm = Template(
+        tm = compile_template(
             """  
             {{source.name}}: {
                 location: {
@@ -454,8 +467,9 @@ class KafKaSource(Source):
         super().__init__(name, registry_tags=registry_tags)
         self.config = kafkaConfig
 
+    @memoize_feature_config
     def to_feature_config(self) -> str:
-        tm = Template(
+        tm = compile_template(
             """
 {{source.name}}: {
     type: KAFKA
@@ -511,8 +525,9 @@ class SparkSqlSource(Source):
             self.table = table
         self.preprocessing = preprocessing
 
+    @memoize_feature_config
     def to_feature_config(self) -> str:
-        tm = Template(
+        tm = compile_template(
             """  
             {{source.name}}: {
                 location: {
@@ -580,8 +595,9 @@ class GenericSource(Source):
         # In Feathr Core, GenericLocation will replace `__` back to `.`
         self.options = dict([(key.replace(".", "__"), options[key]) for key in options])
 
+    @memoize_feature_config
     def to_feature_config(self) -> str:
-        tm = Template(
+        tm = compile_template(
             """  
             {{source.name}}: {
                 location: {
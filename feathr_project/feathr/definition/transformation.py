@@ -1,8 +1,7 @@
 import enum
 from typing import Type, Union, List, Optional
 from abc import ABC, abstractmethod
-from jinja2 import Template
-from feathr.definition.feathrconfig import HoconConvertible
+from feathr.definition.feathrconfig import HoconConvertible, compile_template, memoize_feature_config
 
 
 class Transformation(HoconConvertible):
@@ -28,8 +27,9 @@ class ExpressionTransformation(RowTransformation):
         super().__init__()
         self.expr = expr
 
+    @memoize_feature_config
     def to_feature_config(self, with_def_field_name: Optional[bool] = True) -> str:
-        tm = Template(
+        tm = compile_template(
             """
 {% if with_def_field_name %}
 def.sqlExpr: "{{expr}}"
@@ -69,8 +69,9 @@ class WindowAggTransformation(Transformation):
         self.filter = filter
         self.limit = limit
 
+    @memoize_feature_config
     def to_feature_config(self, with_def_field_name: Optional[bool] = True) -> str:
-        tm = Template(
+        tm = compile_template(
             """
 def:"{{windowAgg.def_expr}}"
 window: {{windowAgg.window}}
@@ -1,3 +1,4 @@
+import hashlib
 import importlib
 import inspect
 import json
@@ -6,7 +7,7 @@ import os
 from pathlib import Path
 import sys
 from urllib.parse import urlparse
-from uuid import UUID
+from uuid import UUID, uuid4
 from azure.identity import DefaultAzureCredential
 from typing import Any, Dict, List, Optional, Tuple
 from re import sub
@@ -57,13 +58,27 @@ from feathr.registry.registry_utils import (
 )
 
 
+# Number of entities fetched in each page when listing the entities of a project
+LIST_PAGE_SIZE = 1000
+# Default directory of the definitions cached by `get_features_from_registry`
+DEFAULT_REGISTRY_CACHE_DIR = Path.home() / ".feathr" / "registry_cache"
+
+
 class _FeatureRegistry(FeathrRegistry):
     def __init__(
-        self, project_name: str, endpoint: str, project_tags: Dict[str, str] = None, credential=None, config_path=None
+        self,
+        project_name: str,
+        endpoint: str,
+        project_tags: Dict[str, str] = None,
+        credential=None,
+        config_path=None,
+        cache_dir: Optional[str] = None,
     ):
         self.project_name = project_name
         self.project_tags = project_tags
         self.endpoint = endpoint
+        # Definitions fetched from the registry are cached here, so that only the changed ones are fetched next time
+        self.cache_dir = Path(cache_dir) if cache_dir else DEFAULT_REGISTRY_CACHE_DIR
         # TODO: expand to more credential provider
         # If FEATHR_SANDBOX is set in the environment variable, don't do auth
         self.credential = (
@@ -95,23 +110,25 @@ class _FeatureRegistry(FeathrRegistry):
         # Before starting, create the project
         self.project_id = self._create_project()
 
-        for anchor in anchor_list:
-            source = anchor.source
-            # 1. Create Source on the registry
-            # We always re-create INPUT_CONTEXT as lots of existing codes reuse the singleton in different projects
-            if (source.name == INPUT_CONTEXT) or (not hasattr(source, "_registry_id")):
-                source._registry_id = self._create_source(source)
-            # 2. Create Anchor on the registry
-            if not hasattr(anchor, "_registry_id"):
-                anchor._registry_id = self._create_anchor(anchor)
-            # 3. Create all features on the registry
-            for feature in anchor.features:
-                if not hasattr(feature, "_registry_id"):
-                    feature._registry_id = self._create_anchor_feature(anchor._registry_id, feature)
-        # 4. Create all derived features on the registry
-        for df in topological_sort(derived_feature_list):
-            if not hasattr(df, "_registry_id"):
-                df._registry_id = self._create_derived_feature(df)
+        # Create everything in one call, or one by one if the registry doesn't support it
+        if not self._create_entities(anchor_list, derived_feature_list):
+            for anchor in anchor_list:
+                source = anchor.source
+                # 1. Create Source on the registry
+                # We always re-create INPUT_CONTEXT as lots of existing codes reuse the singleton in different projects
+                if (source.name == INPUT_CONTEXT) or (not hasattr(source, "_registry_id")):
+                    source._registry_id = self._create_source(source)
+                # 2. Create Anchor on the registry
+                if not hasattr(anchor, "_registry_id"):
+                    anchor._registry_id = self._create_anchor(anchor)
+                # 3. Create all features on the registry
+                for feature in anchor.features:
+                    if not hasattr(feature, "_registry_id"):
+                        feature._registry_id = self._create_anchor_feature(anchor._registry_id, feature)
+            # 4. Create all derived features on the registry
+            for df in topological_sort(derived_feature_list):
+                if not hasattr(df, "_registry_id"):
+                    df._registry_id = self._create_derived_feature(df)
         url = "/".join(self.endpoint.split("/")[:3])
         logging.info(f"Check project lineage by this link: {url}/projects/{self.project_name}/lineage")
 
@@ -119,16 +136,30 @@ class _FeatureRegistry(FeathrRegistry):
         """List all the already registered features. If project_name is not provided or is None, it will return all
         the registered features; otherwise it will only return features under this project
         """
-        resp = self._get(f"/projects/{project_name}/features")
-        # In V1 API resp should be an array, will be changed in V2 API
-        return [
-            {
-                "name": r["attributes"]["name"],
-                "id": r["guid"],
-                "qualifiedName": r["attributes"]["qualifiedName"],
-            }
-            for r in resp
-        ]
+        # Only the names are fetched, page by page. Registries not supporting pages return all the features at once.
+        params = {"limit": LIST_PAGE_SIZE, "fields": "name,qualifiedName"}
+        features = []
+        while True:
+            r = check(
+                requests.get(
+                    f"{self.endpoint}/projects/{project_name}/features",
+                    params=params,
+                    headers=self._get_auth_header(),
+                )
+            )
+            # In V1 API resp should be an array, will be changed in V2 API
+            features.extend(
+                {
+                    "name": e["attributes"]["name"],
+                    "id": e["guid"],
+                    "qualifiedName": e["attributes"]["qualifiedName"],
+                }
+                for e in r.json()
+            )
+            cursor = r.headers.get("X-Next-Cursor")
+            if not cursor:
+                return features
+            params["cursor"] = cursor
 
     def list_dependent_entities(self, qualified_name: str):
         """
@@ -154,17 +185,127 @@ class _FeatureRegistry(FeathrRegistry):
         """
         [Sync Features from registry to local workspace, given a project_name, will write project's features from registry to to user's local workspace]
 
+        The definitions are cached in `cache_dir` along with the project version, and only the definitions changed
+        since that version are fetched next time. If the registry doesn't support fetching the changes, the whole
+        project is fetched every time.
+
         Args:
             project_name (str): project name.
         """
-        lineage = self._get(f"/projects/{project_name}")
-        return dict_to_project(lineage)
+        return dict_to_project({"guidEntityMap": self._sync_project(project_name)})
+
+    def _sync_project(self, project_name: str) -> Dict[str, dict]:
+        """Get the entities of a project by guid, applying the changes since the cached version to the cached ones"""
+        cache_path = self._get_cache_path(project_name)
+        version, entities = 0, {}
+        try:
+            with open(cache_path) as f:
+                cached = json.load(f)
+            version, entities = cached["version"], cached["guidEntityMap"]
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError, TypeError) as e:
+            logging.warning(f"Ignoring the corrupted registry cache {cache_path}: {e}")
+
+        r = requests.get(
+            f"{self.endpoint}/projects/{project_name}/changes",
+            params={"since": version},
+            headers=self._get_auth_header(),
+        )
+        if r.status_code == 404:
+            # The registry doesn't support fetching the changes, or the project doesn't exist
+            return self._get(f"/projects/{project_name}")["guidEntityMap"]
+        changes = check(r).json()
+        if changes["version"] < version:
+            # The registry returns everything in the project if it doesn't know the version, e.g. it's been reset
+            entities = {}
+        entities.update(changes["guidEntityMap"])
+        for guid in changes["deletedGuids"]:
+            entities.pop(guid, None)
+        # Projects without any recorded change are at version 0, nothing to sync from
+        if changes["version"] > 0 and changes["version"] != version:
+            self._save_cache(cache_path, changes["version"], entities)
+        return entities
+
+    def _get_cache_path(self, project_name: str) -> Path:
+        endpoint_hash = hashlib.sha256(self.endpoint.encode("utf-8")).hexdigest()[:16]
+        return self.cache_dir / endpoint_hash / f"{project_name}.json"
+
+    @staticmethod
+    def _save_cache(cache_path: Path, version: int, entities: Dict[str, dict]):
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+            with open(tmp_path, "w") as f:
+                json.dump({"version": version, "guidEntityMap": entities}, f)
+            # Replace the cache at once so that concurrent clients never read a partially written one
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            logging.warning(f"Failed to write the registry cache {cache_path}: {e}")
 
     def _create_project(self) -> UUID:
         r = self._post(f"/projects", {"name": self.project_name})
         self.project_id = UUID(r["guid"])
         return self.project_id
 
+    def _create_entities(self, anchor_list: List[FeatureAnchor], derived_feature_list: List[DerivedFeature]) -> bool:
+        """Create the sources, anchors and features not registered yet in one call, all or nothing.
+        The entities are given temporary ids to refer to each other in the request, which are replaced by the ids
+        returned by the registry. Returns False if the registry doesn't support creating entities in one call.
+        """
+        body = {"sources": {}, "anchors": {}, "anchorFeatures": {}, "derivedFeatures": {}}
+        # (entity, id before this call, qualified name) of the entities in the request
+        staged = []
+
+        def stage(entity, kind: str, qualified_name: str, to_def):
+            staged.append((entity, getattr(entity, "_registry_id", None), qualified_name))
+            entity._registry_id = uuid4()
+            body[kind][str(entity._registry_id)] = to_def(entity)
+
+        for anchor in anchor_list:
+            source = anchor.source
+            # We always re-create INPUT_CONTEXT as lots of existing codes reuse the singleton in different projects
+            if not any(source is e for e, _, _ in staged) and (
+                source.name == INPUT_CONTEXT or not hasattr(source, "_registry_id")
+            ):
+                stage(source, "sources", f"{self.project_name}__{source.name}", source_to_def)
+            if not hasattr(anchor, "_registry_id"):
+                stage(anchor, "anchors", f"{self.project_name}__{anchor.name}", anchor_to_def)
+            for feature in anchor.features:
+                if not hasattr(feature, "_registry_id"):
+                    stage(
+                        feature,
+                        "anchorFeatures",
+                        f"{self.project_name}__{anchor.name}__{feature.name}",
+                        lambda f: {**feature_to_def(f), "anchorId": str(anchor._registry_id)},
+                    )
+        # Derived features can only refer to the ones before them in the request
+        for df in topological_sort(derived_feature_list):
+            if not hasattr(df, "_registry_id"):
+                stage(df, "derivedFeatures", f"{self.project_name}__{df.name}", derived_feature_to_def)
+        if not staged:
+            return True
+
+        guids = None
+        try:
+            r = requests.post(
+                f"{self.endpoint}/projects/{self.project_id}/entities", headers=self._get_auth_header(), json=body
+            )
+            if r.status_code in (404, 405):
+                return False
+            guids = check(r).json()["guids"]
+        finally:
+            # The temporary ids are never left behind, so that failed registrations can be retried
+            for entity, previous_id, qualified_name in staged:
+                if guids is not None:
+                    entity._registry_id = UUID(guids[str(entity._registry_id)])
+                    entity._qualified_name = qualified_name
+                elif previous_id is not None:
+                    entity._registry_id = previous_id
+                else:
+                    del entity._registry_id
+        return True
+
     def _create_source(self, s: Source) -> UUID:
         r = self._post(f"/projects/{self.project_id}/datasources", source_to_def(s))
         id = UUID(r["guid"])
@@ -1,8 +1,10 @@
 import glob
 import inspect
 import itertools
+import json
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 from graphlib import TopologicalSorter
 from pathlib import Path
 from tracemalloc import stop
@@ -11,6 +13,7 @@ from urllib.parse import urlparse
 from time import sleep
 from uuid import UUID
 
+import requests
 from azure.identity import DefaultAzureCredential
 from loguru import logger
 from pyapacheatlas.auth.azcredential import AzCredentialWrapper
@@ -40,6 +43,34 @@ from feathr.registry.feature_registry import FeathrRegistry
 
 from feathr.constants import *
 
+# Maximum number of entities, and of bytes of their JSON, uploaded to Purview in one request
+PURVIEW_BATCH_SIZE = 100
+PURVIEW_BATCH_BYTES = MB_BYTES
+# Number of batches uploaded to Purview at the same time
+PURVIEW_UPLOAD_WORKERS = 4
+# Number of retries of a failed batch, and the delay in seconds before the first one, doubled on every retry
+PURVIEW_UPLOAD_RETRIES = 3
+PURVIEW_RETRY_DELAY = 1
+# Attributes of the entities which are guids of other entities
+PURVIEW_REFERENCE_ATTRIBUTES = ["sourceId", "inputAnchorFeatures", "inputDerivedFeatures"]
+
+
+def _split_batches(entities: List[AtlasEntity], max_size: int, max_bytes: int) -> List[List[AtlasEntity]]:
+    """
+    Split the entities into batches of at most `max_size` entities and `max_bytes` bytes of JSON, an entity larger
+    than `max_bytes` is in a batch by itself
+    """
+    batches = []
+    batch_bytes = 0
+    for entity in entities:
+        size = len(json.dumps(entity.to_json()))
+        if not batches or len(batches[-1]) >= max_size or batch_bytes + size > max_bytes:
+            batches.append([])
+            batch_bytes = 0
+        batches[-1].append(entity)
+        batch_bytes += size
+    return batches
+
 
 def _to_snake(d, level: int = 0):
     """
@@ -584,20 +615,6 @@ class _PurviewRegistry(FeathrRegistry):
         self.entity_batch_queue.extend(anchor_entities)
         self.entity_batch_queue.extend(derived_feature_entities)
 
-    def _create_project(self) -> UUID:
-        """
-        create a project entity
-        """
-        predefined_guid = self.guid.get_guid()
-        feathr_project_entity = AtlasEntity(
-            name=self.project_name,
-            qualified_name=self.project_name,
-            typeName=TYPEDEF_FEATHR_PROJECT,
-            guid=predefined_guid,
-        )
-        guid = self.upload_single_entity_to_purview(feathr_project_entity)
-        return guid
-
     def upload_single_entity_to_purview(self, entity: Union[AtlasEntity, AtlasProcess]):
         """
         Upload a single entity to purview, could be a process entity or AtlasEntity.
@@ -690,165 +707,6 @@ class _PurviewRegistry(FeathrRegistry):
             "typeName": str(entity["typeName"]),
         }
 
-    def _create_source(self, s: Source) -> UUID:
-        """
-        create a data source under a project.
-        this will create the data source entity, together with the relation entity
-        """
-        project_entity = self.purview_client.get_entity(
-            qualifiedName=self.project_name, typeName=TYPEDEF_FEATHR_PROJECT
-        )["entities"][0]
-        attrs = source_to_def(s)
-        qualified_name = self.registry_delimiter.join([project_entity["attributes"]["qualifiedName"], attrs["name"]])
-        source_entity = AtlasEntity(
-            name=attrs["name"],
-            qualified_name=qualified_name,
-            attributes={k: v for k, v in attrs.items() if k != "name"},
-            typeName=TYPEDEF_SOURCE,
-            guid=self.guid.get_guid(),
-        )
-        source_id = self.upload_single_entity_to_purview(source_entity)
-
-        # change from AtlasEntity to Entity
-        source_entity = self.purview_client.get_entity(source_id)["entities"][0]
-
-        # Project contains source, source belongs to project
-        project_contains_source_relation = self._generate_relation_pairs(
-            project_entity, source_entity, RELATION_CONTAINS
-        )
-        [self.upload_single_entity_to_purview(x) for x in project_contains_source_relation]
-        return source_id
-
-    def _create_anchor(self, s: FeatureAnchor) -> UUID:
-        """
-        Create anchor under project ,and based on the data source
-        This will also create two relation pairs
-        """
-        project_entity = self.purview_client.get_entity(
-            qualifiedName=self.project_name, typeName=TYPEDEF_FEATHR_PROJECT
-        )["entities"][0]
-        source_entity = self.purview_client.get_entity(
-            qualifiedName=self.registry_delimiter.join([self.project_name, s.source.name]), typeName=TYPEDEF_SOURCE
-        )["entities"][0]
-        attrs = anchor_to_def(s)
-        qualified_name = self.registry_delimiter.join([self.project_name, attrs["name"]])
-        anchor_entity = AtlasEntity(
-            name=s.name,
-            qualified_name=qualified_name,
-            attributes={k: v for k, v in attrs.items() if k not in ["name", "qualifiedName"]},
-            typeName=TYPEDEF_ANCHOR,
-            guid=self.guid.get_guid(),
-        )
-
-        anchor_id = self.upload_single_entity_to_purview(anchor_entity)
-
-        # change from AtlasEntity to Entity
-        anchor_entity = self.purview_client.get_entity(anchor_id)["entities"][0]
-
-        # project contains anchor, anchor belongs to project.
-        project_contains_anchor_relation = self._generate_relation_pairs(
-            project_entity, anchor_entity, RELATION_CONTAINS
-        )
-        anchor_consumes_source_relation = self._generate_relation_pairs(anchor_entity, source_entity, RELATION_CONSUMES)
-        [
-            self.upload_single_entity_to_purview(x)
-            for x in project_contains_anchor_relation + anchor_consumes_source_relation
-        ]
-
-        return anchor_id
-
-    def _create_anchor_feature(self, anchor_id: str, source: Source, s: Feature) -> UUID:
-        """
-        Create anchor feature under anchor.
-        This will also create three relation pairs
-        """
-        project_entity = self.purview_client.get_entity(
-            qualifiedName=self.project_name, typeName=TYPEDEF_FEATHR_PROJECT
-        )["entities"][0]
-        anchor_entity = self.purview_client.get_entity(anchor_id)["entities"][0]
-        source_entity = self.purview_client.get_entity(
-            qualifiedName=self.registry_delimiter.join([self.project_name, source.name]), typeName=TYPEDEF_SOURCE
-        )["entities"][0]
-
-        attrs = feature_to_def(s)
-        attrs["type"] = attrs["featureType"]
-        qualified_name = self.registry_delimiter.join(
-            [self.project_name, anchor_entity["attributes"]["name"], attrs["name"]]
-        )
-
-        anchor_feature_entity = AtlasEntity(
-            name=s.name,
-            qualified_name=qualified_name,
-            attributes={k: v for k, v in attrs.items() if k not in ["name", "qualifiedName"]},
-            typeName=TYPEDEF_ANCHOR_FEATURE,
-            guid=self.guid.get_guid(),
-        )
-        anchor_feature_id = self.upload_single_entity_to_purview(anchor_feature_entity)
-
-        # change from AtlasEntity to Entity
-        anchor_feature_entity = self.purview_client.get_entity(anchor_feature_id)["entities"][0]
-
-        # Project contains AnchorFeature, AnchorFeature belongs to Project
-        project_contains_feature_relation = self._generate_relation_pairs(
-            project_entity, anchor_feature_entity, RELATION_CONTAINS
-        )
-        anchor_contains_feature_relation = self._generate_relation_pairs(
-            anchor_entity, anchor_feature_entity, RELATION_CONTAINS
-        )
-        feature_consumes_source_relation = self._generate_relation_pairs(
-            anchor_feature_entity, source_entity, RELATION_CONSUMES
-        )
-
-        [
-            self.upload_single_entity_to_purview(x)
-            for x in project_contains_feature_relation
-            + anchor_contains_feature_relation
-            + feature_consumes_source_relation
-        ]
-
-        return anchor_feature_id
-
-    def _create_derived_feature(self, s: DerivedFeature) -> UUID:
-        """
-        Create DerivedFeature.
-        This will also create multiple relations.
-        """
-        input_features = [self.purview_client.get_entity(x._registry_id)["entities"][0] for x in s.input_features]
-        attrs = derived_feature_to_def(s)
-        attrs["type"] = attrs["featureType"]
-
-        project_entity = self.purview_client.get_entity(
-            qualifiedName=self.project_name, typeName=TYPEDEF_FEATHR_PROJECT
-        )["entities"][0]
-        qualified_name = self.registry_delimiter.join([self.project_name, attrs["name"]])
-        derived_feature_entity = AtlasEntity(
-            name=s.name,
-            qualified_name=qualified_name,
-            attributes={k: v for k, v in attrs.items() if k not in ["name", "qualifiedName"]},
-            typeName=TYPEDEF_DERIVED_FEATURE,
-            guid=self.guid.get_guid(),
-        )
-        derived_feature_id = self.upload_single_entity_to_purview(derived_feature_entity)
-
-        # change from AtlasEntity to Entity
-        derived_feature_entity = self.purview_client.get_entity(derived_feature_id)["entities"][0]
-
-        # Project contains DerivedFeature, DerivedFeature belongs to Project.
-        feature_project_contain_belong_pairs = self._generate_relation_pairs(
-            project_entity, derived_feature_entity, RELATION_CONTAINS
-        )
-
-        consume_produce_pairs = []
-        # Each input feature produces DerivedFeature, DerivedFeatures consumes from each input feature.
-        for input_feature in input_features:
-            consume_produce_pairs += self._generate_relation_pairs(
-                derived_feature_entity, input_feature, RELATION_CONSUMES
-            )
-
-        [self.upload_single_entity_to_purview(x) for x in feature_project_contain_belong_pairs + consume_produce_pairs]
-
-        return derived_feature_id
-
     def register_features(
         self,
         workspace_path: Optional[Path] = None,
@@ -869,29 +727,270 @@ class _PurviewRegistry(FeathrRegistry):
             raise RuntimeError(
                 "Currently Feathr only supports registering features from context (i.e. you must call FeathrClient.build_features() before calling this function)."
             )
-            # Before starting, create the project
         self._register_feathr_feature_types()
+        self._create_entities(anchor_list, derived_feature_list)
+        logger.info("Finished registering features.")
 
-        self.project_id = self._create_project()
+    def _create_entities(self, anchor_list: List[FeatureAnchor], derived_feature_list: List[DerivedFeature]):
+        """
+        Create the project, the sources, anchors and features not registered yet, and the relations between them, all
+        or nothing. The whole graph is built first, the entities refer to each other by temporary guids which are
+        replaced by the guids assigned by Purview. The entities are uploaded in bulk level by level, so that every
+        entity is uploaded after the ones its attributes refer to, and the relations last, as their qualified names
+        contain the guids of their ends.
+        """
+        # Temporary guid -> guid in Purview
+        guids = {}
+        # (object, id before this call) of the objects staged
+        staged = []
+        # The entity of every object by id(object), the ones registered before are not uploaded
+        entities = {}
+        # The level of every staged entity by its temporary guid
+        levels = {}
+        # (from, to, relation type) of the relations of the staged entities
+        relations = []
+
+        project_entity = AtlasEntity(
+            name=self.project_name,
+            qualified_name=self.project_name,
+            typeName=TYPEDEF_FEATHR_PROJECT,
+            guid=self.guid.get_guid(),
+        )
+        levels[project_entity.guid] = 0
 
-        for anchor in anchor_list:
-            source = anchor.source
-            # 1. Create Source on the registry
-            # We always re-create INPUT_CONTEXT as lots of existing codes reuse the singleton in different projects
-            if (source.name == INPUT_CONTEXT) or (not hasattr(source, "_registry_id")):
-                source._registry_id = self._create_source(source)
-            # 2. Create Anchor on the registry
-            if not hasattr(anchor, "_registry_id"):
-                anchor._registry_id = self._create_anchor(anchor)
-            # 3. Create all features on the registry
-            for feature in anchor.features:
-                if not hasattr(feature, "_registry_id"):
-                    feature._registry_id = self._create_anchor_feature(anchor._registry_id, anchor.source, feature)
-        # 4. Create all derived features on the registry
-        for df in topological_sort(derived_feature_list):
-            if not hasattr(df, "_registry_id"):
-                df._registry_id = self._create_derived_feature(df)
-        logger.info("Finished registering features.")
+        def registered(obj, type_name: str, qualified_name: Optional[str]) -> AtlasEntity:
+            if id(obj) not in entities:
+                entities[id(obj)] = AtlasEntity(
+                    name=obj.name, qualified_name=qualified_name, typeName=type_name, guid=str(obj._registry_id)
+                )
+            return entities[id(obj)]
+
+        def stage(obj, type_name: str, qualified_name: str, to_def, refs: List[AtlasEntity] = []) -> AtlasEntity:
+            staged.append((obj, getattr(obj, "_registry_id", None)))
+            obj._registry_id = self.guid.get_guid()
+            attrs = to_def(obj)
+            if "featureType" in attrs:
+                attrs["type"] = attrs["featureType"]
+            entity = AtlasEntity(
+                name=attrs["name"],
+                qualified_name=qualified_name,
+                attributes={k: v for k, v in attrs.items() if k not in ["name", "qualifiedName"]},
+                typeName=type_name,
+                guid=obj._registry_id,
+            )
+            entities[id(obj)] = entity
+            levels[entity.guid] = 1 + max([levels.get(r.guid, -1) for r in refs], default=-1)
+            return entity
+
+        succeeded = False
+        try:
+            for anchor in anchor_list:
+                source = anchor.source
+                source_name = self.registry_delimiter.join([self.project_name, source.name])
+                # We always re-create INPUT_CONTEXT as lots of existing codes reuse the singleton in different projects
+                if id(source) in entities:
+                    source_entity = entities[id(source)]
+                elif source.name == INPUT_CONTEXT or not hasattr(source, "_registry_id"):
+                    source_entity = stage(source, TYPEDEF_SOURCE, source_name, source_to_def)
+                    relations.append((project_entity, source_entity, RELATION_CONTAINS))
+                else:
+                    source_entity = registered(source, TYPEDEF_SOURCE, source_name)
+
+                anchor_name = self.registry_delimiter.join([self.project_name, anchor.name])
+                if not hasattr(anchor, "_registry_id"):
+                    anchor_entity = stage(anchor, TYPEDEF_ANCHOR, anchor_name, anchor_to_def, [source_entity])
+                    relations.append((project_entity, anchor_entity, RELATION_CONTAINS))
+                    relations.append((anchor_entity, source_entity, RELATION_CONSUMES))
+                else:
+                    anchor_entity = registered(anchor, TYPEDEF_ANCHOR, anchor_name)
+
+                for feature in anchor.features:
+                    feature_name = self.registry_delimiter.join([self.project_name, anchor.name, feature.name])
+                    if not hasattr(feature, "_registry_id"):
+                        feature_entity = stage(feature, TYPEDEF_ANCHOR_FEATURE, feature_name, feature_to_def)
+                        relations.append((project_entity, feature_entity, RELATION_CONTAINS))
+                        relations.append((anchor_entity, feature_entity, RELATION_CONTAINS))
+                        relations.append((feature_entity, source_entity, RELATION_CONSUMES))
+                    else:
+                        registered(feature, TYPEDEF_ANCHOR_FEATURE, feature_name)
+
+            for df in topological_sort(derived_feature_list):
+                # Input features registered before and not in the lists are looked up by their guids below
+                inputs = [
+                    registered(
+                        f,
+                        TYPEDEF_DERIVED_FEATURE if isinstance(f, DerivedFeature) else TYPEDEF_ANCHOR_FEATURE,
+                        getattr(f, "_qualified_name", None),
+                    )
+                    for f in df.input_features
+                ]
+                df_name = self.registry_delimiter.join([self.project_name, df.name])
+                if not hasattr(df, "_registry_id"):
+                    df_entity = stage(df, TYPEDEF_DERIVED_FEATURE, df_name, derived_feature_to_def, inputs)
+                    relations.append((project_entity, df_entity, RELATION_CONTAINS))
+                    relations.extend([(df_entity, i, RELATION_CONSUMES) for i in inputs])
+                else:
+                    registered(df, TYPEDEF_DERIVED_FEATURE, df_name)
+
+            to_upload = [project_entity] + [e for e in entities.values() if e.guid in levels]
+            by_level = [[e for e in to_upload if levels[e.guid] == level] for level in sorted(set(levels.values()))]
+            for level_entities in by_level:
+                self._upload_entities(level_entities, guids)
+            self.project_id = UUID(project_entity.guid)
+
+            self._fill_qualified_names([to for _, to, _ in relations if to.qualifiedName is None])
+            pairs = {}
+            for from_entity, to_entity, relation_type in relations:
+                for p in self._generate_relation_pairs(from_entity.to_json(), to_entity.to_json(), relation_type):
+                    pairs.setdefault(p.qualifiedName, p)
+            self._upload_entities(list(pairs.values()), guids)
+            succeeded = True
+        finally:
+            # The temporary guids are never left behind, and the objects are only registered if all of the entities
+            # and relations are, so that failed registrations can be retried
+            for obj, previous_id in staged:
+                if succeeded:
+                    obj._qualified_name = entities[id(obj)].qualifiedName
+                    obj._registry_id = UUID(entities[id(obj)].guid)
+                elif previous_id is not None:
+                    obj._registry_id = previous_id
+                else:
+                    del obj._registry_id
+
+    def _upload_entities(self, entities: List[AtlasEntity], guids: Dict[str, str]):
+        """
+        Upload the entities in size-bounded batches, several batches at a time. The guids the entities refer to are
+        replaced by the ones in `guids` first, then the guids of the entities are replaced by the ones assigned by
+        Purview, which are also added to `guids`.
+        """
+        if not entities:
+            return
+        for entity in entities:
+            entity.guid = str(entity.guid)
+            for k in PURVIEW_REFERENCE_ATTRIBUTES:
+                v = entity.attributes.get(k)
+                if isinstance(v, list):
+                    entity.attributes[k] = [guids.get(i, i) for i in v]
+                elif v is not None:
+                    entity.attributes[k] = guids.get(v, v)
+        batches = _split_batches(entities, PURVIEW_BATCH_SIZE, PURVIEW_BATCH_BYTES)
+        with ThreadPoolExecutor(max_workers=min(len(batches), PURVIEW_UPLOAD_WORKERS)) as executor:
+            for assigned in executor.map(self._upload_batch, batches):
+                guids.update(assigned)
+        for entity in entities:
+            entity.guid = guids[entity.guid]
+        logger.info("Uploaded {} entities to Purview in {} batches.", len(entities), len(batches))
+
+    def _upload_batch(self, batch: List[AtlasEntity]) -> Dict[str, str]:
+        """
+        Upload a batch of entities, retried if it fails, returns the guids in Purview by the temporary guids.
+        Purview only creates the entities, the ones existing already, e.g. registered by a former registration or by a
+        request which failed after being applied, fail the batch and are looked up by their qualified names instead,
+        so that uploading the entities again is idempotent.
+        """
+        assigned = {}
+        result = None
+        for attempt in range(PURVIEW_UPLOAD_RETRIES + 1):
+            if attempt > 0:
+                assigned.update(self._get_existing_guids(batch))
+                batch = [e for e in batch if e.guid not in assigned]
+                if not batch:
+                    break
+            try:
+                for entity in batch:
+                    # Fails the request instead of updating an existing entity
+                    entity.lastModifiedTS = "0"
+                result = self.purview_client.upload_entities(batch)
+                break
+            except (AtlasException, requests.RequestException) as e:
+                if attempt == PURVIEW_UPLOAD_RETRIES:
+                    raise
+                if "PreConditionCheckFailed" not in str(e):
+                    delay = PURVIEW_RETRY_DELAY * 2**attempt
+                    logger.warning("Failed to upload {} entities to Purview, retrying in {}s: {}", len(batch), delay, e)
+                    sleep(delay)
+
+        if result is not None:
+            assignments = result.get("guidAssignments", {})
+            assigned.update({e.guid: assignments[e.guid] for e in batch if e.guid in assignments})
+            # Purview doesn't assign guids to the entities it didn't create
+            missing = [e for e in batch if e.guid not in assigned]
+            if missing:
+                assigned.update(self._get_existing_guids(missing))
+        missing = [e.qualifiedName for e in batch if e.guid not in assigned]
+        if missing:
+            raise RuntimeError(f"Failed to upload the entities {missing} to Purview.")
+        return assigned
+
+    def _get_existing_guids(self, entities: List[AtlasEntity]) -> Dict[str, str]:
+        """
+        Returns the guids of the entities existing in Purview by the temporary guids, looked up by qualified name.
+        Raises a RuntimeError if any existing entity has different attributes than the one to upload.
+        """
+        ret = {}
+        for type_name, group in itertools.groupby(sorted(entities, key=lambda e: e.typeName), lambda e: e.typeName):
+            staged = {e.qualifiedName: e for e in group}
+            names = list(staged)
+            for i in range(0, len(names), PURVIEW_BATCH_SIZE):
+                chunk = names[i : i + PURVIEW_BATCH_SIZE]
+                try:
+                    found = self.purview_client.get_entity(qualifiedName=chunk, typeName=type_name).get("entities", [])
+                except AtlasException:
+                    # The bulk lookup fails if any of the entities doesn't exist, look them up one by one
+                    found = []
+                    for name in chunk:
+                        try:
+                            found += self.purview_client.get_entity(qualifiedName=name, typeName=type_name).get(
+                                "entities", []
+                            )
+                        except AtlasException:
+                            pass
+                for x in found:
+                    entity = staged.get(x["attributes"]["qualifiedName"])
+                    if entity is not None:
+                        self._check_existing_entity(entity, x)
+                        ret[entity.guid] = x["guid"]
+        return ret
+
+    def _check_existing_entity(self, entity: AtlasEntity, existing: Dict):
+        """
+        Raise a RuntimeError if the entity existing in Purview with the same qualified name is not the same as the one
+        to upload. Only the attributes kept by Purview are compared, the relations are the same if their qualified
+        names are.
+        """
+        j = entity.to_json()
+        conflict = j["typeName"] != existing["typeName"]
+        if not conflict and j["typeName"] != "Process":
+            for k, v in j["attributes"].items():
+                # The attributes are camel cased, while they're snake cased in the type definitions
+                key = k if k in existing["attributes"] else _to_snake(k)
+                if key not in existing["attributes"]:
+                    continue
+                existing_value = existing["attributes"][key]
+                if k == "type" and isinstance(existing_value, str) and isinstance(v, dict):
+                    existing_value = dict(ConfigFactory.parse_string(existing_value))
+                elif k in PURVIEW_REFERENCE_ATTRIBUTES:
+                    # References may be returned as objects with the guids of the entities referred to
+                    refs = existing_value if isinstance(existing_value, list) else [existing_value]
+                    refs = [r["guid"] if isinstance(r, dict) else r for r in refs]
+                    existing_value = refs if isinstance(existing_value, list) else refs[0]
+                if existing_value != v:
+                    conflict = True
+                    break
+        if conflict:
+            raise RuntimeError(
+                "The requested entity %s conflicts with the existing entity in PurView" % j["attributes"]["qualifiedName"]
+            )
+
+    def _fill_qualified_names(self, entities: List[AtlasEntity]):
+        """
+        Look up the qualified names of the entities registered before, by their guids
+        """
+        by_guid = {e.guid: e for e in entities}
+        guid_list = list(by_guid)
+        for i in range(0, len(guid_list), PURVIEW_BATCH_SIZE):
+            for x in self.purview_client.get_entity(guid=guid_list[i : i + PURVIEW_BATCH_SIZE])["entities"]:
+                by_guid[x["guid"]].qualifiedName = x["attributes"]["qualifiedName"]
 
     def _purge_feathr_registry(self):
         """
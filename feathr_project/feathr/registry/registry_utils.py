@@ -8,7 +8,6 @@ from feathr.definition.dtype import FeatureType, str_to_value_type, value_type_t
 from feathr.definition.feature import Feature
 from feathr.definition.feature_derivations import DerivedFeature
 from feathr.definition.source import HdfsSource, JdbcSource, Source, SnowflakeSource, MongoDbSource
-from pyapacheatlas.core import AtlasProcess, AtlasEntity
 from feathr.definition.source import (
     GenericSource,
     HdfsSource,
@@ -1,31 +1,54 @@
-from azure.keyvault.secrets import SecretClient
-from azure.identity import DefaultAzureCredential
+from typing import Set
+
 from loguru import logger
 from azure.core.exceptions import ResourceNotFoundError
 
 
+def to_akv_secret_name(key: str) -> str:
+    """Convert a Feathr config key to the Azure Key Vault secret name. Azure Key Vault doesn't support '_' in the
+    names and the names are case-insensitive, so '_' is replaced with '-' and the name is lower-cased."""
+    return key.replace("_", "-").lower()
+
+
 class AzureKeyVaultClient:
     def __init__(self, akv_name: str):
         self.akv_name = akv_name
         self.secret_client = None
 
+    def _get_secret_client(self):
+        if self.secret_client is None:
+            # Imported here as the Azure SDKs are slow to import and not needed unless Key Vault is used
+            from azure.identity import DefaultAzureCredential
+            from azure.keyvault.secrets import SecretClient
+
+            self.secret_client = SecretClient(
+                vault_url=f"https://{self.akv_name}.vault.azure.net", credential=DefaultAzureCredential()
+            )
+        return self.secret_client
+
     def get_feathr_akv_secret(self, secret_name: str):
         """Get Feathr Secrets from Azure Key Vault. Note that this function will replace '_' in `secret_name` with '-' since Azure Key Vault doesn't support it
 
         Returns:
             _type_: _description_
         """
-        if self.secret_client is None:
-            self.secret_client = SecretClient(
-                vault_url=f"https://{self.akv_name}.vault.azure.net", credential=DefaultAzureCredential()
-            )
+        secret_client = self._get_secret_client()
         try:
             # replace '_' with '-' since Azure Key Vault doesn't support it
             variable_replaced = secret_name.replace("_", "-")  # .upper()
             logger.info("Fetching the secret {} from Key Vault {}.", variable_replaced, self.akv_name)
-            secret = self.secret_client.get_secret(variable_replaced)
+            secret = secret_client.get_secret(variable_replaced)
             logger.info("Secret {} fetched from Key Vault {}.", variable_replaced, self.akv_name)
             return secret.value
         except ResourceNotFoundError as e:
             logger.error(f"Secret {secret_name} cannot be found in Key Vault {self.akv_name}.")
             raise
+
+    def list_secret_names(self) -> Set[str]:
+        """List the names of the enabled secrets in the Key Vault with a single paged request. The values are not
+        fetched. The names are lower-cased, see `to_akv_secret_name`.
+        """
+        secret_client = self._get_secret_client()
+        return {
+            secret.name.lower() for secret in secret_client.list_properties_of_secrets() if secret.enabled is not False
+        }
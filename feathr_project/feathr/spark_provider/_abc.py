@@ -1,10 +1,17 @@
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from loguru import logger
 
 
 class SparkJobLauncher(ABC):
     """This is the abstract class for all the spark launchers. All the Spark launcher should implement those interfaces"""
 
+    # Job statuses reported by the Spark platform which mean the job has finished successfully or unsuccessfully.
+    # Launchers should override those so that `JobHandle` and `JobScheduler` can tell when a job is done.
+    SUCCESS_STATUSES: Set[Any] = frozenset()
+    FAILED_STATUSES: Set[Any] = frozenset()
+
     @abstractmethod
     def upload_or_get_cloud_path(self, local_path_or_http_path: str):
         """upload a file from local path or an http path to the current work directory. Should support transferring file from an http path to cloud working storage, or upload directly from a local storage.
@@ -14,6 +21,25 @@ class SparkJobLauncher(ABC):
         """
         pass
 
+    def get_cloud_file_size(self, path: str) -> int:
+        """Get the size of a file in the storage of the Spark platform, in bytes"""
+        raise NotImplementedError(f"{type(self).__name__} doesn't support reading files from the cloud storage.")
+
+    def read_cloud_file_range(self, path: str, offset: int, length: int) -> bytes:
+        """Read `length` bytes starting at `offset` from a file in the storage of the Spark platform, without
+        downloading the whole file. Used to read file metadata such as Parquet footers.
+
+        Args:
+            path (str): path of the file
+            offset (int): position of the first byte to read
+            length (int): number of bytes to read
+        """
+        raise NotImplementedError(f"{type(self).__name__} doesn't support reading files from the cloud storage.")
+
+    def list_cloud_files(self, dir_path: str) -> List[str]:
+        """List the paths of the files (not the sub-directories) in a directory of the storage of the Spark platform"""
+        raise NotImplementedError(f"{type(self).__name__} doesn't support listing files in the cloud storage.")
+
     @abstractmethod
     def submit_feathr_job(
         self,
@@ -41,11 +67,12 @@ class SparkJobLauncher(ABC):
         pass
 
     @abstractmethod
-    def wait_for_completion(self, timeout_seconds: Optional[float]) -> bool:
+    def wait_for_completion(self, timeout_seconds: Optional[float], job_id: Any = None) -> bool:
         """Returns true if the job completed successfully
 
         Args:
             timeout_seconds (Optional[float]): time out secs
+            job_id (optional): id of the job to wait for. Defaults to the latest submitted job.
 
         Returns:
             bool: Returns true if the job completed successfully, otherwise False
@@ -53,14 +80,38 @@ class SparkJobLauncher(ABC):
         pass
 
     @abstractmethod
-    def get_status(self) -> str:
+    def get_status(self, job_id: Any = None) -> str:
         """
         Get current job status
 
-        Returns:
-            str: Status of the current job
+        Args:
+            job_id (optional): id of the job. Defaults to the latest submitted job.
 
         Returns:
-            str: _description_
+            str: Status of the job
         """
         pass
+
+    def get_job_statuses(self, job_ids: List[Any]) -> Dict[Any, Any]:
+        """Get the status of several jobs at once. Launchers which can list all the jobs with one request should
+        override this to avoid one status request per job.
+
+        Args:
+            job_ids (List[Any]): ids of the jobs
+
+        Returns:
+            Dict[Any, Any]: job id to job status
+        """
+        return {job_id: self.get_status(job_id) for job_id in job_ids}
+
+    def is_terminal_status(self, status: Any) -> bool:
+        """Returns true if the job status means the job will not make any more progress"""
+        return status in self.SUCCESS_STATUSES or status in self.FAILED_STATUSES
+
+    def is_successful_status(self, status: Any) -> bool:
+        """Returns true if the job status means the job completed successfully"""
+        return status in self.SUCCESS_STATUSES
+
+    def log_job_failure(self, job_id: Any):
+        """Log the error details of a failed job. Launchers should override this to print out the driver logs."""
+        logger.error("Feathr job {} has failed.", job_id)
@@ -1,3 +1,4 @@
+import base64
 from collections import namedtuple
 import copy
 import json
@@ -13,6 +14,7 @@ from databricks_cli.dbfs.api import DbfsApi
 from databricks_cli.runs.api import RunsApi
 from databricks_cli.dbfs.dbfs_path import DbfsPath
 from databricks_cli.sdk.api_client import ApiClient
+from databricks_cli.sdk.service import DbfsService
 from loguru import logger
 import requests
 from requests.structures import CaseInsensitiveDict
@@ -20,6 +22,7 @@ from requests.structures import CaseInsensitiveDict
 from feathr.constants import *
 from feathr.version import get_maven_artifact_fullname
 from feathr.spark_provider._abc import SparkJobLauncher
+from feathr.spark_provider._job_scheduler import JobHandle, PollingBackoff
 
 
 class _FeathrDatabricksJobLauncher(SparkJobLauncher):
@@ -42,6 +45,14 @@ class _FeathrDatabricksJobLauncher(SparkJobLauncher):
         databricks_work_dir (_type_, optional): databricks_work_dir must start with dbfs:/. Defaults to 'dbfs:/feathr_jobs'.
     """
 
+    # see all the status here:
+    # https://docs.microsoft.com/en-us/azure/databricks/dev-tools/api/2.0/jobs#--runlifecyclestate
+    # https://docs.microsoft.com/en-us/azure/databricks/dev-tools/api/2.0/jobs#--runresultstate
+    SUCCESS_STATUSES = frozenset({"SUCCESS"})
+    FAILED_STATUSES = frozenset({"INTERNAL_ERROR", "FAILED", "TIMEDOUT", "CANCELED"})
+    # maximum number of bytes returned by one call of the DBFS read API
+    DBFS_MAX_READ_BYTES = 1024 * 1024
+
     def __init__(
         self,
         workspace_instance_url: str,
@@ -62,6 +73,8 @@ class _FeathrDatabricksJobLauncher(SparkJobLauncher):
         self.auth_headers["Authorization"] = f"Bearer {token_value}"
         self.databricks_work_dir = databricks_work_dir
         self.api_client = ApiClient(host=self.workspace_instance_url, token=token_value)
+        # run page url of every submitted run, used to point users to the error messages
+        self.job_urls = {}
 
     def upload_or_get_cloud_path(self, local_path_or_cloud_src_path: str, tar_dir_path: Optional[str] = None):
         """
@@ -174,6 +187,9 @@ class _FeathrDatabricksJobLauncher(SparkJobLauncher):
             job_tags (str): tags of the job, for example you might want to put your user ID, or a tag with a certain information
             configuration (Dict[str, str]): Additional configs for the spark job
             properties (Dict[str, str]): Additional System Properties for the spark job
+
+        Returns:
+            JobHandle: handle of the submitted job. `job_id` is the Databricks run id.
         """
 
         if properties:
@@ -262,65 +278,75 @@ class _FeathrDatabricksJobLauncher(SparkJobLauncher):
 
         result = RunsApi(self.api_client).get_run(self.res_job_id)
         self.job_url = result["run_page_url"]
+        self.job_urls[self.res_job_id] = self.job_url
         logger.info("Feathr job Submitted Successfully. View more details here: {}", self.job_url)
 
         # return ID as the submission result
-        return self.res_job_id
+        return JobHandle(self, job_name, job_id=self.res_job_id, submission=self.res_job_id)
 
-    def wait_for_completion(self, timeout_seconds: Optional[int] = 600) -> bool:
+    def wait_for_completion(self, timeout_seconds: Optional[int] = 600, job_id: Optional[int] = None) -> bool:
         """Returns true if the job completed successfully"""
+        job_id = self._get_job_id(job_id)
+        # poll quickly first so that short jobs don't wait for a whole polling interval
+        polling = PollingBackoff(max_seconds=30)
         start_time = time.time()
+        deadline = None if timeout_seconds is None else start_time + timeout_seconds
         while (timeout_seconds is None) or (time.time() - start_time < timeout_seconds):
-            status = self.get_status()
+            status = self.get_status(job_id)
             logger.debug("Current Spark job status: {}", status)
-            # see all the status here:
-            # https://docs.microsoft.com/en-us/azure/databricks/dev-tools/api/2.0/jobs#--runlifecyclestate
-            # https://docs.microsoft.com/en-us/azure/databricks/dev-tools/api/2.0/jobs#--runresultstate
-            if status in {"SUCCESS"}:
+            if status in self.SUCCESS_STATUSES:
                 return True
-            elif status in {"INTERNAL_ERROR", "FAILED", "TIMEDOUT", "CANCELED"}:
-                result = RunsApi(self.api_client).get_run_output(self.res_job_id)
-                # See here for the returned fields: https://docs.microsoft.com/en-us/azure/databricks/dev-tools/api/2.0/jobs#--response-structure-8
-                # print out logs and stack trace if the job has failed
-                logger.error("Feathr job has failed. Please visit this page to view error message: {}", self.job_url)
-                if "error" in result:
-                    logger.error("Error Code: {}", result["error"])
-                if "error_trace" in result:
-                    logger.error("{}", result["error_trace"])
+            elif status in self.FAILED_STATUSES:
+                self.log_job_failure(job_id)
                 return False
             else:
-                time.sleep(30)
+                polling.sleep(deadline)
         else:
             raise TimeoutError("Timeout waiting for Feathr job to complete")
 
-    def get_status(self) -> str:
-        assert self.res_job_id is not None
-        result = RunsApi(self.api_client).get_run(self.res_job_id)
+    def log_job_failure(self, job_id: int):
+        """Print out the error message and stack trace of a failed run"""
+        result = RunsApi(self.api_client).get_run_output(job_id)
+        # See here for the returned fields: https://docs.microsoft.com/en-us/azure/databricks/dev-tools/api/2.0/jobs#--response-structure-8
+        # print out logs and stack trace if the job has failed
+        logger.error(
+            "Feathr job has failed. Please visit this page to view error message: {}", self.job_urls.get(job_id)
+        )
+        if "error" in result:
+            logger.error("Error Code: {}", result["error"])
+        if "error_trace" in result:
+            logger.error("{}", result["error_trace"])
+
+    def get_status(self, job_id: Optional[int] = None) -> str:
+        job_id = self._get_job_id(job_id)
+        assert job_id is not None
+        result = RunsApi(self.api_client).get_run(job_id)
         # first try to get result state. it might not be available, and if that's the case, try to get life_cycle_state
         # see result structure: https://docs.microsoft.com/en-us/azure/databricks/dev-tools/api/2.0/jobs#--response-structure-6
         res_state = result["state"].get("result_state") or result["state"]["life_cycle_state"]
         assert res_state is not None
         return res_state
 
-    def get_job_result_uri(self) -> str:
+    def get_job_result_uri(self, job_id: Optional[int] = None) -> str:
         """Get job output uri
 
         Returns:
             str: `output_path` field in the job tags
         """
-        custom_tags = self.get_job_tags()
+        custom_tags = self.get_job_tags(job_id)
         # in case users call this API even when there's no tags available
         return None if custom_tags is None else custom_tags[OUTPUT_PATH_TAG]
 
-    def get_job_tags(self) -> Dict[str, str]:
+    def get_job_tags(self, job_id: Optional[int] = None) -> Dict[str, str]:
         """Get job tags
 
         Returns:
             Dict[str, str]: a dict of job tags
         """
-        assert self.res_job_id is not None
+        job_id = self._get_job_id(job_id)
+        assert job_id is not None
         # For result structure, see https://docs.microsoft.com/en-us/azure/databricks/dev-tools/api/2.0/jobs#--response-structure-6
-        result = RunsApi(self.api_client).get_run(self.res_job_id)
+        result = RunsApi(self.api_client).get_run(job_id)
 
         if "new_cluster" in result["cluster_spec"]:
             custom_tags = result["cluster_spec"]["new_cluster"].get("custom_tags")
@@ -332,6 +358,9 @@ class _FeathrDatabricksJobLauncher(SparkJobLauncher):
             )
             return None
 
+    def _get_job_id(self, job_id: Optional[int] = None) -> int:
+        return getattr(self, "res_job_id", None) if job_id is None else job_id
+
     def download_result(self, result_path: str, local_folder: str, is_file_path: bool = False):
         """
         Supports downloading files from the result folder. Only support paths starts with `dbfs:/` and only support downloading files in one folder (per Spark's design, everything will be in the result folder in a flat manner)
@@ -344,6 +373,30 @@ class _FeathrDatabricksJobLauncher(SparkJobLauncher):
         recursive = True if not is_file_path else False
         DbfsApi(self.api_client).cp(recursive=recursive, overwrite=True, src=result_path, dst=local_folder)
 
+    def get_cloud_file_size(self, path: str) -> int:
+        return DbfsApi(self.api_client).get_status(DbfsPath(path)).file_size
+
+    def read_cloud_file_range(self, path: str, offset: int, length: int) -> bytes:
+        """
+        Read a range of bytes of a DBFS file. The DBFS read API returns at most 1MB per call.
+        """
+        dbfs_service = DbfsService(self.api_client)
+        data = b""
+        while len(data) < length:
+            res = dbfs_service.read(
+                DbfsPath(path).absolute_path,
+                offset=offset + len(data),
+                length=min(length - len(data), self.DBFS_MAX_READ_BYTES),
+            )
+            if not res.get("bytes_read"):
+                break
+            data += base64.b64decode(res["data"])
+        return data
+
+    def list_cloud_files(self, dir_path: str) -> List[str]:
+        files = DbfsApi(self.api_client).list_files(DbfsPath(dir_path))
+        return [file.dbfs_path.absolute_path for file in files if not file.is_dir]
+
     def cloud_dir_exists(self, dir_path: str):
         """
         Check if a directory of hdfs already exists
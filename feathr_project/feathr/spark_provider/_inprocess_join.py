@@ -0,0 +1,480 @@
+import os
+import pickle
+import re
+import shutil
+from datetime import timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from dateutil.relativedelta import relativedelta
+from loguru import logger
+from pyhocon import ConfigFactory, ConfigTree
+
+from feathr.constants import INPUT_CONTEXT
+from feathr.udf._preprocessing_pyudf_manager import FEATHR_PYSPARK_METADATA
+from feathr.utils._partition_planner import to_strftime_format
+from feathr.utils._result_reader import read_result_table
+from feathr.utils.dsl.dsl_evaluator import compile_expression
+from feathr.utils.dsl.dsl_generator import get_identifiers
+
+SUPPORTED_AGGREGATIONS = ("SUM", "COUNT", "AVG", "MAX", "MIN", "LATEST")
+SUPPORTED_OUTPUT_FORMATS = ("avro", "parquet", "csv")
+
+# Key of the features without keys, see `DUMMY_KEY`
+_DUMMY_KEY = "NOT_NEEDED"
+_IDENTIFIER_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+_WINDOW_PATTERN = re.compile(r"^(\d+)([dhms])$")
+_WINDOW_UNITS = {"d": "days", "h": "hours", "m": "minutes", "s": "seconds"}
+_VALUE_TYPE_DTYPES = {
+    "BOOLEAN": "boolean",
+    "INT": "Int32",
+    "LONG": "Int64",
+    "FLOAT": "float32",
+    "DOUBLE": "float64",
+    "STRING": "string",
+}
+_ANCHOR_FEATURE_KEYS = {"def", "type", "window", "aggregation", "filter"}
+_SOURCE_KEYS = {"location", "timeWindowParameters"}
+
+
+class UnsupportedJoinError(NotImplementedError):
+    """The join job uses something the in-process engine doesn't support, so it has to run on Spark."""
+
+
+class _AnchoredFeature(object):
+    def __init__(self, name: str, source: str, keys: List[str], conf: ConfigTree):
+        unsupported = set(conf.keys()) - _ANCHOR_FEATURE_KEYS
+        if unsupported:
+            raise UnsupportedJoinError(f"Feature {name} uses {', '.join(sorted(unsupported))}.")
+        self.name = name
+        self.source = source
+        self.keys = keys
+        definition = conf.get("def", name)
+        self.expr = definition.get("sqlExpr") if isinstance(definition, ConfigTree) else definition
+        self.window = _parse_window(conf["window"]) if "window" in conf else None
+        self.aggregation = conf.get("aggregation", None)
+        self.filter = conf.get("filter", None)
+        self.value_type = _get_value_type(conf)
+        if self.window is not None and self.aggregation not in SUPPORTED_AGGREGATIONS:
+            raise UnsupportedJoinError(f"Feature {name} uses the aggregation {self.aggregation}.")
+
+
+class _DerivedFeature(object):
+    def __init__(self, name: str, conf: ConfigTree):
+        definition = conf.get("definition", None)
+        self.name = name
+        self.expr = definition.get("sqlExpr", None) if isinstance(definition, ConfigTree) else definition
+        if not isinstance(self.expr, str):
+            raise UnsupportedJoinError(f"Derived feature {name} is not defined by an expression.")
+        keys = list(conf.get("key", []))
+        # Alias in the expression -> input feature name
+        self.inputs: Dict[str, str] = {}
+        for alias, input_conf in conf.get("inputs", ConfigTree()).items():
+            # Request features have the dummy key, and their values are already aligned with the observation rows
+            if list(input_conf.get("key", keys)) not in (keys, [_DUMMY_KEY]):
+                raise UnsupportedJoinError(f"Derived feature {name} uses different keys for its inputs.")
+            self.inputs[alias] = input_conf["feature"]
+        self.value_type = _get_value_type(conf)
+
+
+class _FeatureJoinPlan(object):
+    """Feature definitions and join settings parsed from the generated HOCON configs."""
+
+    def __init__(self, join_config: ConfigTree, feature_config: ConfigTree, features_with_preprocessing: Iterable[str]):
+        self.sources: Dict[str, ConfigTree] = dict(feature_config.get("sources", ConfigTree()).items())
+        self.anchored: Dict[str, _AnchoredFeature] = {}
+        self._unsupported: Dict[str, str] = {}
+        for anchor_name, anchor in feature_config.get("anchors", ConfigTree()).items():
+            for feature_name, feature_conf in anchor.get("features", ConfigTree()).items():
+                try:
+                    self.anchored[feature_name] = self._parse_anchored_feature(
+                        anchor_name, anchor, feature_name, feature_conf
+                    )
+                except UnsupportedJoinError as e:
+                    # Only a problem if the feature is requested
+                    self._unsupported[feature_name] = str(e)
+        self.derived: Dict[str, _DerivedFeature] = {}
+        for feature_name, derivation in feature_config.get("derivations", ConfigTree()).items():
+            try:
+                self.derived[feature_name] = _DerivedFeature(feature_name, derivation)
+            except UnsupportedJoinError as e:
+                self._unsupported[feature_name] = str(e)
+
+        settings = join_config.get("settings", ConfigTree())
+        unsupported = set(settings.keys()) - {"joinTimeSettings"}
+        join_time_settings = settings.get("joinTimeSettings", ConfigTree())
+        unsupported |= set(join_time_settings.keys()) - {"timestampColumn"}
+        if unsupported:
+            raise UnsupportedJoinError(f"The join settings {', '.join(sorted(unsupported))} are not supported.")
+        self.timestamp_column = join_time_settings.get("timestampColumn.def", None)
+        self.timestamp_format = join_time_settings.get("timestampColumn.format", "epoch")
+
+        # (query key columns, feature names) of every feature query
+        self.queries: List[Tuple[List[str], List[str]]] = []
+        for query in join_config.get("featureList", []):
+            unsupported = set(query.keys()) - {"key", "featureList"}
+            if unsupported:
+                raise UnsupportedJoinError(f"Query settings {', '.join(sorted(unsupported))} are not supported.")
+            self.queries.append((list(query["key"]), list(query["featureList"])))
+
+        self.requested = [name for _, names in self.queries for name in names]
+        preprocessed = set(features_with_preprocessing).intersection(self._get_upstream_features(self.requested))
+        if preprocessed:
+            raise UnsupportedJoinError(f"Features {', '.join(sorted(preprocessed))} have preprocessing UDFs.")
+
+    def _parse_anchored_feature(self, anchor_name: str, anchor: ConfigTree, feature_name: str, conf: ConfigTree):
+        unsupported = set(anchor.keys()) - {"source", "key", "features", "keyAlias"}
+        if unsupported:
+            raise UnsupportedJoinError(f"Anchor {anchor_name} uses {', '.join(sorted(unsupported))}.")
+        source = anchor["source"]
+        keys = anchor.get("key", [])
+        keys = list(keys.get("sqlExpr", [])) if isinstance(keys, ConfigTree) else list(keys)
+        if source != INPUT_CONTEXT:
+            if not all(_IDENTIFIER_PATTERN.match(key) for key in keys):
+                raise UnsupportedJoinError(f"Anchor {anchor_name} uses key expressions.")
+            if source in self.sources:
+                unsupported = set(self.sources[source].keys()) - _SOURCE_KEYS
+                if unsupported or "path" not in self.sources[source].get("location", ConfigTree()):
+                    raise UnsupportedJoinError(f"Source {source} is not a file source without partitions.")
+        return _AnchoredFeature(feature_name, source, keys, conf)
+
+    def _get_upstream_features(self, feature_names: List[str]) -> List[str]:
+        """Get the feature names and the names of their inputs, recursively, in dependency order."""
+        ordered = []
+
+        def visit(name: str):
+            if name in ordered:
+                return
+            if name in self._unsupported:
+                raise UnsupportedJoinError(self._unsupported[name])
+            if name in self.derived:
+                for input_name in self.derived[name].inputs.values():
+                    visit(input_name)
+            elif name not in self.anchored:
+                raise RuntimeError(f"Feature {name} is not defined.")
+            ordered.append(name)
+
+        for name in feature_names:
+            visit(name)
+        return ordered
+
+    def source_path(self, source: str) -> str:
+        return self.sources[source]["location"]["path"] if source in self.sources else source
+
+    def source_timestamp(self, source: str) -> Tuple[Optional[str], Optional[str]]:
+        params = self.sources.get(source, ConfigTree()).get("timeWindowParameters", ConfigTree())
+        return params.get("timestampColumn", None), params.get("timestampColumnFormat", "epoch")
+
+
+def run_feature_join(
+    join_config_path: str,
+    feature_config_path: str,
+    observation_path: str = None,
+    output_path: str = None,
+    output_format: str = "avro",
+) -> pd.DataFrame:
+    """Run a feature join job in this process with pandas, from the configs generated by `get_offline_features`.
+    Features are joined to the observation rows the same way the Spark job does: sliding window aggregations cover
+    the source rows with the same keys and a timestamp in `(observation time - window, observation time]`, and the
+    other anchored features take the value from the latest source row with the same keys.
+
+    Args:
+        join_config_path: Path of the join config.
+        feature_config_path: Directory of the feature configs, or a single feature config file.
+        observation_path (optional): Path of the observation data. Default to `observationPath` of the join config.
+        output_path (optional): Directory to write the result to. Default to `outputPath` of the join config.
+        output_format (optional): One of `avro`, `parquet` and `csv`.
+
+    Returns:
+        The observation data with the features.
+
+    Raises:
+        UnsupportedJoinError: if the job uses something the in-process engine doesn't support, e.g. a source in a
+            cloud storage, a preprocessing UDF or an aggregation other than `SUPPORTED_AGGREGATIONS`. Nothing is
+            written in this case.
+    """
+    join_config = ConfigFactory.parse_file(join_config_path)
+    observation_path = _get_local_path(observation_path or join_config["observationPath"])
+    output_path = _get_local_path(output_path or join_config["outputPath"])
+    if output_format not in SUPPORTED_OUTPUT_FORMATS:
+        raise UnsupportedJoinError(f"Output format {output_format} is not supported.")
+
+    feature_config_files = (
+        sorted(Path(feature_config_path).glob("*.conf"))
+        if Path(feature_config_path).is_dir()
+        else [Path(feature_config_path)]
+    )
+    # The generated files have top level sections with the same names, which are merged by HOCON
+    feature_config = ConfigFactory.parse_string("\n".join(path.read_text() for path in feature_config_files))
+    plan = _FeatureJoinPlan(join_config, feature_config, _load_features_with_preprocessing(feature_config_path))
+
+    result = _FeatureJoiner(plan).join(_read_table(observation_path))
+    _write_table(result, output_path, output_format)
+    return result
+
+
+class _FeatureJoiner(object):
+    def __init__(self, plan: _FeatureJoinPlan):
+        self.plan = plan
+        self._source_tables: Dict[str, pd.DataFrame] = {}
+
+    def join(self, observation: pd.DataFrame) -> pd.DataFrame:
+        plan = self.plan
+        observation_time = None
+        if plan.timestamp_column:
+            observation_time = _to_timestamps(observation[plan.timestamp_column], plan.timestamp_format)
+
+        # Feature name -> values aligned with the observation rows
+        values: Dict[str, pd.Series] = {}
+        for query_keys, feature_names in plan.queries:
+            missing_keys = [key for key in query_keys if key not in observation.columns]
+            if missing_keys:
+                raise UnsupportedJoinError(f"Key expressions {missing_keys} are not observation columns.")
+            for name in plan._get_upstream_features(feature_names):
+                if name in values:
+                    continue
+                if name in plan.derived:
+                    values[name] = self._derive(plan.derived[name], values, observation.index)
+                else:
+                    values[name] = self._join_anchored(plan.anchored[name], observation, query_keys, observation_time)
+
+        result = observation.copy()
+        for name in plan.requested:
+            result[name] = values[name].to_numpy()
+        return result
+
+    def _get_source_table(self, source: str) -> pd.DataFrame:
+        if source not in self._source_tables:
+            self._source_tables[source] = _read_table(_get_local_path(self.plan.source_path(source)))
+        return self._source_tables[source]
+
+    def _join_anchored(
+        self,
+        feature: _AnchoredFeature,
+        observation: pd.DataFrame,
+        query_keys: List[str],
+        observation_time: Optional[pd.Series],
+    ) -> pd.Series:
+        if feature.source == INPUT_CONTEXT:
+            return _cast(_evaluate(feature.expr, observation), feature.value_type)
+        if len(feature.keys) != len(query_keys):
+            raise RuntimeError(f"Feature {feature.name} has {len(feature.keys)} keys but {len(query_keys)} are given.")
+
+        source = self._get_source_table(feature.source)
+        timestamp_column, timestamp_format = self.plan.source_timestamp(feature.source)
+        facts = pd.DataFrame({f"__key{i}": _normalize_key(source[key]) for i, key in enumerate(feature.keys)})
+        facts["__value"] = _evaluate(feature.expr, source).to_numpy()
+        facts["__time"] = (
+            _to_timestamps(source[timestamp_column], timestamp_format).to_numpy()
+            if timestamp_column
+            else np.arange(len(source))
+        )
+        if feature.filter:
+            facts = facts[_is_true(_evaluate(feature.filter, source)).to_numpy()]
+        key_columns = [f"__key{i}" for i in range(len(query_keys))]
+        facts = facts.dropna(subset=key_columns)
+
+        labels = pd.DataFrame({f"__key{i}": _normalize_key(observation[key]) for i, key in enumerate(query_keys)})
+        labels["__row"] = np.arange(len(observation))
+
+        if feature.window is None:
+            # Latest value per key
+            latest = facts.sort_values("__time", kind="stable").drop_duplicates(key_columns, keep="last")
+            joined = labels.merge(latest, on=key_columns, how="left", sort=False).sort_values("__row")
+            return _cast(pd.Series(joined["__value"].to_numpy(), index=observation.index), feature.value_type)
+
+        if observation_time is None or not timestamp_column:
+            raise UnsupportedJoinError(f"Feature {feature.name} needs the timestamps of the observation and source.")
+        labels["__label_time"] = observation_time.to_numpy()
+        joined = labels.merge(facts, on=key_columns, how="inner", sort=False)
+        joined = joined[
+            (joined["__time"] > joined["__label_time"] - feature.window) & (joined["__time"] <= joined["__label_time"])
+        ]
+        aggregated = _aggregate(joined, feature.aggregation)
+        return _cast(
+            pd.Series(aggregated.reindex(np.arange(len(observation))).to_numpy(), index=observation.index),
+            feature.value_type,
+        )
+
+    def _derive(self, feature: _DerivedFeature, values: Dict[str, pd.Series], index: pd.Index) -> pd.Series:
+        frame = pd.DataFrame({alias: values[name] for alias, name in feature.inputs.items()}, index=index)
+        return _cast(_evaluate(feature.expr, frame), feature.value_type)
+
+
+def _aggregate(joined: pd.DataFrame, aggregation: str) -> pd.Series:
+    if aggregation == "LATEST":
+        latest = joined.dropna(subset=["__value"]).sort_values("__time", kind="stable")
+        return latest.groupby("__row")["__value"].last()
+    values = pd.to_numeric(joined["__value"], errors="coerce") if aggregation != "COUNT" else joined["__value"]
+    grouped = values.groupby(joined["__row"])
+    if aggregation == "COUNT":
+        return grouped.count()
+    return getattr(grouped, {"SUM": "sum", "AVG": "mean", "MAX": "max", "MIN": "min"}[aggregation])()
+
+
+def _evaluate(expr: str, frame: pd.DataFrame) -> pd.Series:
+    """Evaluate a Spark SQL expression on a DataFrame. Column references are supported for any type, and arithmetic,
+    comparison and numeric functions are supported for numeric columns, see `compile_expression`."""
+    expr = expr.strip()
+    if _IDENTIFIER_PATTERN.match(expr) and expr in frame.columns:
+        return frame[expr]
+    try:
+        names = [name for name in get_identifiers(expr) if name in frame.columns]
+        evaluator = compile_expression(expr)
+    except Exception as e:
+        raise UnsupportedJoinError(f"Expression {expr} is not supported: {e}")
+    columns = {}
+    for name in names:
+        column = frame[name]
+        if not (pd.api.types.is_numeric_dtype(column) or pd.api.types.is_bool_dtype(column)):
+            raise UnsupportedJoinError(f"Expression {expr} uses the non-numeric column {name}.")
+        columns[name] = column.to_numpy(dtype=np.float64, na_value=np.nan)
+    try:
+        result = evaluator(columns)
+    except ValueError as e:
+        raise UnsupportedJoinError(f"Expression {expr} is not supported: {e}")
+    return pd.Series(np.broadcast_to(np.asarray(result, dtype=np.float64), (len(frame),)), index=frame.index)
+
+
+def _is_true(values: pd.Series) -> pd.Series:
+    return values.fillna(0).astype(bool)
+
+
+def _cast(values: pd.Series, value_type: Optional[str]) -> pd.Series:
+    dtype = _VALUE_TYPE_DTYPES.get(value_type)
+    if dtype is None:
+        return values
+    if dtype in ("Int32", "Int64") and pd.api.types.is_float_dtype(values):
+        # Spark truncates when casting to integers
+        values = np.trunc(values)
+    if dtype == "boolean" and pd.api.types.is_float_dtype(values):
+        values = values.map(lambda v: None if pd.isna(v) else bool(v))
+    return values.astype(dtype)
+
+
+def _normalize_key(values: pd.Series) -> pd.Series:
+    """Keys are compared as strings, so that e.g. an integer key read from csv matches the same key in parquet"""
+    if pd.api.types.is_float_dtype(values):
+        non_null = values.dropna()
+        if (non_null == np.trunc(non_null)).all():
+            values = values.astype("Int64")
+    return values.astype("string")
+
+
+def _get_value_type(conf: ConfigTree) -> Optional[str]:
+    feature_type = conf.get("type", None)
+    if not isinstance(feature_type, ConfigTree):
+        return None
+    if feature_type.get("dimensionType", []):
+        raise UnsupportedJoinError("Tensor features are not supported.")
+    return feature_type.get("valType", None)
+
+
+def _parse_window(window) -> pd.Timedelta:
+    if isinstance(window, timedelta):
+        return pd.Timedelta(window)
+    if isinstance(window, relativedelta):
+        # pyhocon parses durations like `3d`. Months and years don't have a fixed length.
+        if window.years or window.months:
+            raise UnsupportedJoinError(f"Window {window} is not supported.")
+        return pd.Timedelta(days=window.days, hours=window.hours, minutes=window.minutes, seconds=window.seconds)
+    match = _WINDOW_PATTERN.match(str(window))
+    if not match:
+        raise UnsupportedJoinError(f"Window {window} is not supported.")
+    return pd.Timedelta(**{_WINDOW_UNITS[match.group(2)]: int(match.group(1))})
+
+
+def _to_timestamps(values: pd.Series, timestamp_format: str) -> pd.Series:
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.dt.tz_localize(None) if values.dt.tz is not None else values
+    if timestamp_format == "epoch":
+        return pd.to_datetime(values, unit="s")
+    if timestamp_format == "epoch_millis":
+        return pd.to_datetime(values, unit="ms")
+    try:
+        date_format = to_strftime_format(timestamp_format)
+    except ValueError as e:
+        raise UnsupportedJoinError(str(e))
+    return pd.to_datetime(values.astype("string"), format=date_format)
+
+
+def _get_local_path(path: str) -> str:
+    path = str(path)
+    if path.startswith("file://"):
+        return path[len("file://") :]
+    if "://" in path or path.startswith("dbfs:"):
+        raise UnsupportedJoinError(f"{path} is not a local path.")
+    return path
+
+
+def _load_features_with_preprocessing(feature_config_path: str) -> List[str]:
+    # Written next to the feature configs by `_PreprocessingPyudfManager`
+    metadata_path = Path(feature_config_path).parent / FEATHR_PYSPARK_METADATA
+    if not metadata_path.is_file():
+        return []
+    with open(metadata_path, "rb") as f:
+        return pickle.load(f)
+
+
+def _read_table(path: str) -> pd.DataFrame:
+    if Path(path, "_delta_log").is_dir():
+        data_format = "delta"
+    else:
+        files = [Path(path)] if Path(path).is_file() else sorted(p for p in Path(path).glob("*") if p.is_file())
+        suffixes = {p.suffix.lower() for p in files if not p.name.startswith(("_", "."))}
+        data_format = next((s[1:] for s in (".parquet", ".csv", ".avro") if s in suffixes), None)
+        if data_format is None:
+            raise UnsupportedJoinError(f"Cannot tell the format of {path}.")
+    return read_result_table(path, data_format).to_pandas()
+
+
+def _write_table(result: pd.DataFrame, output_path: str, output_format: str):
+    table = pa.Table.from_pandas(result, preserve_index=False)
+    avro_schema = _to_avro_schema(table.schema) if output_format == "avro" else None
+
+    # Same as the Spark job, the result is a directory of part files and the previous result is overwritten
+    if os.path.exists(output_path):
+        shutil.rmtree(output_path)
+    os.makedirs(output_path)
+    part_path = os.path.join(output_path, f"part-00000.{output_format}")
+    if output_format == "parquet":
+        import pyarrow.parquet as pq
+
+        pq.write_table(table, part_path)
+    elif output_format == "csv":
+        import pyarrow.csv as pa_csv
+
+        pa_csv.write_csv(table, part_path)
+    else:
+        import fastavro
+
+        with open(part_path, "wb") as f:
+            fastavro.writer(f, avro_schema, table.to_pylist())
+    Path(output_path, "_SUCCESS").touch()
+    logger.info("Wrote {} rows to {}.", len(result), output_path)
+
+
+def _to_avro_schema(schema: pa.Schema) -> dict:
+    fields = []
+    for field in schema:
+        if pa.types.is_boolean(field.type):
+            avro_type = "boolean"
+        elif pa.types.is_integer(field.type):
+            avro_type = "long" if field.type.bit_width > 32 else "int"
+        elif pa.types.is_float32(field.type):
+            avro_type = "float"
+        elif pa.types.is_floating(field.type):
+            avro_type = "double"
+        elif pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+            avro_type = "string"
+        elif pa.types.is_timestamp(field.type):
+            avro_type = {"type": "long", "logicalType": "timestamp-micros"}
+        elif pa.types.is_null(field.type):
+            avro_type = "string"
+        else:
+            raise UnsupportedJoinError(f"Column {field.name} of type {field.type} cannot be written as avro.")
+        fields.append({"name": field.name, "type": ["null", avro_type]})
+    return {"type": "record", "name": "topLevelRecord", "fields": fields}
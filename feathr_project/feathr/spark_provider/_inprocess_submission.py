@@ -0,0 +1,145 @@
+import time
+from copy import deepcopy
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from feathr.constants import JOIN_CLASS_NAME, OUTPUT_FORMAT
+from feathr.spark_provider._inprocess_join import UnsupportedJoinError, run_feature_join
+from feathr.spark_provider._job_scheduler import JobHandle
+from feathr.spark_provider._localspark_submission import _FeathrLocalSparkJobLauncher
+
+INPROCESS_JOB_ID_PREFIX = "inprocess-"
+SUCCEEDED_STATUS = "SUCCEEDED"
+FAILED_STATUS = "FAILED"
+
+
+class _FeathrInProcessJobLauncher(_FeathrLocalSparkJobLauncher):
+    """Class to run feature join jobs with small observation data in the client process, without starting Spark.
+    The join is evaluated with pandas from the generated configs, see `run_feature_join`. Jobs which use anything
+    the in-process engine doesn't support, and all the other jobs, e.g. feature generation jobs, are submitted to
+    local Spark as `_FeathrLocalSparkJobLauncher` does.
+
+    Jobs run in the client process are done once submitted. Their job ids are strings starting with `inprocess-`,
+    while the job ids of the local Spark jobs are process ids.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.inprocess_job_num = 0
+        # status, error and job tags of every job run in this process, keyed by the job id
+        self._inprocess_statuses = {}
+        self._inprocess_errors = {}
+        self._latest_job_id = None
+
+    def submit_feathr_job(
+            self,
+            job_name: str,
+            main_jar_path: str,
+            main_class_name: str,
+            arguments: List[str] = None,
+            python_files: List[str] = None,
+            job_tags: Dict[str, str] = None,
+            configuration: Dict[str, str] = {},
+            properties: Dict[str, str] = {},
+            output: str = None,
+            **kwargs,
+    ) -> Any:
+        """Runs the feature join job in this process if possible, otherwise submits the job to local Spark.
+        See `_FeathrLocalSparkJobLauncher.submit_feathr_job` for the arguments.
+
+        Returns:
+            JobHandle: handle of the job.
+        """
+        submit_to_spark = lambda: self._submit_to_spark(
+            job_name=job_name,
+            main_jar_path=main_jar_path,
+            main_class_name=main_class_name,
+            arguments=arguments,
+            python_files=python_files,
+            job_tags=job_tags,
+            configuration=configuration,
+            properties=properties,
+            output=output,
+            **kwargs,
+        )
+        if main_class_name != JOIN_CLASS_NAME:
+            return submit_to_spark()
+
+        job_args = _parse_arguments(arguments or [])
+        output_format = (job_tags or {}).get(OUTPUT_FORMAT) or (configuration or {}).get(OUTPUT_FORMAT) or "avro"
+        job_id = f"{INPROCESS_JOB_ID_PREFIX}{self.inprocess_job_num}"
+        start_time = time.time()
+        try:
+            run_feature_join(
+                join_config_path=job_args["--join-config"],
+                feature_config_path=job_args["--feature-config"],
+                observation_path=job_args.get("--input"),
+                output_path=output,
+                output_format=output_format,
+            )
+            status = SUCCEEDED_STATUS
+        except UnsupportedJoinError as e:
+            logger.info(f"Job {job_name} can't be run in process, submitting it to local Spark: {e}")
+            return submit_to_spark()
+        except Exception as e:
+            logger.exception(f"Job {job_name} failed.")
+            self._inprocess_errors[job_id] = e
+            status = FAILED_STATUS
+        logger.info(f"Job {job_name} finished in process in {time.time() - start_time:.2f} seconds.")
+
+        self.inprocess_job_num += 1
+        self.job_tags = deepcopy(job_tags)
+        self._job_tags[job_id] = self.job_tags
+        self._inprocess_statuses[job_id] = status
+        self._latest_job_id = job_id
+        return JobHandle(self, job_name, job_id=job_id)
+
+    def _submit_to_spark(self, **kwargs) -> JobHandle:
+        handle = super().submit_feathr_job(**kwargs)
+        self._latest_job_id = handle.job_id
+        return handle
+
+    def wait_for_completion(self, timeout_seconds: Optional[float] = 500, job_id: Optional[Any] = None) -> bool:
+        if self._is_inprocess_job(job_id):
+            return self.get_status(job_id) == SUCCEEDED_STATUS
+        return super().wait_for_completion(timeout_seconds, job_id)
+
+    def get_status(self, job_id: Optional[Any] = None) -> Any:
+        """Get the status of the job. Jobs run in process are either `SUCCEEDED` or `FAILED`, while the status of a
+        local Spark job is the return code of the spark-submit process."""
+        if self._is_inprocess_job(job_id):
+            return self._inprocess_statuses[self._resolve_job_id(job_id)]
+        return super().get_status(job_id)
+
+    def is_terminal_status(self, status: Any) -> bool:
+        if status in (SUCCEEDED_STATUS, FAILED_STATUS):
+            return True
+        return super().is_terminal_status(status)
+
+    def is_successful_status(self, status: Any) -> bool:
+        if status in (SUCCEEDED_STATUS, FAILED_STATUS):
+            return status == SUCCEEDED_STATUS
+        return super().is_successful_status(status)
+
+    def log_job_failure(self, job_id: Any):
+        if self._is_inprocess_job(job_id):
+            logger.error(f"Job {job_id} is not successful: {self._inprocess_errors.get(job_id)!r}")
+            return
+        super().log_job_failure(job_id)
+
+    def get_job_tags(self, job_id: Optional[Any] = None) -> Dict[str, str]:
+        if self._is_inprocess_job(job_id):
+            return self._job_tags.get(self._resolve_job_id(job_id))
+        return super().get_job_tags(job_id)
+
+    def _resolve_job_id(self, job_id: Optional[Any]) -> Any:
+        return self._latest_job_id if job_id is None else job_id
+
+    def _is_inprocess_job(self, job_id: Optional[Any]) -> bool:
+        return str(self._resolve_job_id(job_id)).startswith(INPROCESS_JOB_ID_PREFIX)
+
+
+def _parse_arguments(arguments: List[str]) -> Dict[str, str]:
+    """Parse the `--name value` pairs of the job arguments"""
+    return {arguments[i]: arguments[i + 1] for i in range(len(arguments) - 1) if str(arguments[i]).startswith("--")}
@@ -0,0 +1,351 @@
+import asyncio
+from collections import deque
+import time
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+from feathr.constants import OUTPUT_FORMAT, OUTPUT_PATH_TAG
+from feathr.spark_provider._abc import SparkJobLauncher
+
+
+class PollingBackoff(object):
+    """Exponential backoff with a cap for polling the job status.
+    Short jobs are noticed within a few seconds while long jobs are polled at most every `max_seconds`.
+
+    Args:
+        initial_seconds (optional): First interval. Defaults to 1.
+        max_seconds (optional): Max interval. Defaults to 30.
+        multiplier (optional): Factor applied to the interval after each round. Defaults to 2.
+    """
+
+    def __init__(self, initial_seconds: float = 1, max_seconds: float = 30, multiplier: float = 2):
+        self.initial_seconds = min(initial_seconds, max_seconds)
+        self.max_seconds = max_seconds
+        self.multiplier = multiplier
+        self._current = self.initial_seconds
+
+    def next_interval(self) -> float:
+        """Returns the interval to wait for and moves to the next one"""
+        interval = self._current
+        self._current = min(self._current * self.multiplier, self.max_seconds)
+        return interval
+
+    def reset(self):
+        """Starts over from `initial_seconds`, e.g. after a job has made progress"""
+        self._current = self.initial_seconds
+
+    def sleep(self, deadline: Optional[float] = None):
+        """Sleeps for the next interval, but never past `deadline` (a `time.time()` value)"""
+        time.sleep(self._bounded_interval(deadline))
+
+    async def sleep_async(self, deadline: Optional[float] = None):
+        """Same as `sleep` without blocking the event loop"""
+        await asyncio.sleep(self._bounded_interval(deadline))
+
+    def _bounded_interval(self, deadline: Optional[float] = None) -> float:
+        interval = self.next_interval()
+        if deadline is not None:
+            interval = max(0, min(interval, deadline - time.time()))
+        return interval
+
+
+class JobHandle(object):
+    """Handle of a Feathr Spark job submitted through a `SparkJobLauncher`.
+
+    Unlike the launcher, which only keeps track of the latest submitted job, a handle keeps track of one particular
+    job so that several jobs (e.g. one job per backfill cutoff time) can be monitored independently.
+
+    Once the job has finished, its tags and output uri are cached in the handle so they are fetched from the Spark
+    platform at most once. Callbacks registered with `add_done_callback` are called when the job is found finished.
+
+    For backward compatibility, attributes which are not defined on the handle are looked up on the raw submission
+    result returned by the Spark platform (e.g. the Synapse `SparkBatchJob` object).
+
+    Attributes:
+        launcher: The launcher the job is submitted with.
+        job_name: Name of the job.
+        job_id: Id of the job on the Spark platform. `None` if the job is still queued in a `JobScheduler`.
+        submission: Raw submission result returned by the Spark platform.
+        status: Latest known status of the job.
+    """
+
+    def __init__(self, launcher: SparkJobLauncher, job_name: str, job_id: Any = None, submission: Any = None):
+        self.launcher = launcher
+        self.job_name = job_name
+        self.job_id = job_id
+        self.submission = submission
+        self.status = None
+        self._scheduler = None
+        self._callbacks: List[Callable[["JobHandle"], Any]] = []
+        self._job_tags = None
+        self._job_tags_cached = False
+
+    @property
+    def submitted(self) -> bool:
+        """Returns true if the job has been submitted to the Spark platform"""
+        return self.job_id is not None
+
+    def done(self) -> bool:
+        """Returns true if the job has finished, either successfully or unsuccessfully. Uses the latest known status."""
+        return self.submitted and self.launcher.is_terminal_status(self.status)
+
+    def succeeded(self) -> bool:
+        """Returns true if the job has finished successfully. Uses the latest known status."""
+        return self.submitted and self.launcher.is_successful_status(self.status)
+
+    def get_status(self) -> Any:
+        """Fetches the current status of the job from the Spark platform"""
+        if not self.submitted:
+            return None
+        if not self.done():
+            self._set_status(self.launcher.get_status(self.job_id))
+        return self.status
+
+    def add_done_callback(self, fn: Callable[["JobHandle"], Any]):
+        """Registers a callable which is called with the handle once the job is found finished.
+        If the job has already finished, `fn` is called right away.
+        """
+        if self.done():
+            self._run_callback(fn)
+        else:
+            self._callbacks.append(fn)
+
+    def wait_for_completion(self, timeout_seconds: Optional[float] = None) -> bool:
+        """Returns true if the job completed successfully"""
+        if self.done():
+            return self.succeeded()
+        if not self.submitted and self._scheduler is not None:
+            # the job is still queued, so the scheduler has to submit it first
+            return self._scheduler.wait_all([self], timeout_seconds=timeout_seconds)
+        succeeded = self.launcher.wait_for_completion(timeout_seconds, job_id=self.job_id)
+        self._set_status(self.launcher.get_status(self.job_id))
+        return succeeded
+
+    async def wait_for_completion_async(
+        self, timeout_seconds: Optional[float] = None, polling: PollingBackoff = None
+    ) -> bool:
+        """Awaitable version of `wait_for_completion`. Status calls run in the default executor so the event loop
+        is not blocked.
+
+        Args:
+            timeout_seconds (optional): Time out secs. Wait forever if not set.
+            polling (optional): Polling intervals. Defaults to `PollingBackoff()`.
+
+        Returns:
+            bool: Returns true if the job completed successfully, otherwise False
+        """
+        if self._scheduler is not None:
+            return await self._scheduler.wait_all_async([self], timeout_seconds=timeout_seconds)
+        polling = polling or PollingBackoff()
+        deadline = None if timeout_seconds is None else time.time() + timeout_seconds
+        loop = asyncio.get_running_loop()
+        while not self.done():
+            if deadline is not None and time.time() >= deadline:
+                raise TimeoutError("Timeout waiting for job to complete")
+            await loop.run_in_executor(None, self.get_status)
+            if not self.done():
+                await polling.sleep_async(deadline)
+        if not self.succeeded():
+            await loop.run_in_executor(None, self.launcher.log_job_failure, self.job_id)
+        return self.succeeded()
+
+    def get_job_result_uri(self) -> str:
+        """Get job output uri"""
+        job_tags = self.get_job_tags()
+        return None if job_tags is None else job_tags.get(OUTPUT_PATH_TAG)
+
+    def get_job_tags(self) -> Dict[str, str]:
+        """Get job tags. Cached once the job has finished. None if the job is still queued."""
+        if self._job_tags_cached:
+            return self._job_tags
+        if not self.submitted:
+            return None
+        job_tags = self.launcher.get_job_tags(job_id=self.job_id)
+        if self.done():
+            self._job_tags = job_tags
+            self._job_tags_cached = True
+        return job_tags
+
+    def get_output_format(self) -> Optional[str]:
+        """Get the output format recorded in the job tags"""
+        job_tags = self.get_job_tags()
+        return None if job_tags is None else job_tags.get(OUTPUT_FORMAT)
+
+    def _set_status(self, status: Any):
+        was_done = self.done()
+        self.status = status
+        if not was_done and self.done():
+            callbacks, self._callbacks = self._callbacks, []
+            for fn in callbacks:
+                self._run_callback(fn)
+
+    def _run_callback(self, fn: Callable[["JobHandle"], Any]):
+        try:
+            fn(self)
+        except Exception as e:
+            logger.exception("Exception in the done callback of job {}: {}", self.job_name, e)
+
+    def _bind(self, handle: "JobHandle"):
+        """Take over the platform job information from the handle returned by the launcher"""
+        self.job_id = handle.job_id
+        self.submission = handle.submission
+
+    def __getattr__(self, name: str):
+        # Only called when the attribute is not found on the handle itself.
+        submission = self.__dict__.get("submission")
+        if name.startswith("_") or submission is None:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+        return getattr(submission, name)
+
+    def __repr__(self):
+        return f"JobHandle(job_name={self.job_name!r}, job_id={self.job_id!r}, status={self.status!r})"
+
+
+class JobScheduler(object):
+    """Runs Feathr Spark jobs concurrently on one launcher.
+
+    At most `max_concurrent_jobs` jobs are running at the same time; the rest are queued and submitted as soon as
+    running jobs finish. Queued jobs are dispatched whenever the scheduler is polled, i.e. by `poll`, `as_completed`
+    or `wait_all`. The status of all the running jobs is fetched with one `get_job_statuses` call per polling round,
+    and the rounds are spaced out with an exponential backoff which starts over whenever a job finishes.
+
+    Args:
+        launcher: The launcher to submit the jobs with.
+        max_concurrent_jobs (optional): Max number of jobs running at the same time. Unlimited if not set.
+        min_poll_interval_seconds (optional): Seconds to wait after the first polling round. Defaults to 1.
+        max_poll_interval_seconds (optional): Max seconds to wait between two polling rounds. Defaults to 30.
+    """
+
+    def __init__(
+        self,
+        launcher: SparkJobLauncher,
+        max_concurrent_jobs: Optional[int] = None,
+        min_poll_interval_seconds: float = 1,
+        max_poll_interval_seconds: float = 30,
+    ):
+        if max_concurrent_jobs is not None and int(max_concurrent_jobs) < 1:
+            raise ValueError(f"max_concurrent_jobs should be a positive number, but got {max_concurrent_jobs}.")
+        self.launcher = launcher
+        self.max_concurrent_jobs = int(max_concurrent_jobs) if max_concurrent_jobs is not None else None
+        self.min_poll_interval_seconds = min_poll_interval_seconds
+        self.max_poll_interval_seconds = max_poll_interval_seconds
+        self.latest_handle: Optional[JobHandle] = None
+        self.handles: List[JobHandle] = []
+        self._queue: Deque[Tuple[JobHandle, Dict[str, Any]]] = deque()
+        self._running: List[JobHandle] = []
+
+    def submit(self, **submit_kwargs) -> JobHandle:
+        """Submits a job, or queues it if `max_concurrent_jobs` jobs are already running.
+
+        Args:
+            submit_kwargs: Arguments of `SparkJobLauncher.submit_feathr_job`
+
+        Returns:
+            JobHandle: handle of the job. `job_id` is not set until the job leaves the queue.
+        """
+        handle = JobHandle(self.launcher, job_name=submit_kwargs.get("job_name"))
+        handle._scheduler = self
+        self.handles.append(handle)
+        # The latest submitted job, even if it's still queued
+        self.latest_handle = handle
+        self._queue.append((handle, submit_kwargs))
+        self._dispatch()
+        if not handle.submitted:
+            logger.info("Job {} is queued. {} job(s) are waiting in the queue.", handle.job_name, len(self._queue))
+        return handle
+
+    def pending_count(self) -> int:
+        """Number of jobs waiting in the queue"""
+        return len(self._queue)
+
+    def running_count(self) -> int:
+        """Number of submitted jobs which have not finished yet"""
+        return len(self._running)
+
+    def poll(self) -> List[JobHandle]:
+        """Refreshes the status of the running jobs and submits queued jobs if there is capacity.
+
+        Returns:
+            List[JobHandle]: handles of the jobs which have finished since the last call
+        """
+        # jobs might have been waited on directly through their handles
+        finished = [handle for handle in self._running if handle.done()]
+        running = [handle for handle in self._running if not handle.done()]
+        if running:
+            statuses = self.launcher.get_job_statuses([handle.job_id for handle in running])
+            for handle in running:
+                handle._set_status(statuses.get(handle.job_id, handle.status))
+                if handle.done():
+                    finished.append(handle)
+                    if not handle.succeeded():
+                        self.launcher.log_job_failure(handle.job_id)
+        self._running = [handle for handle in self._running if handle not in finished]
+        self._dispatch()
+        return finished
+
+    def as_completed(self, handles: List[JobHandle] = None, timeout_seconds: Optional[float] = None) -> Iterator[JobHandle]:
+        """Yields the handles as the jobs finish. Jobs which have already finished are yielded first.
+
+        Args:
+            handles (optional): Handles to wait for. Defaults to all the handles submitted through this scheduler.
+            timeout_seconds (optional): Time out secs for all the jobs. Wait forever if not set.
+        """
+        remaining = list(self.handles if handles is None else handles)
+        polling = self._new_polling()
+        deadline = None if timeout_seconds is None else time.time() + timeout_seconds
+        while True:
+            for handle in [handle for handle in remaining if handle.done()]:
+                remaining.remove(handle)
+                yield handle
+            if not remaining:
+                return
+            if deadline is not None and time.time() >= deadline:
+                raise TimeoutError(f"Timeout waiting for {len(remaining)} job(s) to complete")
+            if self.poll():
+                polling.reset()
+            if not any(handle.done() for handle in remaining):
+                polling.sleep(deadline)
+
+    def wait_all(self, handles: List[JobHandle] = None, timeout_seconds: Optional[float] = None) -> bool:
+        """Waits for all the jobs to finish.
+
+        Args:
+            handles (optional): Handles to wait for. Defaults to all the handles submitted through this scheduler.
+            timeout_seconds (optional): Time out secs for all the jobs. Wait forever if not set.
+
+        Returns:
+            bool: Returns true if all the jobs completed successfully, otherwise False
+        """
+        handles = list(self.handles if handles is None else handles)
+        for _ in self.as_completed(handles, timeout_seconds=timeout_seconds):
+            pass
+        return all(handle.succeeded() for handle in handles)
+
+    async def wait_all_async(self, handles: List[JobHandle] = None, timeout_seconds: Optional[float] = None) -> bool:
+        """Awaitable version of `wait_all`. Polling rounds run in the default executor so the event loop is not
+        blocked.
+        """
+        handles = list(self.handles if handles is None else handles)
+        polling = self._new_polling()
+        deadline = None if timeout_seconds is None else time.time() + timeout_seconds
+        loop = asyncio.get_running_loop()
+        while not all(handle.done() for handle in handles):
+            if deadline is not None and time.time() >= deadline:
+                raise TimeoutError(
+                    f"Timeout waiting for {len([h for h in handles if not h.done()])} job(s) to complete"
+                )
+            if await loop.run_in_executor(None, self.poll):
+                polling.reset()
+            if not all(handle.done() for handle in handles):
+                await polling.sleep_async(deadline)
+        return all(handle.succeeded() for handle in handles)
+
+    def _new_polling(self) -> PollingBackoff:
+        return PollingBackoff(self.min_poll_interval_seconds, self.max_poll_interval_seconds)
+
+    def _dispatch(self):
+        while self._queue and (self.max_concurrent_jobs is None or len(self._running) < self.max_concurrent_jobs):
+            handle, submit_kwargs = self._queue.popleft()
+            handle._bind(self.launcher.submit_feathr_job(**submit_kwargs))
+            self._running.append(handle)
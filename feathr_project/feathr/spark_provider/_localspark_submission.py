@@ -10,6 +10,7 @@ from typing import Any, Dict, List, Optional
 
 from feathr.constants import OUTPUT_PATH_TAG
 from feathr.spark_provider._abc import SparkJobLauncher
+from feathr.spark_provider._job_scheduler import JobHandle
 from feathr.version import get_maven_artifact_fullname
 from loguru import logger
 from pyspark import *
@@ -23,6 +24,10 @@ class _FeathrLocalSparkJobLauncher(SparkJobLauncher):
         workspace_path (str): Path to the workspace
     """
 
+    # Log messages printed out by the Feathr jobs once they are done. The local spark process may not exit by itself
+    # afterwards, so the process is terminated when one of those is found in the job log.
+    COMPLETED_LOG_MESSAGES = ("Feathr Pyspark job completed", "Feathr mainWithPreprocessedDataFrame job completed")
+
     def __init__(
             self,
             workspace_path: str,
@@ -42,11 +47,30 @@ class _FeathrLocalSparkJobLauncher(SparkJobLauncher):
         self.packages = self._get_default_package()
         self.master = master or "local[*]"
         self.job_tags = None
+        # process, log file and job tags of every submitted job, keyed by the process id
+        self._procs = {}
+        self._log_files = {}
+        self._job_tags = {}
 
     def upload_or_get_cloud_path(self, local_path_or_http_path: str):
         """For Local Spark Case, no need to upload to cloud workspace."""
         return local_path_or_http_path
 
+    def get_cloud_file_size(self, path: str) -> int:
+        """For Local Spark Case, the files are in the local file system."""
+        return os.path.getsize(path)
+
+    def read_cloud_file_range(self, path: str, offset: int, length: int) -> bytes:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            return f.read(length)
+
+    def list_cloud_files(self, dir_path: str) -> List[str]:
+        return [str(p) for p in Path(dir_path).iterdir() if p.is_file()]
+
+    def cloud_dir_exists(self, dir_path: str) -> bool:
+        return os.path.isdir(dir_path)
+
     def submit_feathr_job(
             self,
             job_name: str,
@@ -74,6 +98,9 @@ class _FeathrLocalSparkJobLauncher(SparkJobLauncher):
             configuration: Additional configs for the spark job
             properties: System properties configuration
             **_: Not used arguments in local spark mode, such as reference_files_path
+
+        Returns:
+            JobHandle: handle of the submitted job. `job_id` is the pid of the spark-submit process.
         """
         logger.warning(
             f"Local Spark Mode only support basic params right now and should be used only for testing purpose."
@@ -137,7 +164,8 @@ class _FeathrLocalSparkJobLauncher(SparkJobLauncher):
 
         cmd = " ".join(spark_args)
 
-        log_append = open(f"{self.log_path}_{self.spark_job_num}.txt", "a")
+        log_file = f"{self.log_path}_{self.spark_job_num}.txt"
+        log_append = open(log_file, "a")
         # remove stderr=STDOUT per https://stackoverflow.com/a/40046887
         # reference code: https://github.com/lyft/airflow/blob/main/airflow/providers/apache/spark/hooks/spark_submit.py#L391
         cmds = split(cmd)
@@ -162,21 +190,28 @@ class _FeathrLocalSparkJobLauncher(SparkJobLauncher):
 
         self.job_tags = deepcopy(job_tags)
 
-        return proc
+        self._procs[proc.pid] = proc
+        self._log_files[proc.pid] = log_file
+        self._job_tags[proc.pid] = self.job_tags
 
-    def wait_for_completion(self, timeout_seconds: Optional[float] = 500) -> bool:
+        return JobHandle(self, job_name, job_id=proc.pid, submission=proc)
+
+    def wait_for_completion(self, timeout_seconds: Optional[float] = 500, job_id: Optional[int] = None) -> bool:
         """This function track local spark job commands and process status.
         Files will be write into `debug` folder under your workspace.
         """
-        logger.info(f"{self.spark_job_num} local spark job(s) in this Launcher, only the latest will be monitored.")
-        logger.info(f"Please check auto generated spark command in {self.cmd_file} and detail logs in {self.log_path}.")
+        if job_id is None:
+            logger.info(f"{self.spark_job_num} local spark job(s) in this Launcher, only the latest will be monitored.")
+            logger.info(
+                f"Please check auto generated spark command in {self.cmd_file} and detail logs in {self.log_path}."
+            )
 
-        proc = self.latest_spark_proc
+        proc = self._get_proc(job_id)
         start_time = time.time()
         retry_threshold = self.retry * self.retry_sec  # Tổng thời gian chờ không có log mới, ví dụ: 5 * 30 = 150 giây
         last_log_time = start_time  # Thời điểm log cập nhật cuối cùng
 
-        log_read = open(f"{self.log_path}_{self.spark_job_num - 1}.txt", "r")
+        log_read = open(self._log_files.get(proc.pid, f"{self.log_path}_{self.spark_job_num - 1}.txt"), "r")
         while proc.poll() is None and (((timeout_seconds is None) or (time.time() - start_time < timeout_seconds))):
             time.sleep(1)
             try:
@@ -186,8 +221,7 @@ class _FeathrLocalSparkJobLauncher(SparkJobLauncher):
                     print("_", end="")
                 else:
                     print(">", end="")
-                    if last_line.__contains__("Feathr Pyspark job completed") or last_line.__contains__(
-                            "Feathr mainWithPreprocessedDataFrame job completed"):
+                    if any(msg in last_line for msg in self.COMPLETED_LOG_MESSAGES):
                         logger.info(f"Pyspark job Completed")
                         proc.terminate()
             except IndexError as e:
@@ -200,7 +234,7 @@ class _FeathrLocalSparkJobLauncher(SparkJobLauncher):
                         f"Please check {log_read.name}"
                     )
                     if self.clean_up:
-                        self._clean_up()
+                        self._clean_up(proc)
                         proc.wait()
                     break
 
@@ -209,28 +243,28 @@ class _FeathrLocalSparkJobLauncher(SparkJobLauncher):
 
         if proc.returncode == None:
             logger.warning(
-                f"Spark job with pid {self.latest_spark_proc.pid} not completed after {timeout_seconds} sec \
+                f"Spark job with pid {proc.pid} not completed after {timeout_seconds} sec \
                     time out setting. Spark Logs:"
             )
             with open(log_read.name) as f:
                 contents = f.read()
                 logger.error(contents)
             if self.clean_up:
-                self._clean_up()
+                self._clean_up(proc)
                 proc.wait()
                 return True
         elif proc.returncode == 1:
-            logger.warning(f"Spark job with pid {self.latest_spark_proc.pid} is not successful. Spark Logs:")
+            logger.warning(f"Spark job with pid {proc.pid} is not successful. Spark Logs:")
             with open(log_read.name) as f:
                 contents = f.read()
                 logger.error(contents)
             return False
         elif proc.returncode == 143:
-            logger.info(f"Spark job with pid {self.latest_spark_proc.pid} finished in: {int(job_duration)} seconds.")
+            logger.info(f"Spark job with pid {proc.pid} finished in: {int(job_duration)} seconds.")
             return True
         else:
             logger.info(
-                f"Spark job with pid {self.latest_spark_proc.pid} finished in: {int(job_duration)} seconds \
+                f"Spark job with pid {proc.pid} finished in: {int(job_duration)} seconds \
                     with returncode {proc.returncode}"
             )
             return True
@@ -242,25 +276,58 @@ class _FeathrLocalSparkJobLauncher(SparkJobLauncher):
         else:
             proc.terminate()
 
-    def get_status(self) -> str:
-        """Get the status of the job, only a placeholder for local spark"""
-        return self.latest_spark_proc.returncode
+    def get_status(self, job_id: Optional[int] = None) -> Optional[int]:
+        """Get the status of the job, i.e. the return code of the spark-submit process.
+        `None` means the job is still running.
+        """
+        if job_id is None:
+            return self.latest_spark_proc.returncode
+        proc = self._get_proc(job_id)
+        if proc.poll() is None and self._is_completed_in_log(job_id):
+            logger.info(f"Pyspark job Completed")
+            proc.terminate()
+            proc.wait()
+        return proc.returncode
+
+    def is_terminal_status(self, status: Optional[int]) -> bool:
+        return status is not None
+
+    def is_successful_status(self, status: Optional[int]) -> bool:
+        # Same as `wait_for_completion`, only return code 1 is treated as a failure.
+        return status is not None and status != 1
 
-    def get_job_result_uri(self) -> str:
+    def log_job_failure(self, job_id: int):
+        logger.warning(f"Spark job with pid {job_id} is not successful. Spark Logs:")
+        with open(self._log_files[job_id]) as f:
+            logger.error(f.read())
+
+    def get_job_result_uri(self, job_id: Optional[int] = None) -> str:
         """Get job output path
 
         Returns:
             str: output_path
         """
-        return self.job_tags.get(OUTPUT_PATH_TAG, None) if self.job_tags else None
+        job_tags = self.get_job_tags(job_id)
+        return job_tags.get(OUTPUT_PATH_TAG, None) if job_tags else None
 
-    def get_job_tags(self) -> Dict[str, str]:
+    def get_job_tags(self, job_id: Optional[int] = None) -> Dict[str, str]:
         """Get job tags
 
         Returns:
             Dict[str, str]: a dict of job tags
         """
-        return self.job_tags
+        return self.job_tags if job_id is None else self._job_tags.get(job_id)
+
+    def _get_proc(self, job_id: Optional[int] = None) -> Popen:
+        return self.latest_spark_proc if job_id is None else self._procs[job_id]
+
+    def _is_completed_in_log(self, job_id: int) -> bool:
+        try:
+            with open(self._log_files[job_id], "r") as f:
+                lines = f.readlines()
+        except OSError:
+            return False
+        return bool(lines) and any(msg in lines[-1] for msg in self.COMPLETED_LOG_MESSAGES)
 
     def _init_args(self, job_name: str, confs: Dict[str, str]) -> List[str]:
         args = [
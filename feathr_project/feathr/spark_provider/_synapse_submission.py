@@ -26,6 +26,7 @@ from requests import request
 from tqdm import tqdm
 
 from feathr.spark_provider._abc import SparkJobLauncher
+from feathr.spark_provider._job_scheduler import JobHandle, PollingBackoff
 from feathr.constants import *
 from feathr.version import get_maven_artifact_fullname
 
@@ -54,6 +55,9 @@ class _FeathrSynapseJobLauncher(SparkJobLauncher):
     Submits spark jobs to a Synapse spark cluster.
     """
 
+    SUCCESS_STATUSES = frozenset({LivyStates.SUCCESS.value})
+    FAILED_STATUSES = frozenset({LivyStates.ERROR.value, LivyStates.DEAD.value, LivyStates.KILLED.value})
+
     def __init__(
         self,
         synapse_dev_url: str,
@@ -125,6 +129,15 @@ class _FeathrSynapseJobLauncher(SparkJobLauncher):
         [_, exists] = self._datalake._dir_exists(dir_path)
         return exists
 
+    def get_cloud_file_size(self, path: str) -> int:
+        return self._datalake.get_file_size(path)
+
+    def read_cloud_file_range(self, path: str, offset: int, length: int) -> bytes:
+        return self._datalake.read_file_range(path, offset, length)
+
+    def list_cloud_files(self, dir_path: str) -> List[str]:
+        return self._datalake.list_files(dir_path)
+
     def submit_feathr_job(
         self,
         job_name: str,
@@ -158,6 +171,9 @@ class _FeathrSynapseJobLauncher(SparkJobLauncher):
             job_tags (str): tags of the job, for example you might want to put your user ID, or a tag with a certain information
             configuration (Dict[str, str]): Additional configs for the spark job
             properties (Dict[str, str]): Additional System Properties for the spark job
+
+        Returns:
+            JobHandle: handle of the submitted job
         """
 
         if properties:
@@ -217,59 +233,92 @@ class _FeathrSynapseJobLauncher(SparkJobLauncher):
             configuration=cfg,
         )
         logger.info("See submitted job here: https://web.azuresynapse.net/en-us/monitoring/sparkapplication")
-        return self.current_job_info
+        return JobHandle(self, job_name, job_id=self.current_job_info.id, submission=self.current_job_info)
 
-    def wait_for_completion(self, timeout_seconds: Optional[float]) -> bool:
+    def wait_for_completion(self, timeout_seconds: Optional[float], job_id: Optional[int] = None) -> bool:
         """
         Returns true if the job completed successfully
         """
+        job_id = self._get_job_id(job_id)
+        # poll quickly first so that short jobs don't wait for a whole polling interval
+        polling = PollingBackoff(max_seconds=30)
         start_time = time.time()
+        deadline = None if timeout_seconds is None else start_time + timeout_seconds
         while (timeout_seconds is None) or (time.time() - start_time < timeout_seconds):
-            status = self.get_status()
+            status = self.get_status(job_id)
             logger.info("Current Spark job status: {}", status)
-            if status in {LivyStates.SUCCESS.value}:
+            if status in self.SUCCESS_STATUSES:
                 return True
-            elif status in {LivyStates.ERROR.value, LivyStates.DEAD.value, LivyStates.KILLED.value}:
-                logger.error("Feathr job has failed.")
-                error_msg = self._api.get_driver_log(self.current_job_info.id).decode("utf-8")
-                logger.error(error_msg)
-                logger.error(
-                    "The size of the whole error log is: {}. The logs might be truncated in some cases (such as in Visual Studio Code) so only the top a few lines of the error message is displayed. If you cannot see the whole log, you may want to extend the setting for output size limit.",
-                    len(error_msg),
-                )
+            elif status in self.FAILED_STATUSES:
+                self.log_job_failure(job_id)
                 return False
             else:
-                time.sleep(30)
+                polling.sleep(deadline)
         else:
             raise TimeoutError("Timeout waiting for job to complete")
 
-    def get_status(self) -> str:
+    def log_job_failure(self, job_id: int):
+        """Print out the driver log of a failed job"""
+        logger.error("Feathr job has failed.")
+        error_msg = self._api.get_driver_log(job_id).decode("utf-8")
+        logger.error(error_msg)
+        logger.error(
+            "The size of the whole error log is: {}. The logs might be truncated in some cases (such as in Visual Studio Code) so only the top a few lines of the error message is displayed. If you cannot see the whole log, you may want to extend the setting for output size limit.",
+            len(error_msg),
+        )
+
+    def get_status(self, job_id: Optional[int] = None) -> str:
         """Get current job status
 
+        Args:
+            job_id (optional): Livy id of the job. Defaults to the latest submitted job.
+
         Returns:
-            str: Status of the current job
+            str: Status of the job
         """
-        job = self._api.get_spark_batch_job(self.current_job_info.id)
+        job = self._api.get_spark_batch_job(self._get_job_id(job_id))
         assert job is not None
         return job.state
 
-    def get_job_result_uri(self) -> str:
+    def get_job_statuses(self, job_ids: List[int]) -> Dict[int, str]:
+        """Get the status of several jobs with one request listing all the jobs in the Spark pool.
+        Jobs that are not in the listing (e.g. the listing is paged) are looked up one by one.
+
+        Args:
+            job_ids (List[int]): Livy ids of the jobs
+
+        Returns:
+            Dict[int, str]: job id to job status
+        """
+        wanted = set(job_ids)
+        statuses = {}
+        if len(wanted) > 1:
+            jobs = self._api.get_spark_batch_jobs().sessions or []
+            statuses = {job.id: job.state for job in jobs if job.id in wanted}
+        for job_id in wanted - statuses.keys():
+            statuses[job_id] = self.get_status(job_id)
+        return statuses
+
+    def get_job_result_uri(self, job_id: Optional[int] = None) -> str:
         """Get job output uri
 
         Returns:
             str: `output_path` field in the job tags
         """
-        tags = self._api.get_spark_batch_job(self.current_job_info.id).tags
+        tags = self.get_job_tags(job_id)
         # in case users call this API even when there's no tags available
         return None if tags is None else tags[OUTPUT_PATH_TAG]
 
-    def get_job_tags(self) -> Dict[str, str]:
+    def get_job_tags(self, job_id: Optional[int] = None) -> Dict[str, str]:
         """Get job tags
 
         Returns:
             Dict[str, str]: a dict of job tags
         """
-        return self._api.get_spark_batch_job(self.current_job_info.id).tags
+        return self._api.get_spark_batch_job(self._get_job_id(job_id)).tags
+
+    def _get_job_id(self, job_id: Optional[int] = None) -> int:
+        return self.current_job_info.id if job_id is None else job_id
 
 
 class _SynapseJobRunner(object):
@@ -429,6 +478,7 @@ class _DataLakeFiler(object):
 
         account_url = "https://" + datalake_path_split[2]
 
+        self.credential = credential
         self.file_system_client = DataLakeServiceClient(
             credential=credential, account_url=account_url
         ).get_file_system_client(datalake_path_split[1])
@@ -574,6 +624,48 @@ class _DataLakeFiler(object):
             except Exception as e:
                 logger.error(e)
 
+    def get_file_size(self, file_path: str) -> int:
+        return self._get_file_client(file_path).get_file_properties().size
+
+    def read_file_range(self, file_path: str, offset: int, length: int) -> bytes:
+        """
+        Read a range of bytes of a file without downloading the whole file
+        """
+        return self._get_file_client(file_path).download_file(offset=offset, length=length).readall()
+
+    def list_files(self, dir_path: str) -> List[str]:
+        """
+        List the files (not the sub-directories) under a directory. Returns the full datalake paths.
+        """
+        file_system_client, path = self._get_file_system_client(dir_path)
+        protocol, container, account = list(filter(None, re.split("/|@", dir_path)))[:3]
+        prefix = f"{protocol}//{container}@{account}/"
+        return [
+            prefix + file_path.name
+            for file_path in file_system_client.get_paths(path=path or "/", recursive=False)
+            if not file_path.is_directory
+        ]
+
+    def _get_file_client(self, file_path: str):
+        file_system_client, path = self._get_file_system_client(file_path)
+        return file_system_client.get_file_client(path)
+
+    def _get_file_system_client(self, datalake_path: str):
+        """
+        Get the file system client of the container in the datalake path, together with the path in the container.
+        The paths may point to other containers than the working directory, e.g. the observation data.
+        """
+        datalake_path_split = list(filter(None, re.split("/|@", datalake_path)))
+        if len(datalake_path_split) < 3:
+            raise RuntimeError(f"Invalid datalake path: {datalake_path}")
+        path = "/".join(datalake_path_split[3:])
+        if self.file_system_client.url == f"https://{datalake_path_split[2]}/{datalake_path_split[1]}":
+            return self.file_system_client, path
+        file_system_client = DataLakeServiceClient(
+            credential=self.credential, account_url="https://" + datalake_path_split[2]
+        ).get_file_system_client(datalake_path_split[1])
+        return file_system_client, path
+
     def _dir_exists(self, dir_path: str):
         """
         Check if a directory in datalake already exists. Will also return the directory client
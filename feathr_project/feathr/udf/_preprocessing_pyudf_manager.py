@@ -5,7 +5,7 @@ import pickle
 from pathlib import Path
 from typing import List, Optional, Union
 
-from jinja2 import Template
+from feathr.definition.feathrconfig import compile_template
 
 from feathr.definition.anchor import FeatureAnchor
 from feathr.definition.source import HdfsSource
@@ -34,6 +34,9 @@ class _PreprocessingPyudfManager(object):
         # feature names concatenated to UDF map
         # for example, {'f1,f2,f3': my_udf1, 'f4,f5':my_udf2}
         feature_names_to_func_mapping = {}
+        # feature names concatenated to the source, so that the driver preprocesses a source shared by several anchors
+        # with the same UDF only once. For example, {'f1,f2,f3': 'source1', 'f4,f5': 'source1'}
+        feature_names_to_source_mapping = {}
         # features that have preprocessing defined. This is used to figure out if we need to kick off Pyspark
         # preprocessing for requested features.
         features_with_preprocessing = []
@@ -64,12 +67,15 @@ class _PreprocessingPyudfManager(object):
                 else:
                     # it's a callable function
                     feature_names_to_func_mapping[string_feature_list] = anchor.source.preprocessing.__name__
+                feature_names_to_source_mapping[string_feature_list] = _PreprocessingPyudfManager._get_source_key(
+                    anchor.source
+                )
 
         if not features_with_preprocessing:
             return
 
         _PreprocessingPyudfManager.write_feature_names_to_udf_name_file(
-            feature_names_to_func_mapping, local_workspace_dir
+            feature_names_to_func_mapping, local_workspace_dir, feature_names_to_source_mapping
         )
 
         # Save necessary preprocessing-related metadata locally in your workspace
@@ -79,6 +85,12 @@ class _PreprocessingPyudfManager(object):
         with open(feathr_pyspark_metadata_abs_path, "wb") as file:
             pickle.dump(features_with_preprocessing, file)
 
+    @staticmethod
+    def _get_source_key(source) -> str:
+        """Key identifying the data of a source, the name and the location if any."""
+        location = getattr(source, "path", None) or getattr(source, "sql", None) or getattr(source, "table", None)
+        return f"{source.name}:{location}" if location else source.name
+
     @staticmethod
     def _parse_function_str_for_name(fn_str: str) -> str:
         """Use AST to parse the function string and get the name out.
@@ -129,22 +141,31 @@ class _PreprocessingPyudfManager(object):
             print("".join(lines), file=handle)
 
     @staticmethod
-    def write_feature_names_to_udf_name_file(feature_names_to_func_mapping, local_workspace_dir):
+    def write_feature_names_to_udf_name_file(
+        feature_names_to_func_mapping, local_workspace_dir, feature_names_to_source_mapping=None
+    ):
         """Persist feature names(sorted) of an anchor to the corresponding preprocessing function name to source path
-        under the local_workspace_dir.
+        under the local_workspace_dir. The sources of the anchors are persisted as well if provided.
         """
         # indent in since python needs correct indentation
         # Don't change the indentation
-        tm = Template(
+        tm = compile_template(
             """
 feature_names_funcs = {
 {% for key, value in func_maps.items() %}
     "{{key}}" : {{value}},
 {% endfor %}
 }
+{% if source_maps %}
+feature_names_sources = {
+{% for key, value in source_maps.items() %}
+    "{{key}}" : {{value | tojson}},
+{% endfor %}
+}
+{% endif %}
         """
         )
-        new_file = tm.render(func_maps=feature_names_to_func_mapping)
+        new_file = tm.render(func_maps=feature_names_to_func_mapping, source_maps=feature_names_to_source_mapping)
 
         full_file_name = os.path.join(local_workspace_dir, FEATHR_CLIENT_UDF_FILE_NAME)
         # Append to file, Create it if doesn't exist
@@ -152,24 +173,26 @@ feature_names_funcs = {
             print(new_file, file=text_file)
 
     @staticmethod
-    def prepare_pyspark_udf_files(feature_names: List[str], local_workspace_dir):
+    def prepare_pyspark_udf_files(feature_names: List[str], local_workspace_dir, force_pyspark: bool = False):
         """Prepare the Pyspark driver code that will be executed by the Pyspark cluster.
         The Pyspark driver code file has two parts:
             1. The driver code itself
             2. The UDFs.
             3. The features that need preprocessing in a map(from feature names to UDFs)
+
+        If `force_pyspark` is True, the driver code is prepared even if there is no preprocessing UDF, e.g. for the
+        batched backfill mode which is implemented in the driver code.
         """
         py_udf_files = []
 
         # Load pyspark_metadata which stores what features contains preprocessing UDFs
         feathr_pyspark_metadata_abs_path = os.path.join(local_workspace_dir, FEATHR_PYSPARK_METADATA)
-        # if the preprocessing metadata file doesn't exist or is empty, then we just skip
-        if not Path(feathr_pyspark_metadata_abs_path).is_file():
-            return py_udf_files
-        with open(feathr_pyspark_metadata_abs_path, "rb") as pyspark_metadata_file:
-            features_with_preprocessing = pickle.load(pyspark_metadata_file)
+        features_with_preprocessing = []
+        if Path(feathr_pyspark_metadata_abs_path).is_file():
+            with open(feathr_pyspark_metadata_abs_path, "rb") as pyspark_metadata_file:
+                features_with_preprocessing = pickle.load(pyspark_metadata_file)
         # if there is not features that needs preprocessing, just return.
-        if not features_with_preprocessing:
+        if not features_with_preprocessing and not force_pyspark:
             return py_udf_files
 
         # Figure out if we need to preprocess via UDFs for requested features.
@@ -189,17 +212,21 @@ feature_names_funcs = {
             )
             client_udf_repo_path = os.path.join(local_workspace_dir, FEATHR_CLIENT_UDF_FILE_NAME)
             # write pyspark_driver_template_abs_path and then client_udf_repo_path
-            filenames = [pyspark_driver_template_abs_path, client_udf_repo_path]
+            filenames = [pyspark_driver_template_abs_path]
+            if features_with_preprocessing:
+                filenames.append(client_udf_repo_path)
 
             with open(pyspark_driver_path, "w") as outfile:
                 for fname in filenames:
                     with open(fname) as infile:
                         for line in infile:
                             outfile.write(line)
+                if not features_with_preprocessing:
+                    outfile.write("\nfeature_names_funcs = {}\n")
             lines = [
                 "\n",
                 'print("pyspark_client.py: Preprocessing via UDFs and submit Spark job.")\n',
-                "submit_spark_job(feature_names_funcs)\n",
+                "submit_spark_job(feature_names_funcs, feature_names_sources)\n",
                 'print("pyspark_client.py: Feathr Pyspark job completed.")\n',
                 "\n",
             ]
@@ -0,0 +1,52 @@
+from typing import Callable, Optional
+
+# Attributes set on the preprocessing functions by the decorators below. The PySpark driver template defines the same
+# decorators, since the function source, including the decorator line, is what gets shipped to the cluster.
+PREPROCESSING_MODE_ATTR = "__feathr_preprocessing_mode__"
+PREPROCESSING_SCHEMA_ATTR = "__feathr_preprocessing_schema__"
+
+PYSPARK_PREPROCESSING_MODE = "pyspark"
+PANDAS_PREPROCESSING_MODE = "pandas"
+ARROW_PREPROCESSING_MODE = "arrow"
+
+
+def _mark(func: Optional[Callable], mode: str, schema: Optional[str]):
+    def decorator(f: Callable) -> Callable:
+        setattr(f, PREPROCESSING_MODE_ATTR, mode)
+        setattr(f, PREPROCESSING_SCHEMA_ATTR, schema)
+        return f
+
+    return decorator(func) if func is not None else decorator
+
+
+def pandas_preprocessing(func: Callable = None, *, schema: str = None):
+    """Mark a source preprocessing function as working on pandas DataFrames instead of a PySpark DataFrame.
+    The function is called on every batch of the source with `mapInPandas`, so the data is exchanged with the JVM as
+    Arrow batches rather than row by row. It must not depend on rows outside of the batch, e.g. aggregations.
+
+    The decorator must be used by its bare name, e.g. `@pandas_preprocessing` or
+    `@pandas_preprocessing(schema="id long, fare double")`, since the function source is shipped to the Spark cluster.
+
+    Args:
+        func: Function taking a `pandas.DataFrame` and returning a `pandas.DataFrame`.
+        schema (optional): DDL string of the output schema. If not set, it is inferred once by calling the function
+            on a sample of the source.
+    """
+    return _mark(func, PANDAS_PREPROCESSING_MODE, schema)
+
+
+def arrow_preprocessing(func: Callable = None, *, schema: str = None):
+    """Mark a source preprocessing function as working on Arrow record batches. Same as `pandas_preprocessing`, but the
+    function takes and returns a `pyarrow.RecordBatch`, which avoids the conversion to pandas on Spark 3.3+.
+
+    Args:
+        func: Function taking a `pyarrow.RecordBatch` and returning a `pyarrow.RecordBatch`.
+        schema (optional): DDL string of the output schema. If not set, it is inferred once by calling the function
+            on a sample of the source.
+    """
+    return _mark(func, ARROW_PREPROCESSING_MODE, schema)
+
+
+def get_preprocessing_mode(func: Callable) -> str:
+    """Get how the preprocessing function is applied, one of `pyspark`, `pandas` and `arrow`."""
+    return getattr(func, PREPROCESSING_MODE_ATTR, PYSPARK_PREPROCESSING_MODE)
@@ -1,5 +1,8 @@
 from pyspark.sql import SparkSession, DataFrame, SQLContext
+from pyspark import StorageLevel
 import sys
+import time
+import traceback
 from pyspark.sql.functions import *
 
 # This is executed in Spark driver
@@ -16,7 +19,106 @@ def to_java_string_array(arr):
     return jarr
 
 
-def submit_spark_job(feature_names_funcs):
+# Driver-only arguments for the batched backfill mode. They are removed before the arguments are passed to the
+# Scala job. The first one holds a comma separated list of generation configs, one per backfill window, and the
+# second one is where the status of every window is written to as JSON.
+BATCHED_GENERATION_CONFIGS_ARG = "--feathr-batched-generation-configs"
+BACKFILL_STATUS_PATH_ARG = "--feathr-backfill-status-path"
+
+
+# Spark config of the storage level the preprocessed source DataFrames shared by several anchors or backfill windows
+# are persisted with, e.g. `MEMORY_ONLY`. `NONE` disables persisting.
+PREPROCESSED_STORAGE_LEVEL_CONF = "spark.feathr.preprocessing.storageLevel"
+DEFAULT_PREPROCESSED_STORAGE_LEVEL = "MEMORY_AND_DISK"
+# Spark config to count the rows of every preprocessed source and log them with the preprocessing time. This runs an
+# extra Spark job per source, so it's off by default.
+PREPROCESSED_LOG_ROW_COUNT_CONF = "spark.feathr.preprocessing.logRowCount"
+
+# Map of feature names concatenated to the source they're defined on, set by the generated UDF code below. Anchors
+# on the same source with the same UDF share one preprocessed DataFrame.
+feature_names_sources = {}
+
+# Same as `feathr.udf.batch_preprocessing`, since the preprocessing functions are shipped with their decorators but the
+# cluster may not have feathr installed.
+PREPROCESSING_MODE_ATTR = "__feathr_preprocessing_mode__"
+PREPROCESSING_SCHEMA_ATTR = "__feathr_preprocessing_schema__"
+# Number of rows the batch preprocessing functions are called on to infer their output schema
+SCHEMA_INFERENCE_SAMPLE_ROWS = 100
+
+
+def _mark_preprocessing(func, mode, schema):
+    def decorator(f):
+        setattr(f, PREPROCESSING_MODE_ATTR, mode)
+        setattr(f, PREPROCESSING_SCHEMA_ATTR, schema)
+        return f
+
+    return decorator(func) if func is not None else decorator
+
+
+def pandas_preprocessing(func=None, *, schema=None):
+    return _mark_preprocessing(func, "pandas", schema)
+
+
+def arrow_preprocessing(func=None, *, schema=None):
+    return _mark_preprocessing(func, "arrow", schema)
+
+
+def infer_batch_preprocessing_schema(py_df, user_func, mode):
+    """Infer the output schema of a batch preprocessing function by calling it once on a sample of the source."""
+    sample = py_df.limit(SCHEMA_INFERENCE_SAMPLE_ROWS).toPandas()
+    if sample.empty:
+        raise RuntimeError(
+            f"Cannot infer the output schema of {user_func.__name__} since the source is empty. "
+            "Please set `schema` in the preprocessing decorator."
+        )
+    if mode == "arrow":
+        import pyarrow as pa
+
+        sample = user_func(pa.RecordBatch.from_pandas(sample, preserve_index=False)).to_pandas()
+    else:
+        sample = user_func(sample)
+    return spark.createDataFrame(sample).schema
+
+
+def apply_batch_preprocessing(py_df, user_func):
+    """Apply a pandas or Arrow preprocessing function batch by batch. The data is exchanged with the Python workers as
+    Arrow batches, and the output schema is resolved once per source."""
+    mode = getattr(user_func, PREPROCESSING_MODE_ATTR)
+    schema = getattr(user_func, PREPROCESSING_SCHEMA_ATTR, None) or infer_batch_preprocessing_schema(
+        py_df, user_func, mode
+    )
+    print(f"apply_batch_preprocessing: applying {user_func.__name__} on {mode} batches with schema {schema}")
+
+    if mode == "arrow" and hasattr(py_df, "mapInArrow"):
+        return py_df.mapInArrow(lambda batches: (user_func(batch) for batch in batches), schema)
+    if mode == "arrow":
+        # `mapInArrow` is only available since Spark 3.3
+        def map_batches(pdfs):
+            import pyarrow as pa
+
+            for pdf in pdfs:
+                yield user_func(pa.RecordBatch.from_pandas(pdf, preserve_index=False)).to_pandas()
+
+        return py_df.mapInPandas(map_batches, schema)
+    return py_df.mapInPandas(lambda pdfs: (user_func(pdf) for pdf in pdfs), schema)
+
+
+def pop_argument(argv, name):
+    """Remove an argument and its value from the argument list. Returns the value (None if absent) and the new list."""
+    if name not in argv:
+        return None, argv
+    idx = argv.index(name)
+    return argv[idx + 1], argv[:idx] + argv[idx + 2 :]
+
+
+def replace_argument(argv, name, value):
+    """Return a copy of the argument list with the value of the argument replaced."""
+    argv = list(argv)
+    argv[argv.index(name) + 1] = value
+    return argv
+
+
+def submit_spark_job(feature_names_funcs, feature_names_sources=None):
     """Submit the Pyspark job to the cluster. This should be used when there is Python UDF preprocessing for sources.
     It loads the source DataFrame from Scala spark. Then preprocess the DataFrame with Python UDF in Pyspark. Later,
     the real Scala FeatureJoinJob or FeatureGenJob is executed with preprocessed DataFrames instead of the original
@@ -25,16 +127,20 @@ def submit_spark_job(feature_names_funcs):
         Args:
             feature_names_funcs: Map of feature names concatenated to preprocessing UDF function.
             For example {"f1,f2": df1, "f3,f4": df2} (the feature names in the key will be sorted)
+            feature_names_sources: Map of feature names concatenated to the source, see `feature_names_sources`.
     """
     # Prepare job parameters
     # sys.argv has all the arguments passed by submit job.
     # In pyspark job, the first param is the python file.
     # For example: ['pyspark_client.py', '--join-config', 'abfss://...', ...]
+    batched_generation_configs, argv = pop_argument(sys.argv, BATCHED_GENERATION_CONFIGS_ARG)
+    backfill_status_path, argv = pop_argument(argv, BACKFILL_STATUS_PATH_ARG)
+
     has_gen_config = False
     has_join_config = False
-    if "--generation-config" in sys.argv:
+    if "--generation-config" in argv:
         has_gen_config = True
-    if "--join-config" in sys.argv:
+    if "--join-config" in argv:
         has_join_config = True
 
     py4j_feature_job = None
@@ -52,8 +158,70 @@ def submit_spark_job(feature_names_funcs):
         raise RuntimeError(
             "None of FeatureGenConfig and FeatureJoinConfig are provided. " "One of them should be provided."
         )
-    job_param_java_array = to_java_string_array(sys.argv)
+    job_param_java_array = to_java_string_array(argv)
+
+    persisted_dfs = []
+    try:
+        if batched_generation_configs:
+            if not has_gen_config:
+                raise RuntimeError(f"{BATCHED_GENERATION_CONFIGS_ARG} is only supported by FeatureGenJob.")
+            submit_batched_generation_job(
+                py4j_feature_job,
+                argv,
+                feature_names_funcs,
+                batched_generation_configs.split(","),
+                backfill_status_path,
+                feature_names_sources,
+                persisted_dfs,
+            )
+            return None
+
+        new_preprocessed_df_map = preprocess_source_dataframes(
+            py4j_feature_job, job_param_java_array, feature_names_funcs, feature_names_sources, persisted_dfs
+        )
+
+        py4j_feature_job.mainWithPreprocessedDataFrame(job_param_java_array, new_preprocessed_df_map)
+    finally:
+        for preprocessed_df in persisted_dfs:
+            preprocessed_df.unpersist()
+    return None
+
+
+def get_preprocessed_storage_level():
+    """Get the storage level to persist the preprocessed source DataFrames with, or None to not persist them."""
+    name = spark.conf.get(PREPROCESSED_STORAGE_LEVEL_CONF, DEFAULT_PREPROCESSED_STORAGE_LEVEL).upper()
+    if name == "NONE":
+        return None
+    if not isinstance(getattr(StorageLevel, name, None), StorageLevel):
+        raise RuntimeError(f"Invalid storage level {name} in {PREPROCESSED_STORAGE_LEVEL_CONF}.")
+    return getattr(StorageLevel, name)
+
+
+def should_log_row_count():
+    """Whether to count the rows of the preprocessed source DataFrames, see `PREPROCESSED_LOG_ROW_COUNT_CONF`."""
+    return spark.conf.get(PREPROCESSED_LOG_ROW_COUNT_CONF, "false").lower() == "true"
+
 
+def preprocess_source_dataframes(
+    py4j_feature_job,
+    job_param_java_array,
+    feature_names_funcs,
+    feature_names_sources=None,
+    persisted_dfs=None,
+    persist_all=False,
+):
+    """Load the source DataFrames from Scala spark and preprocess them with the Python UDFs.
+    Anchors on the same source with the same UDF are preprocessed once and share the result. The preprocessed
+    DataFrames shared by several anchors, or all of them if `persist_all` is set since they're read by several jobs,
+    are persisted with the storage level set by `PREPROCESSED_STORAGE_LEVEL_CONF` and appended to `persisted_dfs`, so
+    that the caller can unpersist them after the job. The other ones are read once and aren't worth caching.
+
+    Returns:
+        Map of feature names concatenated to the preprocessed Java DataFrame
+    """
+    feature_names_sources = feature_names_sources or {}
+    storage_level = get_preprocessed_storage_level()
+    log_row_count = should_log_row_count()
     print("submit_spark_job: feature_names_funcs: ")
     print(feature_names_funcs)
     print("set(feature_names_funcs.keys()): ")
@@ -72,17 +240,111 @@ def submit_spark_job(feature_names_funcs):
     # do not use `sql_ctx = SQLContext(spark)`
     sql_ctx = SQLContext(sparkContext=spark.sparkContext, sparkSession=spark)
     new_preprocessed_df_map = {}
+    # (source, UDF) -> preprocessed Java DataFrame
+    preprocessed_sources = {}
+    # Anchors without a known source are never shared
+    source_keys = {
+        feature_names: (feature_names_sources.get(feature_names, feature_names), feature_names_funcs[feature_names])
+        for feature_names in dataframeFromSpark.keys()
+    }
+    # (source, UDF) -> number of anchors reading it
+    source_users = {}
+    for source_key in source_keys.values():
+        source_users[source_key] = source_users.get(source_key, 0) + 1
     for feature_names, scala_dataframe in dataframeFromSpark.items():
+        user_func = feature_names_funcs[feature_names]
+        source_key = source_keys[feature_names]
+        if source_key in preprocessed_sources:
+            print(f"submit_spark_job: reusing the preprocessed source {source_key[0]} for features {feature_names}")
+            new_preprocessed_df_map[feature_names] = preprocessed_sources[source_key]
+            continue
+
+        start_time = time.time()
         # Need to convert java DataFrame into python DataFrame
         py_df = DataFrame(scala_dataframe, sql_ctx)
         # Preprocess the DataFrame via UDF
-        user_func = feature_names_funcs[feature_names]
-        preprocessed_udf = user_func(py_df)
+        if getattr(user_func, PREPROCESSING_MODE_ATTR, "pyspark") == "pyspark":
+            preprocessed_udf = user_func(py_df)
+        else:
+            preprocessed_udf = apply_batch_preprocessing(py_df, user_func)
+        if storage_level is not None and (persist_all or source_users[source_key] > 1):
+            print(f"submit_spark_job: persisting the preprocessed source {source_key[0]} with {storage_level}")
+            preprocessed_udf.persist(storage_level)
+            if persisted_dfs is not None:
+                persisted_dfs.append(preprocessed_udf)
+        if log_row_count:
+            # Also materializes the cache if persisted, so that the time spent on reading and preprocessing is known
+            row_count = preprocessed_udf.count()
+            print(
+                f"Feathr preprocessed source {source_key[0]} with {user_func.__name__} in "
+                f"{time.time() - start_time:.1f} seconds, {row_count} rows"
+            )
+        preprocessed_sources[source_key] = preprocessed_udf._jdf
         new_preprocessed_df_map[feature_names] = preprocessed_udf._jdf
 
     print("submit_spark_job: running Feature job with preprocessed DataFrames:")
     print("Preprocessed DataFrames are: ")
     print(new_preprocessed_df_map)
+    return new_preprocessed_df_map
 
-    py4j_feature_job.mainWithPreprocessedDataFrame(job_param_java_array, new_preprocessed_df_map)
-    return None
+
+def submit_batched_generation_job(
+    py4j_feature_job,
+    argv,
+    feature_names_funcs,
+    generation_configs,
+    status_path=None,
+    feature_names_sources=None,
+    persisted_dfs=None,
+):
+    """Run the FeatureGenJob of several backfill windows in this Spark application.
+    Source DataFrames are loaded and preprocessed once, cached, and reused by every window. A window failing doesn't
+    stop the following ones; the status of every window is printed out, written to `status_path` if provided, and the
+    job fails at the end if any window has failed.
+
+        Args:
+            py4j_feature_job: the Scala FeatureGenJob
+            argv: job arguments without the driver-only arguments
+            feature_names_funcs: Map of feature names concatenated to preprocessing UDF function
+            generation_configs: generation config path of every backfill window
+            status_path: where to write the per-window status to
+            feature_names_sources: Map of feature names concatenated to the source
+            persisted_dfs: list to append the persisted preprocessed DataFrames to
+    """
+    first_window_params = to_java_string_array(replace_argument(argv, "--generation-config", generation_configs[0]))
+    preprocessed_df_map = {}
+    if feature_names_funcs:
+        # The preprocessed sources are shared by all the windows, so they're persisted if there are several windows
+        preprocessed_df_map = preprocess_source_dataframes(
+            py4j_feature_job,
+            first_window_params,
+            feature_names_funcs,
+            feature_names_sources,
+            persisted_dfs,
+            persist_all=len(generation_configs) > 1,
+        )
+
+    statuses = []
+    try:
+        for window, generation_config in enumerate(generation_configs):
+            print(f"submit_batched_generation_job: running window {window} with {generation_config}")
+            start_time = time.time()
+            status, error = "SUCCESS", None
+            try:
+                window_params = to_java_string_array(replace_argument(argv, "--generation-config", generation_config))
+                py4j_feature_job.mainWithPreprocessedDataFrame(window_params, preprocessed_df_map)
+            except Exception:
+                status, error = "FAILED", traceback.format_exc()
+                print(error)
+            duration = time.time() - start_time
+            print(f"Feathr backfill window {window} {status} in {duration:.1f} seconds: {generation_config}")
+            statuses.append((window, generation_config, status, duration, error))
+    finally:
+        if status_path:
+            spark.createDataFrame(
+                statuses, "window int, generation_config string, status string, duration_seconds double, error string"
+            ).coalesce(1).write.mode("overwrite").json(status_path)
+
+    failed_windows = [window for window, _, status, _, _ in statuses if status != "SUCCESS"]
+    if failed_windows:
+        raise RuntimeError(f"Backfill windows {failed_windows} failed. See the logs above for details.")
@@ -1,28 +1,62 @@
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Dict, Iterable, Optional, Set, Tuple
+
 import yaml
 
 from loguru import logger
 
 from azure.core.exceptions import ResourceNotFoundError
-from feathr.secrets.akv_client import AzureKeyVaultClient
+from feathr.secrets.akv_client import AzureKeyVaultClient, to_akv_secret_name
+
+# How long the values fetched from Azure Key Vault, including the keys not found, are reused before fetching again
+DEFAULT_SECRET_CACHE_TTL_SECONDS = 300
+# Number of secrets fetched concurrently by `EnvConfigReader.prefetch`
+_PREFETCH_MAX_WORKERS = 8
 
 
 class EnvConfigReader(object):
     """A utility class to read Feathr environment variables either from os environment variables,
     the config yaml file or Azure Key Vault.
     If a key is set in the environment variable, ConfigReader will return the value of that environment variable.
+
+    Environment variables and the config file are read on every lookup as they're already in memory. Values from
+    Azure Key Vault are cached for `secret_cache_ttl_seconds`, and so are the keys not found there, so that a key is
+    fetched at most once per TTL. Call `prefetch` to list the Key Vault secrets with a single request, after which
+    the keys which are not in the Key Vault don't need any request, and `refresh` after rotating secrets.
     """
 
     akv_name: str = None  # Azure Key Vault name to use for retrieving config values.
     yaml_config: dict = None  # YAML config file content.
-
-    def __init__(self, config_path: str):
+    akv_client: AzureKeyVaultClient = None  # Client to retrieve config values from Azure Key Vault.
+
+    def __init__(
+        self,
+        config_path: str,
+        secret_cache_ttl_seconds: float = DEFAULT_SECRET_CACHE_TTL_SECONDS,
+        akv_client: AzureKeyVaultClient = None,
+    ):
         """Initialize the utility class.
 
         Args:
             config_path: Config file path.
+            secret_cache_ttl_seconds (optional): Seconds to cache the values fetched from Azure Key Vault.
+            akv_client (optional): Client to fetch the secrets with. Default to an `AzureKeyVaultClient` of the Key
+                Vault set by `secrets__azure_key_vault__name`. Any object providing `get_feathr_akv_secret` and
+                `list_secret_names` works, e.g. a local stand-in for testing.
         """
+        self.secret_cache_ttl_seconds = secret_cache_ttl_seconds
+        # Secret name -> (expiry time, value). `None` values mark the keys not found in the Key Vault.
+        self._akv_cache: Dict[str, Tuple[float, Optional[str]]] = {}
+        # Names of the secrets in the Key Vault and their expiry time, set by `prefetch`
+        self._akv_secret_names: Optional[Tuple[float, Set[str]]] = None
+        self._akv_lock = threading.Lock()
+        # The keys already reported as not found, so that repeated lookups don't flood the log
+        self._reported_missing_keys = set()
+
         if config_path is not None:
             config_path = Path(config_path)
             if config_path.is_file():
@@ -32,7 +66,9 @@ class EnvConfigReader(object):
                     logger.warning(e)
 
         self.akv_name = self.get("secrets__azure_key_vault__name")
-        self.akv_client = AzureKeyVaultClient(self.akv_name) if self.akv_name else None
+        if akv_client is None and self.akv_name:
+            akv_client = AzureKeyVaultClient(self.akv_name)
+        self.akv_client = akv_client
 
     def get(self, key: str, default: str = None) -> str:
         """Gets the Feathr config variable for the given key.
@@ -53,15 +89,16 @@ class EnvConfigReader(object):
         # `val` could be a boolean value, so we need to check if it is None.
         if val is None and self.yaml_config is not None:
             val = self._get_variable_from_file(key)
-        if val is None and self.akv_name is not None:
+        if val is None and self.akv_client is not None:
             val = self._get_variable_from_akv(key)
 
         if val is not None:
             return val
         else:
-            logger.info(
-                f"Config {key} is not found in the environment variable, configuration file, or the remote key value store. Returning the default value: {default}."
-            )
+            if self._report_missing_key(key):
+                logger.info(
+                    f"Config {key} is not found in the environment variable, configuration file, or the remote key value store. Returning the default value: {default}."
+                )
             return default
 
     def get_from_env_or_akv(self, key: str) -> str:
@@ -79,15 +116,86 @@ class EnvConfigReader(object):
         """
         val = self._get_variable_from_env(key)
         # `val` could be a boolean value, so we need to check if it is None.
-        if val is None and self.akv_name is not None:
+        if val is None and self.akv_client is not None:
             val = self._get_variable_from_akv(key)
 
         if val is not None:
             return val
         else:
-            logger.warning(f"Config {key} is not found in the environment variable or the remote key value store.")
+            if self._report_missing_key(key):
+                logger.warning(f"Config {key} is not found in the environment variable or the remote key value store.")
             return None
 
+    def prefetch(self, keys: Iterable[str] = None):
+        """List the secrets in Azure Key Vault with a single request, so that looking up the keys which are not in
+        the Key Vault doesn't need any request until the cache expires. The values of `keys` which are in the Key
+        Vault are fetched concurrently. Nothing is done if Key Vault is not configured.
+
+        Args:
+            keys (optional): Config keys to fetch the values of, e.g. the secrets a job submission needs.
+        """
+        if self.akv_client is None:
+            return
+        try:
+            secret_names = self.akv_client.list_secret_names()
+        except Exception as e:
+            # E.g. the identity is only allowed to get the secrets but not to list them
+            logger.warning(
+                "Cannot list the secrets in Key Vault {}, they will be fetched one by one: {}", self.akv_name, e
+            )
+            return
+        with self._akv_lock:
+            self._akv_secret_names = (time.monotonic() + self.secret_cache_ttl_seconds, set(secret_names))
+
+        to_fetch = {
+            to_akv_secret_name(key): key
+            for key in (keys or [])
+            if to_akv_secret_name(key) in secret_names and self._get_cached_secret(to_akv_secret_name(key)) is None
+        }
+        if to_fetch:
+            with ThreadPoolExecutor(max_workers=min(len(to_fetch), _PREFETCH_MAX_WORKERS)) as executor:
+                list(executor.map(self._get_variable_from_akv, to_fetch.values()))
+
+    def refresh(self, key: str = None):
+        """Forget the cached Key Vault values, e.g. after rotating secrets. The values are fetched again on the next
+        lookup.
+
+        Args:
+            key (optional): Config key to refresh. Default to refresh all the keys, including the listed secret names.
+        """
+        with self._akv_lock:
+            if key is None:
+                self._akv_cache.clear()
+                self._akv_secret_names = None
+                self._reported_missing_keys.clear()
+            else:
+                self._akv_cache.pop(to_akv_secret_name(key), None)
+                self._reported_missing_keys.discard(key)
+
+    def _report_missing_key(self, key: str) -> bool:
+        """Return True the first time the key is reported as missing."""
+        with self._akv_lock:
+            if key in self._reported_missing_keys:
+                return False
+            self._reported_missing_keys.add(key)
+            return True
+
+    def _get_cached_secret(self, secret_name: str) -> Optional[Tuple[Optional[str]]]:
+        """Get the cached value as a 1-tuple, or None if the value is not cached or has expired."""
+        now = time.monotonic()
+        with self._akv_lock:
+            cached = self._akv_cache.get(secret_name)
+            if cached is not None and cached[0] > now:
+                return (cached[1],)
+            if self._akv_secret_names is not None and self._akv_secret_names[0] > now:
+                if secret_name not in self._akv_secret_names[1]:
+                    return (None,)
+        return None
+
+    def _set_cached_secret(self, secret_name: str, value: Optional[str]):
+        with self._akv_lock:
+            self._akv_cache[secret_name] = (time.monotonic() + self.secret_cache_ttl_seconds, value)
+
     def _get_variable_from_env(self, key: str) -> str:
         # make it work for lower case and upper case.
         conf_var = os.environ.get(key.lower(), os.environ.get(key.upper()))
@@ -95,14 +203,21 @@ class EnvConfigReader(object):
         return conf_var
 
     def _get_variable_from_akv(self, key: str) -> str:
+        # Azure Key Vault object name is case in-sensitive.
+        # https://learn.microsoft.com/en-us/azure/key-vault/general/about-keys-secrets-certificates#vault-name-and-object-name
+        secret_name = to_akv_secret_name(key)
+        cached = self._get_cached_secret(secret_name)
+        if cached is not None:
+            return cached[0]
+
+        val = None
         try:
-            # Azure Key Vault object name is case in-sensitive.
-            # https://learn.microsoft.com/en-us/azure/key-vault/general/about-keys-secrets-certificates#vault-name-and-object-name
-            return self.akv_client.get_feathr_akv_secret(key)
+            val = self.akv_client.get_feathr_akv_secret(key)
         except ResourceNotFoundError:
             logger.warning(f"Resource {self.akv_name} not found")
+        self._set_cached_secret(secret_name, val)
 
-        return None
+        return val
 
     def _get_variable_from_file(self, key: str) -> str:
         args = key.split("__")
@@ -1,14 +1,27 @@
+import hashlib
 import os
 from pathlib import Path
 
 
-def write_to_file(content: str, full_file_name: str):
+def write_to_file(content: str, full_file_name: str, skip_unchanged: bool = False) -> bool:
     """Write content to a file.
     Attributes:
         content: content to write into the file
         full_file_name: full file path
+        skip_unchanged: don't rewrite the file if it already has the same content, so that its modification time
+            doesn't change either. Used for the generated config files which are mostly the same between calls.
+
+    Returns:
+        True if the file was written
     """
     dir_name = os.path.dirname(full_file_name)
     Path(dir_name).mkdir(parents=True, exist_ok=True)
+    # `print` adds a trailing new line
+    data = (content + "\n").encode("utf-8")
+    if skip_unchanged and os.path.isfile(full_file_name):
+        with open(full_file_name, "rb") as handle:
+            if hashlib.sha256(handle.read()).digest() == hashlib.sha256(data).digest():
+                return False
     with open(full_file_name, "w") as handle:
         print(content, file=handle)
+    return True
@@ -0,0 +1,211 @@
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from dateutil.relativedelta import relativedelta
+from loguru import logger
+
+from feathr.definition.anchor import FeatureAnchor
+from feathr.definition.feature import FeatureBase
+from feathr.definition.feature_derivations import DerivedFeature
+from feathr.definition.source import HdfsSource
+from feathr.definition.transformation import WindowAggTransformation
+
+# Number of partition directories checked concurrently
+_CHECK_MAX_WORKERS = 8
+
+_DURATION_PATTERN = re.compile(r"^\s*(\d+)\s*([dhms])\s*$")
+_DURATION_UNITS = {"d": "days", "h": "hours", "m": "minutes", "s": "seconds"}
+# Java date patterns to strftime directives, longest first
+_DATE_FORMAT_TOKENS = [
+    ("yyyy", "%Y"),
+    ("yy", "%y"),
+    ("MM", "%m"),
+    ("dd", "%d"),
+    ("HH", "%H"),
+    ("mm", "%M"),
+    ("ss", "%S"),
+    ("SSS", "%f"),
+]
+# Partition length by the finest field of the partition pattern
+_PARTITION_STEPS = [
+    ("ss", relativedelta(seconds=1)),
+    ("mm", relativedelta(minutes=1)),
+    ("HH", relativedelta(hours=1)),
+    ("dd", relativedelta(days=1)),
+    ("MM", relativedelta(months=1)),
+    ("yy", relativedelta(years=1)),
+]
+
+
+def to_strftime_format(java_format: str) -> str:
+    """Convert a Java date pattern, e.g. `yyyy/MM/dd`, to a strftime format. Text in single quotes is kept as is.
+
+    Raises:
+        ValueError: if the pattern has a field other than years, months, days, hours, minutes, seconds and millis.
+    """
+    result = []
+    i = 0
+    while i < len(java_format):
+        if java_format[i] == "'":
+            end = java_format.find("'", i + 1)
+            if end < 0:
+                raise ValueError(f"Unterminated quote in date format {java_format}.")
+            result.append(java_format[i + 1 : end].replace("%", "%%") or "'")
+            i = end + 1
+            continue
+        for token, directive in _DATE_FORMAT_TOKENS:
+            if java_format.startswith(token, i):
+                result.append(directive)
+                i += len(token)
+                break
+        else:
+            if java_format[i].isalpha():
+                raise ValueError(f"Date format {java_format} is not supported.")
+            result.append(java_format[i].replace("%", "%%"))
+            i += 1
+    return "".join(result)
+
+
+def parse_duration(duration: str) -> Optional[timedelta]:
+    """Parse a window or delay like `7d`, `5h`, `3m` or `1s`. Returns None if it's not in that form."""
+    match = _DURATION_PATTERN.match(str(duration))
+    if not match:
+        return None
+    return timedelta(**{_DURATION_UNITS[match.group(2)]: int(match.group(1))})
+
+
+def get_partition_paths(source: HdfsSource, start: datetime, end: datetime) -> List[str]:
+    """Get the partition directories of a time partitioned source which hold the data between `start` and `end`,
+    both inclusive, e.g. `{path}/2022/01/02/{postfix_path}` for `time_partition_pattern="yyyy/MM/dd"`.
+    """
+    pattern = source.time_partition_pattern
+    step = next((step for field, step in _PARTITION_STEPS if field in pattern), None)
+    if step is None:
+        raise ValueError(f"Partition pattern {pattern} has no date or time field.")
+    partition_format = to_strftime_format(pattern)
+    # Truncate to the beginning of the partition of `start`
+    partition = datetime.strptime(start.strftime(partition_format), partition_format)
+    root = source.path.rstrip("/")
+    postfix = f"/{source.postfix_path.strip('/')}" if source.postfix_path else ""
+    paths = []
+    while partition <= end:
+        paths.append(f"{root}/{partition.strftime(partition_format)}{postfix}")
+        partition += step
+    return paths
+
+
+class PartitionPlanner(object):
+    """Compute the partition directories of time partitioned `HdfsSource`s a job actually reads, so that they are
+    passed to the job as an explicit path list instead of the job listing the whole history under the source path.
+
+    Only the sources with `time_partition_pattern` and `event_timestamp_column` whose requested features are all
+    sliding window aggregations are planned, since the data those features need is bounded by the windows. Other
+    sources are left to the job.
+
+    Args:
+        dir_exists (optional): Checks if a directory exists in the storage of the Spark platform. If not set, all the
+            partitions in the time range are assumed to exist. Existing directories are remembered until refreshed,
+            while missing ones are checked again on every plan, since new partitions may land at any time.
+    """
+
+    def __init__(self, dir_exists: Callable[[str], bool] = None):
+        self.dir_exists = dir_exists
+        # Directories found to exist
+        self._existing: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def plan(
+        self,
+        anchors: List[FeatureAnchor],
+        derived_features: List[DerivedFeature],
+        feature_names: Iterable[str],
+        start: datetime,
+        end: datetime,
+    ) -> Dict[str, List[str]]:
+        """Get the partition directories to read for each source, keyed by source name.
+
+        Args:
+            anchors: All the anchors of the workspace.
+            derived_features: All the derived features of the workspace.
+            feature_names: Features requested by the job.
+            start: Earliest time the features are computed for, e.g. the earliest observation or backfill cutoff time.
+            end: Latest time the features are computed for.
+        """
+        # Source name -> (source, longest window), None if the source can't be planned
+        windows: Dict[str, Optional[Tuple[HdfsSource, timedelta]]] = {}
+        for anchor, feature in self._get_anchored_features(anchors, derived_features, feature_names):
+            source = anchor.source
+            if source.name in windows and windows[source.name] is None:
+                continue
+            window = None
+            if (
+                isinstance(source, HdfsSource)
+                and source.time_partition_pattern
+                and source.event_timestamp_column
+                and isinstance(feature.transform, WindowAggTransformation)
+            ):
+                window = parse_duration(feature.transform.window)
+            if window is None:
+                windows[source.name] = None
+                continue
+            longest = windows[source.name][1] if source.name in windows else window
+            windows[source.name] = (source, max(longest, window))
+
+        source_paths = {}
+        for name, planned in windows.items():
+            if planned is None:
+                continue
+            source, window = planned
+            try:
+                paths = self._get_existing(get_partition_paths(source, start - window, end))
+            except Exception as e:
+                logger.warning("Cannot plan the partitions of source {}, the job will look them up: {}", name, e)
+                continue
+            if not paths:
+                logger.warning("Source {} has no partitions between {} and {}.", name, start - window, end)
+                continue
+            logger.info("Source {} is read from {} partition(s) from {} to {}.", name, len(paths), start - window, end)
+            source_paths[name] = paths
+        return source_paths
+
+    def refresh(self):
+        """Forget the checked directories"""
+        with self._lock:
+            self._existing.clear()
+
+    @staticmethod
+    def _get_anchored_features(
+        anchors: List[FeatureAnchor], derived_features: List[DerivedFeature], feature_names: Iterable[str]
+    ) -> List[Tuple[FeatureAnchor, FeatureBase]]:
+        """Get the anchored features the requested features depend on, along with their anchors"""
+        anchored = {feature.name: (anchor, feature) for anchor in anchors for feature in anchor.features}
+        derived = {feature.name: feature for feature in derived_features}
+        result = {}
+        to_visit = list(feature_names)
+        visited = set()
+        while to_visit:
+            name = to_visit.pop()
+            if name in visited:
+                continue
+            visited.add(name)
+            if name in anchored:
+                result[name] = anchored[name]
+            elif name in derived:
+                to_visit.extend(feature.name for feature in derived[name].input_features)
+        return list(result.values())
+
+    def _get_existing(self, paths: List[str]) -> List[str]:
+        if self.dir_exists is None:
+            return paths
+        with self._lock:
+            to_check = [path for path in paths if path not in self._existing]
+        if to_check:
+            with ThreadPoolExecutor(max_workers=min(len(to_check), _CHECK_MAX_WORKERS)) as executor:
+                exists = list(executor.map(self.dir_exists, to_check))
+            with self._lock:
+                self._existing.update(path for path, path_exists in zip(to_check, exists) if path_exists)
+        with self._lock:
+            return [path for path in paths if path in self._existing]
@@ -0,0 +1,134 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple, Union
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Filters can be a pyarrow expression, e.g. `pc.field("fare") > 10`, or a list of (column, op, value) tuples in
+# disjunctive normal form, the same as the `filters` argument of `pyarrow.parquet.read_table`.
+Filters = Union[ds.Expression, List[Tuple], List[List[Tuple]]]
+
+# Number of rows per record batch when streaming the result
+DEFAULT_BATCH_SIZE = 128 * 1024
+
+SUPPORTED_FORMATS = ("parquet", "delta", "avro", "csv")
+
+
+def read_result_table(
+    path: str,
+    data_format: str,
+    columns: List[str] = None,
+    filters: Filters = None,
+    max_workers: int = None,
+) -> pa.Table:
+    """Read result files into an Arrow table. Only the requested columns and the rows matching the filters are
+    materialized. Parquet, csv and delta files are read by pyarrow's multi-threaded dataset scanner, and avro files
+    are decoded by a thread pool, one file per task.
+
+    Args:
+        path: A result file or a directory of result files.
+        data_format: One of `parquet`, `delta`, `avro`, and `csv`.
+        columns (optional): Columns to read. Default to read all the columns.
+        filters (optional): Row filters, see `Filters`.
+        max_workers (optional): Maximum number of threads decoding avro files.
+    """
+    expression = _to_expression(filters)
+    if data_format == "avro":
+        files = _list_files(path, ".avro")
+        if not files:
+            return pa.table({})
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            tables = list(executor.map(lambda file: _read_avro_file(file, columns, expression), files))
+        return pa.concat_tables(tables, promote=True)
+
+    dataset = _get_dataset(path, data_format)
+    if dataset is None:
+        return pa.table({})
+    return dataset.to_table(columns=columns, filter=expression, use_threads=True)
+
+
+def iter_result_batches(
+    path: str,
+    data_format: str,
+    columns: List[str] = None,
+    filters: Filters = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Iterator[pa.RecordBatch]:
+    """Stream result files as Arrow record batches of at most `batch_size` rows, so that the whole result never
+    needs to fit into memory. See `read_result_table` for the arguments.
+    """
+    expression = _to_expression(filters)
+    if data_format == "avro":
+        for file in _list_files(path, ".avro"):
+            for table in _iter_avro_tables(file, columns, expression, batch_size):
+                yield from table.to_batches()
+        return
+
+    dataset = _get_dataset(path, data_format)
+    if dataset is None:
+        return
+    yield from dataset.to_batches(columns=columns, filter=expression, batch_size=batch_size, use_threads=True)
+
+
+def _to_expression(filters: Optional[Filters]) -> Optional[ds.Expression]:
+    if filters is None or isinstance(filters, ds.Expression):
+        return filters
+    return pq.filters_to_expression(filters)
+
+
+def _list_files(path: str, suffix: str) -> List[str]:
+    if Path(path).is_file():
+        return [path]
+    return sorted(str(file) for file in Path(path).glob(f"*{suffix}"))
+
+
+def _get_dataset(path: str, data_format: str) -> Optional[ds.Dataset]:
+    if data_format == "parquet":
+        return ds.dataset(path, format="parquet")
+    elif data_format == "delta":
+        from deltalake import DeltaTable
+
+        return DeltaTable(path).to_pyarrow_dataset()
+    elif data_format == "csv":
+        files = _list_files(path, ".csv")
+        return ds.dataset(files, format="csv") if files else None
+    raise ValueError(f"{data_format} is not supported. Currently only {', '.join(SUPPORTED_FORMATS)} are supported.")
+
+
+def _read_avro_file(file: str, columns: Optional[List[str]], expression: Optional[ds.Expression]) -> pa.Table:
+    tables = list(_iter_avro_tables(file, columns, expression, DEFAULT_BATCH_SIZE))
+    # The types are inferred per chunk, e.g. a column of nulls only, so they're promoted to a common schema here
+    return pa.concat_tables(tables, promote=True) if tables else pa.table({})
+
+
+def _iter_avro_tables(
+    file: str,
+    columns: Optional[List[str]],
+    expression: Optional[ds.Expression],
+    batch_size: int,
+) -> Iterator[pa.Table]:
+    import fastavro
+
+    with open(file, "rb") as f:
+        records = []
+        for record in fastavro.reader(f):
+            records.append(record)
+            if len(records) >= batch_size:
+                yield _to_table(records, columns, expression)
+                records = []
+        if records:
+            yield _to_table(records, columns, expression)
+
+
+def _to_table(records: List[dict], columns: Optional[List[str]], expression: Optional[ds.Expression]) -> pa.Table:
+    # The filter may use the columns which are not selected, so the projection is applied after filtering
+    if columns is not None and expression is None:
+        records = [{column: record.get(column) for column in columns} for record in records]
+    table = pa.Table.from_pylist(records)
+    if expression is not None:
+        table = table.filter(expression)
+        if columns is not None:
+            table = table.select(columns)
+    return table
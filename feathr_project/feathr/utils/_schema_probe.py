@@ -0,0 +1,183 @@
+import csv
+import io
+import json
+import posixpath
+import urllib.request
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+
+# Size of the ranged reads. Parquet footers, Avro headers and CSV header lines usually fit into one block.
+_BLOCK_SIZE = 64 * 1024
+# Spark writes one file per partition; only a few of them are inspected before giving up on a directory.
+_MAX_PROBED_FILES = 5
+
+_FILE_EXTENSIONS = {
+    "parquet": ".parquet",
+    "avro": ".avro",
+    "csv": ".csv",
+}
+
+# Column names keyed by (path, format, is_file_path)
+_column_names_cache: Dict[Tuple[str, str, bool], List[str]] = {}
+
+
+class _RangedFile(io.RawIOBase):
+    """Read-only, seekable file object which reads the file with ranged reads from the storage."""
+
+    def __init__(self, storage, path: str, size: int = None):
+        self._storage = storage
+        self._path = path
+        self._size = storage.get_cloud_file_size(path) if size is None else size
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        elif whence == io.SEEK_END:
+            self._pos = self._size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        return self._pos
+
+    def readinto(self, buffer) -> int:
+        length = min(len(buffer), self._size - self._pos)
+        if length <= 0:
+            return 0
+        data = self._storage.read_cloud_file_range(self._path, self._pos, length)
+        buffer[: len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+
+class _PublicHttpStorage(object):
+    """Storage which reads public files (e.g. public blobs) over HTTP with `Range` requests. Directories cannot be
+    listed over HTTP, so it only supports single files which are not Delta tables."""
+
+    def get_cloud_file_size(self, path: str) -> int:
+        with urllib.request.urlopen(urllib.request.Request(path, method="HEAD")) as response:
+            return int(response.headers["Content-Length"])
+
+    def read_cloud_file_range(self, path: str, offset: int, length: int) -> bytes:
+        request = urllib.request.Request(path, headers={"Range": f"bytes={offset}-{offset + length - 1}"})
+        with urllib.request.urlopen(request) as response:
+            return response.read(length)
+
+
+def get_column_names(storage, path: str, data_format: str = "csv", is_file_path: bool = True) -> Optional[List[str]]:
+    """Get the column names of a dataset by reading its metadata only, i.e. the Parquet footer, the Avro header,
+    the first line of a CSV file or the Delta transaction log. The result is cached per path.
+
+    Args:
+        storage: Object providing `get_cloud_file_size`, `read_cloud_file_range` and `list_cloud_files`, e.g. a
+            `SparkJobLauncher`. `list_cloud_files` is only used for directories and Delta tables.
+        path: Path of the dataset.
+        data_format: Format of the dataset. Currently support `parquet`, `delta`, `avro`, and `csv`.
+        is_file_path: If `path` is a single file or a directory.
+
+    Returns:
+        The column names, or None if they cannot be found in the metadata (e.g. the directory has no data files).
+    """
+    data_format = data_format.lower()
+    key = (path, data_format, is_file_path)
+    if key in _column_names_cache:
+        return list(_column_names_cache[key])
+
+    if data_format == "delta":
+        column_names = _get_delta_column_names(storage, path)
+    elif data_format in _FILE_EXTENSIONS:
+        file_paths = [path] if is_file_path else _list_data_files(storage, path, _FILE_EXTENSIONS[data_format])
+        column_names = None
+        for file_path in file_paths[:_MAX_PROBED_FILES]:
+            column_names = _get_file_column_names(storage, file_path, data_format)
+            if column_names:
+                break
+    else:
+        raise ValueError(
+            f"{data_format} is currently not supported. Currently only parquet, delta, avro, and csv are supported."
+        )
+
+    if column_names:
+        _column_names_cache[key] = column_names
+        return list(column_names)
+    return None
+
+
+def clear_column_names_cache():
+    """Forget all the cached column names, e.g. after a dataset is overwritten with a different schema."""
+    _column_names_cache.clear()
+
+
+def _open(storage, path: str, size: int = None) -> io.BufferedReader:
+    return io.BufferedReader(_RangedFile(storage, path, size), buffer_size=_BLOCK_SIZE)
+
+
+def _list_data_files(storage, dir_path: str, extension: str) -> List[str]:
+    """List the data files in a directory, skipping Spark's marker files like `_SUCCESS` and hidden files"""
+    file_paths = sorted(
+        file_path
+        for file_path in storage.list_cloud_files(dir_path)
+        if not posixpath.basename(file_path.rstrip("/")).startswith(("_", "."))
+    )
+    # Prefer the files with the expected extension, but Spark doesn't always add one (e.g. for avro)
+    return [p for p in file_paths if p.endswith(extension)] + [p for p in file_paths if not p.endswith(extension)]
+
+
+def _get_file_column_names(storage, path: str, data_format: str) -> Optional[List[str]]:
+    size = storage.get_cloud_file_size(path)
+    if not size:
+        return None
+
+    with _open(storage, path, size) as f:
+        if data_format == "parquet":
+            import pyarrow.parquet as pq
+
+            return pq.ParquetFile(f).schema_arrow.names
+        elif data_format == "avro":
+            import fastavro
+
+            return [field["name"] for field in fastavro.reader(f).writer_schema["fields"]]
+        else:
+            header = f.readline().decode("utf-8-sig").strip("\r\n")
+            return next(csv.reader([header]), None)
+
+
+def _get_delta_column_names(storage, path: str) -> Optional[List[str]]:
+    """Find the latest `metaData` action in the Delta transaction log. The commits are scanned from the newest one,
+    and the latest checkpoint is read when the commits holding the metadata have been cleaned up."""
+    log_dir = path.rstrip("/") + "/_delta_log"
+    log_files = sorted(storage.list_cloud_files(log_dir), reverse=True)
+
+    for log_file in (p for p in log_files if p.endswith(".json")):
+        size = storage.get_cloud_file_size(log_file)
+        for line in storage.read_cloud_file_range(log_file, 0, size).decode("utf-8").splitlines():
+            if '"metaData"' in line:
+                action = json.loads(line)
+                if "metaData" in action:
+                    return _get_delta_schema_field_names(action["metaData"]["schemaString"])
+
+    for checkpoint_file in (p for p in log_files if p.endswith(".checkpoint.parquet")):
+        import pyarrow.parquet as pq
+
+        with _open(storage, checkpoint_file) as f:
+            for metadata in pq.ParquetFile(f).read(columns=["metaData"]).column("metaData").to_pylist():
+                if metadata and metadata.get("schemaString"):
+                    return _get_delta_schema_field_names(metadata["schemaString"])
+
+    logger.warning("Cannot find the table metadata in the Delta log {}.", log_dir)
+    return None
+
+
+def _get_delta_schema_field_names(schema_string: str) -> List[str]:
+    return [field["name"] for field in json.loads(schema_string)["fields"]]
@@ -6,6 +6,7 @@ from tempfile import NamedTemporaryFile
 from typing import Dict
 import yaml
 
+from feathr.constants import LOCAL_SPARK_RUNTIMES
 from feathr.utils.platform import is_databricks
 
 
@@ -14,7 +15,7 @@ DEFAULT_FEATHR_CONFIG = {
     "project_config": {},  # "project_name"
     "feature_registry": {},  # "api_endpoint"
     "spark_config": {
-        "spark_cluster": "local",  # Currently support 'azure_synapse', 'databricks', and 'local'
+        "spark_cluster": "local",  # Currently support 'azure_synapse', 'databricks', 'local' and 'inprocess'
         "spark_result_output_parts": "1",
     },
     "offline_store": {
@@ -113,7 +114,7 @@ def generate_config(
     _update_config(config, new_config)
 
     # Set platform specific configurations
-    if config["spark_config"]["spark_cluster"] == "local":
+    if config["spark_config"]["spark_cluster"] in LOCAL_SPARK_RUNTIMES:
         _set_local_spark_config()
     elif config["spark_config"]["spark_cluster"] == "azure_synapse":
         _set_azure_synapse_config(
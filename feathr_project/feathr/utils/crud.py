@@ -3,10 +3,12 @@ Module for implementing CRUD operations on various sinks like Redis and MongoDB.
 """
 
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional, List
+from typing import TYPE_CHECKING, Any, Dict, Optional, List
 import logging
-from rediscluster import RedisCluster
-from pymongo.collection import Collection
+
+if TYPE_CHECKING:
+    # pymongo is only needed when MongoDB is used as the online store
+    from pymongo.collection import Collection
 
 logger = logging.getLogger(__name__)
 
@@ -299,7 +301,7 @@ class MongoDBCRUD(SinkCRUD):
     _COMPOSITE_KEY_SEPARATOR = "#"
     _KEY_SEPARATOR = ":"
 
-    def __init__(self, collection: Collection):
+    def __init__(self, collection: "Collection"):
         """
         Initialize the MongoDBCRUD instance.
 
@@ -0,0 +1,260 @@
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Sequence
+
+import numpy as np
+
+from feathr.definition.dtype import FeatureType, ValueType
+from feathr.definition.feature import FeatureBase
+from feathr.definition.feature_derivations import DerivedFeature
+from feathr.definition.transformation import ExpressionTransformation
+
+from .dsl_generator import AST, AtomOp, FuncOp, Operator, parse
+
+# A compiled expression takes the input columns and returns the result column. Every column is a float64 array where
+# NaN means null, booleans are 1.0 and 0.0.
+Evaluator = Callable[[Dict[str, np.ndarray]], np.ndarray]
+
+_SUPPORTED_VALUE_TYPES = {ValueType.BOOL, ValueType.INT32, ValueType.INT64, ValueType.FLOAT, ValueType.DOUBLE}
+
+_CONSTANTS = {"true": 1.0, "false": 0.0, "null": np.nan}
+
+
+def _divide(a, b):
+    # Spark returns null when dividing by zero
+    return np.divide(a, b, out=np.full(np.broadcast(a, b).shape, np.nan), where=(b != 0))
+
+
+def _mod(a, b):
+    # The result has the sign of the dividend like Spark, and it's null when dividing by zero
+    return np.fmod(a, b, out=np.full(np.broadcast(a, b).shape, np.nan), where=(b != 0))
+
+
+def _compare(op):
+    def compare(a, b):
+        return np.where(np.isnan(a) | np.isnan(b), np.nan, op(a, b).astype(np.float64))
+
+    return compare
+
+
+def _is_true(a):
+    return ~np.isnan(a) & (a != 0)
+
+
+def _round(a, scale=0.0):
+    # Spark rounds half away from zero, while `np.round` rounds half to even
+    factor = np.power(10.0, scale)
+    return np.sign(a) * np.floor(np.abs(a) * factor + 0.5) / factor
+
+
+def _coalesce(*args):
+    result = args[-1]
+    for arg in reversed(args[:-1]):
+        result = np.where(np.isnan(arg), result, arg)
+    return result
+
+
+_OPERATORS = {
+    Operator.plus.name: np.add,
+    Operator.minus.name: np.subtract,
+    Operator.multiply.name: np.multiply,
+    Operator.divide.name: _divide,
+    Operator.mod.name: _mod,
+    Operator.power.name: np.power,
+    Operator.equal.name: _compare(np.equal),
+    Operator.not_equal.name: _compare(np.not_equal),
+    Operator.less_than.name: _compare(np.less),
+    Operator.less_equal.name: _compare(np.less_equal),
+    Operator.greater_than.name: _compare(np.greater),
+    Operator.greater_equal.name: _compare(np.greater_equal),
+}
+
+_UNARY_OPERATORS = {
+    Operator.plus.name: np.positive,
+    Operator.minus.name: np.negative,
+}
+
+# Subset of `SUPPORTED_FUNCTIONS` working on numbers, with the same semantics as in Spark
+_FUNCTIONS = {
+    "abs": np.abs,
+    "acos": np.arccos,
+    "acosh": np.arccosh,
+    "asin": np.arcsin,
+    "asinh": np.arcsinh,
+    "atan": np.arctan,
+    "atan2": np.arctan2,
+    "atanh": np.arctanh,
+    "bigint": np.trunc,
+    "boolean": lambda a: np.where(np.isnan(a), np.nan, _is_true(a).astype(np.float64)),
+    "cbrt": np.cbrt,
+    "ceil": np.ceil,
+    "ceiling": np.ceil,
+    "coalesce": _coalesce,
+    "cos": np.cos,
+    "cosh": np.cosh,
+    "degrees": np.degrees,
+    "double": np.asarray,
+    "e": lambda: np.e,
+    "exp": np.exp,
+    "expm1": np.expm1,
+    "float": np.asarray,
+    "floor": np.floor,
+    "hypot": np.hypot,
+    "if": lambda condition, a, b: np.where(_is_true(condition), a, b),
+    "ifnull": _coalesce,
+    "int": np.trunc,
+    "isnan": lambda a: np.isnan(a).astype(np.float64),
+    "isnotnull": lambda a: (~np.isnan(a)).astype(np.float64),
+    "isnull": lambda a: np.isnan(a).astype(np.float64),
+    "ln": np.log,
+    # `log(expr)` is the natural logarithm and `log(base, expr)` the logarithm with the base
+    "log": lambda a, b=None: np.log(a) if b is None else np.log(b) / np.log(a),
+    "log10": np.log10,
+    "log1p": np.log1p,
+    "log2": np.log2,
+    "mod": _mod,
+    "nullif": lambda a, b: np.where(a == b, np.nan, a),
+    "nvl": _coalesce,
+    "nvl2": lambda a, b, c: np.where(np.isnan(a), c, b),
+    "pi": lambda: np.pi,
+    "positive": np.positive,
+    "pow": np.power,
+    "power": np.power,
+    "radians": np.radians,
+    "round": _round,
+    "sign": np.sign,
+    "signum": np.sign,
+    "sin": np.sin,
+    "sinh": np.sinh,
+    "sqrt": np.sqrt,
+    "tan": np.tan,
+    "tanh": np.tanh,
+}
+
+
+@lru_cache(maxsize=1024)
+def compile_expression(expr: str) -> Evaluator:
+    """Compile a Feathr expression, e.g. `f_trip_distance * 2 > f_trip_time_duration`, into a function evaluating it
+    on whole columns with NumPy. Arithmetic, comparison and the numeric functions of `SUPPORTED_FUNCTIONS` are
+    supported. Nulls propagate like in Spark, e.g. dividing by zero returns null.
+    """
+    return _compile(parse(expr))
+
+
+def _compile(ast: AST) -> Evaluator:
+    if isinstance(ast, AtomOp):
+        if ast.token.is_number():
+            value = float(ast.value)
+            return lambda columns: value
+        name = ast.value
+        if name.lower() in _CONSTANTS:
+            value = _CONSTANTS[name.lower()]
+            return lambda columns: value
+
+        def column(columns):
+            if name not in columns:
+                raise ValueError(f"Input feature {name} is not provided.")
+            return columns[name]
+
+        return column
+
+    if isinstance(ast, FuncOp):
+        ops = [_compile(op) for op in ast.ops]
+        func_name = ast.func.token.name if ast.func.token.is_operator() else ast.func.value.lower()
+        if ast.func.token.is_operator():
+            func = _UNARY_OPERATORS.get(func_name) if len(ops) == 1 else _OPERATORS.get(func_name)
+        else:
+            func = _FUNCTIONS.get(func_name)
+        if func is None:
+            raise NotImplementedError(f"{ast.func} is not supported by the online evaluator.")
+
+        def call(columns):
+            with np.errstate(all="ignore"):
+                return func(*[op(columns) for op in ops])
+
+        return call
+
+    raise NotImplementedError(f"{ast} is not supported by the online evaluator.")
+
+
+class DerivedFeatureEvaluator(object):
+    """Evaluate derived features on batches of their input feature values, e.g. values fetched from the online store,
+    without materializing the derived features. The derived features, including the derived input features, are
+    evaluated in topological order, each expression once per batch.
+
+    Args:
+        derived_features: Derived features to evaluate. Their transforms must be expressions on numeric features.
+    """
+
+    def __init__(self, derived_features: List[DerivedFeature]):
+        self.derived_features = derived_features
+        self._stages: List[DerivedFeature] = []
+        # Names of the anchor features all the derived features depend on
+        self.input_feature_names: List[str] = []
+        for feature in derived_features:
+            self._add(feature, visiting=set())
+        self._evaluators = {feature.name: self._compile_feature(feature) for feature in self._stages}
+
+    def _add(self, feature: FeatureBase, visiting: set):
+        if not isinstance(feature, DerivedFeature):
+            if feature.name not in self.input_feature_names:
+                self.input_feature_names.append(feature.name)
+            return
+        if any(feature.name == f.name for f in self._stages):
+            return
+        if feature.name in visiting:
+            raise ValueError(f"Derived feature {feature.name} depends on itself.")
+        visiting.add(feature.name)
+        for input_feature in feature.input_features:
+            self._add(input_feature, visiting)
+        self._stages.append(feature)
+
+    @staticmethod
+    def _compile_feature(feature: DerivedFeature) -> Evaluator:
+        feature_type = feature.feature_type
+        if feature_type.val_type not in _SUPPORTED_VALUE_TYPES or feature_type.dimension_type:
+            raise NotImplementedError(f"Feature {feature.name} is not a numeric or boolean feature.")
+        if not isinstance(feature.transform, ExpressionTransformation):
+            raise NotImplementedError(f"Feature {feature.name} is not defined by an expression.")
+        try:
+            return compile_expression(feature.transform.expr)
+        except NotImplementedError as e:
+            raise NotImplementedError(f"Feature {feature.name} uses unsupported expression: {e}")
+
+    def evaluate(self, inputs: Dict[str, Sequence[Any]]) -> Dict[str, List[Any]]:
+        """Evaluate the derived features.
+
+        Args:
+            inputs: Values of the input features, keyed by feature name. All the sequences have the same length,
+                one value per entity key. None means the value is missing.
+
+        Returns:
+            Values of the derived features keyed by feature name, in the same order as the inputs. Values are
+            converted to the Python type of the feature type, and null values are None.
+        """
+        num_rows = len(next(iter(inputs.values()))) if inputs else 0
+        columns = {name: _to_column(name, values) for name, values in inputs.items()}
+        for feature in self._stages:
+            result = self._evaluators[feature.name](columns)
+            columns[feature.name] = np.broadcast_to(np.asarray(result, dtype=np.float64), (num_rows,))
+        return {
+            feature.name: _to_values(columns[feature.name], feature.feature_type) for feature in self.derived_features
+        }
+
+
+def _to_column(name: str, values: Sequence[Any]) -> np.ndarray:
+    try:
+        return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    except (TypeError, ValueError):
+        raise ValueError(f"Input feature {name} is not numeric.")
+
+
+def _to_values(column: np.ndarray, feature_type: FeatureType) -> List[Any]:
+    if feature_type.val_type == ValueType.BOOL:
+        convert = bool
+    elif feature_type.val_type in (ValueType.INT32, ValueType.INT64):
+        convert = int
+    else:
+        convert = float
+    # Infinity can't be converted to an integer
+    nulls = ~np.isfinite(column) if convert is int else np.isnan(column)
+    return [None if null else convert(value) for value, null in zip(column.tolist(), nulls.tolist())]
@@ -1,11 +1,21 @@
 import re
 from enum import Enum
-from typing import List
+from functools import lru_cache
+from typing import Dict, FrozenSet, List
 from feathr.definition.feature import Feature
 from feathr.definition.feature_derivations import DerivedFeature
 
 from feathr.definition.transformation import ExpressionTransformation, WindowAggTransformation
-from functions import SUPPORTED_FUNCTIONS
+
+try:
+    from .functions import SUPPORTED_FUNCTIONS
+except ImportError:
+    # Run from this directory, e.g. test_dsl_generator.py
+    from functions import SUPPORTED_FUNCTIONS
+
+# `SUPPORTED_FUNCTIONS` is a long list, so the membership checks use a set
+_SUPPORTED_FUNCTION_SET = frozenset(SUPPORTED_FUNCTIONS)
+_IDENTIFIER_PATTERN = re.compile("^[A-Za-z_][A-Za-z0-9_]*$")
 
 
 class Token:
@@ -60,6 +70,16 @@ class Operator(Enum):
     comma = ","
 
 
+COMPARISON_OPERATORS = {
+    Operator.equal.name,
+    Operator.not_equal.name,
+    Operator.less_than.name,
+    Operator.less_equal.name,
+    Operator.greater_than.name,
+    Operator.greater_equal.name,
+}
+
+
 class Tokenizer(Enum):
     comment = r"#[^\r\n]*"
     space = r"[ \t]+"
@@ -186,13 +206,13 @@ class Parser:
         return node
 
     def expr(self):
-        """expr: set_expr|vec_expr|add_expr"""
+        """expr: set_expr|vec_expr|cmp_expr"""
         if self.current_token.name == Operator.left_curly.name:
             node = self.set_expr()
         elif self.current_token.name == Operator.left_square.name:
             node = self.vec_expr()
         else:
-            node = self.add_expr()
+            node = self.cmp_expr()
         return node
 
     def set_expr(self):
@@ -215,6 +235,15 @@ class Parser:
         node = VectorOp(ops=ops)
         return node
 
+    def cmp_expr(self):
+        """cmp_expr: add_expr ([=<>] add_expr)?"""
+        node = self.add_expr()
+        if self.current_token.name in COMPARISON_OPERATORS:
+            op = AtomOp(self.current_token, is_func=True)
+            self.forward()
+            node = FuncOp(func=op, ops=[node, self.add_expr()])
+        return node
+
     def add_expr(self):
         """add_expr: mul_expr ([+-] mul_expr)*"""
         node = self.mul_expr()
@@ -256,10 +285,10 @@ class Parser:
         return node
 
     def term(self):
-        """term: function | ( add_expr )"""
+        """term: function | ( cmp_expr )"""
         if self.current_token.name == Operator.left_paren.name:
             self.forward()
-            node = self.add_expr()
+            node = self.cmp_expr()
             assert self.current_token.name == Operator.right_paren.name
             self.forward()
         else:
@@ -292,15 +321,19 @@ class Parser:
         return res
 
 
+@lru_cache(maxsize=4096)
 def parse(txt) -> AST:
-    """parse txt to AST."""
+    """parse txt to AST. The AST is cached per expression, so it must not be modified."""
     return Parser(Tokenizer.token_iter(txt)).parse()
 
 
-def get_identifiers(txt) -> list:
-    ast = parse(txt)
-    s = set()
-    return collect_id(ast, s)
+def get_identifiers(txt) -> set:
+    return set(_get_identifiers(txt))
+
+
+@lru_cache(maxsize=4096)
+def _get_identifiers(txt) -> FrozenSet[str]:
+    return frozenset(collect_id(parse(txt), set()))
 
 
 def collect_id(ast, s):
@@ -308,8 +341,8 @@ def collect_id(ast, s):
         # if ast.is_func:
         s.add(ast.token.value)
     elif isinstance(ast, FuncOp):
-        if re.match("^[A-Za-z_][A-Za-z0-9_]*$", ast.func.token.value):
-            if ast.func.value not in SUPPORTED_FUNCTIONS:
+        if _IDENTIFIER_PATTERN.match(ast.func.token.value):
+            if ast.func.value not in _SUPPORTED_FUNCTION_SET:
                 raise NotImplementedError(ast.func.value)
         for op in ast.ops:
             collect_id(op, s)
@@ -324,45 +357,37 @@ def collect_id(ast, s):
     return s
 
 
+def _layer_features(features: List[Feature]) -> List[List[Feature]]:
+    """Group the features and all their upstream features into layers. Anchor features are in the first layer, and
+    each derived feature is in the layer after the deepest of its input features. Every feature is visited once."""
+    depths: Dict[int, int] = {}
+    ordered = []
+
+    def visit(f):
+        if id(f) in depths:
+            return depths[id(f)]
+        depth = 0
+        if isinstance(f, DerivedFeature):
+            depth = 1 + max((visit(uf) for uf in f.input_features), default=-1)
+        depths[id(f)] = depth
+        ordered.append(f)
+        return depth
+
+    for f in features:
+        visit(f)
+
+    layers = [[] for _ in range(max(depths.values(), default=-1) + 1)]
+    for f in ordered:
+        layers[depths[id(f)]].append(f)
+    return layers
+
+
 def gen_dsl(name: str, features: List[Feature]):
     """Generate a dsl file for the given features"""
 
-    layers = []
-
-    # Add all upstreams to the current_features
-    current_features = features.copy()
-    while True:
-        cf = current_features.copy()
-        for f in current_features:
-            if isinstance(f, DerivedFeature):
-                for uf in f.input_features:
-                    if uf not in current_features:
-                        cf.append(uf)
-        if len(cf) == len(current_features):
-            break
-        current_features = cf
-
-    feature_names = set([f.name for f in current_features])
-
-    # Topological sort the features
-    while current_features:
-        current_layer = set()
-        for f in current_features:
-            if isinstance(f, Feature):
-                # Anchor feature doesn't have upstream
-                current_features.remove(f)
-                current_layer.add(f)
-            elif isinstance(f, DerivedFeature):
-                pending = False
-                # If any of the input features is still left, it shall wait
-                for input in f.input_features:
-                    if input in current_features:
-                        pending = True
-                        break
-                if not pending:
-                    current_features.remove(f)
-                    current_layer.add(f)
-        layers.append(current_layer)
+    # Topological sort the features, including all the upstream features
+    layers = _layer_features(features)
+    feature_names = set(f.name for layer in layers for f in layer)
 
     identifiers = set()
     stages = []
@@ -379,9 +404,9 @@ def gen_dsl(name: str, features: List[Feature]):
             t.append(f"{f.name} = {expr}")
             unsupported_func = ""
             try:
-                for id in get_identifiers(expr):
+                for id in _get_identifiers(expr):
                     if id not in feature_names:
-                        if re.match("^[A-Za-z_][A-Za-z0-9_]*$", id):
+                        if _IDENTIFIER_PATTERN.match(id):
                             identifiers.add(id)
             except NotImplementedError as e:
                 unsupported_func = f"{e}"
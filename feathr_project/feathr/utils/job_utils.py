@@ -1,14 +1,23 @@
 from pathlib import Path
 from tempfile import TemporaryDirectory
-from typing import Union, Set
+from typing import Iterator, List, Optional, Tuple, Union
 
 from loguru import logger
 import pandas as pd
+import pyarrow as pa
 import re
 from pyspark.sql import DataFrame, SparkSession
 
 from feathr.client import FeathrClient
-from feathr.constants import OUTPUT_FORMAT
+from feathr.constants import LOCAL_SPARK_RUNTIMES, OUTPUT_FORMAT
+from feathr.utils._result_reader import (
+    DEFAULT_BATCH_SIZE,
+    SUPPORTED_FORMATS,
+    Filters,
+    iter_result_batches as _iter_result_batches,
+    read_result_table,
+)
+from feathr.utils._schema_probe import _PublicHttpStorage, get_column_names
 from feathr.utils.platform import is_databricks
 from feathr.spark_provider._synapse_submission import _DataLakeFiler
 
@@ -75,8 +84,11 @@ def get_result_df(
     spark: SparkSession = None,
     format: str = None,
     is_file_path: bool = False,
-) -> Union[DataFrame, pd.DataFrame]:
-    """Download the job result dataset from cloud as a Spark DataFrame or pandas DataFrame.
+    columns: List[str] = None,
+    filters: Filters = None,
+    as_arrow: bool = False,
+) -> Union[DataFrame, pd.DataFrame, pa.Table]:
+    """Download the job result dataset from cloud as a Spark DataFrame, pandas DataFrame or Arrow table.
 
     Args:
         client: Feathr client
@@ -90,17 +102,130 @@ def get_result_df(
             Otherwise, it returns pd.DataFrame.
         format: An alias for `data_format` (for backward compatibility).
         is_file: If 'res_url' is a single file or a directory. Default as False
+        columns (optional): Only load these columns.
+        filters (optional): Only load the rows matching the filters, either a pyarrow expression like
+            `pyarrow.compute.field("fare") > 10` or a list of `(column, op, value)` tuples as in
+            `pyarrow.parquet.read_table`. The filters are pushed down to the file readers when loading into pandas,
+            and not supported with Spark DataFrame.
+        as_arrow (optional): Return a pyarrow Table instead of a pandas DataFrame. Ignored if `spark` is provided.
 
     Returns:
-        Either Spark or pandas DataFrame.
+        Either Spark or pandas DataFrame, or Arrow table.
+    """
+    if spark is not None and filters is not None:
+        raise ValueError(
+            "`filters` is not supported when loading the result as Spark DataFrame. Please use DataFrame.filter instead."
+        )
+
+    local_cache_path, data_format = _download_result(
+        client=client,
+        data_format=data_format,
+        res_url=res_url,
+        local_cache_path=local_cache_path,
+        spark=spark,
+        format=format,
+        is_file_path=is_file_path,
+    )
+
+    # Only pass the new loading options when they're used
+    load_options = {}
+    if columns is not None:
+        load_options["columns"] = columns
+    if filters is not None:
+        load_options["filters"] = filters
+    if as_arrow:
+        load_options["as_arrow"] = as_arrow
+
+    result_df = None
+    try:
+        if spark is not None:
+            if data_format == "csv":
+                result_df = spark.read.option("header", True).csv(local_cache_path)
+            else:
+                result_df = spark.read.format(data_format).load(local_cache_path)
+            if columns is not None:
+                result_df = result_df.select(columns)
+        else:
+            result_df = _load_files_to_pandas_df(
+                dir_path=local_cache_path.replace(
+                    "dbfs:", "/dbfs"
+                ),  # replace to python path if spark path is provided.
+                data_format=data_format,
+                **load_options,
+            )
+    except Exception as e:
+        logger.error(f"Failed to load result files from {local_cache_path} with format {data_format}.")
+        raise e
+
+    return result_df
+
+
+def iter_result_batches(
+    client: FeathrClient,
+    data_format: str = None,
+    res_url: str = None,
+    local_cache_path: str = None,
+    is_file_path: bool = False,
+    columns: List[str] = None,
+    filters: Filters = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Iterator[pa.RecordBatch]:
+    """Download the job result dataset from cloud and stream it as Arrow record batches, e.g. to feed a training
+    loop without loading the whole result into memory. Batches can be converted by `RecordBatch.to_pandas()`.
+
+    Args:
+        client: Feathr client
+        data_format: Format to read the downloaded files. Currently support `parquet`, `delta`, `avro`, and `csv`.
+            Default to use client's job tags if exists.
+        res_url: Result URL to download files from. Default to use client's job tags if exists.
+        local_cache_path (optional): Specify the absolute download directory. if the user does not provide this,
+            the function will create a temporary directory.
+        is_file_path: If 'res_url' is a single file or a directory. Default as False
+        columns (optional): Only load these columns.
+        filters (optional): Only load the rows matching the filters. See `get_result_df`.
+        batch_size (optional): Maximum number of rows per batch.
+
+    Returns:
+        Iterator of pyarrow RecordBatch.
+    """
+    local_cache_path, data_format = _download_result(
+        client=client,
+        data_format=data_format,
+        res_url=res_url,
+        local_cache_path=local_cache_path,
+        is_file_path=is_file_path,
+    )
+    return _iter_result_batches(
+        path=local_cache_path.replace("dbfs:", "/dbfs"),
+        data_format=data_format,
+        columns=columns,
+        filters=filters,
+        batch_size=batch_size,
+    )
+
+
+def _download_result(
+    client: FeathrClient,
+    data_format: str = None,
+    res_url: str = None,
+    local_cache_path: str = None,
+    spark: SparkSession = None,
+    format: str = None,
+    is_file_path: bool = False,
+) -> Tuple[str, str]:
+    """Resolve the result URL and data format, and download the result files if needed.
+
+    Returns:
+        The local path of the result files and the data format.
     """
     if format is not None:
         data_format = format
 
     if data_format is None:
         # May use data format from the job tags
-        if client.get_job_tags() and client.get_job_tags().get(OUTPUT_FORMAT):
-            data_format = client.get_job_tags().get(OUTPUT_FORMAT)
+        job_tags = client.get_job_tags()
+        if job_tags and job_tags.get(OUTPUT_FORMAT):
+            data_format = job_tags.get(OUTPUT_FORMAT)
         else:
             raise ValueError("Cannot determine the data format. Please provide the data_format argument.")
 
@@ -124,7 +249,7 @@ def get_result_df(
             "`res_url` is None. Please make sure either you provide a res_url or make sure the job finished in FeathrClient has a valid result URI."
         )
 
-    if client.spark_runtime == "local":
+    if client.spark_runtime in LOCAL_SPARK_RUNTIMES:
         if local_cache_path is not None:
             logger.warning(
                 "In local spark mode, the result files are expected to be stored at a local storage and thus `local_cache_path` argument will be ignored."
@@ -152,25 +277,7 @@ def get_result_df(
             result_path=res_url, local_folder=local_cache_path, is_file_path=is_file_path
         )
 
-    result_df = None
-    try:
-        if spark is not None:
-            if data_format == "csv":
-                result_df = spark.read.option("header", True).csv(local_cache_path)
-            else:
-                result_df = spark.read.format(data_format).load(local_cache_path)
-        else:
-            result_df = _load_files_to_pandas_df(
-                dir_path=local_cache_path.replace(
-                    "dbfs:", "/dbfs"
-                ),  # replace to python path if spark path is provided.
-                data_format=data_format,
-            )
-    except Exception as e:
-        logger.error(f"Failed to load result files from {local_cache_path} with format {data_format}.")
-        raise e
-
-    return result_df
+    return local_cache_path, data_format
 
 
 def copy_cloud_dir(client: FeathrClient, source_url: str, target_url: str = None):
@@ -189,44 +296,35 @@ def cloud_dir_exists(client: FeathrClient, dir_path: str) -> bool:
     return client.feathr_spark_launcher.cloud_dir_exists(dir_path)
 
 
-def _load_files_to_pandas_df(dir_path: str, data_format: str = "avro") -> pd.DataFrame:
-    if data_format == "parquet":
-        return pd.read_parquet(dir_path)
-
-    elif data_format == "delta":
-        from deltalake import DeltaTable
-
-        delta = DeltaTable(dir_path)
-        return delta.to_pyarrow_table().to_pandas()
-
-    elif data_format == "avro":
-        import pandavro as pdx
-
-        if Path(dir_path).is_file():
-            return pdx.read_avro(dir_path)
-        else:
-            try:
-                return pd.concat([pdx.read_avro(f) for f in Path(dir_path).glob("*.avro")]).reset_index(drop=True)
-            except ValueError:  # No object to concat when the dir is empty
-                return pd.DataFrame()
-
-    elif data_format == "csv":
-        if Path(dir_path).is_file():
-            return pd.read_csv(dir_path)
-        else:
-            try:
-                return pd.concat([pd.read_csv(f) for f in Path(dir_path).glob("*.csv")]).reset_index(drop=True)
-            except ValueError:  # No object to concat when the dir is empty
-                return pd.DataFrame()
-
-    else:
+def _load_files_to_pandas_df(
+    dir_path: str,
+    data_format: str = "avro",
+    columns: List[str] = None,
+    filters: Filters = None,
+    as_arrow: bool = False,
+) -> Union[pd.DataFrame, pa.Table]:
+    if data_format not in SUPPORTED_FORMATS:
         raise ValueError(
             f"{data_format} is currently not supported in get_result_df. Currently only parquet, delta, avro, and csv are supported, please consider writing a customized function to read the result."
         )
 
+    table = read_result_table(dir_path, data_format, columns=columns, filters=filters)
+    if as_arrow:
+        return table
+    # Convert column by column and release the Arrow buffers along the way to avoid doubling the peak memory
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
 
-def get_cloud_file_column_names(client: FeathrClient, path: str, format: str = "csv", is_file_path=True) -> Set[str]:
-    # Try to load publid cloud files without credential
+def get_cloud_file_column_names(
+    client: FeathrClient, path: str, format: str = "csv", is_file_path=True
+) -> Optional[List[str]]:
+    """Get the column names of a dataset in the cloud in the order of the dataset, or None if it cannot be read.
+    Only the metadata of the dataset is read (Parquet footers, Avro headers, the first line of CSV files or the Delta
+    log) with ranged reads, and the result is cached per path. Falls back to loading the whole dataset if the metadata
+    cannot be read.
+    """
+    probes = []
+    # Try to load public cloud files without credential
     if path.startswith(("abfss:", "wasbs:")):
         paths = re.split("/|@", path)
         if len(paths) < 4:
@@ -234,14 +332,22 @@ def get_cloud_file_column_names(client: FeathrClient, path: str, format: str = "
         new_path = "https://" + paths[3] + "/" + paths[2] + "/"
         if len(paths) > 4:
             new_path = new_path + "/".join(paths[4:])
-        if format == "csv" and is_file_path:
-            try:
-                df = pd.read_csv(new_path)
-                return df.columns
-            except:
-                df = None
-        # TODO: support loading other formats files
-
+        # Public files can only be read one by one since listing a directory needs credential. Directories and Delta
+        # tables are probed with the Spark launcher only.
+        if is_file_path and format.lower() != "delta":
+            probes.append((_PublicHttpStorage(), new_path))
+    probes.append((client.feathr_spark_launcher, path))
+
+    for storage, probe_path in probes:
+        try:
+            column_names = get_column_names(storage, probe_path, format, is_file_path)
+        except Exception as e:
+            logger.debug(f"failed to read the schema of {probe_path} from its metadata: {e}")
+            continue
+        if column_names:
+            return column_names
+
+    logger.info(f"failed to read the schema of {path} from its metadata. Loading the whole dataset instead.")
     try:
         df = get_result_df(client=client, data_format=format, res_url=path, is_file_path=is_file_path)
     except:
@@ -254,4 +360,4 @@ def get_cloud_file_column_names(client: FeathrClient, path: str, format: str = "
             f"failed to load cloud files from the path: {path} because of lack of permission or invalid path."
         )
         return None
-    return df.columns
+    return list(df.columns)
@@ -72,6 +72,7 @@ setup(
         "pyapacheatlas<=0.14.0",
         "pyhocon<=0.3.59",
         "pandavro",
+        "fastavro",  # read directly for avro results and schemas
         "pyyaml<=6.0",
         "Jinja2<=3.1.2",
         "pyarrow<=11.0.0",
@@ -1,11 +1,14 @@
+import hashlib
 from pathlib import Path
 from tempfile import TemporaryDirectory
 from urllib.parse import urlparse
 
 import pytest
+import requests
+from pytest_mock import MockerFixture
 
 from feathr.datasets.nyc_taxi import NYC_TAXI_SMALL_URL
-from feathr.datasets.utils import maybe_download
+from feathr.datasets.utils import maybe_convert_to_parquet, maybe_download, read_parquet
 
 
 @pytest.mark.parametrize(
@@ -52,3 +55,78 @@ def test__maybe_download__raise_exception():
         )
 
     tmpdir.cleanup()
+
+
+class _FakeResponse(object):
+    """Streamed response of `requests.get`, which fails after `fail_after` blocks if set"""
+
+    def __init__(self, content: bytes, status_code: int = 200, fail_after: int = None):
+        self.content = content
+        self.status_code = status_code
+        self.fail_after = fail_after
+        self.headers = {"content-length": str(len(content))}
+
+    def iter_content(self, block_size: int):
+        for i in range(0, len(self.content), block_size):
+            if self.fail_after is not None and i // block_size == self.fail_after:
+                raise requests.exceptions.ChunkedEncodingError("Connection broken")
+            yield self.content[i : i + block_size]
+
+    def raise_for_status(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+def test__maybe_download__resume(mocker: MockerFixture, tmp_path: Path):
+    """Test maybe_download resumes an interrupted download with a range request and verifies the checksum."""
+    content = bytes(range(256)) * 40
+    mocker.patch("feathr.datasets.utils.time.sleep")
+    mocked_get = mocker.patch(
+        "feathr.datasets.utils.requests.get",
+        side_effect=[_FakeResponse(content, fail_after=3), _FakeResponse(content[3000:], status_code=206)],
+    )
+    dst_filepath = tmp_path.joinpath("data.csv")
+
+    assert maybe_download(
+        src_url="https://example.com/data.csv",
+        dst_filepath=str(dst_filepath),
+        expected_sha256=hashlib.sha256(content).hexdigest(),
+        block_size=1000,
+    )
+
+    assert dst_filepath.read_bytes() == content
+    assert not tmp_path.joinpath("data.csv.part").exists()
+    assert mocked_get.call_args_list[0].kwargs["headers"] == {}
+    assert mocked_get.call_args_list[1].kwargs["headers"] == {"Range": "bytes=3000-"}
+
+
+def test__maybe_download__checksum_mismatch(mocker: MockerFixture, tmp_path: Path):
+    mocker.patch("feathr.datasets.utils.requests.get", return_value=_FakeResponse(b"a,b\n1,2\n"))
+    dst_filepath = tmp_path.joinpath("data.csv")
+
+    with pytest.raises(IOError):
+        maybe_download(src_url="https://example.com/data.csv", dst_filepath=str(dst_filepath), expected_sha256="0" * 64)
+
+    assert not dst_filepath.exists()
+    assert not tmp_path.joinpath("data.csv.part").exists()
+
+
+def test__maybe_convert_to_parquet(mocker: MockerFixture, tmp_path: Path):
+    csv_filepath = tmp_path.joinpath("data.csv")
+    csv_filepath.write_text("a,b,c\n1,x,0.5\n2,y,1.5\n")
+
+    parquet_filepath = maybe_convert_to_parquet(str(csv_filepath))
+    assert parquet_filepath == tmp_path.joinpath("data.parquet")
+    pdf = read_parquet(parquet_filepath, columns=["a", "c"])
+    assert list(pdf.columns) == ["a", "c"]
+    assert pdf["a"].tolist() == [1, 2]
+
+    # Converted once
+    mocked_read_csv = mocker.patch("pandas.read_csv")
+    assert maybe_convert_to_parquet(str(csv_filepath)) == parquet_filepath
+    mocked_read_csv.assert_not_called()
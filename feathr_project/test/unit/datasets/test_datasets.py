@@ -44,6 +44,22 @@ def test__nyc_taxi__get_pandas_df(
     mocked_maybe_download.assert_called_once_with(src_url=nyc_taxi.NYC_TAXI_SMALL_URL, dst_filepath=NYC_TAXI_FILE_PATH)
 
 
+def test__nyc_taxi__get_pandas_df__columns(
+    mocker: MockerFixture,
+    tmp_path: Path,
+):
+    """Test if nyc_taxi.get_pandas_df loads the requested columns from the parquet file converted once."""
+    mocker.patch("feathr.datasets.nyc_taxi.maybe_download")
+    tmp_path.joinpath("green_tripdata_2020-04_with_index.csv").write_text(
+        "trip_id,fare_amount,passenger_count\n0,10.5,1\n1,7.0,2\n"
+    )
+
+    pdf = nyc_taxi.get_pandas_df(local_cache_path=str(tmp_path), columns=["fare_amount"])
+    assert list(pdf.columns) == ["fare_amount"]
+    assert pdf["fare_amount"].tolist() == [10.5, 7.0]
+    assert tmp_path.joinpath("green_tripdata_2020-04_with_index.parquet").is_file()
+
+
 @pytest.mark.parametrize(
     "local_cache_path",
     [
@@ -101,8 +117,9 @@ def test__nyc_taxi__get_spark_df__with_databricks(
     expected_python_cache_path: str,
     expected_spark_cache_path: str,
 ):
-    # Mock maybe_download and spark session
+    # Mock maybe_download, maybe_convert_to_parquet and spark session
     mocked_maybe_download = mocker.patch("feathr.datasets.nyc_taxi.maybe_download")
+    mocked_maybe_convert_to_parquet = mocker.patch("feathr.datasets.nyc_taxi.maybe_convert_to_parquet")
     mocked_is_databricks = mocker.patch("feathr.datasets.nyc_taxi.is_databricks", return_value=True)
     mocked_spark = MagicMock(spec=SparkSession)
 
@@ -115,4 +132,7 @@ def test__nyc_taxi__get_spark_df__with_databricks(
         src_url=nyc_taxi.NYC_TAXI_SMALL_URL, dst_filepath=expected_python_cache_path
     )
 
-    mocked_spark.read.option.return_value.csv.assert_called_once_with(expected_spark_cache_path)
+    mocked_maybe_convert_to_parquet.assert_called_once_with(expected_python_cache_path)
+
+    # The data set is loaded from the parquet file converted from the downloaded csv file
+    mocked_spark.read.parquet.assert_called_once_with(expected_spark_cache_path.replace(".csv", ".parquet"))
@@ -0,0 +1,63 @@
+import os
+
+from feathr import INT32, Feature, FeatureAnchor, HdfsSource, TypedKey, ValueType, WindowAggTransformation
+from feathr.definition.feathrconfig import compile_template
+from feathr.utils._file_utils import write_to_file
+
+
+def _anchor() -> FeatureAnchor:
+    key = TypedKey(key_column="user_id", key_column_type=ValueType.INT32)
+    source = HdfsSource(name="trips", path="abfss://container@account.dfs.core.windows.net/trips.csv")
+    features = [
+        Feature(
+            name=f"f_{i}",
+            feature_type=INT32,
+            key=key,
+            transform=WindowAggTransformation(agg_expr="fare", agg_func="SUM", window="7d"),
+        )
+        for i in range(3)
+    ]
+    return FeatureAnchor(name="trip_features", source=source, features=features)
+
+
+def test__compile_template__compiled_once():
+    assert compile_template("{{ a }}") is compile_template("{{ a }}")
+    assert compile_template("{{ a }}").render(a=1) == "1"
+
+
+def test__memoize_feature_config__invalidated_on_change():
+    anchor = _anchor()
+    config = anchor.to_feature_config()
+    assert anchor.to_feature_config() == config
+    assert "_feature_config_cache" in vars(anchor.features[0])
+
+    # Changes of the referenced objects, including in-place changes, invalidate the cached config
+    anchor.features[0].transform.window = "3d"
+    assert "window: 3d" in anchor.to_feature_config()
+
+    anchor.features.append(Feature(name="f_new", feature_type=INT32, key=anchor.features[0].key, transform="fare"))
+    assert "f_new" in anchor.to_feature_config()
+
+    anchor.source.path = "abfss://container@account.dfs.core.windows.net/new_trips.csv"
+    assert "new_trips.csv" in anchor.source.to_feature_config()
+
+    # The cached config is the same as the one generated from scratch
+    assert anchor.to_feature_config() == _render_without_cache(anchor)
+
+
+def _render_without_cache(anchor: FeatureAnchor) -> str:
+    for obj in [anchor, anchor.source, *anchor.features, *[f.transform for f in anchor.features]]:
+        vars(obj).pop("_feature_config_cache", None)
+    return anchor.to_feature_config()
+
+
+def test__write_to_file__skip_unchanged(tmp_path):
+    file_path = str(tmp_path / "conf" / "features.conf")
+    assert write_to_file("anchors: {}", file_path, skip_unchanged=True)
+    os.utime(file_path, (0, 0))
+
+    assert not write_to_file("anchors: {}", file_path, skip_unchanged=True)
+    assert os.path.getmtime(file_path) == 0
+
+    assert write_to_file("anchors: {a: {}}", file_path, skip_unchanged=True)
+    assert open(file_path).read() == "anchors: {a: {}}\n"
@@ -0,0 +1,181 @@
+import copy
+import json
+from pathlib import Path
+
+import pytest
+
+from feathr import FLOAT, DerivedFeature, Feature, FeatureAnchor, HdfsSource, TypedKey, ValueType
+from feathr.registry import _feathr_registry_client
+from feathr.registry._feathr_registry_client import _FeatureRegistry
+
+LINEAGE = json.loads((Path(__file__).parents[2] / "test_registry_lineage.json").read_text())
+F_TRIP_TIME_DISTANCE = "226b42ee-0c34-4329-b935-744aecc63fb4"
+F_TRIP_TIME_ROUNDED_PLUS = "479c6306-5fdb-4e06-9008-c18f68db52a4"
+
+
+class _FakeResponse:
+    def __init__(self, status_code: int, body: dict, headers: dict = None):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.text = json.dumps(body)
+        self.headers = headers or {}
+        self._body = body
+
+    def json(self):
+        return copy.deepcopy(self._body)
+
+
+class _FakeRegistry:
+    """Serves the project changes by version, or 404 if the changes endpoint is not supported"""
+
+    def __init__(self, changes: dict = None):
+        self.changes = changes
+        self.requests = []
+
+    def get(self, url, params=None, headers=None):
+        self.requests.append((url.split("/api/v1", 1)[1], params))
+        if url.endswith("/changes"):
+            if self.changes is None:
+                return _FakeResponse(404, {"message": "Not Found"})
+            return _FakeResponse(200, self.changes[params["since"]])
+        return _FakeResponse(200, LINEAGE)
+
+
+@pytest.fixture
+def registry_client(monkeypatch, tmp_path):
+    monkeypatch.setenv("FEATHR_SANDBOX", "true")
+    return _FeatureRegistry("p", endpoint="https://registry/api/v1", cache_dir=str(tmp_path))
+
+
+def test__get_features_from_registry__applies_changes_to_cache(monkeypatch, registry_client):
+    updated = copy.deepcopy(LINEAGE["guidEntityMap"][F_TRIP_TIME_DISTANCE])
+    updated["attributes"]["tags"] = {"updated": "true"}
+    server = _FakeRegistry(
+        {
+            0: {"version": 3, "guidEntityMap": LINEAGE["guidEntityMap"], "deletedGuids": []},
+            3: {
+                "version": 5,
+                "guidEntityMap": {F_TRIP_TIME_DISTANCE: updated},
+                "deletedGuids": [F_TRIP_TIME_ROUNDED_PLUS],
+            },
+            5: {"version": 5, "guidEntityMap": {}, "deletedGuids": []},
+        }
+    )
+    monkeypatch.setattr(_feathr_registry_client.requests, "get", server.get)
+
+    anchors, derived_features = registry_client.get_features_from_registry("test_project")
+    assert len(anchors) == 2 and len(derived_features) == 3
+
+    # Only the changes since the cached version are fetched, by a new client as well
+    anchors, derived_features = registry_client.get_features_from_registry("test_project")
+    assert sorted(f.name for f in derived_features) == ["f_trip_time_distance", "f_trip_time_rounded"]
+    assert [f.registry_tags for f in derived_features if f.name == "f_trip_time_distance"] == [{"updated": "true"}]
+    client = _FeatureRegistry("p", endpoint="https://registry/api/v1", cache_dir=str(registry_client.cache_dir))
+    _, derived_features = client.get_features_from_registry("test_project")
+    assert len(derived_features) == 2
+    assert server.requests == [("/projects/test_project/changes", {"since": v}) for v in [0, 3, 5]]
+
+
+def test__get_features_from_registry__without_changes_endpoint(monkeypatch, registry_client):
+    server = _FakeRegistry()
+    monkeypatch.setattr(_feathr_registry_client.requests, "get", server.get)
+
+    for _ in range(2):
+        anchors, derived_features = registry_client.get_features_from_registry("test_project")
+        assert len(anchors) == 2 and len(derived_features) == 3
+    assert [path for path, _ in server.requests] == ["/projects/test_project/changes", "/projects/test_project"] * 2
+    assert not any(registry_client.cache_dir.iterdir())
+
+
+def test__list_registered_features__pages(monkeypatch, registry_client):
+    features = [
+        {"guid": str(i), "attributes": {"name": f"f{i}", "qualifiedName": f"p__f{i}"}} for i in range(5)
+    ]
+    requested = []
+
+    def get(url, params=None, headers=None):
+        requested.append(dict(params))
+        start = int(params.get("cursor", 0))
+        end = start + 2
+        return _FakeResponse(200, features[start:end], {"X-Next-Cursor": str(end)} if end < len(features) else {})
+
+    monkeypatch.setattr(_feathr_registry_client, "LIST_PAGE_SIZE", 2)
+    monkeypatch.setattr(_feathr_registry_client.requests, "get", get)
+
+    assert [f["qualifiedName"] for f in registry_client.list_registered_features("p")] == [f"p__f{i}" for i in range(5)]
+    assert [r.get("cursor") for r in requested] == [None, "2", "4"]
+    assert all(r["limit"] == 2 and r["fields"] == "name,qualifiedName" for r in requested)
+
+
+def _build_features():
+    key = TypedKey(key_column="id", key_column_type=ValueType.INT32)
+    source = HdfsSource(name="s", path="wasbs://data.csv")
+    f1 = Feature(name="f1", feature_type=FLOAT, key=key, transform="c1")
+    f2 = Feature(name="f2", feature_type=FLOAT, key=key, transform="c2")
+    anchor = FeatureAnchor(name="a", source=source, features=[f1, f2])
+    d1 = DerivedFeature(name="d1", feature_type=FLOAT, key=key, input_features=[f1, f2], transform="f1 + f2")
+    d2 = DerivedFeature(name="d2", feature_type=FLOAT, key=key, input_features=[d1], transform="d1 * 2")
+    return [anchor], [d2, d1]
+
+
+def test__register_features__creates_entities_in_one_call(monkeypatch, registry_client):
+    posted = []
+
+    def post(url, json=None, headers=None):
+        posted.append((url.split("/api/v1", 1)[1], json))
+        if url.endswith("/projects"):
+            return _FakeResponse(200, {"guid": "00000000-0000-0000-0000-000000000000"})
+        # The registry assigns ids in the order of the definitions
+        temp_ids = [id for kind in ["sources", "anchors", "anchorFeatures", "derivedFeatures"] for id in json[kind]]
+        guids = dict([(id, f"00000000-0000-0000-0000-00000000000{i + 1}") for i, id in enumerate(temp_ids)])
+        return _FakeResponse(200, {"guids": guids})
+
+    monkeypatch.setattr(_feathr_registry_client.requests, "post", post)
+    anchor_list, derived_feature_list = _build_features()
+    registry_client.register_features(anchor_list=anchor_list, derived_feature_list=derived_feature_list)
+
+    assert [path for path, _ in posted] == ["/projects", "/projects/00000000-0000-0000-0000-000000000000/entities"]
+    body = posted[1][1]
+    anchor_id, source_id = list(body["anchors"])[0], list(body["sources"])[0]
+    assert body["anchors"][anchor_id]["sourceId"] == source_id
+    assert [f["anchorId"] for f in body["anchorFeatures"].values()] == [anchor_id] * 2
+    # Derived features are sorted by their dependencies, and refer to the others by the temporary ids
+    d1_id, d2_id = list(body["derivedFeatures"])
+    assert [d["name"] for d in body["derivedFeatures"].values()] == ["d1", "d2"]
+    assert body["derivedFeatures"][d1_id]["inputAnchorFeatures"] == list(body["anchorFeatures"])
+    assert body["derivedFeatures"][d2_id]["inputDerivedFeatures"] == [d1_id]
+
+    anchor = anchor_list[0]
+    d2, d1 = derived_feature_list
+    assert str(anchor.source._registry_id).endswith("1") and str(anchor._registry_id).endswith("2")
+    assert [str(f._registry_id)[-1] for f in anchor.features + [d1, d2]] == ["3", "4", "5", "6"]
+    assert [f._qualified_name for f in anchor.features] == ["p__a__f1", "p__a__f2"]
+    assert d2._qualified_name == "p__d2"
+
+
+def test__register_features__without_batch_endpoint(monkeypatch, registry_client):
+    posted = []
+
+    def post(url, json=None, headers=None):
+        path = url.split("/api/v1", 1)[1]
+        posted.append(path)
+        if path.endswith("/entities"):
+            return _FakeResponse(404, {"detail": "Not Found"})
+        return _FakeResponse(200, {"guid": f"00000000-0000-0000-0000-00000000000{len(posted) - 1}"})
+
+    monkeypatch.setattr(_feathr_registry_client.requests, "post", post)
+    anchor_list, derived_feature_list = _build_features()
+    registry_client.register_features(anchor_list=anchor_list, derived_feature_list=derived_feature_list)
+
+    project = "/projects/00000000-0000-0000-0000-000000000000"
+    assert posted == [
+        "/projects",
+        f"{project}/entities",
+        f"{project}/datasources",
+        f"{project}/anchors",
+        f"{project}/anchors/00000000-0000-0000-0000-000000000003/features",
+        f"{project}/anchors/00000000-0000-0000-0000-000000000003/features",
+        f"{project}/derivedfeatures",
+        f"{project}/derivedfeatures",
+    ]
+    assert str(derived_feature_list[0]._registry_id).endswith("7")
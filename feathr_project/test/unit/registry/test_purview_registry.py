@@ -0,0 +1,164 @@
+from uuid import uuid4
+
+import pytest
+import requests
+from pyapacheatlas.core.util import AtlasException
+
+from feathr import FLOAT, DerivedFeature, Feature, FeatureAnchor, HdfsSource, TypedKey, ValueType
+from feathr.constants import TYPEDEF_ANCHOR, TYPEDEF_DERIVED_FEATURE
+from feathr.registry import _feature_registry_purview
+from feathr.registry._feature_registry_purview import _PurviewRegistry
+
+
+class _FakePurview:
+    """Keeps the entities by type and qualified name, and fails the uploads of entities existing already like Purview"""
+
+    def __init__(self, failures: int = 0):
+        self.entities = {}
+        # Number of entities in every upload request
+        self.uploads = []
+        # Number of upload requests failing after being applied
+        self.failures = failures
+
+    def upload_typedefs(self, **kwargs):
+        return {}
+
+    def upload_entities(self, batch):
+        entities = [e.to_json() for e in batch]
+        self.uploads.append(len(entities))
+        if any((e["typeName"], e["attributes"]["qualifiedName"]) in self.entities for e in entities):
+            raise AtlasException("PreConditionCheckFailed")
+        assignments = {}
+        for e in entities:
+            assignments[e["guid"]] = str(uuid4())
+            self.entities[(e["typeName"], e["attributes"]["qualifiedName"])] = {**e, "guid": assignments[e["guid"]]}
+        if self.failures:
+            self.failures -= 1
+            raise requests.ConnectionError("Connection reset by peer")
+        return {"guidAssignments": assignments}
+
+    def get_entity(self, guid=None, qualifiedName=None, typeName=None):
+        if guid is not None:
+            return {"entities": [e for e in self.entities.values() if e["guid"] in guid]}
+        names = qualifiedName if isinstance(qualifiedName, list) else [qualifiedName]
+        found = [self.entities[(typeName, n)] for n in names if (typeName, n) in self.entities]
+        if len(found) < len(names):
+            raise AtlasException("ATLAS-404-00-009")
+        return {"entities": found}
+
+
+@pytest.fixture
+def purview(monkeypatch):
+    monkeypatch.setattr(_feature_registry_purview, "PURVIEW_RETRY_DELAY", 0)
+    return _FakePurview()
+
+
+@pytest.fixture
+def registry(purview):
+    registry = _PurviewRegistry("p", "purview", "__", credential=object())
+    registry.purview_client = purview
+    return registry
+
+
+def _build_features(d1_transform: str = "f1 + f2"):
+    key = TypedKey(key_column="id", key_column_type=ValueType.INT32)
+    source = HdfsSource(name="s", path="wasbs://data.csv")
+    f1 = Feature(name="f1", feature_type=FLOAT, key=key, transform="c1")
+    f2 = Feature(name="f2", feature_type=FLOAT, key=key, transform="c2")
+    anchor = FeatureAnchor(name="a", source=source, features=[f1, f2])
+    d1 = DerivedFeature(name="d1", feature_type=FLOAT, key=key, input_features=[f1, f2], transform=d1_transform)
+    d2 = DerivedFeature(name="d2", feature_type=FLOAT, key=key, input_features=[d1], transform="d1 * 2")
+    return [anchor], [d2, d1]
+
+
+def _relations(purview):
+    return sorted(name.split("__")[0] for type_name, name in purview.entities if type_name == "Process")
+
+
+def test__register_features__uploads_entities_in_bulk(purview, registry):
+    anchor_list, derived_feature_list = _build_features()
+    registry.register_features(anchor_list=anchor_list, derived_feature_list=derived_feature_list)
+
+    # The project, the source and the anchor features, then the anchor and d1, then d2, then all of the relations
+    assert purview.uploads == [4, 2, 1, 28]
+    anchor = anchor_list[0]
+    d2, d1 = derived_feature_list
+    assert purview.entities[(TYPEDEF_ANCHOR, "p__a")]["attributes"]["sourceId"] == str(anchor.source._registry_id)
+    d1_entity = purview.entities[(TYPEDEF_DERIVED_FEATURE, "p__d1")]
+    assert d1_entity["attributes"]["inputAnchorFeatures"] == [str(f._registry_id) for f in anchor.features]
+    assert purview.entities[(TYPEDEF_DERIVED_FEATURE, "p__d2")]["attributes"]["inputDerivedFeatures"] == [
+        str(d1._registry_id)
+    ]
+    assert d1_entity["guid"] == str(d1._registry_id) and d2._qualified_name == "p__d2"
+    assert registry.project_id is not None
+    # Every relation is uploaded with its reverse, between the guids assigned by Purview
+    assert _relations(purview) == ["BELONGSTO"] * 8 + ["CONSUMES"] * 6 + ["CONTAINS"] * 8 + ["PRODUCES"] * 6
+    guids = set(e["guid"] for e in purview.entities.values())
+    assert all(name.split("__")[1] in guids for type_name, name in purview.entities if type_name == "Process")
+
+
+def test__register_features__bounds_batch_size(monkeypatch, purview, registry):
+    monkeypatch.setattr(_feature_registry_purview, "PURVIEW_BATCH_SIZE", 3)
+    anchor_list, derived_feature_list = _build_features()
+    registry.register_features(anchor_list=anchor_list, derived_feature_list=derived_feature_list)
+
+    assert max(purview.uploads) == 3 and sum(purview.uploads) == 4 + 2 + 1 + 28
+    assert len(purview.entities) == 35
+
+
+def test__register_features__retries_idempotently(purview, registry):
+    purview.failures = 2
+    anchor_list, derived_feature_list = _build_features()
+    registry.register_features(anchor_list=anchor_list, derived_feature_list=derived_feature_list)
+    assert len(purview.entities) == 35
+    ids = [f._registry_id for f in anchor_list[0].features + derived_feature_list]
+
+    # Registering the same definitions again creates nothing and resolves the same guids
+    anchor_list, derived_feature_list = _build_features()
+    registry.register_features(anchor_list=anchor_list, derived_feature_list=derived_feature_list)
+    assert len(purview.entities) == 35
+    assert [f._registry_id for f in anchor_list[0].features + derived_feature_list] == ids
+
+
+def test__register_features__failure_restores_ids(monkeypatch, purview, registry):
+    upload_entities = purview.upload_entities
+
+    def upload_relations(batch):
+        if any(e.typeName == "Process" for e in batch):
+            raise requests.ConnectionError("Connection reset by peer")
+        return upload_entities(batch)
+
+    monkeypatch.setattr(purview, "upload_entities", upload_relations)
+    anchor_list, derived_feature_list = _build_features()
+    with pytest.raises(requests.ConnectionError):
+        registry.register_features(anchor_list=anchor_list, derived_feature_list=derived_feature_list)
+    anchor = anchor_list[0]
+    assert not any(hasattr(e, "_registry_id") for e in [anchor, anchor.source] + anchor.features + derived_feature_list)
+
+    # A registration only refers to the features registered before by their guids
+    monkeypatch.setattr(purview, "upload_entities", upload_entities)
+    registry.register_features(anchor_list=anchor_list, derived_feature_list=[])
+    # The qualified names of the input features are looked up if unknown
+    for f in anchor.features:
+        del f._qualified_name
+    d3 = DerivedFeature(
+        name="d3", feature_type=FLOAT, key=anchor.features[0].key, input_features=anchor.features, transform="f1"
+    )
+    registry.register_features(anchor_list=[], derived_feature_list=[d3])
+    assert purview.entities[(TYPEDEF_DERIVED_FEATURE, "p__d3")]["attributes"]["inputAnchorFeatures"] == [
+        str(f._registry_id) for f in anchor.features
+    ]
+    assert _relations(purview).count("CONSUMES") == 3 + 2
+
+
+def test__register_features__conflict(purview, registry):
+    anchor_list, derived_feature_list = _build_features()
+    registry.register_features(anchor_list=anchor_list, derived_feature_list=derived_feature_list)
+
+    # The existing d1 has a different transformation
+    anchor_list, derived_feature_list = _build_features(d1_transform="f1 - f2")
+    with pytest.raises(RuntimeError, match="p__d1 conflicts with the existing entity"):
+        registry.register_features(anchor_list=anchor_list, derived_feature_list=derived_feature_list)
+    assert purview.entities[(TYPEDEF_DERIVED_FEATURE, "p__d1")]["attributes"]["transformation"] == {
+        "transformExpr": "f1 + f2"
+    }
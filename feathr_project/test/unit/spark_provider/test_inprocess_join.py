@@ -0,0 +1,196 @@
+import pickle
+from pathlib import Path
+
+import fastavro
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+import pytest
+
+from feathr import (
+    FLOAT,
+    INPUT_CONTEXT,
+    INT32,
+    DerivedFeature,
+    Feature,
+    FeatureAnchor,
+    FeatureQuery,
+    HdfsSource,
+    ObservationSettings,
+    TypedKey,
+    ValueType,
+    WindowAggTransformation,
+)
+from feathr.constants import JOIN_CLASS_NAME, OUTPUT_FORMAT
+from feathr.definition.config_helper import FeathrConfigHelper
+from feathr.spark_provider._inprocess_join import UnsupportedJoinError, run_feature_join
+from feathr.spark_provider._inprocess_submission import _FeathrInProcessJobLauncher
+from feathr.udf._preprocessing_pyudf_manager import FEATHR_PYSPARK_METADATA
+
+location_id = TypedKey(key_column="location_id", key_column_type=ValueType.INT32)
+
+
+def _write_sources(tmp_path: Path) -> Path:
+    trips = pa.table(
+        {
+            "location_id": [1, 1, 1, 2, 2],
+            "fare": [10.0, 20.0, -5.0, 7.0, 3.0],
+            "ts": [
+                "2022-01-01 00:00:00",
+                "2022-01-05 00:00:00",
+                "2022-01-06 00:00:00",
+                "2022-01-02 12:00:00",
+                "2022-01-20 00:00:00",
+            ],
+        }
+    )
+    pq.write_table(trips, str(tmp_path / "trips.parquet"))
+    observation = pa.table(
+        {
+            "location_id": [1, 1, 2, 3],
+            "distance": [2.0, 3.0, 4.0, 5.0],
+            "ts": ["2022-01-05 00:00:00", "2022-01-07 00:00:00", "2022-01-03 00:00:00", "2022-01-03 00:00:00"],
+        }
+    )
+    pa_csv.write_csv(observation, str(tmp_path / "observation.csv"))
+    return tmp_path / "observation.csv"
+
+
+def _build_features(tmp_path: Path, agg_func: str = "AVG"):
+    source = HdfsSource(
+        name="trips",
+        path=str(tmp_path / "trips.parquet"),
+        event_timestamp_column="ts",
+        timestamp_format="yyyy-MM-dd HH:mm:ss",
+    )
+    f_fare = Feature(name="f_fare", key=location_id, feature_type=FLOAT, transform="fare * 2")
+    f_window_fare = Feature(
+        name="f_window_fare",
+        key=location_id,
+        feature_type=FLOAT,
+        transform=WindowAggTransformation(agg_expr="fare", agg_func=agg_func, window="3d", filter="fare > 0"),
+    )
+    f_trip_count = Feature(
+        name="f_trip_count",
+        key=location_id,
+        feature_type=INT32,
+        transform=WindowAggTransformation(agg_expr="fare", agg_func="COUNT", window="10d"),
+    )
+    f_distance = Feature(name="f_distance", feature_type=FLOAT, transform="distance")
+    f_fare_per_distance = DerivedFeature(
+        name="f_fare_per_distance",
+        key=location_id,
+        feature_type=FLOAT,
+        input_features=[f_window_fare, f_distance],
+        transform="f_window_fare / f_distance",
+    )
+    anchors = [
+        FeatureAnchor(name="trip_features", source=source, features=[f_fare, f_window_fare, f_trip_count]),
+        FeatureAnchor(name="request_features", source=INPUT_CONTEXT, features=[f_distance]),
+    ]
+    FeathrConfigHelper().save_to_feature_config_from_context(anchors, [f_fare_per_distance], str(tmp_path))
+    return tmp_path / "feature_conf"
+
+
+def _write_join_config(tmp_path: Path, observation_path: Path, feature_names) -> Path:
+    settings = ObservationSettings(
+        observation_path=str(observation_path), event_timestamp_column="ts", timestamp_format="yyyy-MM-dd HH:mm:ss"
+    )
+    query = FeatureQuery(feature_list=feature_names, key=location_id)
+    join_config_path = tmp_path / "feature_join.conf"
+    join_config_path.write_text(
+        f"{settings.to_feature_config()}\n"
+        f"featureList: [{query.to_feature_config()}]\n"
+        f'outputPath: "{tmp_path / "output"}"\n'
+    )
+    return join_config_path
+
+
+def test__run_feature_join(tmp_path):
+    observation_path = _write_sources(tmp_path)
+    feature_config_path = _build_features(tmp_path)
+    feature_names = ["f_fare", "f_window_fare", "f_trip_count", "f_distance", "f_fare_per_distance"]
+    join_config_path = _write_join_config(tmp_path, observation_path, feature_names)
+
+    result = run_feature_join(str(join_config_path), str(feature_config_path), output_format="parquet")
+
+    assert list(result.columns) == ["location_id", "distance", "ts"] + feature_names
+    # The latest source row of the key, regardless of the observation time
+    assert result["f_fare"].tolist()[:3] == [-10.0, -10.0, 6.0]
+    # Point-in-time window: (observation time - 3d, observation time] and `fare > 0`
+    assert result["f_window_fare"].tolist()[:3] == [20.0, 20.0, 7.0]
+    assert result["f_trip_count"].tolist()[:3] == [2, 3, 1]
+    assert result["f_distance"].tolist() == [2.0, 3.0, 4.0, 5.0]
+    assert result["f_fare_per_distance"].tolist()[:3] == [10.0, pytest.approx(20.0 / 3), 1.75]
+    # Keys without source rows get nulls
+    assert result.iloc[3][["f_fare", "f_window_fare", "f_trip_count", "f_fare_per_distance"]].isna().all()
+
+    output = pq.read_table(str(tmp_path / "output"))
+    assert output.column_names == list(result.columns)
+    assert output.num_rows == 4
+    assert (tmp_path / "output" / "_SUCCESS").exists()
+
+
+def test__run_feature_join__avro_output(tmp_path):
+    observation_path = _write_sources(tmp_path)
+    feature_config_path = _build_features(tmp_path)
+    join_config_path = _write_join_config(tmp_path, observation_path, ["f_trip_count"])
+
+    run_feature_join(str(join_config_path), str(feature_config_path), output_format="avro")
+
+    with open(tmp_path / "output" / "part-00000.avro", "rb") as f:
+        records = list(fastavro.reader(f))
+    assert [record["f_trip_count"] for record in records] == [2, 3, 1, None]
+
+
+def test__run_feature_join__unsupported_aggregation(tmp_path):
+    observation_path = _write_sources(tmp_path)
+    feature_config_path = _build_features(tmp_path, agg_func="MAX_POOLING")
+    join_config_path = _write_join_config(tmp_path, observation_path, ["f_window_fare"])
+
+    with pytest.raises(UnsupportedJoinError):
+        run_feature_join(str(join_config_path), str(feature_config_path))
+    assert not (tmp_path / "output").exists()
+
+    # Features which are not requested don't matter
+    join_config_path = _write_join_config(tmp_path, observation_path, ["f_trip_count"])
+    run_feature_join(str(join_config_path), str(feature_config_path))
+
+
+def test__inprocess_job_launcher(tmp_path, mocker):
+    observation_path = _write_sources(tmp_path)
+    feature_config_path = _build_features(tmp_path)
+    join_config_path = _write_join_config(tmp_path, observation_path, ["f_fare"])
+    launcher = _FeathrInProcessJobLauncher(workspace_path=str(tmp_path), debug_folder=str(tmp_path))
+    submit_to_spark = mocker.patch(
+        "feathr.spark_provider._localspark_submission._FeathrLocalSparkJobLauncher.submit_feathr_job"
+    )
+    arguments = [
+        "--join-config",
+        str(join_config_path),
+        "--input",
+        str(observation_path),
+        "--feature-config",
+        str(feature_config_path) + "/",
+    ]
+
+    handle = launcher.submit_feathr_job(
+        job_name="join",
+        main_jar_path=None,
+        main_class_name=JOIN_CLASS_NAME,
+        arguments=arguments,
+        job_tags={OUTPUT_FORMAT: "csv"},
+    )
+    assert handle.job_id == "inprocess-0"
+    assert handle.wait_for_completion()
+    assert launcher.get_job_tags(handle.job_id) == {OUTPUT_FORMAT: "csv"}
+    assert (tmp_path / "output" / "part-00000.csv").exists()
+    submit_to_spark.assert_not_called()
+
+    # Features with preprocessing UDFs are joined by Spark
+    with open(tmp_path / FEATHR_PYSPARK_METADATA, "wb") as f:
+        pickle.dump(["f_fare"], f)
+    launcher.submit_feathr_job(
+        job_name="join", main_jar_path=None, main_class_name=JOIN_CLASS_NAME, arguments=arguments
+    )
+    submit_to_spark.assert_called_once()
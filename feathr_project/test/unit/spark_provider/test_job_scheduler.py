@@ -0,0 +1,167 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+from feathr.constants import OUTPUT_FORMAT, OUTPUT_PATH_TAG
+from feathr.spark_provider._abc import SparkJobLauncher
+from feathr.spark_provider._job_scheduler import JobHandle, JobScheduler, PollingBackoff
+
+
+class _MockedJobLauncher(SparkJobLauncher):
+    """Launcher which finishes every job after `steps` status calls"""
+
+    SUCCESS_STATUSES = frozenset({"success"})
+    FAILED_STATUSES = frozenset({"failed"})
+
+    def __init__(self, steps: int = 1, failed_jobs: List[str] = None):
+        self.steps = steps
+        self.failed_jobs = failed_jobs or []
+        self.submitted = []
+        self.polls = {}
+        self.batch_calls = 0
+        self.tag_calls = 0
+
+    def upload_or_get_cloud_path(self, local_path_or_http_path: str):
+        return local_path_or_http_path
+
+    def submit_feathr_job(self, job_name: str, **_) -> JobHandle:
+        job_id = len(self.submitted)
+        self.submitted.append(job_name)
+        self.polls[job_id] = 0
+        return JobHandle(self, job_name, job_id=job_id, submission={"id": job_id})
+
+    def wait_for_completion(self, timeout_seconds: Optional[float], job_id: Any = None) -> bool:
+        return True
+
+    def get_status(self, job_id: Any = None) -> str:
+        self.polls[job_id] += 1
+        if self.polls[job_id] < self.steps:
+            return "running"
+        return "failed" if self.submitted[job_id] in self.failed_jobs else "success"
+
+    def get_job_statuses(self, job_ids: List[Any]) -> Dict[Any, str]:
+        self.batch_calls += 1
+        return super().get_job_statuses(job_ids)
+
+    def get_job_tags(self, job_id: Any = None) -> Dict[str, str]:
+        self.tag_calls += 1
+        return {OUTPUT_PATH_TAG: f"output_{job_id}", OUTPUT_FORMAT: "parquet"}
+
+
+def test__job_scheduler__max_concurrent_jobs():
+    launcher = _MockedJobLauncher(steps=2)
+    scheduler = JobScheduler(launcher, max_concurrent_jobs=2, max_poll_interval_seconds=0)
+
+    handles = [scheduler.submit(job_name=f"job_{i}") for i in range(5)]
+
+    # Only the first two jobs are submitted, the rest are queued
+    assert launcher.submitted == ["job_0", "job_1"]
+    assert scheduler.pending_count() == 3
+    assert [handle.submitted for handle in handles] == [True, True, False, False, False]
+
+    assert scheduler.wait_all(timeout_seconds=10)
+    assert launcher.submitted == [f"job_{i}" for i in range(5)]
+    assert all(handle.succeeded() for handle in handles)
+    # One batched status call per polling round rather than one call per job
+    assert launcher.batch_calls <= 6
+
+
+def test__job_scheduler__as_completed():
+    launcher = _MockedJobLauncher(steps=1, failed_jobs=["job_1"])
+    scheduler = JobScheduler(launcher, max_poll_interval_seconds=0)
+
+    handles = [scheduler.submit(job_name=f"job_{i}") for i in range(3)]
+    completed = list(scheduler.as_completed())
+
+    assert sorted(handle.job_name for handle in completed) == ["job_0", "job_1", "job_2"]
+    assert [handle.succeeded() for handle in handles] == [True, False, True]
+    assert not scheduler.wait_all()
+    assert scheduler.wait_all([handles[0], handles[2]])
+
+
+def test__job_scheduler__timeout():
+    launcher = _MockedJobLauncher(steps=100)
+    scheduler = JobScheduler(launcher, max_poll_interval_seconds=0)
+    scheduler.submit(job_name="job_0")
+
+    with pytest.raises(TimeoutError):
+        scheduler.wait_all(timeout_seconds=0)
+
+
+def test__job_scheduler__invalid_max_concurrent_jobs():
+    with pytest.raises(ValueError):
+        JobScheduler(_MockedJobLauncher(), max_concurrent_jobs=0)
+
+
+def test__job_handle__submission_attributes():
+    launcher = _MockedJobLauncher()
+    handle = launcher.submit_feathr_job(job_name="job_0")
+
+    # Attributes of the raw submission result are still accessible from the handle
+    assert handle.get("id") == 0
+    assert handle.get_status() == "success"
+    assert handle.done()
+
+
+def test__polling_backoff():
+    polling = PollingBackoff(initial_seconds=1, max_seconds=10, multiplier=3)
+    assert [polling.next_interval() for _ in range(4)] == [1, 3, 9, 10]
+    polling.reset()
+    assert polling.next_interval() == 1
+
+
+def test__job_handle__done_callback_and_cached_tags():
+    launcher = _MockedJobLauncher(steps=2)
+    handle = launcher.submit_feathr_job(job_name="job_0")
+    done = []
+    handle.add_done_callback(lambda h: done.append(h.job_name))
+
+    assert handle.get_status() == "running"
+    assert done == []
+    assert handle.get_status() == "success"
+    assert done == ["job_0"]
+
+    # Callbacks registered after the job finished are called right away
+    handle.add_done_callback(lambda h: done.append(h.status))
+    assert done == ["job_0", "success"]
+
+    # Job tags are fetched only once after the job finished
+    assert handle.get_job_result_uri() == "output_0"
+    assert handle.get_output_format() == "parquet"
+    assert handle.get_job_tags()[OUTPUT_PATH_TAG] == "output_0"
+    assert launcher.tag_calls == 1
+
+
+def test__job_scheduler__wait_all_async():
+    launcher = _MockedJobLauncher(steps=3)
+    scheduler = JobScheduler(launcher, max_concurrent_jobs=1, max_poll_interval_seconds=0)
+    handles = [scheduler.submit(job_name=f"job_{i}") for i in range(3)]
+
+    assert asyncio.run(scheduler.wait_all_async(timeout_seconds=10))
+    assert asyncio.run(handles[0].wait_for_completion_async())
+    assert all(handle.done() for handle in handles)
+
+
+def test__client__latest_job_queued():
+    from feathr.client import FeathrClient
+
+    launcher = _MockedJobLauncher(steps=2)
+    client = FeathrClient.__new__(FeathrClient)
+    client.feathr_spark_launcher = launcher
+    client.job_scheduler = JobScheduler(launcher, max_concurrent_jobs=1, max_poll_interval_seconds=0)
+
+    client.job_scheduler.submit(job_name="job_0")
+    queued = client.job_scheduler.submit(job_name="job_1")
+    assert not queued.submitted
+    # The latest job is the queued one, not the one running
+    assert client.job_scheduler.latest_handle is queued
+    assert client.get_job_tags() is None
+    assert client.get_job_result_uri(block=False) is None
+
+    # Waiting for the latest job submits it once the first one finished
+    client.wait_job_to_finish(timeout_sec=10)
+    assert launcher.submitted == ["job_0", "job_1"]
+    assert queued.succeeded()
+    assert client.get_job_result_uri() == "output_1"
+    assert client.get_job_tags()[OUTPUT_PATH_TAG] == "output_1"
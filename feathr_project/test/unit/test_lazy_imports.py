@@ -0,0 +1,31 @@
+import subprocess
+import sys
+
+# Modules which are slow to import and only needed by some of the features
+HEAVY_MODULES = [
+    "pyspark",
+    "redis",
+    "rediscluster",
+    "pymongo",
+    "azure.identity",
+    "azure.keyvault.secrets",
+    "databricks_cli",
+    "pandas",
+]
+
+
+def _run(code: str) -> str:
+    return subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+
+
+def test__import_feathr__skips_heavy_modules():
+    output = _run(f"import sys, feathr; print([m for m in {HEAVY_MODULES!r} if m in sys.modules])")
+    assert output.strip() == "[]"
+
+
+def test__import_feathr__lazy_attributes():
+    output = _run(
+        "import feathr; "
+        "print(feathr.FeathrClient.__name__, feathr.get_result_df.__name__, 'FeathrClient' in dir(feathr))"
+    )
+    assert output.split() == ["FeathrClient", "get_result_df", "True"]
@@ -1,6 +1,17 @@
+import ast
+from pathlib import Path
+
+import pandas as pd
 import pytest
 
-from feathr.udf._preprocessing_pyudf_manager import _PreprocessingPyudfManager
+import feathr.udf
+from feathr import BOOLEAN, Feature, FeatureAnchor, HdfsSource, TypedKey, ValueType, pandas_preprocessing
+from feathr.udf._preprocessing_pyudf_manager import (
+    FEATHR_CLIENT_UDF_FILE_NAME,
+    FEATHR_PYSPARK_DRIVER_TEMPLATE_FILE_NAME,
+    _PreprocessingPyudfManager,
+)
+from feathr.udf.batch_preprocessing import arrow_preprocessing, get_preprocessing_mode
 
 
 @pytest.mark.parametrize(
@@ -16,3 +27,175 @@ from feathr.udf._preprocessing_pyudf_manager import _PreprocessingPyudfManager
 )
 def test__parse_function_str_for_name(fn_name, fn_str):
     assert fn_name == _PreprocessingPyudfManager._parse_function_str_for_name(fn_str)
+
+
+def test__prepare_pyspark_udf_files__force_pyspark(tmp_path):
+    # Without preprocessing UDFs, the driver is only needed when it's forced, e.g. for the batched backfill mode
+    assert _PreprocessingPyudfManager.prepare_pyspark_udf_files(["f"], str(tmp_path)) == []
+
+    udf_files = _PreprocessingPyudfManager.prepare_pyspark_udf_files(["f"], str(tmp_path), force_pyspark=True)
+    assert len(udf_files) == 1
+    driver_code = open(udf_files[0]).read()
+    assert "def submit_batched_generation_job(" in driver_code
+    assert "feature_names_funcs = {}" in driver_code
+    compile(driver_code, udf_files[0], "exec")
+
+
+@pandas_preprocessing(schema="trip_distance double, is_long_trip boolean")
+def add_is_long_trip(pdf):
+    pdf["is_long_trip"] = pdf["trip_distance"] > 30
+    return pdf
+
+
+def test__batch_preprocessing__shipped_with_decorator(tmp_path):
+    source = HdfsSource(name="trips", path="trips.parquet", preprocessing=add_is_long_trip)
+    anchor = FeatureAnchor(
+        name="trip_features",
+        source=source,
+        features=[
+            Feature(
+                name="f_is_long_trip",
+                feature_type=BOOLEAN,
+                key=TypedKey(key_column="trip_id", key_column_type=ValueType.INT64),
+            )
+        ],
+    )
+    _PreprocessingPyudfManager.build_anchor_preprocessing_metadata([anchor], str(tmp_path))
+    udf_files = _PreprocessingPyudfManager.prepare_pyspark_udf_files(["f_is_long_trip"], str(tmp_path))
+    compile(open(udf_files[0]).read(), udf_files[0], "exec")
+
+    # Run the UDF code with the decorators defined by the driver template, as the driver does on the cluster
+    template_path = Path(feathr.udf.__file__).parent / FEATHR_PYSPARK_DRIVER_TEMPLATE_FILE_NAME
+    template = ast.parse(template_path.read_text())
+    namespace = {}
+    exec(
+        compile(
+            ast.Module(
+                body=[
+                    node
+                    for node in template.body
+                    if (isinstance(node, ast.FunctionDef) and "preprocessing" in node.name)
+                    or (isinstance(node, ast.Assign) and node.targets[0].id.startswith("PREPROCESSING_"))
+                ],
+                type_ignores=[],
+            ),
+            str(template_path),
+            "exec",
+        ),
+        namespace,
+    )
+    exec((tmp_path / FEATHR_CLIENT_UDF_FILE_NAME).read_text(), namespace)
+
+    user_func = namespace["feature_names_funcs"]["f_is_long_trip"]
+    assert get_preprocessing_mode(user_func) == "pandas"
+    assert getattr(user_func, namespace["PREPROCESSING_SCHEMA_ATTR"]) == "trip_distance double, is_long_trip boolean"
+    assert user_func(pd.DataFrame({"trip_distance": [10.0, 40.0]}))["is_long_trip"].tolist() == [False, True]
+
+
+def test__batch_preprocessing__decorators():
+    @arrow_preprocessing
+    def identity(batch):
+        return batch
+
+    assert get_preprocessing_mode(identity) == "arrow"
+    assert get_preprocessing_mode(lambda df: df) == "pyspark"
+
+
+def test__build_anchor_preprocessing_metadata__shared_source(tmp_path):
+    key = TypedKey(key_column="trip_id", key_column_type=ValueType.INT64)
+    source = HdfsSource(name="trips", path="trips.parquet", preprocessing=add_is_long_trip)
+    other_source = HdfsSource(name="other_trips", path="other_trips.parquet", preprocessing=add_is_long_trip)
+    anchors = [
+        FeatureAnchor(name=name, source=s, features=[Feature(name=f"f_{name}", feature_type=BOOLEAN, key=key)])
+        for name, s in [("a", source), ("b", source), ("c", other_source)]
+    ]
+    _PreprocessingPyudfManager.build_anchor_preprocessing_metadata(anchors, str(tmp_path))
+    udf_files = _PreprocessingPyudfManager.prepare_pyspark_udf_files(["f_a"], str(tmp_path))
+    assert "submit_spark_job(feature_names_funcs, feature_names_sources)" in open(udf_files[0]).read()
+
+    namespace = {"pandas_preprocessing": pandas_preprocessing}
+    exec((tmp_path / FEATHR_CLIENT_UDF_FILE_NAME).read_text(), namespace)
+    # The driver preprocesses the anchors with the same source and UDF once
+    assert namespace["feature_names_sources"] == {
+        "f_a": "trips:trips.parquet",
+        "f_b": "trips:trips.parquet",
+        "f_c": "other_trips:other_trips.parquet",
+    }
+
+
+class _FakeDataFrame:
+    def __init__(self, name):
+        self._jdf = name
+        self.persisted = False
+        self.counted = False
+
+    def persist(self, storage_level):
+        self.persisted = True
+
+    def count(self):
+        self.counted = True
+        return 0
+
+
+@pytest.mark.parametrize("persist_all", [False, True])
+def test__preprocess_source_dataframes__persists_shared_sources(persist_all):
+    template_path = Path(feathr.udf.__file__).parent / FEATHR_PYSPARK_DRIVER_TEMPLATE_FILE_NAME
+    template = ast.parse(template_path.read_text())
+    preprocessed_dfs = []
+
+    def preprocess(df):
+        preprocessed_dfs.append(_FakeDataFrame(df._jdf))
+        return preprocessed_dfs[-1]
+
+    class _FakeConf:
+        def get(self, key, default):
+            return default
+
+    namespace = {
+        "spark": type("Spark", (), {"conf": _FakeConf(), "sparkContext": None})(),
+        "DataFrame": lambda jdf, sql_ctx: _FakeDataFrame(jdf),
+        "SQLContext": lambda **kwargs: None,
+        "StorageLevel": type("StorageLevel", (), {}),
+        "time": __import__("time"),
+    }
+    namespace["StorageLevel"].MEMORY_AND_DISK = namespace["StorageLevel"]()
+    exec(
+        compile(
+            ast.Module(
+                body=[
+                    node
+                    for node in template.body
+                    if (
+                        isinstance(node, ast.FunctionDef)
+                        and node.name
+                        in ["preprocess_source_dataframes", "get_preprocessed_storage_level", "should_log_row_count"]
+                    )
+                    or (isinstance(node, ast.Assign) and node.targets[0].id.startswith("PREPROCESS"))
+                    or (isinstance(node, ast.Assign) and node.targets[0].id.startswith("DEFAULT_PREPROCESSED"))
+                ],
+                type_ignores=[],
+            ),
+            str(template_path),
+            "exec",
+        ),
+        namespace,
+    )
+    feature_job = type("FeatureJob", (), {"loadSourceDataframe": lambda params, names: {n: n for n in names}})
+    persisted_dfs = []
+    df_map = namespace["preprocess_source_dataframes"](
+        feature_job,
+        [],
+        {"f_a": preprocess, "f_b": preprocess, "f_c": preprocess},
+        {"f_a": "trips", "f_b": "trips", "f_c": "other_trips"},
+        persisted_dfs,
+        persist_all=persist_all,
+    )
+
+    # The shared source is preprocessed once, only the DataFrames read several times are persisted
+    assert len(preprocessed_dfs) == 2
+    assert df_map["f_a"] == df_map["f_b"] != df_map["f_c"]
+    persisted_sources = sorted(df._jdf for df in persisted_dfs)
+    assert persisted_sources == (sorted([df_map["f_a"], df_map["f_c"]]) if persist_all else [df_map["f_a"]])
+    assert all(df.persisted == (df in persisted_dfs) for df in preprocessed_dfs)
+    # The rows are only counted if enabled in the Spark config
+    assert not any(df.counted for df in preprocessed_dfs)
@@ -0,0 +1,108 @@
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from feathr import BOOLEAN, FLOAT, INT32, STRING, DerivedFeature, Feature, FeathrClient
+from feathr.utils.dsl.dsl_evaluator import DerivedFeatureEvaluator, compile_expression
+
+f_trip_distance = Feature(name="f_trip_distance", feature_type=FLOAT)
+f_trip_time_duration = Feature(name="f_trip_time_duration", feature_type=INT32)
+f_trip_time_distance = DerivedFeature(
+    name="f_trip_time_distance",
+    feature_type=FLOAT,
+    input_features=[f_trip_distance, f_trip_time_duration],
+    transform="f_trip_distance * f_trip_time_duration",
+)
+f_trip_time_rounded = DerivedFeature(
+    name="f_trip_time_rounded",
+    feature_type=INT32,
+    input_features=[f_trip_time_duration],
+    transform="f_trip_time_duration % 10",
+)
+f_is_long_trip = DerivedFeature(
+    name="f_is_long_trip",
+    feature_type=BOOLEAN,
+    input_features=[f_trip_time_distance],
+    transform="f_trip_time_distance >= 100",
+)
+
+
+@pytest.mark.parametrize(
+    "expr, expected",
+    [
+        ("a + b * 2", [5.0, np.nan, 2.0]),
+        ("-a ** 2", [-1.0, np.nan, -16.0]),
+        ("b / (a - 1)", [np.nan, np.nan, -0.6]),
+        ("a % 3", [1.0, np.nan, -1.0]),
+        ("a > b", [0.0, np.nan, 0.0]),
+        ("if(a = 1, b, 0)", [2.0, 0.0, 0.0]),
+        ("coalesce(a, b, 42)", [1.0, 42.0, -4.0]),
+        ("round(sqrt(abs(a)) * 1.5)", [2.0, np.nan, 3.0]),
+        ("log(2, pow(2, b))", [2.0, np.nan, 3.0]),
+        ("isnull(a) + 1", [1.0, 2.0, 1.0]),
+    ],
+)
+def test__compile_expression(expr, expected):
+    columns = {"a": np.array([1.0, np.nan, -4.0]), "b": np.array([2.0, np.nan, 3.0])}
+    result = np.broadcast_to(compile_expression(expr)(columns), (3,))
+    np.testing.assert_array_equal(result, np.array(expected))
+
+
+def test__compile_expression__unsupported_function():
+    with pytest.raises(NotImplementedError):
+        compile_expression("upper(a)")
+
+
+def test__derived_feature_evaluator():
+    evaluator = DerivedFeatureEvaluator([f_is_long_trip, f_trip_time_rounded])
+    assert evaluator.input_feature_names == ["f_trip_distance", "f_trip_time_duration"]
+
+    result = evaluator.evaluate(
+        {
+            "f_trip_distance": [1.5, 20.0, None],
+            "f_trip_time_duration": [13, 7, 25],
+        }
+    )
+    assert result == {
+        "f_is_long_trip": [False, True, None],
+        "f_trip_time_rounded": [3, 7, 5],
+    }
+
+
+def test__derived_feature_evaluator__unsupported_feature_type():
+    f_trip_label = DerivedFeature(
+        name="f_trip_label",
+        feature_type=STRING,
+        input_features=[f_trip_distance],
+        transform="f_trip_distance",
+    )
+    with pytest.raises(NotImplementedError):
+        DerivedFeatureEvaluator([f_trip_label])
+
+
+def test__multi_get_online_features__derived_features():
+    client = MagicMock()
+    client.multi_get_online_features_by_crud.return_value = {
+        "key_0": ["a", 1.5, 13],
+        "key_1": ["b", 20.0, 7],
+    }
+
+    result = FeathrClient.multi_get_online_features(
+        client,
+        feature_table="table",
+        keys=["key_0", "key_1"],
+        feature_names=["f_name", "f_trip_distance"],
+        derived_features=[f_trip_time_distance, f_is_long_trip],
+    )
+
+    # The input features of the derived features are fetched along with the requested features
+    assert client.multi_get_online_features_by_crud.call_args.kwargs["feature_names"] == [
+        "f_name",
+        "f_trip_distance",
+        "f_trip_time_duration",
+    ]
+    assert result == {
+        "key_0": ["a", 1.5, 19.5, False],
+        "key_1": ["b", 20.0, 140.0, True],
+    }
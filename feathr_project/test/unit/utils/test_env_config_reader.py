@@ -1,4 +1,7 @@
 from tempfile import NamedTemporaryFile
+from typing import Dict
+
+from azure.core.exceptions import ResourceNotFoundError
 
 import pytest
 from pytest_mock import MockerFixture
@@ -92,3 +95,70 @@ def test__envvariableutil__get_from_env_or_akv(
 
     env_config = EnvConfigReader(config_path="")
     assert env_config.get_from_env_or_akv(TEST_CONFIG_KEY) == expected_value
+
+
+class _LocalKeyVaultClient:
+    """Local stand-in of `AzureKeyVaultClient` which counts the requests"""
+
+    def __init__(self, secrets: Dict[str, str]):
+        self.secrets = dict(secrets)
+        self.get_calls = 0
+        self.list_calls = 0
+
+    def get_feathr_akv_secret(self, secret_name: str) -> str:
+        self.get_calls += 1
+        name = secret_name.replace("_", "-").lower()
+        if name not in self.secrets:
+            raise ResourceNotFoundError(name)
+        return self.secrets[name]
+
+    def list_secret_names(self):
+        self.list_calls += 1
+        return set(self.secrets)
+
+
+def test__envvariableutil__akv_cache(mocker: MockerFixture):
+    """Test if the Key Vault values, including the missing keys, are cached until refreshed."""
+    mocker.patch.object(feathr.utils._env_config_reader.os, "environ", {})
+    akv_client = _LocalKeyVaultClient({"redis-password": "old_password"})
+    env_config = EnvConfigReader(config_path="", akv_client=akv_client)
+
+    for _ in range(3):
+        assert env_config.get_from_env_or_akv("REDIS_PASSWORD") == "old_password"
+        assert env_config.get_from_env_or_akv(TEST_CONFIG_KEY) is None
+    assert akv_client.get_calls == 2
+
+    # Rotate the secret
+    akv_client.secrets["redis-password"] = "new_password"
+    assert env_config.get_from_env_or_akv("REDIS_PASSWORD") == "old_password"
+    env_config.refresh("REDIS_PASSWORD")
+    assert env_config.get_from_env_or_akv("REDIS_PASSWORD") == "new_password"
+    assert akv_client.get_calls == 3
+
+
+def test__envvariableutil__akv_cache_ttl(mocker: MockerFixture):
+    mocker.patch.object(feathr.utils._env_config_reader.os, "environ", {})
+    akv_client = _LocalKeyVaultClient({"redis-password": "password"})
+    env_config = EnvConfigReader(config_path="", secret_cache_ttl_seconds=0, akv_client=akv_client)
+
+    env_config.get_from_env_or_akv("REDIS_PASSWORD")
+    env_config.get_from_env_or_akv("REDIS_PASSWORD")
+    assert akv_client.get_calls == 2
+
+
+def test__envvariableutil__akv_prefetch(mocker: MockerFixture):
+    """Test if `prefetch` lists the secrets once and only fetches the keys in the Key Vault."""
+    mocker.patch.object(feathr.utils._env_config_reader.os, "environ", {})
+    akv_client = _LocalKeyVaultClient({"redis-password": "password", "jdbc-user": "user"})
+    env_config = EnvConfigReader(config_path="", akv_client=akv_client)
+
+    env_config.prefetch(["REDIS_PASSWORD", "JDBC_USER", "JDBC_PASSWORD"])
+    assert akv_client.list_calls == 1
+    assert akv_client.get_calls == 2
+
+    assert env_config.get_from_env_or_akv("REDIS_PASSWORD") == "password"
+    assert env_config.get_from_env_or_akv("JDBC_USER") == "user"
+    # Missing keys are answered by the listed secret names without any request
+    assert env_config.get("online_store__redis__host", default="default") == "default"
+    assert env_config.get_from_env_or_akv("JDBC_PASSWORD") is None
+    assert akv_client.get_calls == 2
@@ -0,0 +1,48 @@
+import pytest
+
+from feathr import FLOAT, INT32, DerivedFeature, Feature
+from feathr.utils.dsl.dsl_generator import gen_dsl, get_identifiers, parse
+
+f_trip_distance = Feature(name="f_trip_distance", feature_type=FLOAT, transform="trip_distance")
+f_trip_time_duration = Feature(name="f_trip_time_duration", feature_type=INT32, transform="duration / 60")
+f_trip_time_distance = DerivedFeature(
+    name="f_trip_time_distance",
+    feature_type=FLOAT,
+    input_features=[f_trip_distance, f_trip_time_duration],
+    transform="f_trip_distance * f_trip_time_duration",
+)
+f_trip_speed_score = DerivedFeature(
+    name="f_trip_speed_score",
+    feature_type=FLOAT,
+    input_features=[f_trip_time_distance, f_trip_distance],
+    transform="abs(f_trip_time_distance - f_trip_distance)",
+)
+
+
+def test__gen_dsl__layers_upstream_features():
+    dsl = gen_dsl("test_pipeline", [f_trip_speed_score])
+    lines = dsl.split("\n")
+
+    assert lines[0] in ("test_pipeline(trip_distance, duration)", "test_pipeline(duration, trip_distance)")
+    assert lines[1:] == [
+        "| project f_trip_distance = trip_distance, f_trip_time_duration = duration / 60",
+        "| project f_trip_time_distance = f_trip_distance * f_trip_time_duration",
+        "| project f_trip_speed_score = abs(f_trip_time_distance - f_trip_distance)",
+        "| project-keep f_trip_speed_score",
+        ";",
+    ]
+
+
+def test__gen_dsl__unsupported_function():
+    f_day_of_week = Feature(name="f_day_of_week", feature_type=INT32, transform="some_fancy_func(dropoff)")
+    with pytest.raises(NotImplementedError):
+        gen_dsl("test_pipeline", [f_day_of_week])
+
+
+def test__parse__cached():
+    assert parse("a + b * 2") is parse("a + b * 2")
+    identifiers = get_identifiers("a + abs(b)")
+    assert identifiers == {"a", "b"}
+    # Modifying the result doesn't affect the cache
+    identifiers.add("c")
+    assert get_identifiers("a + abs(b)") == {"a", "b"}
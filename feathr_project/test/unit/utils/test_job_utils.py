@@ -1,7 +1,7 @@
 # TODO with, without optional args
 # TODO test with no data files exception and unsupported format exception
 from pathlib import Path
-from typing import Type
+from typing import List, Type
 from unittest.mock import MagicMock
 
 import pandas as pd
@@ -11,10 +11,13 @@ from pyspark.sql import DataFrame, SparkSession
 
 from feathr import FeathrClient
 from feathr.constants import OUTPUT_FORMAT, OUTPUT_PATH_TAG
+from feathr.utils._schema_probe import _PublicHttpStorage
 from feathr.utils.job_utils import (
+    get_cloud_file_column_names,
     get_result_df,
     get_result_pandas_df,
     get_result_spark_df,
+    iter_result_batches,
 )
 
 
@@ -289,3 +292,51 @@ def test__get_result_df__arg_alias(
         )
         assert isinstance(df, pd.DataFrame)
         assert len(df) == expected_count
+
+
+def test__get_result_df__columns_and_filters(tmp_path: Path):
+    """Test get_result_df loads only the requested columns and rows"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    pq.write_table(pa.table({"trip_id": [1, 2, 3], "fare": [5.0, 15.0, 25.0]}), tmp_path / "part-00000.parquet")
+    client = MagicMock()
+    client.spark_runtime = "local"
+
+    df = get_result_df(
+        client, data_format="parquet", res_url=str(tmp_path), columns=["trip_id"], filters=[("fare", ">", 10)]
+    )
+    assert isinstance(df, pd.DataFrame)
+    assert df["trip_id"].tolist() == [2, 3]
+
+    table = get_result_df(client, data_format="parquet", res_url=str(tmp_path), as_arrow=True)
+    assert isinstance(table, pa.Table)
+    assert table.num_rows == 3
+
+    batches = list(iter_result_batches(client, data_format="parquet", res_url=str(tmp_path), batch_size=2))
+    assert sum(batch.num_rows for batch in batches) == 3
+
+
+@pytest.mark.parametrize(
+    "format, is_file_path, expected_storages",
+    [
+        ("csv", True, ["http", "launcher"]),
+        ("csv", False, ["launcher"]),
+        ("delta", True, ["launcher"]),
+    ],
+)
+def test__get_cloud_file_column_names__public_probe(
+    mocker: MockerFixture, format: str, is_file_path: bool, expected_storages: List[str]
+):
+    """Test public files are probed over HTTP only if they can be read without listing a directory"""
+    storages = []
+
+    def get_column_names(storage, path, data_format, is_file_path):
+        storages.append("http" if isinstance(storage, _PublicHttpStorage) else "launcher")
+        return ["trip_id"] if storage is client.feathr_spark_launcher else None
+
+    mocker.patch("feathr.utils.job_utils.get_column_names", side_effect=get_column_names)
+    client = MagicMock()
+    path = "abfss://container@account.dfs.core.windows.net/trips"
+    assert get_cloud_file_column_names(client, path, format, is_file_path) == ["trip_id"]
+    assert storages == expected_storages
@@ -0,0 +1,129 @@
+from datetime import datetime
+
+import pytest
+from pyhocon import ConfigFactory
+
+from feathr import (
+    FLOAT,
+    DerivedFeature,
+    Feature,
+    FeatureAnchor,
+    HdfsSource,
+    TypedKey,
+    ValueType,
+    WindowAggTransformation,
+)
+from feathr.utils._partition_planner import PartitionPlanner, get_partition_paths, to_strftime_format
+
+location_id = TypedKey(key_column="location_id", key_column_type=ValueType.INT32)
+
+
+def _source(time_partition_pattern: str = "yyyy/MM/dd", postfix_path: str = None) -> HdfsSource:
+    return HdfsSource(
+        name="trips",
+        path="abfss://container@account.dfs.core.windows.net/trips/",
+        event_timestamp_column="ts",
+        timestamp_format="yyyy-MM-dd HH:mm:ss",
+        time_partition_pattern=time_partition_pattern,
+        postfix_path=postfix_path,
+    )
+
+
+def _window_feature(name: str, window: str) -> Feature:
+    return Feature(
+        name=name,
+        key=location_id,
+        feature_type=FLOAT,
+        transform=WindowAggTransformation(agg_expr="fare", agg_func="SUM", window=window),
+    )
+
+
+@pytest.mark.parametrize(
+    "java_format, expected",
+    [
+        ("yyyy/MM/dd", "%Y/%m/%d"),
+        ("yyyy-MM-dd HH:mm:ss.SSS", "%Y-%m-%d %H:%M:%S.%f"),
+        ("'year='yyyy/'month='MM", "year=%Y/month=%m"),
+    ],
+)
+def test__to_strftime_format(java_format, expected):
+    assert to_strftime_format(java_format) == expected
+
+
+def test__get_partition_paths():
+    root = "abfss://container@account.dfs.core.windows.net/trips"
+    assert get_partition_paths(_source(postfix_path="/daily/"), datetime(2022, 2, 27, 12), datetime(2022, 3, 1)) == [
+        f"{root}/2022/02/27/daily",
+        f"{root}/2022/02/28/daily",
+        f"{root}/2022/03/01/daily",
+    ]
+    assert get_partition_paths(_source("yyyy/MM/dd/HH"), datetime(2022, 1, 1, 22, 30), datetime(2022, 1, 2)) == [
+        f"{root}/2022/01/01/22",
+        f"{root}/2022/01/01/23",
+        f"{root}/2022/01/02/00",
+    ]
+
+
+def test__partition_planner__plan():
+    source = _source()
+    f_fare_3d = _window_feature("f_fare_3d", "3d")
+    f_fare_1d = _window_feature("f_fare_1d", "1d")
+    f_fare = Feature(name="f_fare", key=location_id, feature_type=FLOAT, transform="fare")
+    f_fare_ratio = DerivedFeature(
+        name="f_fare_ratio",
+        key=location_id,
+        feature_type=FLOAT,
+        input_features=[f_fare_1d, f_fare_3d],
+        transform="f_fare_1d / f_fare_3d",
+    )
+    anchors = [FeatureAnchor(name="trip_features", source=source, features=[f_fare_3d, f_fare_1d, f_fare])]
+    checked = []
+    missing = {"abfss://container@account.dfs.core.windows.net/trips/2022/01/08"}
+
+    def dir_exists(path: str) -> bool:
+        checked.append(path)
+        return path not in missing
+
+    planner = PartitionPlanner(dir_exists=dir_exists)
+    source_paths = planner.plan(anchors, [f_fare_ratio], ["f_fare_ratio"], datetime(2022, 1, 10), datetime(2022, 1, 11))
+
+    # The longest window of the derived feature inputs, minus the missing partition
+    assert [path.rsplit("/", 3)[-1] for path in source_paths["trips"]] == ["07", "09", "10", "11"]
+    assert len(checked) == 5
+
+    # Existing partitions are remembered until refreshed, missing ones are checked again
+    planner.plan(anchors, [f_fare_ratio], ["f_fare_3d"], datetime(2022, 1, 10), datetime(2022, 1, 11))
+    assert checked[5:] == ["abfss://container@account.dfs.core.windows.net/trips/2022/01/08"]
+    planner.refresh()
+    planner.plan(anchors, [f_fare_ratio], ["f_fare_3d"], datetime(2022, 1, 10), datetime(2022, 1, 11))
+    assert len(checked) == 11
+
+    # Features without windows may need any partition
+    assert planner.plan(anchors, [], ["f_fare_3d", "f_fare"], datetime(2022, 1, 10), datetime(2022, 1, 11)) == {}
+
+
+def test__partition_planner__partition_lands_after_miss():
+    source = _source()
+    anchors = [FeatureAnchor(name="trip_features", source=source, features=[_window_feature("f_fare_1d", "1d")])]
+    late = "abfss://container@account.dfs.core.windows.net/trips/2022/01/11"
+    missing = {late}
+    planner = PartitionPlanner(dir_exists=lambda path: path not in missing)
+
+    source_paths = planner.plan(anchors, [], ["f_fare_1d"], datetime(2022, 1, 10), datetime(2022, 1, 11))
+    assert late not in source_paths["trips"]
+
+    # The partition lands before the next job, which must read it
+    missing.clear()
+    source_paths = planner.plan(anchors, [], ["f_fare_1d"], datetime(2022, 1, 10), datetime(2022, 1, 11))
+    assert source_paths["trips"][-1] == late
+
+
+def test__hdfs_source__to_feature_config__paths():
+    source = _source()
+    config = ConfigFactory.parse_string(source.to_feature_config(paths=["/a/2022/01/01", "/a/2022/01/02"]))
+    assert config["trips"]["location"] == {"type": "pathlist", "paths": ["/a/2022/01/01", "/a/2022/01/02"]}
+    assert "timePartitionPattern" not in config["trips"]
+    assert config["trips"]["timeWindowParameters"]["timestampColumn"] == "ts"
+
+    config = ConfigFactory.parse_string(source.to_feature_config())
+    assert config["trips"]["timePartitionPattern"] == "yyyy/MM/dd"
@@ -0,0 +1,72 @@
+from pathlib import Path
+
+import fastavro
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import pytest
+
+from feathr.utils._result_reader import iter_result_batches, read_result_table
+
+ROWS = [{"trip_id": i, "fare": float(i), "city": "seattle" if i % 2 else "redmond"} for i in range(10)]
+AVRO_SCHEMA = {
+    "type": "record",
+    "name": "trip",
+    "fields": [
+        {"name": "trip_id", "type": "long"},
+        {"name": "fare", "type": "double"},
+        {"name": "city", "type": "string"},
+    ],
+}
+
+
+@pytest.fixture
+def result_dir(tmp_path: Path, request) -> Path:
+    """Write the rows into two part files of the requested format, together with a `_SUCCESS` marker file"""
+    data_format = request.param
+    (tmp_path / "_SUCCESS").touch()
+    for part, rows in enumerate([ROWS[:5], ROWS[5:]]):
+        file = tmp_path / f"part-0000{part}.{data_format}"
+        if data_format == "parquet":
+            pq.write_table(pa.Table.from_pylist(rows), file)
+        elif data_format == "avro":
+            with open(file, "wb") as f:
+                fastavro.writer(f, AVRO_SCHEMA, rows)
+        else:
+            file.write_text("trip_id,fare,city\n" + "".join(f"{r['trip_id']},{r['fare']},{r['city']}\n" for r in rows))
+    return tmp_path
+
+
+@pytest.mark.parametrize("result_dir", ["parquet", "avro", "csv"], indirect=True)
+def test__read_result_table(result_dir: Path):
+    data_format = next(result_dir.glob("part-*")).suffix[1:]
+
+    table = read_result_table(str(result_dir), data_format)
+    assert table.num_rows == 10
+    assert set(table.column_names) == {"trip_id", "fare", "city"}
+
+    # Projection and predicate pushdown, with both kinds of filters
+    for filters in [pc.field("fare") >= 6, [("fare", ">=", 6)]]:
+        table = read_result_table(str(result_dir), data_format, columns=["trip_id", "city"], filters=filters)
+        assert table.column_names == ["trip_id", "city"]
+        assert sorted(table.column("trip_id").to_pylist()) == [6, 7, 8, 9]
+
+
+@pytest.mark.parametrize("result_dir", ["parquet", "avro", "csv"], indirect=True)
+def test__iter_result_batches(result_dir: Path):
+    data_format = next(result_dir.glob("part-*")).suffix[1:]
+
+    batches = list(iter_result_batches(str(result_dir), data_format, columns=["trip_id"], batch_size=3))
+    assert all(batch.num_rows <= 3 for batch in batches)
+    assert sorted(pa.Table.from_batches(batches).column("trip_id").to_pylist()) == list(range(10))
+
+
+def test__read_result_table__empty_dir(tmp_path: Path):
+    assert read_result_table(str(tmp_path), "avro").num_rows == 0
+    assert list(iter_result_batches(str(tmp_path), "csv")) == []
+
+
+def test__read_result_table__unsupported_format(tmp_path: Path):
+    with pytest.raises(ValueError):
+        read_result_table(str(tmp_path), "orc")
@@ -0,0 +1,102 @@
+import json
+import os
+from pathlib import Path
+from typing import List
+
+import fastavro
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from feathr.utils._schema_probe import clear_column_names_cache, get_column_names
+
+
+class _CountingStorage(object):
+    """Local storage which records how many bytes are read"""
+
+    def __init__(self):
+        self.bytes_read = 0
+
+    def get_cloud_file_size(self, path: str) -> int:
+        return os.path.getsize(path)
+
+    def read_cloud_file_range(self, path: str, offset: int, length: int) -> bytes:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read(length)
+        self.bytes_read += len(data)
+        return data
+
+    def list_cloud_files(self, dir_path: str) -> List[str]:
+        return [str(p) for p in Path(dir_path).iterdir() if p.is_file()]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    clear_column_names_cache()
+    yield
+    clear_column_names_cache()
+
+
+@pytest.fixture
+def df() -> pd.DataFrame:
+    return pd.DataFrame({"trip_id": range(100000), "fare": [1.5] * 100000, "city": ["seattle"] * 100000})
+
+
+@pytest.mark.parametrize("data_format", ["parquet", "avro", "csv"])
+def test__get_column_names__file(tmp_path, df, data_format):
+    path = str(tmp_path / f"data.{data_format}")
+    if data_format == "parquet":
+        pq.write_table(pa.table(df.to_dict("list")), path)
+    elif data_format == "avro":
+        schema = {
+            "type": "record",
+            "name": "trip",
+            "fields": [{"name": "trip_id", "type": "long"}, {"name": "fare", "type": "double"}, {"name": "city", "type": "string"}],
+        }
+        with open(path, "wb") as f:
+            fastavro.writer(f, schema, df.to_dict("records"))
+    else:
+        df.to_csv(path, index=False)
+
+    storage = _CountingStorage()
+    assert get_column_names(storage, path, data_format) == ["trip_id", "fare", "city"]
+    # Only the metadata is read
+    assert 0 < storage.bytes_read < os.path.getsize(path) / 2
+
+    # The result is cached per path
+    storage.bytes_read = 0
+    assert get_column_names(storage, path, data_format) == ["trip_id", "fare", "city"]
+    assert storage.bytes_read == 0
+
+
+def test__get_column_names__directory(tmp_path, df):
+    (tmp_path / "_SUCCESS").touch()
+    (tmp_path / "part-00000.csv").touch()
+    df.to_csv(tmp_path / "part-00001.csv", index=False)
+
+    assert get_column_names(_CountingStorage(), str(tmp_path), "csv", is_file_path=False) == ["trip_id", "fare", "city"]
+
+
+def test__get_column_names__delta(tmp_path):
+    schema = {
+        "type": "struct",
+        "fields": [{"name": name, "type": "string", "nullable": True, "metadata": {}} for name in ["trip_id", "city"]],
+    }
+    log_dir = tmp_path / "_delta_log"
+    log_dir.mkdir()
+    (log_dir / "00000000000000000000.json").write_text(
+        json.dumps({"protocol": {"minReaderVersion": 1, "minWriterVersion": 2}})
+        + "\n"
+        + json.dumps({"metaData": {"id": "0", "schemaString": json.dumps(schema), "partitionColumns": []}})
+    )
+    # The later commits don't change the metadata
+    (log_dir / "00000000000000000001.json").write_text(json.dumps({"add": {"path": "part-00000.parquet"}}))
+
+    assert get_column_names(_CountingStorage(), str(tmp_path), "delta", is_file_path=False) == ["trip_id", "city"]
+
+
+def test__get_column_names__unsupported_format(tmp_path):
+    with pytest.raises(ValueError):
+        get_column_names(_CountingStorage(), str(tmp_path), "orc")
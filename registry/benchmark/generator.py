@@ -0,0 +1,75 @@
+import random
+from dataclasses import dataclass
+from typing import List, Tuple
+
+from feathr import FLOAT, DerivedFeature, Feature, FeatureAnchor, HdfsSource, TypedKey, ValueType
+
+
+@dataclass
+class ProjectSpec:
+    """
+    The shape of a synthetic project, every source is consumed by `anchors_per_source` anchors of
+    `features_per_anchor` features each. The derived features are in `derived_depth` levels of `derived_per_level`
+    features, the first level consumes anchor features, every other level consumes the level before it.
+    """
+
+    sources: int = 5
+    anchors_per_source: int = 2
+    features_per_anchor: int = 10
+    derived_depth: int = 3
+    derived_per_level: int = 10
+
+    @property
+    def entity_count(self) -> int:
+        anchors = self.sources * self.anchors_per_source
+        return 1 + self.sources + anchors + anchors * self.features_per_anchor + self.derived_count
+
+    @property
+    def derived_count(self) -> int:
+        return self.derived_depth * self.derived_per_level
+
+
+def build_project(spec: ProjectSpec, seed: int = 0) -> Tuple[List[FeatureAnchor], List[List[DerivedFeature]]]:
+    """
+    Returns the anchors of a synthetic project and its derived features by level, the same seed builds the same
+    project
+    """
+    rnd = random.Random(seed)
+    key = TypedKey(key_column="id", key_column_type=ValueType.INT64, description="id", full_name="benchmark.id")
+    anchors = []
+    anchor_features = []
+    for i in range(spec.sources):
+        source = HdfsSource(
+            name=f"source_{i}",
+            path=f"abfss://benchmark@account.dfs.core.windows.net/source_{i}.parquet",
+            event_timestamp_column="ts",
+            timestamp_format="epoch",
+        )
+        for j in range(spec.anchors_per_source):
+            features = [
+                Feature(name=f"f_{i}_{j}_{k}", feature_type=FLOAT, key=key, transform=f"c{k} * 2")
+                for k in range(spec.features_per_anchor)
+            ]
+            anchors.append(FeatureAnchor(name=f"anchor_{i}_{j}", source=source, features=features))
+            anchor_features.extend(features)
+
+    levels = []
+    inputs = anchor_features
+    for level in range(1, spec.derived_depth + 1):
+        if not inputs:
+            break
+        derived_features = []
+        for k in range(spec.derived_per_level):
+            chosen = rnd.sample(inputs, min(2, len(inputs)))
+            derived_features.append(
+                DerivedFeature(
+                    name=f"d_{level}_{k}",
+                    feature_type=FLOAT,
+                    key=key,
+                    input_features=chosen,
+                    transform=" + ".join([f.name for f in chosen]),
+                )
+            )
+        levels.append(derived_features)
+        inputs = derived_features
+    return anchors, levels
@@ -0,0 +1,89 @@
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+import requests
+
+# (method, path) of a request, the path is relative to the API base of the registry
+Request = Tuple[str, str]
+# Method of a paged listing, the pages are fetched with GET following the `X-Next-Cursor` header until the last one,
+# and measured as one request
+PAGED_GET = "PAGED_GET"
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """
+    Nearest-rank percentile of sorted values
+    """
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values)) - 1))]
+
+
+def summarize(latencies: List[float], errors: int, seconds: float) -> Dict:
+    """
+    Summarize the latencies of the successful requests in milliseconds, the throughput counts all requests
+    """
+    latencies = sorted(latencies)
+    count = len(latencies) + errors
+    return {
+        "requests": count,
+        "errors": errors,
+        "seconds": seconds,
+        "throughput_rps": count / seconds if seconds > 0 else 0.0,
+        "mean_ms": sum(latencies) / len(latencies) if latencies else 0.0,
+        "p50_ms": percentile(latencies, 0.5),
+        "p90_ms": percentile(latencies, 0.9),
+        "p99_ms": percentile(latencies, 0.99),
+        "max_ms": latencies[-1] if latencies else 0.0,
+    }
+
+
+def get_pages(session: requests.Session, url: str, timeout: float) -> bool:
+    """
+    Get all pages of a listing, returns whether all of them succeeded
+    """
+    cursor = None
+    while True:
+        r = session.get(url, params={"cursor": cursor} if cursor else None, timeout=timeout)
+        if not r.ok:
+            return False
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            return True
+
+
+def run_load(endpoint: str, reqs: List[Request], concurrency: int, timeout: float = 60) -> Dict:
+    """
+    Send the requests to the registry from `concurrency` threads, each with its own connection, and summarize them
+    """
+    local = threading.local()
+    lock = threading.Lock()
+    latencies = []
+    errors = []
+
+    def send(req: Request):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        method, path = req
+        start = time.perf_counter()
+        try:
+            if method == PAGED_GET:
+                ok = get_pages(local.session, f"{endpoint}{path}", timeout)
+            else:
+                ok = local.session.request(method, f"{endpoint}{path}", timeout=timeout).ok
+        except requests.RequestException:
+            ok = False
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            if ok:
+                latencies.append(elapsed)
+            else:
+                errors.append(req)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(send, reqs))
+    return summarize(latencies, len(errors), time.perf_counter() - start)
@@ -0,0 +1,75 @@
+import json
+import os
+import subprocess
+from typing import Dict, List, Optional, Tuple
+
+# Version of the report format, reports of different versions are not compared
+REPORT_VERSION = 1
+
+
+def git_commit() -> Optional[str]:
+    """
+    Returns the commit the registry is benchmarked at, or None if not in a git repo
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True,
+            text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_report(path: str) -> Dict:
+    with open(path) as f:
+        report = json.load(f)
+    if report.get("version") != REPORT_VERSION:
+        raise ValueError(f"Unsupported report version {report.get('version')} in {path}")
+    return report
+
+
+def save_report(report: Dict, path: str):
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+def print_results(results: Dict[str, Dict[str, Dict]]):
+    print(f"{'endpoint':<16} {'conc':>5} {'reqs':>6} {'errors':>6} {'req/s':>9} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+    for name, by_concurrency in results.items():
+        for concurrency, r in by_concurrency.items():
+            print(f"{name:<16} {concurrency:>5} {r['requests']:>6} {r['errors']:>6} {r['throughput_rps']:>9.1f} "
+                  f"{r['p50_ms']:>10.2f} {r['p99_ms']:>10.2f}")
+
+
+def compare(base: Dict, new: Dict, threshold: float) -> List[Tuple[str, str, str, float, float, bool]]:
+    """
+    Compare the results of two reports, returns (endpoint, concurrency, metric, base value, new value, regressed) of
+    every metric measured by both. A metric regressed if the latency grew, or the throughput dropped, by more than
+    `threshold` of the base value.
+    """
+    rows = []
+    for name, by_concurrency in base["results"].items():
+        for concurrency, b in by_concurrency.items():
+            n = new["results"].get(name, {}).get(concurrency)
+            if n is None:
+                continue
+            for metric, higher_is_better in [("throughput_rps", True), ("p50_ms", False), ("p99_ms", False)]:
+                if higher_is_better:
+                    regressed = n[metric] < b[metric] * (1 - threshold)
+                else:
+                    regressed = n[metric] > b[metric] * (1 + threshold)
+                rows.append((name, concurrency, metric, b[metric], n[metric], regressed))
+            # Errors only show up when something is broken, any new one is a regression
+            rows.append((name, concurrency, "errors", b["errors"], n["errors"], n["errors"] > b["errors"]))
+    return rows
+
+
+def print_comparison(base: Dict, new: Dict, rows: List[Tuple[str, str, str, float, float, bool]]):
+    print(f"base: {base.get('label') or base.get('commit')}  new: {new.get('label') or new.get('commit')}")
+    if base.get("config") != new.get("config"):
+        print("WARNING: the reports were made with different configurations")
+    print(f"{'endpoint':<16} {'conc':>5} {'metric':<15} {'base':>10} {'new':>10} {'change':>8}")
+    for name, concurrency, metric, b, n, regressed in rows:
+        change = f"{(n - b) / b * 100:+.1f}%" if b else "n/a"
+        print(f"{name:<16} {concurrency:>5} {metric:<15} {b:>10.2f} {n:>10.2f} {change:>8}"
+              f"{'  REGRESSED' if regressed else ''}")
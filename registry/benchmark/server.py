@@ -0,0 +1,49 @@
+import logging
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+import requests
+
+SQL_REGISTRY_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sql-registry")
+API_BASE = "/api/v1"
+
+
+@contextmanager
+def local_registry(database_url: str, port: int, startup_timeout: float = 60) -> Iterator[str]:
+    """
+    Run the SQL registry on the database with uvicorn, yields the endpoint of its API
+    """
+    env = dict(os.environ)
+    env.update({"FEATHR_SANDBOX": "1", "FEATHR_SANDBOX_REGISTRY_URL": database_url, "API_BASE": API_BASE})
+    endpoint = f"http://127.0.0.1:{port}{API_BASE}"
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level",
+         "warning"],
+        cwd=SQL_REGISTRY_DIR,
+        env=env,
+    )
+    try:
+        deadline = time.monotonic() + startup_timeout
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"The registry exited with code {process.returncode}")
+            try:
+                if requests.get(f"{endpoint}/projects", timeout=5).ok:
+                    break
+            except requests.RequestException:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"The registry didn't start in {startup_timeout}s")
+            time.sleep(0.5)
+        logging.info(f"Started the registry on {database_url} at {endpoint}")
+        yield endpoint
+    finally:
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
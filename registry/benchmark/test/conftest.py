@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The benchmark is run as a package from the `registry` directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
@@ -0,0 +1,86 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from benchmark.generator import ProjectSpec, build_project
+from benchmark.load import PAGED_GET, percentile, run_load
+from benchmark.report import compare
+
+
+def test_percentile():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 0.5) == 50.0
+    assert percentile(values, 0.99) == 99.0
+    assert percentile(values, 1.0) == 100.0
+    assert percentile(values, 0.0) == 1.0
+    assert percentile([7.0], 0.99) == 7.0
+    assert percentile([], 0.5) == 0.0
+
+
+def _report(throughput: float, p50: float, p99: float, errors: int = 0):
+    return {"results": {"features": {"4": {"throughput_rps": throughput, "p50_ms": p50, "p99_ms": p99,
+                                           "errors": errors}}}}
+
+
+def test_compare():
+    rows = compare(_report(100, 10, 50), _report(95, 10.5, 70, errors=1), 0.1)
+    regressed = dict([(metric, r) for _, _, metric, _, _, r in rows])
+    assert regressed == {"throughput_rps": False, "p50_ms": False, "p99_ms": True, "errors": True}
+    assert all(name == "features" and concurrency == "4" for name, concurrency, *_ in rows)
+
+    regressed = dict([(metric, r) for _, _, metric, _, _, r in compare(_report(100, 10, 50), _report(80, 5, 40), 0.1)])
+    assert regressed == {"throughput_rps": True, "p50_ms": False, "p99_ms": False, "errors": False}
+    # Only the results in both reports are compared
+    assert compare(_report(100, 10, 50), {"results": {}}, 0.1) == []
+
+
+@pytest.mark.parametrize("spec", [
+    ProjectSpec(),
+    ProjectSpec(sources=2, anchors_per_source=3, features_per_anchor=4, derived_depth=2, derived_per_level=5),
+    ProjectSpec(sources=1, anchors_per_source=1, features_per_anchor=1, derived_depth=0),
+])
+def test_entity_count(spec):
+    anchors, levels = build_project(spec)
+    sources = set(a.source.name for a in anchors)
+    features = [f for a in anchors for f in a.features]
+    derived_features = [f for level in levels for f in level]
+    assert spec.derived_count == len(derived_features)
+    # The project, the sources, the anchors and the features
+    assert spec.entity_count == 1 + len(sources) + len(anchors) + len(features) + len(derived_features)
+
+
+class _PagedHandler(BaseHTTPRequestHandler):
+    """
+    Lists 5 items, `limit` at a time
+    """
+    pages = []
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        start = int(query.get("cursor", ["0"])[0])
+        end = start + int(query["limit"][0])
+        _PagedHandler.pages.append(start)
+        self.send_response(200)
+        if end < 5:
+            self.send_header("X-Next-Cursor", str(end))
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"[]")
+
+    def log_message(self, *args):
+        pass
+
+
+def test_run_load_follows_cursor():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _PagedHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        endpoint = f"http://127.0.0.1:{server.server_address[1]}"
+        result = run_load(endpoint, [(PAGED_GET, "/projects/p/features?limit=2")], 1)
+    finally:
+        server.shutdown()
+    # One request made of every page
+    assert result["requests"] == 1 and result["errors"] == 0
+    assert _PagedHandler.pages == [0, 2, 4]
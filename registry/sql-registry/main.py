@@ -1,13 +1,18 @@
+import base64
+import binascii
 import os
 import traceback
 from typing import Optional, Dict, List
 from uuid import UUID
-from fastapi import APIRouter, FastAPI, HTTPException
+from fastapi import APIRouter, FastAPI, HTTPException, Response
 from fastapi.responses import JSONResponse
 from starlette.middleware.cors import CORSMiddleware
 from registry import *
-from registry.db_registry import DbRegistry, ConflictError
-from registry.models import AnchorDef, AnchorFeatureDef, DerivedFeatureDef, EntityType, ProjectDef, SourceDef, to_snake
+from registry.async_db_registry import AsyncDbRegistry
+from registry.db_registry import ConflictError
+from registry.identity_map import IdentityMapMiddleware
+from registry.models import AnchorDef, AnchorFeatureDef, DerivedFeatureDef, EntityRef, EntityType, ProjectDef, SourceDef, \
+    to_snake
 
 rp = "/"
 try:
@@ -18,7 +23,7 @@ except:
     pass
 print("Using API BASE: ", rp)
 
-registry = DbRegistry()
+registry = AsyncDbRegistry()
 app = FastAPI(debug=True, title="Feature Registry API", version="0.1")
 router = APIRouter()
 
@@ -28,7 +33,10 @@ app.add_middleware(CORSMiddleware,
                    allow_credentials=True,
                    allow_methods=["*"],
                    allow_headers=["*"],
+                   expose_headers=["X-Next-Cursor"],
                    )
+# The entities read by a request are cached during the request
+app.add_middleware(IdentityMapMiddleware)
 
 
 def exc_to_content(e: Exception) -> Dict:
@@ -78,53 +86,142 @@ async def index_error_handler(_, exc: IndexError):
     )
 
 
+@app.on_event("shutdown")
+async def close_registry():
+    await registry.close()
+
+
+# Entity fields can be listed without reading the attributes of the entities
+REF_FIELDS = {"qualifiedName"}
+# Entities need to be filled from the edges for these fields
+EDGE_FIELDS = {
+    EntityType.Anchor: {"features", "source"},
+    EntityType.DerivedFeature: {"inputAnchorFeatures", "inputDerivedFeatures"},
+}
+
+
+def json_response(content: bytes) -> Response:
+    """
+    Returns the JSON serialized by the registry as is, instead of encoding the objects again
+    """
+    return Response(content=content, media_type="application/json")
+
+
+def encode_cursor(after: str) -> str:
+    return base64.urlsafe_b64encode(after.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[str]:
+    if not cursor:
+        return None
+    try:
+        return base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+    except (binascii.Error, UnicodeError):
+        raise ValueError(f"Invalid cursor {cursor}")
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    if not fields:
+        return None
+    return [f.strip() for f in fields.split(",") if f.strip()]
+
+
+def entity_to_dict(e, fields: Optional[List[str]] = None) -> Dict:
+    """
+    Returns the whole entity if `fields` is None, otherwise only the guid, the type and the attributes in `fields`
+    """
+    if fields is None:
+        return e.to_dict()
+    if isinstance(e, EntityRef):
+        attributes = e.uniq_attr
+    else:
+        attributes = e.attributes.to_dict()
+    ret = {
+        "guid": str(e.id),
+        "typeName": str(e.entity_type),
+        "attributes": dict([(f, attributes[f]) for f in fields if f in attributes]),
+    }
+    if "name" in ret["attributes"]:
+        ret["displayText"] = ret["attributes"]["name"]
+    return ret
+
+
+async def list_project_entities(project: str,
+                                type: List[EntityType],
+                                response: Response,
+                                cursor: Optional[str] = None,
+                                limit: Optional[int] = None,
+                                fields: Optional[str] = None) -> List:
+    """
+    List entities in a project, one page of `limit` entities after the `cursor` if `limit` is set.
+    The cursor of the next page is returned in the `X-Next-Cursor` header, which is absent on the last page.
+    """
+    if limit is not None and limit <= 0:
+        raise ValueError("limit must be positive")
+    field_list = parse_fields(fields)
+    with_attributes = field_list is None or not set(field_list).issubset(REF_FIELDS)
+    entities, after = await registry.list_entities(project, type, decode_cursor(cursor), limit, with_attributes)
+    filled_types = [t for t, edge_fields in EDGE_FIELDS.items()
+                    if field_list is None or edge_fields.intersection(field_list)]
+    fill_ids = [e.id for e in entities if with_attributes and e.entity_type in filled_types]
+    if fill_ids:
+        filled = dict([(e.id, e) for e in await registry.get_entities(fill_ids)])
+        entities = list([filled.get(e.id, e) for e in entities])
+    if after is not None:
+        response.headers["X-Next-Cursor"] = encode_cursor(after)
+    return list([entity_to_dict(e, field_list) for e in entities])
+
+
 @router.get("/projects")
-def get_projects() -> List[str]:
-    return registry.get_projects()
+async def get_projects() -> List[str]:
+    return await registry.get_projects()
 
 
 @router.get("/projects-ids")
-def get_projects_ids() -> Dict:
-    return registry.get_projects_ids()
+async def get_projects_ids() -> Dict:
+    return await registry.get_projects_ids()
 
 
 @router.get("/projects/{project}")
-def get_projects(project: str) -> Dict:
-    return registry.get_project(project).to_dict()
+async def get_projects(project: str) -> Response:
+    return json_response(await registry.get_project_json(project))
+
+
+@router.get("/projects/{project}/changes")
+async def get_project_changes(project: str, since: int = 0) -> Response:
+    return json_response(await registry.get_project_changes_json(project, since))
 
 
 @router.get("/dependent/{entity}")
-def get_dependent_entities(entity: str) -> List:
-    entity_id = registry.get_entity_id(entity)
-    downstream_entities = registry.get_dependent_entities(entity_id)
+async def get_dependent_entities(entity: str) -> List:
+    entity_id = await registry.get_entity_id(entity)
+    downstream_entities = await registry.get_dependent_entities(entity_id)
     return list([e.to_dict() for e in downstream_entities])
 
 
 @router.delete("/entity/{entity}")
-def delete_entity(entity: str):
-    entity_id = registry.get_entity_id(entity)
-    downstream_entities = registry.get_dependent_entities(entity_id)
+async def delete_entity(entity: str):
+    entity_id = await registry.get_entity_id(entity)
+    downstream_entities = await registry.get_dependent_entities(entity_id)
     if len(downstream_entities) > 0:
-        registry.delete_empty_entities(downstream_entities)
-        if len(registry.get_dependent_entities(entity_id)) > 0:
+        await registry.delete_empty_entities(downstream_entities)
+        if len(await registry.get_dependent_entities(entity_id)) > 0:
             raise HTTPException(
                 status_code=412, detail=f"""Entity cannot be deleted as it has downstream/dependent entities.
                 Entities: {list([e.qualified_name for e in downstream_entities])}"""
             )
-    registry.delete_entity(None, entity_id)
+    await registry.delete_entity(entity_id)
 
 
 @router.get("/projects/{project}/datasources")
-def get_project_datasources(project: str) -> List:
-    p = registry.get_entity(None, project)
-    source_ids = [s.id for s in p.attributes.sources]
-    sources = registry.get_entities(None, source_ids)
-    return list([e.to_dict() for e in sources])
+async def get_project_datasources(project: str, response: Response, cursor: Optional[str] = None,
+                                  limit: Optional[int] = None, fields: Optional[str] = None) -> List:
+    return await list_project_entities(project, [EntityType.Source], response, cursor, limit, fields)
 
 
 @router.get("/projects/{project}/datasources/{datasource}")
-def get_datasource(project: str, datasource: str) -> Dict:
-    p = registry.get_entity(None, project)
+async def get_datasource(project: str, datasource: str) -> Dict:
+    p = await registry.get_entity(project)
     for s in p.attributes.sources:
         if str(s.id) == datasource:
             return s.to_dict()
@@ -134,30 +231,43 @@ def get_datasource(project: str, datasource: str) -> Dict:
 
 
 @router.get("/projects/{project}/features")
-def get_project_features(project: str, keyword: Optional[str] = None, page: Optional[int] = None,
-                         limit: Optional[int] = None) -> List:
+async def get_project_features(project: str, response: Response, keyword: Optional[str] = None,
+                               page: Optional[int] = None, limit: Optional[int] = None, cursor: Optional[str] = None,
+                               fields: Optional[str] = None) -> List:
     if keyword:
         start = None
         size = None
         if page is not None and limit is not None:
             start = (page - 1) * limit
             size = limit
-        efs = registry.search_entity(
+        efs = await registry.search_entity(
             keyword, [EntityType.AnchorFeature, EntityType.DerivedFeature], project=project, start=start, size=size)
         feature_ids = [ef.id for ef in efs]
-        features = registry.get_entities(None, feature_ids)
-        return list([e.to_dict() for e in features])
+        features = await registry.get_entities(feature_ids)
+        return list([entity_to_dict(e, parse_fields(fields)) for e in features])
     else:
-        p = registry.get_entity(None, project)
-        feature_ids = [s.id for s in p.attributes.anchor_features] + \
-                      [s.id for s in p.attributes.derived_features]
-        features = registry.get_entities(None, feature_ids)
-        return list([e.to_dict() for e in features])
+        # `page` only applies to keyword search, the whole project is listed with it for compatibility
+        if page is not None:
+            limit = None
+        return await list_project_entities(project, [EntityType.AnchorFeature, EntityType.DerivedFeature], response,
+                                           cursor, limit, fields)
+
+
+@router.get("/projects/{project}/anchors")
+async def get_project_anchors(project: str, response: Response, cursor: Optional[str] = None,
+                              limit: Optional[int] = None, fields: Optional[str] = None) -> List:
+    return await list_project_entities(project, [EntityType.Anchor], response, cursor, limit, fields)
+
+
+@router.get("/projects/{project}/derivedfeatures")
+async def get_project_derived_features(project: str, response: Response, cursor: Optional[str] = None,
+                                       limit: Optional[int] = None, fields: Optional[str] = None) -> List:
+    return await list_project_entities(project, [EntityType.DerivedFeature], response, cursor, limit, fields)
 
 
 @router.get("/features/{feature}")
-def get_feature(feature: str) -> Dict:
-    e = registry.get_entity(None, feature)
+async def get_feature(feature: str) -> Dict:
+    e = await registry.get_entity(feature)
     if e.entity_type not in [EntityType.DerivedFeature, EntityType.AnchorFeature]:
         raise HTTPException(
             status_code=404, detail=f"Feature {feature} not found")
@@ -165,44 +275,60 @@ def get_feature(feature: str) -> Dict:
 
 
 @router.get("/features/{feature}/lineage")
-def get_feature_lineage(feature: str) -> Dict:
-    lineage = registry.get_lineage(feature)
-    return lineage.to_dict()
+async def get_feature_lineage(feature: str) -> Response:
+    return json_response(await registry.get_lineage_json(feature))
 
 
 @router.post("/projects")
-def new_project(definition: Dict) -> Dict:
-    id = registry.create_project(ProjectDef(**to_snake(definition)))
+async def new_project(definition: Dict) -> Dict:
+    id = await registry.create_project(ProjectDef(**to_snake(definition)))
     return {"guid": str(id)}
 
 
 @router.post("/projects/{project}/datasources")
-def new_project_datasource(project: str, definition: Dict) -> Dict:
-    project_id = registry.get_entity_id(project)
-    id = registry.create_project_datasource(project_id, SourceDef(**to_snake(definition)))
+async def new_project_datasource(project: str, definition: Dict) -> Dict:
+    project_id = await registry.get_entity_id(project)
+    id = await registry.create_project_datasource(project_id, SourceDef(**to_snake(definition)))
     return {"guid": str(id)}
 
 
 @router.post("/projects/{project}/anchors")
-def new_project_anchor(project: str, definition: Dict) -> Dict:
-    project_id = registry.get_entity_id(project)
-    id = registry.create_project_anchor(project_id, AnchorDef(**to_snake(definition)))
+async def new_project_anchor(project: str, definition: Dict) -> Dict:
+    project_id = await registry.get_entity_id(project)
+    id = await registry.create_project_anchor(project_id, AnchorDef(**to_snake(definition)))
     return {"guid": str(id)}
 
 
 @router.post("/projects/{project}/anchors/{anchor}/features")
-def new_project_anchor_feature(project: str, anchor: str, definition: Dict) -> Dict:
-    project_id = registry.get_entity_id(project)
-    anchor_id = registry.get_entity_id(anchor)
-    id = registry.create_project_anchor_feature(project_id, anchor_id, AnchorFeatureDef(**to_snake(definition)))
+async def new_project_anchor_feature(project: str, anchor: str, definition: Dict) -> Dict:
+    project_id, anchor_id = await registry.get_entity_ids([project, anchor])
+    id = await registry.create_project_anchor_feature(project_id, anchor_id, AnchorFeatureDef(**to_snake(definition)))
     return {"guid": str(id)}
 
 
 @router.post("/projects/{project}/derivedfeatures")
-def new_project_derived_feature(project: str, definition: Dict) -> Dict:
-    project_id = registry.get_entity_id(project)
-    id = registry.create_project_derived_feature(project_id, DerivedFeatureDef(**to_snake(definition)))
+async def new_project_derived_feature(project: str, definition: Dict) -> Dict:
+    project_id = await registry.get_entity_id(project)
+    id = await registry.create_project_derived_feature(project_id, DerivedFeatureDef(**to_snake(definition)))
     return {"guid": str(id)}
 
 
+@router.post("/projects/{project}/entities")
+async def new_project_entities(project: str, definition: Dict) -> Dict:
+    project_id = await registry.get_entity_id(project)
+    # The definitions are keyed by temporary guids, only the definitions themselves are converted to snake case
+    anchor_features = {}
+    for id, d in definition.get("anchorFeatures", {}).items():
+        d = to_snake(d)
+        anchor_features[UUID(id)] = (UUID(d.pop("anchor_id")), AnchorFeatureDef(**d))
+    ids = await registry.create_project_entities(
+        project_id,
+        sources=dict([(UUID(id), SourceDef(**to_snake(d))) for id, d in definition.get("sources", {}).items()]),
+        anchors=dict([(UUID(id), AnchorDef(**to_snake(d))) for id, d in definition.get("anchors", {}).items()]),
+        anchor_features=anchor_features,
+        derived_features=dict([(UUID(id), DerivedFeatureDef(**to_snake(d)))
+                               for id, d in definition.get("derivedFeatures", {}).items()]))
+    return {"guids": dict([(str(k), str(v)) for k, v in ids.items()])}
+
+
 app.include_router(prefix=rp, router=router)
@@ -0,0 +1,151 @@
+import functools
+import os
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from uuid import UUID
+
+import anyio
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from registry.db.utils import SQLITE, bind_session, create_async_sqlalchemy_engine, prepare_engine
+from registry.db_registry import DbRegistry
+from registry.environment_variables import FEATHRUI_REGISTRY_MAX_WORKERS, FEATHRUI_SQLALCHEMYSTORE_ASYNC
+from registry.models import AnchorDef, AnchorFeatureDef, DerivedFeatureDef, Edge, EntitiesAndRelations, Entity, \
+    EntityRef, EntityType, ProjectChanges, ProjectDef, RelationshipType, SourceDef
+
+
+class AsyncDbRegistry:
+    """
+    The `Registry` interface with `async` methods, for the async API endpoints. Every method returns the same as the
+    method of `DbRegistry` with the same name.
+
+    In sandbox mode the registry runs on the asyncio driver of the database, e.g. asyncpg, the code of `DbRegistry`
+    runs in `AsyncSession.run_sync` so that waiting for the database doesn't block a thread, see
+    `FEATHRUI_SQLALCHEMYSTORE_ASYNC`. Otherwise, e.g. on pymssql which has no asyncio API, or if the asyncio driver is
+    not installed, the calls run in a pool of at most `FEATHRUI_REGISTRY_MAX_WORKERS` threads.
+    """
+
+    def __init__(self, registry: Optional[DbRegistry] = None):
+        self.registry = registry or DbRegistry()
+        self.engine = None
+        use_async = FEATHRUI_SQLALCHEMYSTORE_ASYNC.get()
+        if os.environ.get("FEATHR_SANDBOX") and use_async is None:
+            use_async = self.registry.db_type != SQLITE
+        if os.environ.get("FEATHR_SANDBOX") and use_async:
+            self.engine = create_async_sqlalchemy_engine(self.registry.engine.url.render_as_string(hide_password=False))
+            if self.engine is not None:
+                prepare_engine(self.engine, self.registry.db_type)
+        self.limiter = anyio.CapacityLimiter(FEATHRUI_REGISTRY_MAX_WORKERS.get())
+
+    async def close(self):
+        if self.engine is not None:
+            await self.engine.dispose()
+
+    async def _run(self, fn: Callable, *args, **kwargs):
+        """
+        Run a method of `DbRegistry`, all queries made by it are in one transaction in sandbox mode
+        """
+        call = functools.partial(fn, *args, **kwargs)
+        if self.engine is None:
+            return await anyio.to_thread.run_sync(call, limiter=self.limiter)
+        async with AsyncSession(self.engine) as session:
+            async with session.begin():
+                return await session.run_sync(self._run_in_session, call)
+
+    def _run_in_session(self, sql_session, call: Callable):
+        with bind_session(sql_session):
+            return call()
+
+    def _get_neighbors(self, id_or_name: Union[str, UUID], relationship: RelationshipType) -> List[Edge]:
+        if os.environ.get("FEATHR_SANDBOX"):
+            with self.registry.ManagedSessionMaker() as sql_session:
+                return self.registry.get_neighbors(sql_session, id_or_name, relationship)
+        return self.registry.get_neighbors(None, id_or_name, relationship)
+
+    async def get_projects(self) -> List[str]:
+        return await self._run(self.registry.get_projects)
+
+    async def get_projects_ids(self) -> Dict:
+        return await self._run(self.registry.get_projects_ids)
+
+    async def get_entity(self, id_or_name: Union[str, UUID]) -> Entity:
+        return await self._run(self.registry.get_entity, None, id_or_name)
+
+    async def get_entities(self, ids: List[UUID]) -> List[Entity]:
+        return await self._run(self.registry.get_entities, None, ids)
+
+    async def get_entity_id(self, id_or_name: Union[str, UUID]) -> UUID:
+        return await self._run(self.registry.get_entity_id, id_or_name)
+
+    async def get_entity_ids(self, ids_or_names: List[Union[str, UUID]]) -> List[UUID]:
+        return await self._run(self.registry.get_entity_ids, ids_or_names)
+
+    async def get_neighbors(self, id_or_name: Union[str, UUID], relationship: RelationshipType) -> List[Edge]:
+        return await self._run(self._get_neighbors, id_or_name, relationship)
+
+    async def get_lineage(self, id_or_name: Union[str, UUID]) -> EntitiesAndRelations:
+        return await self._run(self.registry.get_lineage, id_or_name)
+
+    async def get_project(self, id_or_name: Union[str, UUID]) -> EntitiesAndRelations:
+        return await self._run(self.registry.get_project, id_or_name)
+
+    async def get_project_changes(self, id_or_name: Union[str, UUID], since: int = 0) -> ProjectChanges:
+        return await self._run(self.registry.get_project_changes, id_or_name, since)
+
+    async def get_lineage_json(self, id_or_name: Union[str, UUID]) -> bytes:
+        return await self._run(self.registry.get_lineage_json, id_or_name)
+
+    async def get_project_json(self, id_or_name: Union[str, UUID]) -> bytes:
+        return await self._run(self.registry.get_project_json, id_or_name)
+
+    async def get_project_changes_json(self, id_or_name: Union[str, UUID], since: int = 0) -> bytes:
+        return await self._run(self.registry.get_project_changes_json, id_or_name, since)
+
+    async def search_entity(self,
+                            keyword: str,
+                            type: List[EntityType],
+                            project: Optional[Union[str, UUID]] = None,
+                            start: Optional[int] = None,
+                            size: Optional[int] = None) -> List[EntityRef]:
+        return await self._run(self.registry.search_entity, keyword, type, project, start, size)
+
+    async def list_entities(self,
+                            project: Union[str, UUID],
+                            type: List[EntityType],
+                            after: Optional[str] = None,
+                            limit: Optional[int] = None,
+                            with_attributes: bool = True) -> Tuple[List[Union[Entity, EntityRef]], Optional[str]]:
+        return await self._run(self.registry.list_entities, project, type, after, limit, with_attributes)
+
+    async def create_project(self, definition: ProjectDef) -> UUID:
+        return await self._run(self.registry.create_project, definition)
+
+    async def create_project_datasource(self, project_id: UUID, definition: SourceDef) -> UUID:
+        return await self._run(self.registry.create_project_datasource, project_id, definition)
+
+    async def create_project_anchor(self, project_id: UUID, definition: AnchorDef) -> UUID:
+        return await self._run(self.registry.create_project_anchor, project_id, definition)
+
+    async def create_project_anchor_feature(self, project_id: UUID, anchor_id: UUID,
+                                            definition: AnchorFeatureDef) -> UUID:
+        return await self._run(self.registry.create_project_anchor_feature, project_id, anchor_id, definition)
+
+    async def create_project_derived_feature(self, project_id: UUID, definition: DerivedFeatureDef) -> UUID:
+        return await self._run(self.registry.create_project_derived_feature, project_id, definition)
+
+    async def create_project_entities(self,
+                                      project_id: UUID,
+                                      sources: Dict[UUID, SourceDef] = {},
+                                      anchors: Dict[UUID, AnchorDef] = {},
+                                      anchor_features: Dict[UUID, Tuple[UUID, AnchorFeatureDef]] = {},
+                                      derived_features: Dict[UUID, DerivedFeatureDef] = {}) -> Dict[UUID, UUID]:
+        return await self._run(self.registry.create_project_entities, project_id, sources, anchors, anchor_features,
+                               derived_features)
+
+    async def get_dependent_entities(self, entity_id: Union[str, UUID]) -> List[Entity]:
+        return await self._run(self.registry.get_dependent_entities, entity_id)
+
+    async def delete_empty_entities(self, entities: List[Entity]):
+        return await self._run(self.registry.delete_empty_entities, entities)
+
+    async def delete_entity(self, entity_id: Union[str, UUID]):
+        return await self._run(self.registry.delete_entity, None, entity_id)
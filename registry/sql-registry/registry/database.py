@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
 from contextlib import contextmanager
 import logging
+import queue
 import threading
 import os
 from typing import List, Dict
@@ -13,6 +14,7 @@ if platform.system().lower().startswith('dar'):
 
 import pymssql
 
+from registry.environment_variables import FEATHRUI_MSSQL_POOL_SIZE
 
 providers = []
 
@@ -122,8 +124,11 @@ class MssqlConnection(DbConnection):
 
     def __init__(self, params):
         self.params = params
+        # Only one cursor is allowed at the same time on a connection, concurrent queries take different connections
+        # from the idle ones, or make new ones if there's none
+        self.pool = queue.LifoQueue()
         self.make_connection()
-        self.mutex = threading.Lock()
+        self.pool.put(self.conn)
 
     def make_connection(self):
         self.conn = pymssql.connect(**self.params)
@@ -133,23 +138,36 @@ class MssqlConnection(DbConnection):
         Make SQL query and return result
         """
         logging.debug(f"SQL: `{sql}`")
-        # NOTE: Only one cursor is allowed at the same time
         retry = 0
         while True:
             try:
-                with self.mutex:
-                    c = self.conn.cursor(as_dict=True)
-                    c.execute(sql, *args, **kwargs)
-                    return c.fetchall()
+                conn = self.pool.get_nowait()
+            except queue.Empty:
+                conn = pymssql.connect(**self.params)
+            try:
+                c = conn.cursor(as_dict=True)
+                c.execute(sql, *args, **kwargs)
+                rows = c.fetchall()
             except pymssql.OperationalError:
                 logging.warning("Database error, retrying...")
-                # Reconnect
-                self.make_connection()
+                # Drop the connection, the retry reconnects
+                conn.close()
                 retry += 1
                 if retry >= 3:
                     # Stop retrying
                     raise
-                pass
+                continue
+            except Exception:
+                self._release(conn)
+                raise
+            self._release(conn)
+            return rows
+
+    def _release(self, conn):
+        if self.pool.qsize() < FEATHRUI_MSSQL_POOL_SIZE.get():
+            self.pool.put(conn)
+        else:
+            conn.close()
 
     @contextmanager
     def transaction(self):
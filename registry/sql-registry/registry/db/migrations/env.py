@@ -0,0 +1,43 @@
+from alembic import context
+from sqlalchemy import engine_from_config, pool
+
+config = context.config
+# The database can be set on the command line, e.g.
+# `alembic -c registry/db/migrations/alembic.ini -x url=postgresql://... upgrade head`
+url = context.get_x_argument(as_dictionary=True).get("url")
+if url:
+    config.set_main_option("sqlalchemy.url", url)
+
+
+def run_migrations_offline():
+    """
+    Run migrations in 'offline' mode, which emits the SQL statements instead of running them
+    """
+    context.configure(url=config.get_main_option("sqlalchemy.url"), literal_binds=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    """
+    Run migrations in 'online' mode, with the connection shared by `registry.db.utils._upgrade_db` if any
+    """
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        context.configure(connection=connection)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+    connectable = engine_from_config(
+        config.get_section(config.config_ini_section), prefix="sqlalchemy.", poolclass=pool.NullPool
+    )
+    with connectable.connect() as connection:
+        context.configure(connection=connection)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,42 @@
+"""initial schema
+
+Revision ID: 4a1d2b6f0c3e
+Revises:
+Create Date: 2023-02-20 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "4a1d2b6f0c3e"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The databases created before the migrations already have the tables
+    tables = sa.inspect(op.get_bind()).get_table_names()
+    if "entities" not in tables:
+        op.create_table(
+            "entities",
+            sa.Column("entity_id", sa.String(50), nullable=False, primary_key=True),
+            sa.Column("qualified_name", sa.String(200), nullable=False),
+            sa.Column("entity_type", sa.String(100), nullable=False),
+            sa.Column("attributes", sa.String(2000), nullable=False),
+        )
+    if "edges" not in tables:
+        op.create_table(
+            "edges",
+            sa.Column("edge_id", sa.String(50), nullable=False, primary_key=True),
+            sa.Column("from_id", sa.String(50), nullable=False),
+            sa.Column("to_id", sa.String(50), nullable=False),
+            sa.Column("conn_type", sa.String(50), nullable=False),
+        )
+
+
+def downgrade():
+    op.drop_table("edges")
+    op.drop_table("entities")
@@ -0,0 +1,103 @@
+"""add entity changes and indexes
+
+Revision ID: 7f3e9c1a5b2d
+Revises: 4a1d2b6f0c3e
+Create Date: 2023-02-20 10:30:00.000000
+
+"""
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "7f3e9c1a5b2d"
+down_revision = "4a1d2b6f0c3e"
+branch_labels = None
+depends_on = None
+
+_logger = logging.getLogger(__name__)
+
+edges = sa.table("edges", sa.column("edge_id"), sa.column("from_id"), sa.column("to_id"), sa.column("conn_type"))
+entities = sa.table("entities", sa.column("qualified_name"))
+
+# Index name -> (table, columns, unique)
+INDEXES = {
+    "uq_entities_qualified_name": ("entities", ["qualified_name"], True),
+    "ix_entities_entity_type": ("entities", ["entity_type"], False),
+    "uq_edges_from_id_to_id_conn_type": ("edges", ["from_id", "to_id", "conn_type"], True),
+    "ix_edges_from_id_conn_type": ("edges", ["from_id", "conn_type"], False),
+    "ix_edges_to_id_conn_type": ("edges", ["to_id", "conn_type"], False),
+    "ix_entity_changes_project_id_change_id": ("entity_changes", ["project_id", "change_id"], False),
+}
+
+
+def _delete_duplicate_edges(bind):
+    """
+    Keep only one of the edges with the same type between the same entities, older registries may create them
+    """
+    columns = [edges.c.from_id, edges.c.to_id, edges.c.conn_type]
+    duplicates = bind.execute(
+        sa.select(*columns, sa.func.min(edges.c.edge_id)).group_by(*columns).having(sa.func.count() > 1)
+    ).fetchall()
+    for from_id, to_id, conn_type, kept_id in duplicates:
+        bind.execute(
+            edges.delete().where(
+                edges.c.from_id == from_id,
+                edges.c.to_id == to_id,
+                edges.c.conn_type == conn_type,
+                edges.c.edge_id != kept_id,
+            )
+        )
+    if duplicates:
+        _logger.info("Deleted the duplicates of %d edges", len(duplicates))
+
+
+def _has_duplicate_qualified_names(bind) -> bool:
+    return (
+        bind.execute(
+            sa.select(entities.c.qualified_name)
+            .group_by(entities.c.qualified_name)
+            .having(sa.func.count() > 1)
+            .limit(1)
+        ).first()
+        is not None
+    )
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if "entity_changes" not in inspector.get_table_names():
+        op.create_table(
+            "entity_changes",
+            sa.Column(
+                "change_id",
+                sa.BigInteger().with_variant(sa.Integer, "sqlite"),
+                nullable=False,
+                primary_key=True,
+                autoincrement=True,
+            ),
+            sa.Column("project_id", sa.String(50), nullable=False),
+            sa.Column("entity_id", sa.String(50), nullable=False),
+            sa.Column("change_type", sa.String(20), nullable=False),
+        )
+    _delete_duplicate_edges(bind)
+    for name, (table, columns, unique) in INDEXES.items():
+        if name in set([i["name"] for i in inspector.get_indexes(table)]):
+            continue
+        if name == "uq_entities_qualified_name" and _has_duplicate_qualified_names(bind):
+            # Entities registered twice by older registries can't be merged automatically as they have edges
+            _logger.warning(
+                "Entities with duplicate qualified names found, indexing qualified names without uniqueness. "
+                "Delete the duplicates and index them again to prevent duplicates."
+            )
+            unique = False
+        op.create_index(name, table, columns, unique=unique)
+
+
+def downgrade():
+    for name, (table, _, _) in INDEXES.items():
+        op.drop_index(name, table_name=table)
+    op.drop_table("entity_changes")
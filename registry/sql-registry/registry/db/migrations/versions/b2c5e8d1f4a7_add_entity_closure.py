@@ -0,0 +1,38 @@
+"""add entity closure
+
+Revision ID: b2c5e8d1f4a7
+Revises: 7f3e9c1a5b2d
+Create Date: 2023-03-06 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "b2c5e8d1f4a7"
+down_revision = "7f3e9c1a5b2d"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The table is filled by the registry when `FEATHRUI_REGISTRY_CLOSURE_TABLE` is enabled
+    inspector = sa.inspect(op.get_bind())
+    if "entity_closure" not in inspector.get_table_names():
+        op.create_table(
+            "entity_closure",
+            sa.Column("ancestor_id", sa.String(50), nullable=False, primary_key=True),
+            sa.Column("conn_type", sa.String(50), nullable=False, primary_key=True),
+            sa.Column("descendant_id", sa.String(50), nullable=False, primary_key=True),
+            sa.Column("depth", sa.Integer, nullable=False),
+        )
+    # The table may be created by the registry without the index
+    indexes = set([i["name"] for i in sa.inspect(op.get_bind()).get_indexes("entity_closure")])
+    if "ix_entity_closure_descendant_id_conn_type" not in indexes:
+        op.create_index("ix_entity_closure_descendant_id_conn_type", "entity_closure", ["descendant_id", "conn_type"])
+
+
+def downgrade():
+    op.drop_index("ix_entity_closure_descendant_id_conn_type", table_name="entity_closure")
+    op.drop_table("entity_closure")
@@ -1,12 +1,13 @@
+import importlib.util
 import logging
 import os
 import time
 from contextlib import contextmanager
+from contextvars import ContextVar
 
 import sqlalchemy
 from alembic.migration import MigrationContext
 from alembic.script import ScriptDirectory
-from sqlalchemy import sql
 # We need to import sqlalchemy.pool to convert poolclass string to class object
 from sqlalchemy.pool import (
     AssertionPool,
@@ -38,6 +39,17 @@ MSSQL = "mssql"
 
 DATABASE_ENGINES = [POSTGRES, MYSQL, SQLITE, MSSQL]
 
+# The asyncio drivers supported by SQLAlchemy for each database type
+ASYNC_DRIVERS = {
+    POSTGRES: "asyncpg",
+    MYSQL: "aiomysql",
+    SQLITE: "aiosqlite",
+    MSSQL: "aioodbc",
+}
+
+# The session of the registry call in progress, the managed sessions made during the call join it
+_current_session = ContextVar("_current_session", default=None)
+
 
 def _get_package_dir():
     """Returns directory containing MLflow python package."""
@@ -65,9 +77,8 @@ def _verify_schema(engine):
     if current_rev != head_revision:
         raise Exception(
             f"Detected out-of-date database schema (found version {current_rev}, "
-            f"but expected {head_revision}). Take a backup of your database, then run "
-            "'mlflow db upgrade <database_uri>' "
-            "to migrate your database to the latest schema. NOTE: schema migration may "
+            f"but expected {head_revision}). Take a backup of your database, then restart the "
+            "registry to migrate your database to the latest schema. NOTE: schema migration may "
             "result in database downtime - please consult your database's documentation for "
             "more detail."
         )
@@ -80,17 +91,19 @@ def _get_managed_session_maker(SessionMaker, db_type):
     if no exceptions are encountered within its associated context. If an exception is
     encountered, the session is rolled back. Finally, any session produced by this factory is
     automatically closed when the session's associated context is exited.
+    The sessions made within the context of another one, or of a session bound by `bind_session`, are that session,
+    so that one registry call uses one connection and commits or rolls back as a whole.
     """
 
     @contextmanager
     def make_managed_session():
         """Provide a transactional scope around a series of operations."""
+        if _current_session.get() is not None:
+            yield _current_session.get()
+            return
         with SessionMaker() as session:
+            token = _current_session.set(session)
             try:
-                if db_type == SQLITE:
-                    session.execute(sql.text("PRAGMA foreign_keys = ON;"))
-                    session.execute(sql.text("PRAGMA busy_timeout = 20000;"))
-                    session.execute(sql.text("PRAGMA case_sensitive_like = true;"))
                 yield session
                 session.commit()
             except Exception:
@@ -109,10 +122,42 @@ def _get_managed_session_maker(SessionMaker, db_type):
             except Exception as e:
                 session.rollback()
                 raise Exception(e)
+            finally:
+                _current_session.reset(token)
 
     return make_managed_session
 
 
+@contextmanager
+def bind_session(session):
+    """
+    Make the managed sessions made within the context join `session`, e.g. the sync session of an `AsyncSession`
+    in `run_sync`. The session is committed or rolled back by its owner.
+    """
+    token = _current_session.set(session)
+    try:
+        yield session
+    finally:
+        _current_session.reset(token)
+
+
+def prepare_engine(engine, db_type):
+    """
+    Set up every new connection of the engine, or of the sync engine of an `AsyncEngine`, so it's done once per
+    connection rather than on every session
+    """
+    if db_type == SQLITE:
+        sqlalchemy.event.listen(getattr(engine, "sync_engine", engine), "connect", _set_sqlite_pragmas)
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys = ON;")
+    cursor.execute("PRAGMA busy_timeout = 20000;")
+    cursor.execute("PRAGMA case_sensitive_like = true;")
+    cursor.close()
+
+
 def _get_alembic_config(db_url, alembic_dir=None):
     """
     Constructs an alembic Config object referencing the specified database and migration script
@@ -122,15 +167,13 @@ def _get_alembic_config(db_url, alembic_dir=None):
         db_url: Database URL, like sqlite:///<absolute-path-to-local-db-file>. See
             https://docs.sqlalchemy.org/en/13/core/engines.html#database-urls for a full list of
             valid database URLs.
-        alembic_dir: Path to migration script directory. Uses canonical migration script
-            directory under mlflow/alembic if unspecified. TODO: remove this argument in MLflow 1.1,
-            as it's only used to run special migrations for pre-1.0 users to remove duplicate
-            constraint names.
+        alembic_dir: Path to migration script directory. Uses the migration script directory
+            `registry/db/migrations` if unspecified.
     """
     from alembic.config import Config
 
     final_alembic_dir = (
-        os.path.join(_get_package_dir(), "store", "db_migrations")
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
         if alembic_dir is None
         else alembic_dir
     )
@@ -145,7 +188,7 @@ def _get_alembic_config(db_url, alembic_dir=None):
 
 def _upgrade_db(engine):
     """
-    Upgrade the schema of an MLflow tracking database to the latest supported version.
+    Upgrade the schema of a registry database to the latest supported version.
     Note that schema migrations can be slow and are not guaranteed to be transactional -
     we recommend taking a backup of your database before running migrations.
 
@@ -199,6 +242,27 @@ def create_sqlalchemy_engine_with_retry(db_uri):
 
 
 def create_sqlalchemy_engine(db_uri):
+    return sqlalchemy.create_engine(db_uri, pool_pre_ping=True, **_get_pool_kwargs())
+
+
+def create_async_sqlalchemy_engine(db_uri):
+    """
+    Create an `AsyncEngine` on the asyncio driver of the database type, e.g. `sqlite+aiosqlite` for `sqlite`.
+    Returns None if the driver is not installed.
+    """
+    from sqlalchemy.engine import make_url
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url = make_url(db_uri)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None or importlib.util.find_spec(driver) is None:
+        _logger.warning("The asyncio driver of %s is not installed", url.get_backend_name())
+        return None
+    return create_async_engine(url.set(drivername=f"{url.get_backend_name()}+{driver}"), pool_pre_ping=True,
+                               **_get_pool_kwargs())
+
+
+def _get_pool_kwargs():
     pool_size = FEATHRUI_SQLALCHEMYSTORE_POOL_SIZE.get()
     pool_max_overflow = FEATHRUI_SQLALCHEMYSTORE_MAX_OVERFLOW.get()
     pool_recycle = FEATHRUI_SQLALCHEMYSTORE_POOL_RECYCLE.get()
@@ -236,7 +300,7 @@ def create_sqlalchemy_engine(db_uri):
         pool_kwargs["poolclass"] = pool_class_map[poolclass]
     if pool_kwargs:
         _logger.info("Create SQLAlchemy engine with pool options %s", pool_kwargs)
-    return sqlalchemy.create_engine(db_uri, pool_pre_ping=True, **pool_kwargs)
+    return pool_kwargs
 
 
 def extract_db_type_from_uri(db_uri):
@@ -71,3 +71,32 @@ class Edge(Base):
     def __repr__(self):
         return f"<Entity({self.edge_id}, {self.from_id}, {self.to_id}, {self.conn_type})>"
 
+
+
+class EntityChange(Base):
+    """
+    DB model for EntityChange.
+    These are recorded in ``entity_changes`` table, one row for each entity created, updated or deleted in a project.
+    """
+
+    __tablename__ = "entity_changes"
+
+    change_id = Column(sa.BigInteger().with_variant(sa.Integer, "sqlite"), primary_key=True, autoincrement=True)
+    """
+    change_id: `BigInteger`. *Primary Key* for ``entity_changes`` table, the project version after the change.
+    """
+    project_id = Column(String(50), nullable=False)
+    """
+    project_id the changed entity belongs to: `String` (limit 50 characters). Couldn't be *null*.
+    """
+    entity_id = Column(String(50), nullable=False)
+    """
+    entity_id of the changed entity: `String` (limit 50 characters). Couldn't be *null*.
+    """
+    change_type = Column(String(20), nullable=False)
+    """
+    change_type, `Upsert` or `Delete`: `String` (limit 20 characters). Couldn't be *null*.
+    """
+
+    def __repr__(self):
+        return f"<EntityChange({self.change_id}, {self.project_id}, {self.entity_id}, {self.change_type})>"
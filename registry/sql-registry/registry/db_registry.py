@@ -1,4 +1,5 @@
-from typing import Optional, Tuple, Union
+import logging
+from typing import Callable, Optional, Tuple, Union
 from uuid import UUID, uuid4
 from typing import List, Set, Dict
 # from pydantic import UUID4
@@ -6,14 +7,21 @@ from registry import Registry
 from registry import connect
 from registry.models import AnchorAttributes, AnchorDef, AnchorFeatureAttributes, AnchorFeatureDef, \
     DerivedFeatureAttributes, DerivedFeatureDef, Edge, EntitiesAndRelations, Entity, EntityRef, EntityType, \
-    ProjectAttributes, ProjectDef, RelationshipType, SourceAttributes, SourceDef, _to_type, _to_uuid
+    ProjectAttributes, ProjectChanges, ProjectDef, RelationshipType, SourceAttributes, SourceDef, _to_type, _to_uuid
 import json
 
-from registry.db_models import Entity as DbEntity, Edge as DbEdge
+from registry.db_models import Entity as DbEntity
 
 import os
 # from sqlalchemy import insert
-from registry.db.utils import create_sqlalchemy_engine_with_retry, _get_managed_session_maker, extract_db_type_from_uri
+from registry.db.utils import create_sqlalchemy_engine_with_retry, _get_managed_session_maker, _upgrade_db, \
+    extract_db_type_from_uri, prepare_engine
+from registry.environment_variables import FEATHRUI_FRAGMENT_CACHE_SIZE, FEATHRUI_REGISTRY_CLOSURE_TABLE
+from registry.fragment_cache import FragmentCache, dumps, entities_and_relations_json, project_changes_json
+from registry.identity_map import current_identity_map
+
+_logger = logging.getLogger(__name__)
+
 
 class ConflictError(Exception):
     pass
@@ -50,6 +58,24 @@ class Edges(Base):
     conn_type = db.Column('conn_type', db.String(50), nullable=False)
 
 
+class EntityChanges(Base):
+    __tablename__ = 'entity_changes'
+
+    change_id = db.Column('change_id', db.Integer, primary_key=True, autoincrement=True)
+    project_id = db.Column('project_id', db.String(50), nullable=False)
+    entity_id = db.Column('entity_id', db.String(50), nullable=False)
+    change_type = db.Column('change_type', db.String(20), nullable=False)
+
+
+class EntityClosure(Base):
+    __tablename__ = 'entity_closure'
+
+    ancestor_id = db.Column('ancestor_id', db.String(50), nullable=False, primary_key=True)
+    conn_type = db.Column('conn_type', db.String(50), nullable=False, primary_key=True)
+    descendant_id = db.Column('descendant_id', db.String(50), nullable=False, primary_key=True)
+    depth = db.Column('depth', db.Integer, nullable=False)
+
+
 def quote(id):
     if isinstance(id, str):
         return f"'{id}'"
@@ -67,9 +93,142 @@ def valid_uuid4() -> UUID:
 
     return val
 
+
+# Maximum number of values in the `in` clause of a query
+QUERY_BATCH_SIZE = 1000
+
+
+class _WriteBatch:
+    """
+    The entities and edges to be created in a transaction, they're written with one multi-row insert per table.
+    `existing` is the rows of the entities with the same qualified names as the ones to be created, so duplicates
+    can be found without querying the DB for each entity.
+    """
+    ATTRIBUTES_TYPES = {
+        EntityType.Source: SourceAttributes,
+        EntityType.Anchor: AnchorAttributes,
+        EntityType.AnchorFeature: AnchorFeatureAttributes,
+        EntityType.DerivedFeature: DerivedFeatureAttributes,
+    }
+    REVERSED_RELATIONSHIPS = {
+        RelationshipType.Contains: RelationshipType.BelongsTo,
+        RelationshipType.Consumes: RelationshipType.Produces,
+    }
+
+    def __init__(self, existing: Dict[str, List[Dict]]):
+        self.existing = existing
+        self.entities = []
+        self.edges = []
+        self.changed_ids = []
+
+    def find(self, entity_type: EntityType, definition) -> Optional[UUID]:
+        """
+        Returns the id of the entity with the same definition if it exists,
+        raises ConflictError if the qualified name is taken by a different entity
+        """
+        r = self.existing.get(definition.qualified_name)
+        if not r:
+            return None
+        if len(r) > 1:
+            # There are multiple entities with same qualified name， that means we already have errors in the db
+            assert False, "Data inconsistency detected, %d entities have same qualified_name %s" % (
+                len(r), definition.qualified_name)
+        # The entity with same name already exists but with different type
+        if _to_type(r[0]["entity_type"], EntityType) != entity_type:
+            raise ConflictError("Entity %s already exists" % definition.qualified_name)
+        attr = _to_type(json.loads(r[0]["attributes"]), self.ATTRIBUTES_TYPES[entity_type])
+        if attr.name != definition.name:
+            raise ConflictError("Entity %s already exists" % definition.qualified_name)
+        if entity_type == EntityType.Source:
+            same = attr.type == definition.type \
+                and attr.options == definition.options \
+                and attr.preprocessing == definition.preprocessing \
+                and attr.event_timestamp_column == definition.event_timestamp_column \
+                and attr.timestamp_format == definition.timestamp_format
+        elif entity_type in (EntityType.AnchorFeature, EntityType.DerivedFeature):
+            same = attr.type == definition.feature_type \
+                and attr.transformation == definition.transformation \
+                and attr.key == definition.key
+        else:
+            same = True
+        if not same:
+            # The existing entity has different definition, that's a conflict
+            raise ConflictError("Entity %s already exists" % definition.qualified_name)
+        # Creating exactly same entity, just return the existing id
+        return _to_uuid(r[0]["entity_id"])
+
+    def add_entity(self, id: UUID, entity_type: EntityType, qualified_name: str, attributes: str):
+        row = {
+            "entity_id": str(id),
+            "entity_type": str(entity_type),
+            "qualified_name": qualified_name,
+            "attributes": attributes,
+        }
+        self.entities.append(row)
+        # Later definitions with the same qualified name in the batch are duplicates of this one
+        self.existing[qualified_name] = [row]
+        self.changed_ids.append(id)
+
+    def connect(self, from_id: UUID, to_id: UUID, relationship: RelationshipType):
+        """
+        Add the edge and the reversed one, e.g. "Contains/BelongsTo", between 2 entities
+        """
+        for f, t, r in [(from_id, to_id, relationship), (to_id, from_id, self.REVERSED_RELATIONSHIPS[relationship])]:
+            self.edges.append({
+                "edge_id": str(valid_uuid4()),
+                "from_id": str(f),
+                "to_id": str(t),
+                "conn_type": r.name,
+            })
+
+
+# The relationships whose transitive closure is kept in the `entity_closure` table, the paths of the reversed ones,
+# e.g. "Produces", are the same paths looked up from the other end
+CLOSURE_RELATIONSHIPS = [RelationshipType.Contains, RelationshipType.Consumes]
+
+
+def _closure_relationship(conn_type: RelationshipType) -> Optional[Tuple[RelationshipType, bool]]:
+    """
+    Returns the relationship kept in the closure table for `conn_type` and whether the paths are reversed,
+    or None if the closure of `conn_type` is not kept
+    """
+    for r in CLOSURE_RELATIONSHIPS:
+        if conn_type == r:
+            return r, False
+        if conn_type == _WriteBatch.REVERSED_RELATIONSHIPS[r]:
+            return r, True
+    return None
+
+
+def _transitive_closure(children: Dict[str, List[str]]) -> Dict[str, Dict[str, int]]:
+    """
+    Returns the depths of the shortest paths from every node to the nodes reachable from it, the graph is acyclic.
+    The nodes are visited in post-order so the paths of a node are made of the ones of its children.
+    """
+    closure = {}
+    for root in children:
+        stack = [(root, False)]
+        while stack:
+            node, visited = stack.pop()
+            if node in closure:
+                continue
+            if not visited:
+                stack.append((node, True))
+                stack.extend([(c, False) for c in children.get(node, []) if c not in closure])
+                continue
+            depths = {}
+            for c in children.get(node, []):
+                for d, depth in [(c, 0)] + list(closure.get(c, {}).items()):
+                    if d != node and depths.get(d, depth + 2) > depth + 1:
+                        depths[d] = depth + 1
+            closure[node] = depths
+    return closure
+
+
 class DbRegistry(Registry):
     def __init__(self):
         self.conn = connect()
+        self.fragment_cache = FragmentCache(FEATHRUI_FRAGMENT_CACHE_SIZE.get())
         if os.environ.get("FEATHR_SANDBOX"):
             sandbox_registry_url = os.environ.get("FEATHR_SANDBOX_REGISTRY_URL") 
             if sandbox_registry_url:
@@ -79,6 +238,7 @@ class DbRegistry(Registry):
                 db_uri = 'sqlite:////tmp/feathr_registry.sqlite?check_same_thread=False' 
                 engine = db.create_engine(db_uri)  # Create test.sqlite automatically
             # self.sql_session = Session(engine)
+            prepare_engine(engine, extract_db_type_from_uri(db_uri))
             self.engine = engine
             self.connection = engine.connect()
             metadata = db.MetaData()
@@ -87,22 +247,53 @@ class DbRegistry(Registry):
                                            db.Column('entity_id', db.String(50), nullable=False, primary_key=True),
                                            db.Column('qualified_name', db.String(200), nullable=False),
                                            db.Column('entity_type', db.String(100), nullable=False),
-                                           db.Column('attributes', db.String(2000), nullable=False)
+                                           db.Column('attributes', db.String(2000), nullable=False),
                                            # TODO: sqlite doesn't enforce length but others might
+                                           db.Index('uq_entities_qualified_name', 'qualified_name', unique=True),
+                                           db.Index('ix_entities_entity_type', 'entity_type')
                                            )
             
             self.edges_table = db.Table('edges', metadata,
                                         db.Column('edge_id', db.String(50), nullable=False, primary_key=True),
                                         db.Column('from_id', db.String(50), nullable=False),
                                         db.Column('to_id', db.String(50), nullable=False),
-                                        db.Column('conn_type', db.String(50), nullable=False)
+                                        db.Column('conn_type', db.String(50), nullable=False),
+                                        db.Index('uq_edges_from_id_to_id_conn_type', 'from_id', 'to_id', 'conn_type',
+                                                 unique=True),
+                                        db.Index('ix_edges_from_id_conn_type', 'from_id', 'conn_type'),
+                                        db.Index('ix_edges_to_id_conn_type', 'to_id', 'conn_type')
                                         )
+
+            self.entity_changes_table = db.Table('entity_changes', metadata,
+                                                 db.Column('change_id', db.Integer, primary_key=True, autoincrement=True),
+                                                 db.Column('project_id', db.String(50), nullable=False),
+                                                 db.Column('entity_id', db.String(50), nullable=False),
+                                                 db.Column('change_type', db.String(20), nullable=False),
+                                                 db.Index('ix_entity_changes_project_id_change_id', 'project_id',
+                                                          'change_id')
+                                                 )
+
+            self.entity_closure_table = db.Table('entity_closure', metadata,
+                                                 db.Column('ancestor_id', db.String(50), nullable=False,
+                                                           primary_key=True),
+                                                 db.Column('conn_type', db.String(50), nullable=False,
+                                                           primary_key=True),
+                                                 db.Column('descendant_id', db.String(50), nullable=False,
+                                                           primary_key=True),
+                                                 db.Column('depth', db.Integer, nullable=False),
+                                                 db.Index('ix_entity_closure_descendant_id_conn_type',
+                                                          'descendant_id', 'conn_type')
+                                                 )
             metadata.create_all(engine)  # Creates the table
+            # Adds the tables and indexes missing in the databases created by older versions
+            _upgrade_db(engine)
             self.db_type = extract_db_type_from_uri(db_uri)
             SessionMaker = db.orm.sessionmaker(bind=self.engine)
 
             self.ManagedSessionMaker = _get_managed_session_maker(
                 SessionMaker, self.db_type)
+        if FEATHRUI_REGISTRY_CLOSURE_TABLE.get():
+            self._init_closure()
 
     def _fetch_helper(self, query):
         """serves as a function to have max code similarity between the ORM based code and the SQL based code. Basically fetch all and return a dict (otherwise it might just return a list of `LegacyRow` object)
@@ -123,7 +314,7 @@ class DbRegistry(Registry):
             with self.ManagedSessionMaker() as sql_session:
                 query = sql_session.query(self.entities_table.c.qualified_name).where(
                 (self.entities_table.c.entity_type == str(EntityType.Project)))
-            ret = self._fetch_helper(query)
+                ret = self._fetch_helper(query)
         else:
             ret = self.conn.query(
                 f"select qualified_name from entities where entity_type=%s", str(EntityType.Project))
@@ -135,7 +326,7 @@ class DbRegistry(Registry):
             with self.ManagedSessionMaker() as sql_session:
                 query = sql_session.query(self.entities_table.c.entity_id, self.entities_table.c.qualified_name).where(
                 (self.entities_table.c.entity_type == str(EntityType.Project)))
-            ret = self._fetch_helper(query)
+                ret = self._fetch_helper(query)
         else:
             ret = self.conn.query(
                 f"select entity_id, qualified_name from entities where entity_type=%s", str(EntityType.Project))
@@ -165,18 +356,56 @@ class DbRegistry(Registry):
         except ValueError:
             pass
         # It is a name
+        cache = current_identity_map()
+        if cache is not None and str(id_or_name) in cache.ids:
+            return cache.ids[str(id_or_name)]
         if os.environ.get("FEATHR_SANDBOX"):
             with self.ManagedSessionMaker() as sql_session:
                 query = sql_session.query(self.entities_table.c.entity_id).where(
                 (self.entities_table.c.qualified_name == str(id_or_name)))
-            ret = self._fetch_helper(query)
+                ret = self._fetch_helper(query)
         else:
             ret = self.conn.query(
                 f"select entity_id from entities where qualified_name=%s", str(id_or_name))
         if len(ret) == 0:
             raise KeyError(f"Entity {id_or_name} not found")
+        if cache is not None:
+            cache.add_id(str(id_or_name), ret[0]["entity_id"])
         return ret[0]["entity_id"]
 
+    def get_entity_ids(self, ids_or_names: List[Union[str, UUID]]) -> List[UUID]:
+        """
+        Same as calling `get_entity_id` for each of them, but all names are resolved with one query
+        """
+        cache = current_identity_map()
+        ids = dict([(n, cache.ids[str(n)]) for n in ids_or_names if cache is not None and str(n) in cache.ids])
+        names = []
+        for n in ids_or_names:
+            try:
+                ids[n] = _to_uuid(n)
+            except ValueError:
+                if n not in ids:
+                    names.append(str(n))
+        names = list(dict.fromkeys(names))
+        for i in range(0, len(names), QUERY_BATCH_SIZE):
+            chunk = tuple(names[i:i + QUERY_BATCH_SIZE])
+            if os.environ.get("FEATHR_SANDBOX"):
+                with self.ManagedSessionMaker() as sql_session:
+                    query = sql_session.query(Entities.entity_id, Entities.qualified_name).filter(
+                        Entities.qualified_name.in_(chunk))
+                    rows = self._fetch_helper(query)
+            else:
+                rows = self.conn.query("select entity_id, qualified_name from entities where qualified_name in %s",
+                                       (chunk,))
+            for r in rows:
+                ids[r["qualified_name"]] = r["entity_id"]
+                if cache is not None:
+                    cache.add_id(r["qualified_name"], r["entity_id"])
+        for n in ids_or_names:
+            if n not in ids:
+                raise KeyError(f"Entity {n} not found")
+        return list([ids[n] for n in ids_or_names])
+
     def get_neighbors(self, sql_session: Session, id_or_name: Union[str, UUID], relationship: RelationshipType) -> List[Edge]:
         if os.environ.get("FEATHR_SANDBOX"):
             query = sql_session.query(self.edges_table.c.edge_id, self.edges_table.c.from_id, self.edges_table.c.to_id,
@@ -208,6 +437,16 @@ class DbRegistry(Registry):
                 upstream_entities + downstream_entities,
                 upstream_edges + downstream_edges)
 
+    def get_lineage_json(self, id_or_name: Union[str, UUID]) -> bytes:
+        with self.ManagedSessionMaker() as sql_session:
+            version = self._sync_fragment_cache(sql_session)
+            id = self.get_entity_id(id_or_name)
+            upstream_ids, upstream_connections = self._bfs_connections(sql_session, id, RelationshipType.Consumes)
+            downstream_ids, downstream_connections = self._bfs_connections(sql_session, id, RelationshipType.Produces)
+            fragments = self._get_fragments(sql_session, list(upstream_ids) + list(downstream_ids), version)
+            edges = set([Edge(**c) for c in upstream_connections + downstream_connections])
+            return entities_and_relations_json(fragments, edges)
+
     def get_project(self, id_or_name: Union[str, UUID]) -> EntitiesAndRelations:
         """
         This function returns not only the project itself, but also everything in the project
@@ -237,6 +476,80 @@ class DbRegistry(Registry):
             all_edges = self._get_edges(sql_session,ids)
             return EntitiesAndRelations([project] + children, list(edges.union(all_edges)))
 
+    def get_project_json(self, id_or_name: Union[str, UUID]) -> bytes:
+        """
+        Same as `get_project`, but the entities are serialized from the fragment cache, only the entities changed since
+        they were cached are read from the DB
+        """
+        with self.ManagedSessionMaker() as sql_session:
+            version = self._sync_fragment_cache(sql_session)
+            project_id = _to_uuid(self.get_entity_id(id_or_name))
+            edges = set(self.get_neighbors(sql_session, project_id, RelationshipType.Contains))
+            ids = list([e.to_id for e in edges])
+            fragments = self._get_fragments(sql_session, [project_id] + ids, version)
+            if project_id not in fragments:
+                raise KeyError(f"Entity {id_or_name} not found")
+            all_edges = self._get_edges(sql_session, ids)
+            return entities_and_relations_json(fragments, edges.union(all_edges))
+
+    def get_project_changes(self, id_or_name: Union[str, UUID], since: int = 0) -> ProjectChanges:
+        """
+        The project version is the id of the latest change recorded in the `entity_changes` table, so it only goes up.
+        Everything in the project is returned if `since` is 0 or unknown to the registry, e.g. the database was reset.
+        Projects without any recorded change are at version 0.
+        """
+        project_id = self.get_entity_id(id_or_name)
+        with self.ManagedSessionMaker() as sql_session:
+            version, upserted, deleted = self._get_changed_ids(sql_session, project_id, since)
+            if upserted is None:
+                # The version is read before the entities, changes made in between are fetched again next time
+                project = self.get_project(project_id)
+                return ProjectChanges(version, list(project.entities.values()), [])
+            return ProjectChanges(version, self.get_entities(sql_session, upserted), deleted)
+
+    def get_project_changes_json(self, id_or_name: Union[str, UUID], since: int = 0) -> bytes:
+        project_id = _to_uuid(self.get_entity_id(id_or_name))
+        with self.ManagedSessionMaker() as sql_session:
+            cache_version = self._sync_fragment_cache(sql_session)
+            version, upserted, deleted = self._get_changed_ids(sql_session, project_id, since)
+            if upserted is None:
+                edges = self.get_neighbors(sql_session, project_id, RelationshipType.Contains)
+                fragments = self._get_fragments(sql_session, [project_id] + [e.to_id for e in edges], cache_version)
+                if project_id not in fragments:
+                    raise KeyError(f"Entity {id_or_name} not found")
+                return project_changes_json(version, fragments, [])
+            return project_changes_json(version, self._get_fragments(sql_session, upserted, cache_version), deleted)
+
+    def _get_changed_ids(self, sql_session: Session, project_id: UUID,
+                         since: int) -> Tuple[int, Optional[List[str]], List[str]]:
+        """
+        Returns the project version, and the ids of the entities upserted and deleted after `since`.
+        The upserted ids are None if the whole project needs to be returned.
+        """
+        if os.environ.get("FEATHR_SANDBOX"):
+            query = sql_session.query(db.func.max(EntityChanges.change_id).label("version")).filter(
+                EntityChanges.project_id == str(project_id))
+            version = self._fetch_helper(query)[0]["version"] or 0
+        else:
+            version = self.conn.query(fr'''select max(change_id) as version from entity_changes
+                where project_id = %s''', str(project_id))[0]["version"] or 0
+        if since <= 0 or since > version:
+            return version, None, []
+        if os.environ.get("FEATHR_SANDBOX"):
+            query = sql_session.query(EntityChanges.entity_id, EntityChanges.change_type).filter(
+                EntityChanges.project_id == str(project_id), EntityChanges.change_id > since,
+                EntityChanges.change_id <= version).order_by(EntityChanges.change_id)
+            rows = self._fetch_helper(query)
+        else:
+            rows = self.conn.query(fr'''select entity_id, change_type from entity_changes
+                where project_id = %s and change_id > %s and change_id <= %s
+                order by change_id''', (str(project_id), since, version))
+        # Only the latest change of each entity matters
+        changes = dict([(r["entity_id"], r["change_type"]) for r in rows])
+        upserted = [id for id in changes if changes[id] == "Upsert"]
+        deleted = [id for id in changes if changes[id] == "Delete"]
+        return version, upserted, deleted
+
     def get_dependent_entities(self, entity_id: Union[str, UUID]) -> List[Entity]:
         """
         Given entity id, returns list of all entities that are downstream/dependant on the given entity
@@ -287,10 +600,12 @@ class DbRegistry(Registry):
             if sql_session is None:
                 # create session if it not exist
                 with self.ManagedSessionMaker() as sql_session:
+                    self._record_deletion(sql_session, c, entity_id)
                     self._delete_all_entity_edges(sql_session, c, entity_id)
                     self._delete_entity(sql_session, c, entity_id)
                     sql_session.flush()
             else:
+                self._record_deletion(sql_session, c, entity_id)
                 self._delete_all_entity_edges(sql_session, c, entity_id)
                 self._delete_entity(sql_session, c, entity_id)
 
@@ -344,6 +659,56 @@ class DbRegistry(Registry):
             rows = rows[-size:]
         return list([EntityRef(**row) for row in rows])
 
+    def list_entities(self,
+                      project: Union[str, UUID],
+                      type: List[EntityType],
+                      after: Optional[str] = None,
+                      limit: Optional[int] = None,
+                      with_attributes: bool = True) -> Tuple[List[Union[Entity, EntityRef]], Optional[str]]:
+        """
+        List entities with specified type in a project ordered by qualified name, with a single query.
+        Only the entities whose qualified names are greater than `after` are listed, at most `limit` of them.
+        Returns the entities and the `after` of the next page, which is None if this is the last page.
+        Returns `EntityRef`s instead if `with_attributes` is False, so that the attributes are not read at all.
+        """
+        project_id = self.get_entity_id(project)
+        after = after or ""
+        size = None if limit is None else int(limit) + 1
+        if os.environ.get("FEATHR_SANDBOX"):
+            columns = [Entities.entity_id, Entities.qualified_name, Entities.entity_type]
+            if with_attributes:
+                columns.append(Entities.attributes)
+            with self.ManagedSessionMaker() as sql_session:
+                query = sql_session.query(*columns).join(Edges, and_(
+                    Entities.entity_id == Edges.from_id, Edges.conn_type == 'BelongsTo')).filter(
+                    Edges.to_id == str(project_id), Entities.qualified_name > after,
+                    Entities.entity_type.in_(tuple([str(t) for t in type]))).order_by(Entities.qualified_name)
+                if size is not None:
+                    query = query.limit(size)
+                rows = self._fetch_helper(query)
+        else:
+            top_clause = "" if size is None else f"TOP({size})"
+            attributes_column = ", attributes" if with_attributes else ""
+            sql = fr'''select {top_clause} entity_id, qualified_name, entity_type{attributes_column}
+                from entities
+                inner join edges on entity_id=edges.from_id and edges.conn_type='BelongsTo'
+                where
+                edges.to_id=%s and qualified_name > %s and entity_type in %s
+                order by qualified_name'''
+            rows = self.conn.query(sql, (str(project_id), after, tuple([str(t) for t in type])))
+        next_after = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            next_after = rows[-1]["qualified_name"]
+        if not with_attributes:
+            refs = list([EntityRef(_to_uuid(r["entity_id"]), r["entity_type"], r["qualified_name"]) for r in rows])
+            return refs, next_after
+        entities = []
+        for row in rows:
+            row["attributes"] = json.loads(row["attributes"])
+            entities.append(Entity(**row))
+        return entities, next_after
+
     def create_project(self, definition: ProjectDef) -> UUID:
         # Here we start a transaction, any following step failed, everything rolls back
         with self.ManagedSessionMaker() as sql_session:
@@ -381,6 +746,7 @@ class DbRegistry(Registry):
                     raise Exception(
                         f"Entity(id={str(id)}) already exists. Error: {e}"
                     )
+                self._record_changes(sql_session, None, id, [id], "Upsert")
                 sql_session.flush()
                 return id
                 # with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
@@ -412,489 +778,218 @@ class DbRegistry(Registry):
                         str(EntityType.Project),
                         definition.qualified_name,
                         definition.to_attr().to_json()))
+                    self._record_changes(None, c, id, [id], "Upsert")
                     return id
 
     def create_project_datasource(self, project_id: UUID, definition: SourceDef) -> UUID:
-
-        # Here we start a transaction, any following step failed, everything rolls back
-        with self.ManagedSessionMaker() as sql_session:
-            project = self.get_entity(sql_session, project_id)
-            definition.qualified_name = f"{project.qualified_name}__{definition.name}"
-            def __check_queue_version1(r):
-                if r:
-                    if len(r) > 1:
-                        # There are multiple entities with same qualified name， that means we already have errors in the db
-                        assert False, "Data inconsistency detected, %d entities have same qualified_name %s" % (
-                            len(r), definition.qualified_name)
-                    # The entity with same name already exists but with different type
-                    if _to_type(r[0]["entity_type"], EntityType) != EntityType.Source:
-                        raise ConflictError("Entity %s already exists" %
-                                            definition.qualified_name)
-                    attr: SourceAttributes = _to_type(
-                        json.loads(r[0]["attributes"]), SourceAttributes)
-                    if attr.name == definition.name \
-                            and attr.type == definition.type \
-                            and attr.options == definition.options \
-                            and attr.preprocessing == definition.preprocessing \
-                            and attr.event_timestamp_column == definition.event_timestamp_column \
-                            and attr.timestamp_format == definition.timestamp_format:
-                        # Creating exactly same entity
-                        # Just return the existing id
-                        return _to_uuid(r[0]["entity_id"])
-                    raise ConflictError("Entity %s already exists" %
-                                        definition.qualified_name)
-                
-            if os.environ.get("FEATHR_SANDBOX"):
-                query = sql_session.query(self.entities_table.c.entity_id, self.entities_table.c.entity_type,
-                                    self.entities_table.c.attributes).where(
-                        (self.entities_table.c.qualified_name == definition.qualified_name))
-                r = self._fetch_helper(query)
-                __check_queue_version1(r)
-                id = valid_uuid4()
-                try: 
-                    entity = DbEntity(
-                       entity_id=str(id), 
-                       entity_type=str(EntityType.Source),
-                       qualified_name=definition.qualified_name,
-                       attributes=definition.to_attr().to_json()
-                    )
-                    sql_session.add(entity)                    
-                except db.exc.IntegrityError as e:
-                    raise Exception(
-                        f"Entity(id={str(id)}) already exists. Error: {e}"
-                    )
-                self._create_edge(sql_session, project_id, id, RelationshipType.Contains)
-                self._create_edge(sql_session, id, project_id, RelationshipType.BelongsTo)
-
-                sql_session.flush()
-                return id
-                
-                # with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
-
-                #     query = insert(self.entities_table).values(entity_id=str(id), entity_type=str(EntityType.Source),
-                #                                                     qualified_name=definition.qualified_name,
-                #                                                     attributes=definition.to_attr().to_json())
-                #     conn.execute(query)
-                #     self._create_edge(conn, project_id, id, RelationshipType.Contains)
-                #     self._create_edge(conn, id, project_id, RelationshipType.BelongsTo)
-                #     return id
-            else:
-                with self.conn.transaction() as c:
-                    c.execute(f'''select entity_id, entity_type, attributes from entities where qualified_name = %s''',
-                            definition.qualified_name)
-                    r = c.fetchall()
-                    __check_queue_version1(r)
-                    id = valid_uuid4()
-                    c.execute(
-                        f"insert into entities (entity_id, entity_type, qualified_name, attributes) values (%s, %s, %s, %s)",
-                        (str(id),
-                        str(EntityType.Source),
-                        definition.qualified_name,
-                        definition.to_attr().to_json()))
-                    self._create_edge(c, project_id, id, RelationshipType.Contains)
-                    self._create_edge(c, id, project_id, RelationshipType.BelongsTo)
-                    return id
-
+        id = valid_uuid4()
+        return self.create_project_entities(project_id, sources={id: definition})[id]
 
     def create_project_anchor(self, project_id: UUID, definition: AnchorDef) -> UUID:
-
-        # Here we start a transaction, any following step failed, everything rolls back
-        with self.ManagedSessionMaker() as sql_session:
-            project = self.get_entity(sql_session, project_id)
-            definition.qualified_name = f"{project.qualified_name}__{definition.name}"
-            def __check_queue_version1(r):
-                if r:
-                    if len(r) > 1:
-                        # There are multiple entities with same qualified name， that means we already have errors in the db
-                        assert False, "Data inconsistency detected, %d entities have same qualified_name %s" % (
-                            len(r), definition.qualified_name)
-                    # The entity with same name already exists but with different type
-                    if _to_type(r[0]["entity_type"], EntityType) != EntityType.Anchor:
-                        raise ConflictError("Entity %s already exists" %
-                                            definition.qualified_name)
-                    attr: AnchorAttributes = _to_type(
-                        json.loads(r[0]["attributes"]), AnchorAttributes)
-                    if attr.name == definition.name:
-                        # Creating exactly same entity
-                        # Just return the existing id
-                        return _to_uuid(r[0]["entity_id"])
-                    raise ConflictError("Entity %s already exists" %
-                                        definition.qualified_name)
-                
-            if os.environ.get("FEATHR_SANDBOX"):
-                query = sql_session.query(self.entities_table.c.entity_id, self.entities_table.c.entity_type,
-                                    self.entities_table.c.attributes).where(
-                        (self.entities_table.c.qualified_name == definition.qualified_name))
-                r = self._fetch_helper(query)
-                __check_queue_version1(r)
-                query = sql_session.query(self.entities_table.c.entity_id, self.entities_table.c.qualified_name).where(
-                        (self.entities_table.c.entity_id == str(definition.source_id)) & (
-                                    self.entities_table.c.entity_type == str(EntityType.Source)))
-                r = self._fetch_helper(query)
-                if not r:
-                    raise ValueError("Source %s does not exist" %
-                                    definition.source_id)
-                ref = EntityRef(r[0]["entity_id"],
-                                EntityType.Source, r[0]["qualified_name"])
-                id = valid_uuid4()
-
-                try:
-                    entity = DbEntity(
-                       entity_id=str(id), 
-                       entity_type=str(EntityType.Anchor),
-                        qualified_name=definition.qualified_name,
-                        attributes=definition.to_attr(ref).to_json()
-                    )
-                    sql_session.add(entity)
-                    # Add "Contains/BelongsTo" relations between anchor and project
-                except db.exc.IntegrityError as e:
-                    raise Exception(
-                        f"Entity(id={str(id)}) already exists. Error: {e}"
-                    )
-                self._create_edge(sql_session, project_id, id, RelationshipType.Contains)
-                self._create_edge(sql_session, id, project_id, RelationshipType.BelongsTo)
-                # Add "Consumes/Produces" relations between anchor and datasource
-                self._create_edge(sql_session, id, definition.source_id,
-                                    RelationshipType.Consumes)
-                self._create_edge(sql_session, definition.source_id, id,
-                                    RelationshipType.Produces)
-
-                sql_session.flush()
-                return id
-             
-                # with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
-                #     query = insert(self.entities_table).values(entity_id=str(id), entity_type=str(EntityType.Anchor),
-                #                                                     qualified_name=definition.qualified_name,
-                #                                                     attributes=definition.to_attr(ref).to_json())
-                #     conn.execute(query)
-                #     # Add "Contains/BelongsTo" relations between anchor and project
-                #     self._create_edge(conn, project_id, id, RelationshipType.Contains)
-                #     self._create_edge(conn, id, project_id, RelationshipType.BelongsTo)
-                #     # Add "Consumes/Produces" relations between anchor and datasource
-                #     self._create_edge(conn, id, definition.source_id,
-                #                     RelationshipType.Consumes)
-                #     self._create_edge(conn, definition.source_id, id,
-                #                     RelationshipType.Produces)
-                #     return id
-            else:
-                with self.conn.transaction() as c:
-                    c.execute(f'''select entity_id, entity_type, attributes from entities where qualified_name = %s''',
-                                definition.qualified_name)
-                    r = c.fetchall()
-                    __check_queue_version1(r)
-                    c.execute("select entity_id, qualified_name from entities where entity_id = %s and entity_type = %s",
-                            (str(
-                                definition.source_id), str(EntityType.Source)))
-                    r = c.fetchall()
-                    if not r:
-                        raise ValueError("Source %s does not exist" %
-                                    definition.source_id)
-                    ref = EntityRef(r[0]["entity_id"],
-                                EntityType.Source, r[0]["qualified_name"])
-                    id = valid_uuid4()
-                    c.execute(
-                        f"insert into entities (entity_id, entity_type, qualified_name, attributes) values (%s, %s, %s, %s)",
-                        (str(id),
-                        str(EntityType.Anchor),
-                        definition.qualified_name,
-                        definition.to_attr(ref).to_json()))
-                    # Add "Contains/BelongsTo" relations between anchor and project
-                    self._create_edge(c, project_id, id, RelationshipType.Contains)
-                    self._create_edge(c, id, project_id, RelationshipType.BelongsTo)
-                    # Add "Consumes/Produces" relations between anchor and datasource
-                    self._create_edge(c, id, definition.source_id,
-                                    RelationshipType.Consumes)
-                    self._create_edge(c, definition.source_id, id,
-                                    RelationshipType.Produces)
-                    return id
-        
+        id = valid_uuid4()
+        return self.create_project_entities(project_id, anchors={id: definition})[id]
 
     def create_project_anchor_feature(self, project_id: UUID, anchor_id: UUID, definition: AnchorFeatureDef) -> UUID:
-        
-        # Here we start a transaction, any following step failed, everything rolls back
-        with self.ManagedSessionMaker() as sql_session:
-            anchor = self.get_entity(sql_session, anchor_id)
-            definition.qualified_name = f"{anchor.qualified_name}__{definition.name}"
-            def __check_queue_version1(r):
-                if r:
-                    if len(r) > 1:
-                        # There are multiple entities with same qualified name， that means we already have errors in the db
-                        assert False, "Data inconsistency detected, %d entities have same qualified_name %s" % (
-                            len(r), definition.qualified_name)
-                    # The entity with same name already exists but with different type
-                    if _to_type(r[0]["entity_type"], EntityType) != EntityType.AnchorFeature:
-                        raise ConflictError("Entity %s already exists" %
-                                            definition.qualified_name)
-                    attr: AnchorFeatureAttributes = _to_type(
-                        json.loads(r[0]["attributes"]), AnchorFeatureAttributes)
-                    if attr.name == definition.name \
-                            and attr.type == definition.feature_type \
-                            and attr.transformation == definition.transformation \
-                            and attr.key == definition.key:
-                        # Creating exactly same entity
-                        # Just return the existing id
-                        return _to_uuid(r[0]["entity_id"])
-                    # The existing entity has different definition, that's a conflict
-                    raise ConflictError("Entity %s already exists" %
-                                        definition.qualified_name)
-                
-            if os.environ.get("FEATHR_SANDBOX"):
-                query = sql_session.query(self.entities_table.c.entity_id, self.entities_table.c.entity_type,
-                                    self.entities_table.c.attributes).where(
-                        (self.entities_table.c.qualified_name == definition.qualified_name))
-                r = self._fetch_helper(query)
-                __check_queue_version1(r)
-                source_id = anchor.attributes.source.id
-                id = valid_uuid4()
-                try:
-                    entity = DbEntity(
-                        entity_id=str(id),
-                        entity_type=str(EntityType.AnchorFeature),
-                        qualified_name=definition.qualified_name,
-                        attributes=definition.to_attr().to_json()
-                    )
-                    sql_session.add(entity)
-
-                except db.exc.IntegrityError as e:
-                    raise Exception(
-                        f"Entity(id={str(id)}) already exists. Error: {e}"
-                    )
-
-                # Add "Contains/BelongsTo" relations between anchor feature and project
-                self._create_edge(sql_session, project_id, id, RelationshipType.Contains)
-                self._create_edge(sql_session, id, project_id, RelationshipType.BelongsTo)
-                # Add "Contains/BelongsTo" relations between anchor feature and anchor
-                self._create_edge(sql_session, anchor_id, id, RelationshipType.Contains)
-                self._create_edge(sql_session, id, anchor_id, RelationshipType.BelongsTo)
-                # Add "Consumes/Produces" relations between anchor feature and datasource used by anchor
-                self._create_edge(sql_session, id, source_id, RelationshipType.Consumes)
-                self._create_edge(sql_session, source_id, id, RelationshipType.Produces)
-                sql_session.flush()
-                return id
-            
-                # with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
-                #     query = insert(self.entities_table).values(entity_id=str(id),
-                #                                                     entity_type=str(EntityType.AnchorFeature),
-                #                                                     qualified_name=definition.qualified_name,
-                #                                                     attributes=definition.to_attr().to_json())
-                #     r = conn.execute(query)
-                #     # Add "Contains/BelongsTo" relations between anchor feature and project
-                #     self._create_edge(conn, project_id, id, RelationshipType.Contains)
-                #     self._create_edge(conn, id, project_id, RelationshipType.BelongsTo)
-                #     # Add "Contains/BelongsTo" relations between anchor feature and anchor
-                #     self._create_edge(conn, anchor_id, id, RelationshipType.Contains)
-                #     self._create_edge(conn, id, anchor_id, RelationshipType.BelongsTo)
-                #     # Add "Consumes/Produces" relations between anchor feature and datasource used by anchor
-                #     self._create_edge(conn, id, source_id, RelationshipType.Consumes)
-                #     self._create_edge(conn, source_id, id, RelationshipType.Produces)
-                #     return id
-            else:
-                with self.conn.transaction() as c:
-                    c.execute(f'''select entity_id, entity_type, attributes from entities where qualified_name = %s''',
-                            definition.qualified_name)
-                    r = c.fetchall()
-                    __check_queue_version1(r)
-                    source_id = anchor.attributes.source.id
-                    id = valid_uuid4()
-                    c.execute(
-                        f"insert into entities (entity_id, entity_type, qualified_name, attributes) values (%s, %s, %s, %s)",
-                        (str(id),
-                        str(EntityType.AnchorFeature),
-                        definition.qualified_name,
-                        definition.to_attr().to_json()))
-                    # Add "Contains/BelongsTo" relations between anchor feature and project
-                    self._create_edge(c, project_id, id, RelationshipType.Contains)
-                    self._create_edge(c, id, project_id, RelationshipType.BelongsTo)
-                    # Add "Contains/BelongsTo" relations between anchor feature and anchor
-                    self._create_edge(c, anchor_id, id, RelationshipType.Contains)
-                    self._create_edge(c, id, anchor_id, RelationshipType.BelongsTo)
-                    # Add "Consumes/Produces" relations between anchor feature and datasource used by anchor
-                    self._create_edge(c, id, source_id, RelationshipType.Consumes)
-                    self._create_edge(c, source_id, id, RelationshipType.Produces)
-                    return id
+        id = valid_uuid4()
+        return self.create_project_entities(project_id, anchor_features={id: (anchor_id, definition)})[id]
 
     def create_project_derived_feature(self, project_id: UUID, definition: DerivedFeatureDef) -> UUID:
-
+        id = valid_uuid4()
+        return self.create_project_entities(project_id, derived_features={id: definition})[id]
+
+    def create_project_entities(self,
+                                project_id: UUID,
+                                sources: Dict[UUID, SourceDef] = {},
+                                anchors: Dict[UUID, AnchorDef] = {},
+                                anchor_features: Dict[UUID, Tuple[UUID, AnchorFeatureDef]] = {},
+                                derived_features: Dict[UUID, DerivedFeatureDef] = {}) -> Dict[UUID, UUID]:
+        """
+        Everything is created in one transaction, the entities and edges are staged and written with one
+        multi-row insert per table, and the existing entities are looked up by qualified names in one query.
+        """
         # Here we start a transaction, any following step failed, everything rolls back
-        with self.ManagedSessionMaker() as sql_session:
-            project = self.get_entity(sql_session, project_id)
-            definition.qualified_name = f"{project.qualified_name}__{definition.name}"
-            def __check_queue_version1(r):
-                if r:
-                    if len(r) > 1:
-                        # There are multiple entities with same qualified name， that means we already have errors in the db
-                        assert False, "Data inconsistency detected, %d entities have same qualified_name %s" % (
-                            len(r), definition.qualified_name)
-                    # The entity with same name already exists but with different type, that's conflict
-                    if _to_type(r[0]["entity_type"], EntityType) != EntityType.DerivedFeature:
-                        raise ConflictError("Entity %s already exists" %
-                                            definition.qualified_name)
-                    attr: DerivedFeatureAttributes = _to_type(
-                        json.loads(r[0]["attributes"]), DerivedFeatureAttributes)
-                    if attr.name == definition.name \
-                            and attr.type == definition.feature_type \
-                            and attr.transformation == definition.transformation \
-                            and attr.key == definition.key:
-                        # Creating exactly same entity
-                        # Just return the existing id
-                        return _to_uuid(r[0]["entity_id"])
-                    # The existing entity has different definition, that's a conflict
-                    raise ConflictError("Entity %s already exists" %
-                                        definition.qualified_name)
-
+        if os.environ.get("FEATHR_SANDBOX"):
+            with self.ManagedSessionMaker() as sql_session:
+                return self._create_project_entities(sql_session, None, project_id, sources, anchors,
+                                                     anchor_features, derived_features)
+        else:
+            with self.conn.transaction() as c:
+                return self._create_project_entities(None, c, project_id, sources, anchors,
+                                                     anchor_features, derived_features)
+
+    def _create_project_entities(self,
+                                 sql_session: Session,
+                                 cursor,
+                                 project_id: UUID,
+                                 sources: Dict[UUID, SourceDef],
+                                 anchors: Dict[UUID, AnchorDef],
+                                 anchor_features: Dict[UUID, Tuple[UUID, AnchorFeatureDef]],
+                                 derived_features: Dict[UUID, DerivedFeatureDef]) -> Dict[UUID, UUID]:
+        project_id = _to_uuid(project_id)
+        sources = dict([(_to_uuid(id), d) for id, d in sources.items()])
+        anchors = dict([(_to_uuid(id), d) for id, d in anchors.items()])
+        anchor_features = dict([(_to_uuid(id), (_to_uuid(a), d)) for id, (a, d) in anchor_features.items()])
+        derived_features = dict([(_to_uuid(id), d) for id, d in derived_features.items()])
+        # The ids of all entities referred to by the definitions, the ones created in this batch are resolved later
+        temp_ids = set(list(sources) + list(anchors) + list(anchor_features) + list(derived_features))
+        referred_ids = [project_id] \
+            + [d.source_id for d in anchors.values()] \
+            + [anchor_id for anchor_id, _ in anchor_features.values()] \
+            + [id for d in derived_features.values() for id in d.input_anchor_features + d.input_derived_features]
+        refs = dict([(r.id, r) for r in self._get_entity_refs(sql_session,
+                                                              [id for id in referred_ids if id not in temp_ids])])
+        if project_id not in refs or refs[project_id].entity_type != EntityType.Project:
+            raise KeyError(f"Project {project_id} not found")
+        # The features of an anchor consume the source of the anchor
+        anchor_sources = dict([(e.from_id, e.to_id) for e in self._get_neighbors_of(
+            sql_session, [id for id in refs if refs[id].entity_type == EntityType.Anchor], RelationshipType.Consumes)])
+
+        project_name = refs[project_id].qualified_name
+        for d in list(sources.values()) + list(anchors.values()) + list(derived_features.values()):
+            d.qualified_name = f"{project_name}__{d.name}"
+        for anchor_id, d in anchor_features.values():
+            if anchor_id in anchors:
+                d.qualified_name = f"{anchors[anchor_id].qualified_name}__{d.name}"
+            elif anchor_id in refs:
+                d.qualified_name = f"{refs[anchor_id].qualified_name}__{d.name}"
+            else:
+                raise ValueError("Anchor %s does not exist" % anchor_id)
+        batch = _WriteBatch(self._get_entities_by_names(
+            sql_session, cursor,
+            [d.qualified_name for d in list(sources.values()) + list(anchors.values()) + list(derived_features.values())]
+            + [d.qualified_name for _, d in anchor_features.values()]))
+
+        # The id of every entity in the batch, either created or the existing one with the same definition
+        ids = {}
+
+        def resolve(id: UUID, entity_type: EntityType) -> EntityRef:
+            id = ids.get(id, id)
+            if id not in refs or refs[id].entity_type != entity_type:
+                raise ValueError("%s %s does not exist" % (entity_type.name, id))
+            return refs[id]
+
+        def create(temp_id: UUID, entity_type: EntityType, definition, attributes: Callable) -> bool:
+            existing_id = batch.find(entity_type, definition)
+            if existing_id:
+                ids[temp_id] = existing_id
+                refs[existing_id] = EntityRef(existing_id, entity_type, definition.qualified_name)
+                return False
+            ids[temp_id] = valid_uuid4()
+            refs[ids[temp_id]] = EntityRef(ids[temp_id], entity_type, definition.qualified_name)
+            batch.add_entity(ids[temp_id], entity_type, definition.qualified_name, attributes().to_json())
+            batch.connect(project_id, ids[temp_id], RelationshipType.Contains)
+            return True
+
+        for temp_id, d in sources.items():
+            create(temp_id, EntityType.Source, d, lambda: d.to_attr())
+        for temp_id, d in anchors.items():
+            source = resolve(d.source_id, EntityType.Source)
+            d.source_id = source.id
+            if create(temp_id, EntityType.Anchor, d, lambda: d.to_attr(source)):
+                # Add "Consumes/Produces" relations between anchor and datasource
+                batch.connect(ids[temp_id], source.id, RelationshipType.Consumes)
+                anchor_sources[ids[temp_id]] = source.id
+        # The anchors existed already may have different sources
+        anchor_sources.update(dict([(e.from_id, e.to_id) for e in self._get_neighbors_of(
+            sql_session, [ids[id] for id in anchors if ids[id] not in anchor_sources], RelationshipType.Consumes)]))
+        for temp_id, (anchor_id, d) in anchor_features.items():
+            anchor = resolve(anchor_id, EntityType.Anchor)
+            if create(temp_id, EntityType.AnchorFeature, d, lambda: d.to_attr()):
+                # Add "Contains/BelongsTo" relations between anchor feature and anchor
+                batch.connect(anchor.id, ids[temp_id], RelationshipType.Contains)
+                # Add "Consumes/Produces" relations between anchor feature and datasource used by anchor
+                batch.connect(ids[temp_id], anchor_sources[anchor.id], RelationshipType.Consumes)
+                # The features of the anchor are changed as well
+                batch.changed_ids.append(anchor.id)
+        for temp_id, d in derived_features.items():
+            inputs = list([resolve(id, EntityType.AnchorFeature) for id in d.input_anchor_features]) \
+                + list([resolve(id, EntityType.DerivedFeature) for id in d.input_derived_features])
+            d.input_anchor_features = list([r.id for r in inputs if r.entity_type == EntityType.AnchorFeature])
+            d.input_derived_features = list([r.id for r in inputs if r.entity_type == EntityType.DerivedFeature])
+            if create(temp_id, EntityType.DerivedFeature, d, lambda: d.to_attr(inputs)):
+                # Add "Consumes/Produces" relations between derived feature and all its upstream
+                for r in inputs:
+                    batch.connect(ids[temp_id], r.id, RelationshipType.Consumes)
+
+        self._flush(sql_session, cursor, batch)
+        self._record_changes(sql_session, cursor, project_id, batch.changed_ids, "Upsert")
+        return ids
+
+    def _get_entities_by_names(self, sql_session: Session, cursor, names: List[str]) -> Dict[str, List[Dict]]:
+        """
+        Returns the rows of the entities with the qualified names, grouped by the qualified names
+        """
+        names = list(set(names))
+        rows = []
+        for i in range(0, len(names), QUERY_BATCH_SIZE):
+            chunk = tuple(names[i:i + QUERY_BATCH_SIZE])
             if os.environ.get("FEATHR_SANDBOX"):
-                query = sql_session.query(self.entities_table.c.entity_id, self.entities_table.c.entity_type,
-                                    self.entities_table.c.attributes).where(
-                        (self.entities_table.c.qualified_name == definition.qualified_name))
-                r = self._fetch_helper(query)
-                __check_queue_version1(r)
-                r1 = []
-                # Fill `input_anchor_features`, from `definition` we have ids only, we still need qualified names
-                if definition.input_anchor_features:
-                    query = sql_session.query(Entities.entity_id, Entities.entity_type,
-                                                    Entities.qualified_name).filter(
-                            Entities.entity_id.in_(tuple([str(id) for id in definition.input_anchor_features])),
-                            Entities.entity_type == str(EntityType.AnchorFeature))
-                    r1 = self._fetch_helper(query)
-                    if len(r1) != len(definition.input_anchor_features):
-                        # TODO: More detailed error
-                        raise (ValueError("Missing input anchor features"))
-                # Fill `input_derived_features`, from `definition` we have ids only, we still need qualified names
-                r2 = []
-                if definition.input_derived_features:
-                    query = sql_session.query(Entities.entity_id, Entities.entity_type,
-                                                    Entities.qualified_name).filter(
-                            Entities.entity_id.in_(tuple([str(id) for id in definition.input_derived_features])),
-                            Entities.entity_type == str(EntityType.DerivedFeature))
-                    r2 = self._fetch_helper(query)
-                    if len(r2) != len(definition.input_derived_features):
-                        # TODO: More detailed error
-                        raise (ValueError("Missing input derived features"))
-                refs = list([EntityRef(r["entity_id"], r["entity_type"], r["qualified_name"]) for r in r1 + r2])
-                id = valid_uuid4()
-
-                try:
-                    entity = DbEntity(
-                        entity_id=str(id),
-                        entity_type=str(EntityType.DerivedFeature),
-                        qualified_name=definition.qualified_name,
-                        attributes=definition.to_attr(refs).to_json()
-                    )
-                    sql_session.add(entity)
-                except db.exc.IntegrityError as e:
-                    raise Exception(
-                        f"Entity(id={str(id)}) already exists. Error: {e}"
-                    )
-
-                # Add "Contains/BelongsTo" relations between derived feature and project
-                self._create_edge(sql_session, project_id, id, RelationshipType.Contains)
-                self._create_edge(sql_session, id, project_id, RelationshipType.BelongsTo)
-                for r in r1 + r2:
-                    # Add "Consumes/Produces" relations between derived feature and all its upstream
-                    input_feature_id = r["entity_id"]
-                    self._create_edge(sql_session, id, input_feature_id,
-                                        RelationshipType.Consumes)
-                    self._create_edge(sql_session, input_feature_id, id,
-                                        RelationshipType.Produces)
-                sql_session.flush()
-                return id
-                
-                # with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
-                #     query = insert(self.entities_table).values(entity_id=str(id),
-                #                                                     entity_type=str(EntityType.DerivedFeature),
-                #                                                     qualified_name=definition.qualified_name,
-                #                                                     attributes=definition.to_attr(refs).to_json())
-                #     conn.execute(query)
-                #     # Add "Contains/BelongsTo" relations between derived feature and project
-                #     self._create_edge(conn, project_id, id, RelationshipType.Contains)
-                #     self._create_edge(conn, id, project_id, RelationshipType.BelongsTo)
-                #     for r in r1 + r2:
-                #         # Add "Consumes/Produces" relations between derived feature and all its upstream
-                #         input_feature_id = r["entity_id"]
-                #         self._create_edge(conn, id, input_feature_id,
-                #                         RelationshipType.Consumes)
-                #         self._create_edge(conn, input_feature_id, id,
-                #                         RelationshipType.Produces)
-                #     return id
-
+                query = sql_session.query(Entities.entity_id, Entities.qualified_name, Entities.entity_type,
+                                          Entities.attributes).filter(Entities.qualified_name.in_(chunk))
+                rows.extend(self._fetch_helper(query))
             else:
-                with self.conn.transaction() as c:
-                    c.execute(f'''select entity_id, entity_type, attributes from entities where qualified_name = %s''',
-                            definition.qualified_name)
-                    r = c.fetchall()
-                    __check_queue_version1(r)
-                    r1 = []
-                    # Fill `input_anchor_features`, from `definition` we have ids only, we still need qualified names
-                    if definition.input_anchor_features:
-                        c.execute(
-                            fr'''select entity_id, entity_type, qualified_name from entities where entity_id in %s and entity_type = %s ''',
-                            (tuple([str(id) for id in definition.input_anchor_features]), str(EntityType.AnchorFeature)))
-                        r1 = c.fetchall()
-                        if len(r1) != len(definition.input_anchor_features):
-                            # TODO: More detailed error
-                            raise (ValueError("Missing input anchor features"))
-                    # Fill `input_derived_features`, from `definition` we have ids only, we still need qualified names
-                    r2 = []
-                    if definition.input_derived_features:
-                        c.execute(
-                            fr'''select entity_id, entity_type, qualified_name from entities where entity_id in %s and entity_type = %s ''',
-                            (tuple([str(id) for id in definition.input_derived_features]), str(EntityType.DerivedFeature)))
-                        r2 = c.fetchall()
-                        if len(r2) != len(definition.input_derived_features):
-                            # TODO: More detailed error
-                            raise (ValueError("Missing input derived features"))
-                    refs = list([EntityRef(r["entity_id"], r["entity_type"], r["qualified_name"]) for r in r1 + r2])
-                    id = valid_uuid4()
-                    # Add "Contains/BelongsTo" relations between derived feature and project
-                    self._create_edge(c, project_id, id, RelationshipType.Contains)
-                    self._create_edge(c, id, project_id, RelationshipType.BelongsTo)
-                    for r in r1 + r2:
-                        # Add "Consumes/Produces" relations between derived feature and all its upstream
-                        input_feature_id = r["entity_id"]
-                        self._create_edge(c, id, input_feature_id,
-                                        RelationshipType.Consumes)
-                        self._create_edge(c, input_feature_id, id,
-                                        RelationshipType.Produces)
-                    return id
-
+                cursor.execute(fr'''select entity_id, qualified_name, entity_type, attributes from entities
+                    where qualified_name in %s''', (chunk,))
+                rows.extend(cursor.fetchall())
+        ret = {}
+        for r in rows:
+            ret.setdefault(r["qualified_name"], []).append(r)
+        return ret
 
-    def _create_edge(self, cursor, from_id: UUID, to_id: UUID, type: RelationshipType):
+    def _flush(self, sql_session: Session, cursor, batch: "_WriteBatch"):
         """
-        Create an edge with specified type between 2 entities, skip if the same connection already exists
+        Write the entities and edges staged in the batch
         """
         if os.environ.get("FEATHR_SANDBOX"):
-            # TODO: might not be a safe solution since it's not transactional
-            # query = insert(self.edges_table).values(edge_id=str(valid_uuid4()), from_id=str(from_id), to_id=str(to_id),
-            #                                                 conn_type=type.name)
-            # cursor.execute(query)
-            try:
-                id = valid_uuid4() 
-                edge = DbEdge(
-                    edge_id=str(id), 
-                    from_id=str(from_id), 
-                    to_id=str(to_id),
-                    conn_type=type.name
-                )
-                cursor.add(edge) 
-            except db.exc.IntegrityError as e:
-                    raise Exception(
-                        f"Edge(id={str(id)}) already exists. Error: {e}"
-                    )
+            if batch.entities:
+                sql_session.execute(self.entities_table.insert(), batch.entities)
+            if batch.edges:
+                sql_session.execute(self.edges_table.insert(), batch.edges)
         else:
-            sql = r'''
-            IF NOT EXISTS (SELECT 1 FROM edges WHERE from_id=%(from_id)s and to_id=%(to_id)s and conn_type=%(type)s)
-                    BEGIN
-                        INSERT INTO edges
-                        (edge_id, from_id, to_id, conn_type)
-                        values
-                        (%(edge_id)s, %(from_id)s, %(to_id)s, %(type)s)
-                    END'''
-            cursor.execute(sql, {
-                "edge_id": str(valid_uuid4()),
-                "from_id": str(from_id),
-                "to_id": str(to_id),
-                "type": type.name
-            })
+            if batch.entities:
+                cursor.executemany(
+                    "insert into entities (entity_id, entity_type, qualified_name, attributes) values (%s, %s, %s, %s)",
+                    list([(e["entity_id"], e["entity_type"], e["qualified_name"], e["attributes"])
+                          for e in batch.entities]))
+            if batch.edges:
+                cursor.executemany(
+                    "insert into edges (edge_id, from_id, to_id, conn_type) values (%s, %s, %s, %s)",
+                    list([(e["edge_id"], e["from_id"], e["to_id"], e["conn_type"]) for e in batch.edges]))
+        if batch.edges and FEATHRUI_REGISTRY_CLOSURE_TABLE.get():
+            self._add_to_closure(sql_session, cursor, batch.edges)
+
+    def _record_changes(self, sql_session: Session, cursor, project_id: UUID, entity_ids: List[UUID], change_type: str):
+        """
+        Record entities in a project are created/updated (`Upsert`) or deleted (`Delete`), each change bumps the
+        project version so clients can fetch only the entities changed after the version they have
+        """
+        entity_ids = list(dict.fromkeys(entity_ids))
+        # The project lists its entities, so it's changed along with them
+        self.fragment_cache.invalidate(entity_ids + [project_id])
+        if not entity_ids:
+            return
+        rows = list([(str(project_id), str(entity_id), change_type) for entity_id in entity_ids])
+        if os.environ.get("FEATHR_SANDBOX"):
+            sql_session.execute(self.entity_changes_table.insert(), list([
+                {"project_id": p, "entity_id": e, "change_type": t} for p, e, t in rows]))
+        else:
+            cursor.executemany(f"insert into entity_changes (project_id, entity_id, change_type) values (%s, %s, %s)",
+                               rows)
+
+    def _record_deletion(self, sql_session: Session, cursor, entity_id: UUID):
+        """
+        Record an entity is deleted, the entities containing it, e.g. the anchor of an anchor feature, are updated
+        """
+        owners = self._get_entities(sql_session,
+                                    [e.to_id for e in self.get_neighbors(sql_session, entity_id, RelationshipType.BelongsTo)])
+        project_ids = [e.id for e in owners if e.entity_type == EntityType.Project]
+        if not project_ids:
+            # The entity is a project itself
+            project_ids = [entity_id]
+        for project_id in project_ids:
+            self._record_changes(sql_session, cursor, project_id, [entity_id], "Delete")
+            self._record_changes(sql_session, cursor, project_id,
+                                 [e.id for e in owners if e.entity_type != EntityType.Project], "Upsert")
 
     def _delete_all_entity_edges(self, sql_session: Session, cursor, entity_id: UUID):
         """
@@ -904,10 +999,11 @@ class DbRegistry(Registry):
             row_to_delete = sql_session.query(Edges).filter(
                 (Edges.from_id == str(entity_id)) | (Edges.to_id == str(entity_id)))
             row_to_delete.delete()
-            sql_session.commit()
         else:
             sql = fr'''DELETE FROM edges WHERE from_id = %s OR to_id = %s'''
             cursor.execute(sql, (str(entity_id), str(entity_id)))
+        if FEATHRUI_REGISTRY_CLOSURE_TABLE.get():
+            self._remove_from_closure(sql_session, cursor, entity_id)
 
     def _delete_entity(self, sql_session: Session, cursor, entity_id: UUID):
         """
@@ -917,10 +1013,11 @@ class DbRegistry(Registry):
             row_to_delete = sql_session.query(Entities).filter((Entities.entity_id == str(entity_id)))
             # self.sql_session.delete(row_to_delete)
             row_to_delete.delete()
-            sql_session.commit()
         else:
             sql = fr'''DELETE FROM entities WHERE entity_id = %s'''
             cursor.execute(sql, str(entity_id))
+        if current_identity_map() is not None:
+            current_identity_map().remove(entity_id)
 
     def _fill_entity(self, sql_session: Session, e: Entity) -> Entity:
         """
@@ -951,49 +1048,152 @@ class DbRegistry(Registry):
             return e
         return e
 
+    def _sync_fragment_cache(self, sql_session: Session) -> Optional[int]:
+        """
+        Invalidate the cached fragments of the entities changed since the cache version, including the changes made
+        by other registry instances sharing the DB. Returns the version the fragments read from now on can be cached at.
+        """
+        if self.fragment_cache.max_size <= 0:
+            return None
+        if os.environ.get("FEATHR_SANDBOX"):
+            query = sql_session.query(db.func.max(EntityChanges.change_id).label("version"))
+            version = self._fetch_helper(query)[0]["version"] or 0
+        else:
+            version = self.conn.query("select max(change_id) as version from entity_changes")[0]["version"] or 0
+        cached_version = self.fragment_cache.version
+        if cached_version is None or version < cached_version:
+            # The cache is new or the DB was reset
+            self.fragment_cache.sync(version, None)
+        elif version > cached_version:
+            if os.environ.get("FEATHR_SANDBOX"):
+                query = sql_session.query(EntityChanges.project_id, EntityChanges.entity_id).filter(
+                    EntityChanges.change_id > cached_version, EntityChanges.change_id <= version)
+                rows = self._fetch_helper(query)
+            else:
+                rows = self.conn.query(fr'''select project_id, entity_id from entity_changes
+                    where change_id > %s and change_id <= %s''', (cached_version, version))
+            self.fragment_cache.sync(version, [r["entity_id"] for r in rows] + [r["project_id"] for r in rows])
+        return version
+
+    def _get_fragments(self, sql_session: Session, ids: List[Union[str, UUID]],
+                       version: Optional[int]) -> Dict[UUID, bytes]:
+        """
+        Returns the serialized JSON of the entities, the same as `to_dict()` of the ones returned by `get_entities`.
+        The entities not in the fragment cache are read and filled in batch, then cached if `version` is still current.
+        """
+        ids = list(dict.fromkeys([_to_uuid(id) for id in ids]))
+        fragments = self.fragment_cache.get_many(ids)
+        entities = self._get_entities(sql_session, [id for id in ids if id not in fragments])
+        # Entities only refer to the entities they connect to, so these don't need to be read as a whole
+        contains = self._get_neighbors_of(sql_session, [e.id for e in entities if e.entity_type in (
+            EntityType.Project, EntityType.Anchor)], RelationshipType.Contains)
+        consumes = self._get_neighbors_of(sql_session, [e.id for e in entities if e.entity_type in (
+            EntityType.Anchor, EntityType.DerivedFeature)], RelationshipType.Consumes)
+        refs = dict([(r.id, r) for r in self._get_entity_refs(sql_session, [e.to_id for e in contains + consumes])])
+        contained = {}
+        for e in contains:
+            if e.to_id in refs:
+                contained.setdefault(e.from_id, []).append(refs[e.to_id])
+        consumed = {}
+        for e in consumes:
+            if e.to_id in refs:
+                consumed.setdefault(e.from_id, []).append(refs[e.to_id])
+        for e in entities:
+            if e.entity_type == EntityType.Project:
+                e.attributes.children = contained.get(e.id, [])
+            elif e.entity_type == EntityType.Anchor:
+                e.attributes.features = contained.get(e.id, [])
+                if e.id in consumed:
+                    e.attributes.source = consumed[e.id][0]
+            elif e.entity_type == EntityType.DerivedFeature:
+                e.attributes.input_features = consumed.get(e.id, [])
+            fragments[e.id] = self.fragment_cache.put(e.id, dumps(e.to_dict()), version)
+        return dict([(id, fragments[id]) for id in ids if id in fragments])
+
+    def _get_neighbors_of(self, sql_session: Session, ids: List[UUID], relationship: RelationshipType) -> List[Edge]:
+        """
+        Same as `get_neighbors`, but for multiple entities at once
+        """
+        if not ids:
+            return []
+        if os.environ.get("FEATHR_SANDBOX"):
+            query = sql_session.query(Edges.edge_id, Edges.from_id, Edges.to_id, Edges.conn_type).filter(
+                Edges.conn_type == relationship.name, Edges.from_id.in_(tuple([str(id) for id in ids])))
+            rows = self._fetch_helper(query)
+        else:
+            rows = self.conn.query(fr'''select edge_id, from_id, to_id, conn_type from edges
+                where conn_type = %s and from_id in %s''', (relationship.name, tuple([str(id) for id in ids])))
+        return list([Edge(**row) for row in rows])
+
+    def _get_entity_refs(self, sql_session: Session, ids: List[UUID]) -> List[EntityRef]:
+        """
+        Get the refs of the entities, without reading their attributes
+        """
+        cache = current_identity_map()
+        cached = []
+        if cache is not None:
+            cached = cache.get_rows(set([str(id) for id in ids]))
+            read_ids = set([str(r["entity_id"]) for r in cached])
+            ids = list([id for id in ids if str(id) not in read_ids])
+        if not ids:
+            rows = []
+        elif os.environ.get("FEATHR_SANDBOX"):
+            query = sql_session.query(Entities.entity_id, Entities.entity_type, Entities.qualified_name).filter(
+                Entities.entity_id.in_(tuple(set([str(id) for id in ids]))))
+            rows = self._fetch_helper(query)
+        else:
+            rows = self.conn.query(fr'''select entity_id, entity_type, qualified_name from entities
+                where entity_id in %s''', (tuple(set([str(id) for id in ids])),))
+        return list([EntityRef(_to_uuid(r["entity_id"]), r["entity_type"], r["qualified_name"]) for r in cached + rows])
+
     def _get_edges(self, sql_session: Session, ids: List[UUID], types: List[RelationshipType] = []) -> List[Edge]:
         if not ids:
             return []
+        # Only `from_id` is filtered by the DB, filtering both ends makes the DB look up every pair of ids
+        # in the (from_id, to_id, conn_type) index
         if os.environ.get("FEATHR_SANDBOX"):
             if len(types) > 0:
                 query = sql_session.query(Edges.edge_id, Edges.from_id, Edges.to_id, Edges.conn_type).filter(
                     (Edges.from_id.in_(tuple([str(id) for id in ids]))) & (
-                        Edges.to_id.in_(tuple([str(id) for id in ids]))) & (
                         Edges.conn_type.in_(tuple([t.name for t in types]))))
             else:
                 query = sql_session.query(Edges.edge_id, Edges.from_id, Edges.to_id, Edges.conn_type).filter(
-                    (Edges.from_id.in_(tuple([str(id) for id in ids]))) & (
-                        Edges.to_id.in_(tuple([str(id) for id in ids]))))
+                    Edges.from_id.in_(tuple([str(id) for id in ids])))
 
             rows = self._fetch_helper(query)
         else:
             sql = fr"""select edge_id, from_id, to_id, conn_type from edges
-            where from_id in %(ids)s
-            and to_id in %(ids)s"""
+            where from_id in %(ids)s"""
             if len(types) > 0:
                 sql = fr"""select edge_id, from_id, to_id, conn_type from edges
                 where conn_type in %(types)s
-                and from_id in %(ids)s
-                and to_id in %(ids)s"""
+                and from_id in %(ids)s"""
 
             rows = self.conn.query(sql, {
                 "ids": tuple([str(id) for id in ids]),
                 "types": tuple([t.name for t in types]),
             })
-        return list([_to_type(row, Edge) for row in rows])
+        to_ids = set([str(id) for id in ids])
+        return list([Edge(**row) for row in rows if str(row["to_id"]) in to_ids])
 
     def _get_entity(self, sql_session: Session, id_or_name: Union[str, UUID]) -> Entity:
-        if os.environ.get("FEATHR_SANDBOX"):
-            query = sql_session.query(self.entities_table.c.entity_id, self.entities_table.c.qualified_name,
-                              self.entities_table.c.entity_type, self.entities_table.c.attributes).where(
-                (self.entities_table.c.entity_id == str(self.get_entity_id(id_or_name))))
-            row = self._fetch_helper(query)
-        else:
-            row = self.conn.query(fr'''
-            select entity_id, qualified_name, entity_type, attributes
-            from entities
-            where entity_id = %s
-        ''', self.get_entity_id(id_or_name))
+        id = self.get_entity_id(id_or_name)
+        cache = current_identity_map()
+        row = cache.get_rows([id]) if cache is not None else []
+        if not row:
+            if os.environ.get("FEATHR_SANDBOX"):
+                query = sql_session.query(self.entities_table.c.entity_id, self.entities_table.c.qualified_name,
+                                  self.entities_table.c.entity_type, self.entities_table.c.attributes).where(
+                    (self.entities_table.c.entity_id == str(id)))
+                row = self._fetch_helper(query)
+            else:
+                row = self.conn.query(fr'''
+                select entity_id, qualified_name, entity_type, attributes
+                from entities
+                where entity_id = %s
+            ''', id)
+            if cache is not None:
+                cache.add_rows(row)
         if not row:
             raise KeyError(f"Entity {id_or_name} not found")
         row = row[0]
@@ -1001,9 +1201,15 @@ class DbRegistry(Registry):
         return _to_type(row, Entity)
 
     def _get_entities(self, sql_session: Session, ids: List[UUID]) -> List[Entity]:
+        cache = current_identity_map()
+        cached = []
+        if cache is not None:
+            cached = cache.get_rows(ids)
+            read_ids = set([str(r["entity_id"]) for r in cached])
+            ids = list([id for id in ids if str(id) not in read_ids])
         if not ids:
-            return []
-        if os.environ.get("FEATHR_SANDBOX"):
+            rows = []
+        elif os.environ.get("FEATHR_SANDBOX"):
             query = sql_session.query(Entities.entity_id, Entities.qualified_name, Entities.entity_type,
                                            Entities.attributes).filter(
                 Entities.entity_id.in_(tuple([str(id) for id in ids]), ))
@@ -1013,8 +1219,10 @@ class DbRegistry(Registry):
                 from entities
                 where entity_id in %s
             ''', (tuple([str(id) for id in ids]),))
+        if cache is not None:
+            cache.add_rows(rows)
         ret = []
-        for row in rows:
+        for row in cached + rows:
             row["attributes"] = json.loads(row["attributes"])
             ret.append(Entity(**row))
         return ret
@@ -1023,24 +1231,35 @@ class DbRegistry(Registry):
         """
         Breadth first traversal
         Starts from `id`, follow edges with `conn_type` only.
+        The paths are looked up in the closure table instead if `FEATHRUI_REGISTRY_CLOSURE_TABLE` is enabled.
 
         WARN: There is no depth limit.
         """
+        ids, connections = self._bfs_connections(sql_session, id, conn_type)
+        entities = self.get_entities(sql_session, ids)
+        edges = list([Edge(**c) for c in connections])
+        return (entities, edges)
+
+    def _bfs_connections(self, sql_session: Session, id: UUID, conn_type: RelationshipType) -> Tuple[Set, List[Dict]]:
+        """
+        Returns the ids of the entities traversed by `_bfs` and the edges between them
+        """
         connections = []
-        to_ids = [{
-            "to_id": id,
-        }]
-        # BFS over SQL
-        while len(to_ids) != 0:
-            to_ids = self._bfs_step(sql_session, to_ids, conn_type)
-            connections.extend(to_ids)
+        if FEATHRUI_REGISTRY_CLOSURE_TABLE.get() and _closure_relationship(conn_type):
+            connections = self._get_closure_edges(sql_session, id, conn_type)
+        else:
+            to_ids = [{
+                "to_id": id,
+            }]
+            # BFS over SQL
+            while len(to_ids) != 0:
+                to_ids = self._bfs_step(sql_session, to_ids, conn_type)
+                connections.extend(to_ids)
         ids = set([id])
         for r in connections:
             ids.add(r["from_id"])
             ids.add(r["to_id"])
-        entities = self.get_entities(sql_session, ids)
-        edges = list([Edge(**c) for c in connections])
-        return (entities, edges)
+        return (ids, connections)
 
     def _bfs_step(self, sql_session:Session, ids: List[UUID], conn_type: RelationshipType) -> Set[Dict]:
         """
@@ -1056,3 +1275,247 @@ class DbRegistry(Registry):
         else:
             sql = fr"""select edge_id, from_id, to_id, conn_type from edges where conn_type = %s and from_id in %s"""
             return self.conn.query(sql, (conn_type.name, tuple([str(id) for id in ids])))
+
+    def _get_closure_edges(self, sql_session: Session, id: UUID, conn_type: RelationshipType) -> List[Dict]:
+        """
+        Returns the edges traversed by `_bfs`, i.e. the ones going out of `id` and the entities reachable from it,
+        which are looked up in the closure table in the same query
+        """
+        relationship, reverse = _closure_relationship(conn_type)
+        key, other = ("descendant_id", "ancestor_id") if reverse else ("ancestor_id", "descendant_id")
+        if os.environ.get("FEATHR_SANDBOX"):
+            reachable = db.select(getattr(EntityClosure, other)).where(EntityClosure.conn_type == relationship.name,
+                                                                       getattr(EntityClosure, key) == str(id))
+            query = sql_session.query(Edges.edge_id, Edges.from_id, Edges.to_id, Edges.conn_type).filter(
+                Edges.conn_type == conn_type.name, (Edges.from_id == str(id)) | Edges.from_id.in_(reachable))
+            return self._fetch_helper(query)
+        else:
+            return self.conn.query(fr"""select edge_id, from_id, to_id, conn_type from edges
+                where conn_type = %s and (from_id = %s or from_id in (
+                    select {other} from entity_closure where conn_type = %s and {key} = %s))""",
+                                   (conn_type.name, str(id), relationship.name, str(id)))
+
+    def _query(self, cursor, sql: str, params) -> List[Dict]:
+        """
+        Run the query in the transaction of `cursor` if there is one, so the changes made in it are visible
+        """
+        if cursor is None:
+            return self.conn.query(sql, params)
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+    def _get_edge_rows(self, sql_session: Session, cursor, ids: List[Union[str, UUID]],
+                       relationship: RelationshipType) -> List[Dict]:
+        """
+        Returns the rows of the edges of `relationship` going out of the entities
+        """
+        ids = list(set([str(id) for id in ids]))
+        rows = []
+        for i in range(0, len(ids), QUERY_BATCH_SIZE):
+            chunk = tuple(ids[i:i + QUERY_BATCH_SIZE])
+            if os.environ.get("FEATHR_SANDBOX"):
+                query = sql_session.query(Edges.edge_id, Edges.from_id, Edges.to_id, Edges.conn_type).filter(
+                    Edges.conn_type == relationship.name, Edges.from_id.in_(chunk))
+                rows.extend(self._fetch_helper(query))
+            else:
+                rows.extend(self._query(cursor, fr"""select edge_id, from_id, to_id, conn_type from edges
+                    where conn_type = %s and from_id in %s""", (relationship.name, chunk)))
+        return rows
+
+    def _get_closure(self, sql_session: Session, cursor, ids: List[Union[str, UUID]], relationship: RelationshipType,
+                     reverse: bool = False) -> Dict[str, Dict[str, int]]:
+        """
+        Returns the depths of the entities reachable from each of the entities by following the edges of
+        `relationship`, or the depths of the ones reaching each of the entities if `reverse` is set
+        """
+        ids = list(set([str(id) for id in ids]))
+        key, other = ("descendant_id", "ancestor_id") if reverse else ("ancestor_id", "descendant_id")
+        ret = dict([(id, {}) for id in ids])
+        for i in range(0, len(ids), QUERY_BATCH_SIZE):
+            chunk = tuple(ids[i:i + QUERY_BATCH_SIZE])
+            if os.environ.get("FEATHR_SANDBOX"):
+                query = sql_session.query(EntityClosure.ancestor_id, EntityClosure.descendant_id,
+                                          EntityClosure.depth).filter(EntityClosure.conn_type == relationship.name,
+                                                                      getattr(EntityClosure, key).in_(chunk))
+                rows = self._fetch_helper(query)
+            else:
+                rows = self._query(cursor, fr"""select ancestor_id, descendant_id, depth from entity_closure
+                    where conn_type = %s and {key} in %s""", (relationship.name, chunk))
+            for r in rows:
+                ret[r[key]][r[other]] = r["depth"]
+        return ret
+
+    def _get_depths(self, sql_session: Session, cursor, id: str, relationship: RelationshipType) -> Dict[str, int]:
+        """
+        Returns the depths of the entities reachable from `id` by following the edges, without the closure table
+        """
+        depths = {}
+        to_ids = [id]
+        depth = 0
+        while to_ids:
+            depth += 1
+            rows = self._get_edge_rows(sql_session, cursor, to_ids, relationship)
+            to_ids = []
+            for r in rows:
+                if r["to_id"] != id and r["to_id"] not in depths:
+                    depths[r["to_id"]] = depth
+                    to_ids.append(r["to_id"])
+        return depths
+
+    def _write_closure(self, sql_session: Session, cursor, relationship: RelationshipType,
+                       depths: Dict[Tuple[str, str], Optional[int]], shorter_only: bool = False):
+        """
+        Set the depths of the paths in the closure table, the paths whose depths are None are deleted.
+        The paths already in the table are only updated if they get shorter when `shorter_only` is set.
+        """
+        if not depths:
+            return
+        pairs = list(depths)
+        existing = {}
+        for i in range(0, len(pairs), QUERY_BATCH_SIZE):
+            chunk = pairs[i:i + QUERY_BATCH_SIZE]
+            ancestor_ids = tuple(set([a for a, _ in chunk]))
+            descendant_ids = tuple(set([d for _, d in chunk]))
+            if os.environ.get("FEATHR_SANDBOX"):
+                query = sql_session.query(EntityClosure.ancestor_id, EntityClosure.descendant_id,
+                                          EntityClosure.depth).filter(EntityClosure.conn_type == relationship.name,
+                                                                      EntityClosure.ancestor_id.in_(ancestor_ids),
+                                                                      EntityClosure.descendant_id.in_(descendant_ids))
+                rows = self._fetch_helper(query)
+            else:
+                rows = self._query(cursor, fr"""select ancestor_id, descendant_id, depth from entity_closure
+                    where conn_type = %s and ancestor_id in %s and descendant_id in %s""",
+                                   (relationship.name, ancestor_ids, descendant_ids))
+            for r in rows:
+                if (r["ancestor_id"], r["descendant_id"]) in depths:
+                    existing[(r["ancestor_id"], r["descendant_id"])] = r["depth"]
+        inserted = list([(a, d, depth) for (a, d), depth in depths.items()
+                         if depth is not None and (a, d) not in existing])
+        updated = list([(a, d, depth) for (a, d), depth in depths.items()
+                        if depth is not None and (a, d) in existing and existing[(a, d)] != depth
+                        and not (shorter_only and existing[(a, d)] < depth)])
+        deleted = list([(a, d) for (a, d), depth in depths.items() if depth is None and (a, d) in existing])
+        if os.environ.get("FEATHR_SANDBOX"):
+            t = self.entity_closure_table
+            if inserted:
+                sql_session.execute(t.insert(), list([
+                    {"ancestor_id": a, "conn_type": relationship.name, "descendant_id": d, "depth": depth}
+                    for a, d, depth in inserted]))
+            where = (t.c.ancestor_id == db.bindparam("a")) & (t.c.conn_type == relationship.name) \
+                & (t.c.descendant_id == db.bindparam("d"))
+            if updated:
+                sql_session.execute(t.update().where(where).values(depth=db.bindparam("depth")),
+                                    list([{"a": a, "d": d, "depth": depth} for a, d, depth in updated]))
+            if deleted:
+                sql_session.execute(t.delete().where(where), list([{"a": a, "d": d} for a, d in deleted]))
+        else:
+            if inserted:
+                cursor.executemany(
+                    "insert into entity_closure (ancestor_id, conn_type, descendant_id, depth) values (%s, %s, %s, %s)",
+                    list([(a, relationship.name, d, depth) for a, d, depth in inserted]))
+            if updated:
+                cursor.executemany(
+                    "update entity_closure set depth = %s where ancestor_id = %s and conn_type = %s and descendant_id = %s",
+                    list([(depth, a, relationship.name, d) for a, d, depth in updated]))
+            if deleted:
+                cursor.executemany(
+                    "delete from entity_closure where ancestor_id = %s and conn_type = %s and descendant_id = %s",
+                    list([(a, relationship.name, d) for a, d in deleted]))
+
+    def _add_to_closure(self, sql_session: Session, cursor, edges: List[Dict]):
+        """
+        Add the paths made by the new edges to the closure table. The edges are added one by one to the ancestors and
+        descendants of their ends, so the paths going through several new edges are found as well.
+        """
+        for relationship in CLOSURE_RELATIONSHIPS:
+            pairs = list([(e["from_id"], e["to_id"]) for e in edges if e["conn_type"] == relationship.name])
+            if not pairs:
+                continue
+            # Only the ancestors of the starts and the descendants of the ends are needed to find the paths
+            ancestors = self._get_closure(sql_session, cursor, [a for a, _ in pairs], relationship, reverse=True)
+            descendants = self._get_closure(sql_session, cursor, [d for _, d in pairs], relationship)
+            depths = {}
+            for from_id, to_id in pairs:
+                for a, a_depth in [(from_id, 0)] + list(ancestors[from_id].items()):
+                    for d, d_depth in [(to_id, 0)] + list(descendants[to_id].items()):
+                        depth = a_depth + 1 + d_depth
+                        if a == d or depths.get((a, d), depth + 1) <= depth:
+                            continue
+                        depths[(a, d)] = depth
+                        if d in ancestors and ancestors[d].get(a, depth + 1) > depth:
+                            ancestors[d][a] = depth
+                        if a in descendants and descendants[a].get(d, depth + 1) > depth:
+                            descendants[a][d] = depth
+            self._write_closure(sql_session, cursor, relationship, depths, shorter_only=True)
+
+    def _remove_from_closure(self, sql_session: Session, cursor, entity_id: UUID):
+        """
+        Remove the paths from and to the entity whose edges are deleted. The other paths between its ancestors and
+        descendants may go through it, they're found again by following the remaining edges from the ancestors.
+        """
+        id = str(entity_id)
+        for relationship in CLOSURE_RELATIONSHIPS:
+            ancestors = self._get_closure(sql_session, cursor, [id], relationship, reverse=True)[id]
+            descendants = self._get_closure(sql_session, cursor, [id], relationship)[id]
+            depths = dict([((a, id), None) for a in ancestors] + [((id, d), None) for d in descendants])
+            if ancestors and descendants:
+                for a in ancestors:
+                    reachable = self._get_depths(sql_session, cursor, a, relationship)
+                    for d in descendants:
+                        depths[(a, d)] = reachable.get(d)
+            self._write_closure(sql_session, cursor, relationship, depths)
+
+    def _init_closure(self):
+        """
+        Build the closure table if it's empty while there are edges, e.g. it's just enabled on an existing database
+        """
+        names = tuple([r.name for r in CLOSURE_RELATIONSHIPS])
+        if os.environ.get("FEATHR_SANDBOX"):
+            with self.ManagedSessionMaker() as sql_session:
+                built = sql_session.query(EntityClosure.ancestor_id).limit(1).first() is not None
+                empty = sql_session.query(Edges.edge_id).filter(Edges.conn_type.in_(names)).limit(1).first() is None
+        else:
+            built = len(self.conn.query("select top(1) ancestor_id from entity_closure")) > 0
+            empty = len(self.conn.query("select top(1) edge_id from edges where conn_type in %s", (names,))) == 0
+        if not built and not empty:
+            _logger.info("Building the closure table")
+            self.rebuild_closure()
+
+    def rebuild_closure(self) -> int:
+        """
+        Rebuild the closure table from the edges, returns the number of paths in it
+        """
+        if os.environ.get("FEATHR_SANDBOX"):
+            with self.ManagedSessionMaker() as sql_session:
+                return self._rebuild_closure(sql_session, None)
+        else:
+            with self.conn.transaction() as c:
+                return self._rebuild_closure(None, c)
+
+    def _rebuild_closure(self, sql_session: Session, cursor) -> int:
+        count = 0
+        for relationship in CLOSURE_RELATIONSHIPS:
+            if os.environ.get("FEATHR_SANDBOX"):
+                sql_session.query(EntityClosure).filter(EntityClosure.conn_type == relationship.name).delete()
+                rows = self._fetch_helper(sql_session.query(Edges.from_id, Edges.to_id).filter(
+                    Edges.conn_type == relationship.name))
+            else:
+                cursor.execute("delete from entity_closure where conn_type = %s", relationship.name)
+                rows = self._query(cursor, "select from_id, to_id from edges where conn_type = %s", relationship.name)
+            children = {}
+            for r in rows:
+                children.setdefault(r["from_id"], []).append(r["to_id"])
+            paths = list([(a, d, depth) for a, descendants in _transitive_closure(children).items()
+                          for d, depth in descendants.items()])
+            for i in range(0, len(paths), QUERY_BATCH_SIZE):
+                chunk = paths[i:i + QUERY_BATCH_SIZE]
+                if os.environ.get("FEATHR_SANDBOX"):
+                    sql_session.execute(self.entity_closure_table.insert(), list([
+                        {"ancestor_id": a, "conn_type": relationship.name, "descendant_id": d, "depth": depth}
+                        for a, d, depth in chunk]))
+                else:
+                    cursor.executemany(
+                        "insert into entity_closure (ancestor_id, conn_type, descendant_id, depth) values (%s, %s, %s, %s)",
+                        list([(a, relationship.name, d, depth) for a, d, depth in chunk]))
+            count += len(paths)
+        return count
@@ -115,6 +115,32 @@ FEATHRUI_SQLALCHEMYSTORE_POOLCLASS = _EnvironmentVariable(
     "FEATHRUI_SQLALCHEMYSTORE_POOLCLASS", str, None
 )
 
+#: Specifies the maximum number of entities whose serialized JSON is cached by the registry to build
+#: the responses of large requests, e.g. getting a whole project. ``0`` disables the cache.
+#: (default: ``100000``)
+FEATHRUI_FRAGMENT_CACHE_SIZE = _EnvironmentVariable("FEATHRUI_FRAGMENT_CACHE_SIZE", int, 100000)
+
+#: Specifies whether the API runs the registry on the asyncio driver of the sandbox database, e.g. asyncpg for
+#: PostgreSQL. By default it does except on SQLite, which runs in the process so there's no round trip to the database
+#: to wait for, aiosqlite only adds a thread switch to every query.
+#: (default: ``None``)
+FEATHRUI_SQLALCHEMYSTORE_ASYNC = _BooleanEnvironmentVariable("FEATHRUI_SQLALCHEMYSTORE_ASYNC", None)
+
+#: Specifies the maximum number of threads running the registry calls of the API, when the database has no
+#: asyncio driver, e.g. on MSSQL or SQLite.
+#: (default: ``100``)
+FEATHRUI_REGISTRY_MAX_WORKERS = _EnvironmentVariable("FEATHRUI_REGISTRY_MAX_WORKERS", int, 100)
+
+#: Specifies the maximum number of idle MSSQL connections kept for the queries of the registry.
+#: (default: ``10``)
+FEATHRUI_MSSQL_POOL_SIZE = _EnvironmentVariable("FEATHRUI_MSSQL_POOL_SIZE", int, 10)
+
+#: Specifies whether the registry keeps the transitive closure of the edges in the ``entity_closure`` table, so the
+#: lineage and the dependent entities are looked up instead of traversing the edges. Run
+#: ``scripts/rebuild_closure.py`` after enabling it on a database written to while it was disabled.
+#: (default: ``False``)
+FEATHRUI_REGISTRY_CLOSURE_TABLE = _BooleanEnvironmentVariable("FEATHRUI_REGISTRY_CLOSURE_TABLE", False)
+
 
 
 
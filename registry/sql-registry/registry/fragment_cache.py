@@ -0,0 +1,108 @@
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Union
+from uuid import UUID
+
+from registry.models import Edge
+
+try:
+    import orjson
+
+    def dumps(obj) -> bytes:
+        """
+        Serialize `obj` into compact JSON
+        """
+        return orjson.dumps(obj)
+except ImportError:
+    def dumps(obj) -> bytes:
+        """
+        Serialize `obj` into compact JSON
+        """
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+class FragmentCache:
+    """
+    LRU cache of the serialized JSON of entities, keyed by entity id.
+
+    The fragment of an entity depends on the entities it connects to, e.g. the features of an anchor, so it must be
+    invalidated whenever the entity is recorded as changed in the `entity_changes` table.
+    `version` is the latest change the cache is invalidated up to, fragments read before a newer version is seen are
+    not cached, as they may be stale already.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.version = None
+        self._fragments = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, ids: Iterable[Union[str, UUID]]) -> Dict[UUID, bytes]:
+        ret = {}
+        with self._lock:
+            for id in ids:
+                fragment = self._fragments.get(str(id))
+                if fragment is not None:
+                    self._fragments.move_to_end(str(id))
+                    ret[id] = fragment
+        return ret
+
+    def put(self, id: Union[str, UUID], fragment: bytes, version: Optional[int]) -> bytes:
+        with self._lock:
+            if self.max_size > 0 and version is not None and version == self.version:
+                self._fragments[str(id)] = fragment
+                self._fragments.move_to_end(str(id))
+                while len(self._fragments) > self.max_size:
+                    self._fragments.popitem(last=False)
+        return fragment
+
+    def invalidate(self, ids: Iterable[Union[str, UUID]]):
+        with self._lock:
+            for id in ids:
+                self._fragments.pop(str(id), None)
+
+    def sync(self, version: int, changed_ids: Optional[Iterable[Union[str, UUID]]]):
+        """
+        Move the cache to `version`, invalidating `changed_ids`, the entities changed after the current version.
+        Everything is invalidated if `changed_ids` is None, e.g. the cache is new or the database was reset.
+        """
+        with self._lock:
+            if changed_ids is None:
+                self._fragments.clear()
+            else:
+                for id in changed_ids:
+                    self._fragments.pop(str(id), None)
+            self.version = version
+
+    def clear(self):
+        with self._lock:
+            self._fragments.clear()
+            self.version = None
+
+
+def entities_and_relations_json(fragments: Dict[UUID, bytes], edges: Iterable[Edge]) -> bytes:
+    """
+    The JSON of `EntitiesAndRelations`, assembled from the fragments of the entities
+    """
+    return b"".join([
+        b'{"guidEntityMap":', _entity_map_json(fragments),
+        b',"relations":', dumps(list([e.to_dict() for e in edges])),
+        b"}",
+    ])
+
+
+def project_changes_json(version: int, fragments: Dict[UUID, bytes], deleted_ids: List[Union[str, UUID]]) -> bytes:
+    """
+    The JSON of `ProjectChanges`, assembled from the fragments of the entities
+    """
+    return b"".join([
+        b'{"version":', dumps(version),
+        b',"guidEntityMap":', _entity_map_json(fragments),
+        b',"deletedGuids":', dumps(list([str(id) for id in deleted_ids])),
+        b"}",
+    ])
+
+
+def _entity_map_json(fragments: Dict[UUID, bytes]) -> bytes:
+    return b"{" + b",".join([b'"%s":%s' % (str(id).encode("ascii"), fragments[id]) for id in fragments]) + b"}"
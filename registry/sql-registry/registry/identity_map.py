@@ -0,0 +1,89 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+from uuid import UUID
+
+from registry.models import _to_uuid
+
+
+class IdentityMap:
+    """
+    The entities read from the DB in one request, so an entity referred to many times by the request, by its id or its
+    qualified name, is only read once.
+
+    The rows are kept instead of the entities, the registry fills the connections of the entities in place so every
+    caller gets its own copy. Only the rows read are kept, the entities written may still be rolled back. The entities
+    are never updated, so the rows only go stale when the entities are deleted.
+    """
+
+    def __init__(self):
+        # Qualified name -> entity id as stored in the DB
+        self.ids: Dict[str, str] = {}
+        # Entity id -> the row of the entity, the attributes are not parsed
+        self.rows: Dict[UUID, Dict] = {}
+
+    def add_id(self, qualified_name: str, id: str):
+        self.ids[qualified_name] = id
+
+    def add_rows(self, rows: Iterable[Dict]):
+        for r in rows:
+            self.ids[r["qualified_name"]] = r["entity_id"]
+            self.rows[_to_uuid(r["entity_id"])] = dict(r)
+
+    def get_rows(self, ids: Iterable[Union[str, UUID]]) -> List[Dict]:
+        """
+        Returns copies of the rows of the entities read before
+        """
+        ret = {}
+        for id in ids:
+            id = _to_uuid(id)
+            if id in self.rows and id not in ret:
+                ret[id] = dict(self.rows[id])
+        return list(ret.values())
+
+    def remove(self, id: Union[str, UUID]):
+        id = _to_uuid(id)
+        self.rows.pop(id, None)
+        for name in [name for name, i in self.ids.items() if _to_uuid(i) == id]:
+            del self.ids[name]
+
+
+_current_identity_map = ContextVar("_current_identity_map", default=None)
+
+
+def current_identity_map() -> Optional[IdentityMap]:
+    """
+    Returns the identity map of the request in progress, or None if the entities are not cached
+    """
+    return _current_identity_map.get()
+
+
+@contextmanager
+def identity_map() -> Iterator[IdentityMap]:
+    """
+    Cache the entities read within the context, a nested context shares the map of the outer one
+    """
+    if _current_identity_map.get() is not None:
+        yield _current_identity_map.get()
+        return
+    token = _current_identity_map.set(IdentityMap())
+    try:
+        yield _current_identity_map.get()
+    finally:
+        _current_identity_map.reset(token)
+
+
+class IdentityMapMiddleware:
+    """
+    ASGI middleware reading the entities of every HTTP request through its own identity map
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with identity_map():
+            await self.app(scope, receive, send)
@@ -1,5 +1,5 @@
 from abc import ABC, abstractclassmethod, abstractmethod
-from typing import Union, List, Dict
+from typing import Optional, Tuple, Union, List, Dict
 from uuid import UUID
 from registry.database import DbConnection
 
@@ -42,6 +42,13 @@ class Registry(ABC):
         """
         pass
 
+    @abstractmethod
+    def get_entity_ids(self, ids_or_names: List[Union[str, UUID]]) -> List[UUID]:
+        """
+        Get the ids of many entities by their names at once
+        """
+        pass
+
     @abstractmethod
     def get_neighbors(self, id_or_name: Union[str, UUID], relationship: RelationshipType) -> List[Edge]:
         """
@@ -65,6 +72,35 @@ class Registry(ABC):
         """
         pass
 
+    @abstractmethod
+    def get_project_changes(self, id_or_name: Union[str, UUID], since: int = 0) -> ProjectChanges:
+        """
+        Get the entities changed in a project after the project version `since`, along with the latest version.
+        Everything in the project is returned if `since` is 0
+        """
+        pass
+
+    def get_lineage_json(self, id_or_name: Union[str, UUID]) -> bytes:
+        """
+        Same as `get_lineage`, serialized into JSON.
+        Implementations can override this to serialize large lineages faster.
+        """
+        return self.get_lineage(id_or_name).to_json().encode("utf-8")
+
+    def get_project_json(self, id_or_name: Union[str, UUID]) -> bytes:
+        """
+        Same as `get_project`, serialized into JSON.
+        Implementations can override this to serialize large projects faster.
+        """
+        return self.get_project(id_or_name).to_json().encode("utf-8")
+
+    def get_project_changes_json(self, id_or_name: Union[str, UUID], since: int = 0) -> bytes:
+        """
+        Same as `get_project_changes`, serialized into JSON.
+        Implementations can override this to serialize large projects faster.
+        """
+        return self.get_project_changes(id_or_name, since).to_json().encode("utf-8")
+
     @abstractmethod
     def search_entity(self,
                       keyword: str,
@@ -77,6 +113,19 @@ class Registry(ABC):
         """
         pass
 
+    @abstractmethod
+    def list_entities(self,
+                      project: Union[str, UUID],
+                      type: List[EntityType],
+                      after: Optional[str] = None,
+                      limit: Optional[int] = None,
+                      with_attributes: bool = True) -> Tuple[List[Union[Entity, EntityRef]], Optional[str]]:
+        """
+        List entities with specified type in a project page by page, ordered by qualified name.
+        Returns the entities and the qualified name to list the next page after, None if there is no more page
+        """
+        pass
+
     @abstractmethod
     def create_project(self, definition: ProjectDef) -> UUID:
         """
@@ -111,7 +160,23 @@ class Registry(ABC):
         Create a new derived feature under the project
         """
         pass
-    
+
+    @abstractmethod
+    def create_project_entities(self,
+                                project_id: UUID,
+                                sources: Dict[UUID, SourceDef] = {},
+                                anchors: Dict[UUID, AnchorDef] = {},
+                                anchor_features: Dict[UUID, Tuple[UUID, AnchorFeatureDef]] = {},
+                                derived_features: Dict[UUID, DerivedFeatureDef] = {}) -> Dict[UUID, UUID]:
+        """
+        Create sources, anchors and features under the project in one transaction.
+        Each definition is keyed by a temporary id, which can be referred to by other definitions in the same call,
+        e.g. as the `source_id` of an anchor, anchor features are keyed to a tuple of the anchor id and the definition.
+        Returns the map from the temporary ids to the ids of the entities, existing entities with the same
+        definitions are reused.
+        """
+        pass
+
     @abstractmethod
     def get_dependent_entities(self, entity_id: Union[str, UUID]) -> List[Entity]:
         """
@@ -371,9 +371,9 @@ class ProjectAttributes(Attributes):
         return self._children
 
     @children.setter
-    def children(self, v: List[Union[Dict, Entity]]):
+    def children(self, v: List[Union[Dict, Entity, EntityRef]]):
         for f in v:
-            if isinstance(f, Entity):
+            if isinstance(f, (Entity, EntityRef)):
                 self._children.append(f)
             elif isinstance(f, dict):
                 self._children.append(_to_type(f, Entity))
@@ -661,6 +661,24 @@ class EntitiesAndRelations(ToDict):
         }
 
 
+class ProjectChanges(ToDict):
+    """
+    Entities created or updated and ids of entities deleted in a project since a project version,
+    `version` is the latest project version these changes are up to.
+    """
+    def __init__(self, version: int, entities: List[Entity], deleted_ids: List[Union[str, UUID]]):
+        self.version = version
+        self.entities = dict([(e.id, e) for e in entities])
+        self.deleted_ids = list([_to_uuid(id) for id in deleted_ids])
+
+    def to_dict(self) -> Dict:
+        return {
+            "version": self.version,
+            "guidEntityMap": dict([(str(id), self.entities[id].to_dict()) for id in self.entities]),
+            "deletedGuids": list([str(id) for id in self.deleted_ids]),
+        }
+
+
 class ProjectDef:
     def __init__(self, name: str, qualified_name: str = "", tags: Dict = {}):
         self.name = name
@@ -0,0 +1,38 @@
+"""
+Rebuild the closure table of the registry from the edges.
+
+The closure table is only maintained while `FEATHRUI_REGISTRY_CLOSURE_TABLE` is enabled, run this after enabling it on
+a database written to while it was disabled. The registry builds the table on startup if it's empty.
+
+Usage:
+    python scripts/rebuild_closure.py --url sqlite:////tmp/feathr_registry.sqlite
+    CONNECTION_STR="..." python scripts/rebuild_closure.py
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the closure table of the registry from the edges")
+    parser.add_argument("--url", help="SQLAlchemy URL of the sandbox database, the SQL Server in `CONNECTION_STR` "
+                                      "is used if not set")
+    args = parser.parse_args()
+
+    if args.url:
+        os.environ["FEATHR_SANDBOX"] = "1"
+        os.environ["FEATHR_SANDBOX_REGISTRY_URL"] = args.url
+    # The table is rebuilt below, not on the startup of the registry
+    os.environ["FEATHRUI_REGISTRY_CLOSURE_TABLE"] = "false"
+    from registry.db_registry import DbRegistry
+
+    start = time.perf_counter()
+    count = DbRegistry().rebuild_closure()
+    print(f"Rebuilt the closure table with {count} paths in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
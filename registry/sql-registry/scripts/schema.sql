@@ -4,6 +4,7 @@ create table entities
     qualified_name varchar(200) not null,
     entity_type varchar(100) not null,
     attributes NVARCHAR(MAX) not null,
+    constraint uq_entities_qualified_name unique (qualified_name),
 )
 
 create table edges
@@ -12,4 +13,29 @@ create table edges
     from_id   varchar(50) not null,
     to_id     varchar(50) not null,
     conn_type varchar(20) not null,
-)
\ No newline at end of file
+    constraint uq_edges_from_id_to_id_conn_type unique (from_id, to_id, conn_type),
+)
+
+create table entity_changes
+(
+    change_id   bigint identity(1,1) not null primary key,
+    project_id  varchar(50) not null,
+    entity_id   varchar(50) not null,
+    change_type varchar(20) not null,
+)
+
+-- The transitive closure of the "Contains" and "Consumes" edges, only used when FEATHRUI_REGISTRY_CLOSURE_TABLE is set
+create table entity_closure
+(
+    ancestor_id   varchar(50) not null,
+    conn_type     varchar(20) not null,
+    descendant_id varchar(50) not null,
+    depth         int         not null,
+    constraint pk_entity_closure primary key (ancestor_id, conn_type, descendant_id),
+)
+
+create index ix_entities_entity_type on entities (entity_type)
+create index ix_edges_from_id_conn_type on edges (from_id, conn_type)
+create index ix_edges_to_id_conn_type on edges (to_id, conn_type)
+create index ix_entity_changes_project_id_change_id on entity_changes (project_id, change_id)
+create index ix_entity_closure_descendant_id_conn_type on entity_closure (descendant_id, conn_type)
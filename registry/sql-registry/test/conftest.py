@@ -0,0 +1,44 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# The API creates its registry on import, the tests run it on a SQLite database in sandbox mode
+os.environ["FEATHR_SANDBOX"] = "1"
+os.environ.setdefault("FEATHR_SANDBOX_REGISTRY_URL",
+                      f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'registry.sqlite')}")
+os.environ.setdefault("API_BASE", "/api/v1")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# These scripts run against the MSSQL database in `CONNECTION_STR`
+collect_ignore = ["test_basic.py", "test_create.py"]
+
+
+@pytest.fixture
+def database_url(tmp_path, monkeypatch):
+    """
+    A new SQLite database for the registries created by the test
+    """
+    url = f"sqlite:///{tmp_path / 'registry.sqlite'}"
+    monkeypatch.setenv("FEATHR_SANDBOX_REGISTRY_URL", url)
+    return url
+
+
+@pytest.fixture
+def registry(database_url):
+    from registry import DbRegistry
+    return DbRegistry()
+
+
+@pytest.fixture
+def client(registry, monkeypatch):
+    """
+    Test client of the API on the registry of the test
+    """
+    from fastapi.testclient import TestClient
+    import main
+    from registry.async_db_registry import AsyncDbRegistry
+
+    monkeypatch.setattr(main, "registry", AsyncDbRegistry(registry))
+    return TestClient(main.app)
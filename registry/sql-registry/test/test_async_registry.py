@@ -0,0 +1,70 @@
+import anyio
+import orjson
+import pytest
+
+from registry import DbRegistry
+from registry.async_db_registry import AsyncDbRegistry
+from registry.environment_variables import FEATHRUI_SQLALCHEMYSTORE_ASYNC
+from registry.models import AnchorDef, AnchorFeatureDef, DerivedFeatureDef, EntityType, ExpressionTransformation, \
+    FeatureType, ProjectDef, RelationshipType, SourceDef, TensorCategory, TypedKey, ValueType, VectorType
+
+FEATURE_TYPE = FeatureType(type=VectorType.TENSOR, tensor_category=TensorCategory.DENSE, dimension_type=[],
+                           val_type=ValueType.INT)
+KEY = [TypedKey(key_column="c1", key_column_type=ValueType.INT)]
+
+
+async def run_registry(r: AsyncDbRegistry):
+    project_id = await r.create_project(ProjectDef("async_project"))
+    source_id = await r.create_project_datasource(project_id, SourceDef(
+        qualified_name="async_project__s", name="s", path="hdfs://somewhere", type="hdfs"))
+    anchor_id = await r.create_project_anchor(project_id, AnchorDef(
+        qualified_name="async_project__a", name="a", source_id=source_id))
+    # The anchor features are created concurrently, each in its own transaction
+    async with anyio.create_task_group() as tg:
+        for name in ["f1", "f2", "f3"]:
+            tg.start_soon(r.create_project_anchor_feature, project_id, anchor_id, AnchorFeatureDef(
+                qualified_name=f"async_project__a__{name}", name=name, feature_type=FEATURE_TYPE,
+                transformation=ExpressionTransformation("c1"), key=KEY))
+    features = dict([(e.qualified_name, e.id) for e in (await r.list_entities(
+        project_id, [EntityType.AnchorFeature]))[0]])
+    assert sorted(features) == ["async_project__a__f1", "async_project__a__f2", "async_project__a__f3"]
+    f1 = features["async_project__a__f1"]
+    d1 = await r.create_project_derived_feature(project_id, DerivedFeatureDef(
+        qualified_name="async_project__d1", name="d1", feature_type=FEATURE_TYPE,
+        transformation=ExpressionTransformation("f1 + 1"), key=KEY, input_anchor_features=[f1],
+        input_derived_features=[]))
+
+    assert str(await r.get_entity_id("async_project__d1")) == str(d1)
+    assert (await r.get_entity(d1)).attributes.input_anchor_features[0].id == f1
+    assert [e.id for e in await r.get_dependent_entities(f1)] == [d1]
+    assert [e.to_id for e in await r.get_neighbors(d1, RelationshipType.Consumes)] == [f1]
+    assert f1 in (await r.get_lineage(d1)).entities
+    project = await r.get_project(project_id)
+    assert {source_id, anchor_id, f1, d1}.issubset(project.entities)
+    assert str(d1) in orjson.loads(await r.get_project_json("async_project"))["guidEntityMap"]
+
+    version = (await r.get_project_changes(project_id)).version
+    await r.delete_entity(d1)
+    changes = await r.get_project_changes(project_id, version)
+    assert changes.deleted_ids == [d1]
+    assert await r.get_dependent_entities(f1) == []
+    with pytest.raises(KeyError):
+        await r.get_entity(d1)
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_async_registry(database_url, monkeypatch, use_async):
+    if use_async:
+        pytest.importorskip("aiosqlite")
+    monkeypatch.setenv(FEATHRUI_SQLALCHEMYSTORE_ASYNC.name, str(use_async).lower())
+    r = AsyncDbRegistry(DbRegistry())
+    # The calls run in `AsyncSession.run_sync` on aiosqlite, otherwise in threads
+    assert (r.engine is not None) == use_async
+
+    async def run():
+        try:
+            await run_registry(r)
+        finally:
+            await r.close()
+
+    anyio.run(run)
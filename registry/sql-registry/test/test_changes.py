@@ -0,0 +1,65 @@
+from registry.models import AnchorDef, ProjectDef, SourceDef
+
+
+def create_project(registry, name: str):
+    project_id = registry.create_project(ProjectDef(name))
+    source_id = registry.create_project_datasource(project_id, SourceDef(
+        qualified_name=f"{name}__source1", name="source1", path="hdfs://somewhere", type="hdfs"))
+    return project_id, source_id
+
+
+def test_create_records_change(registry):
+    project_id, source_id = create_project(registry, "changes_create")
+    changes = registry.get_project_changes(project_id)
+    assert changes.version > 0
+    assert set(changes.entities) == {project_id, source_id}
+    assert changes.deleted_ids == []
+
+
+def test_delete_records_deletion(registry):
+    project_id, source_id = create_project(registry, "changes_delete")
+    version = registry.get_project_changes(project_id).version
+    registry.delete_entity(None, source_id)
+    changes = registry.get_project_changes(project_id, version)
+    assert changes.version > version
+    assert changes.deleted_ids == [source_id]
+    assert source_id not in list(changes.entities)
+
+
+def test_since_returns_delta(registry):
+    project_id, source_id = create_project(registry, "changes_since")
+    version = registry.get_project_changes(project_id).version
+    anchor_id = registry.create_project_anchor(project_id, AnchorDef(
+        qualified_name="changes_since__anchor1", name="anchor1", source_id=source_id))
+    changes = registry.get_project_changes(project_id, version)
+    assert changes.version > version
+    assert anchor_id in list(changes.entities)
+    assert source_id not in list(changes.entities)
+
+    # Nothing changed since the latest version
+    changes = registry.get_project_changes(project_id, changes.version)
+    assert changes.entities == {}
+    assert changes.deleted_ids == []
+
+
+def test_project_without_changes(registry):
+    project_id = registry.create_project(ProjectDef("changes_none"))
+    # Projects created before the change feed have no recorded change
+    with registry.ManagedSessionMaker() as sql_session:
+        sql_session.execute(registry.entity_changes_table.delete())
+    changes = registry.get_project_changes(project_id)
+    assert changes.version == 0
+    assert list(changes.entities) == [project_id]
+
+
+def test_changes_api(client):
+    client.post("/api/v1/projects", json={"name": "changes_api"})
+    source_id = client.post("/api/v1/projects/changes_api/datasources",
+                            json={"name": "s", "type": "hdfs", "path": "/a"}).json()["guid"]
+    changes = client.get("/api/v1/projects/changes_api/changes").json()
+    assert source_id in changes["guidEntityMap"]
+
+    assert client.delete(f"/api/v1/entity/{source_id}").status_code == 200
+    delta = client.get(f"/api/v1/projects/changes_api/changes?since={changes['version']}").json()
+    assert delta["version"] > changes["version"]
+    assert delta["deletedGuids"] == [source_id]
@@ -0,0 +1,98 @@
+import pytest
+
+from registry import DbRegistry
+from registry.db_registry import EntityClosure
+from registry.environment_variables import FEATHRUI_REGISTRY_CLOSURE_TABLE
+from registry.models import AnchorDef, AnchorFeatureDef, DerivedFeatureDef, ExpressionTransformation, FeatureType, \
+    ProjectDef, RelationshipType, SourceDef, TensorCategory, TypedKey, ValueType, VectorType
+
+FEATURE_TYPE = FeatureType(type=VectorType.TENSOR, tensor_category=TensorCategory.DENSE, dimension_type=[],
+                           val_type=ValueType.INT)
+KEY = [TypedKey(key_column="c1", key_column_type=ValueType.INT)]
+RELATIONSHIPS = [RelationshipType.Consumes, RelationshipType.Produces, RelationshipType.Contains,
+                 RelationshipType.BelongsTo]
+
+
+@pytest.fixture
+def closure_registry(database_url, monkeypatch):
+    monkeypatch.setenv(FEATHRUI_REGISTRY_CLOSURE_TABLE.name, "true")
+    return DbRegistry()
+
+
+def create_diamond(r: DbRegistry):
+    """
+    f1 <- d1, d2 <- d3, i.e. d3 consumes d1 and d2 which both consume the anchor feature f1
+    """
+    project_id = r.create_project(ProjectDef("closure"))
+    source_id = r.create_project_datasource(project_id, SourceDef(
+        qualified_name="closure__s", name="s", path="hdfs://somewhere", type="hdfs"))
+    anchor_id = r.create_project_anchor(project_id, AnchorDef(qualified_name="closure__a", name="a",
+                                                              source_id=source_id))
+    f1 = r.create_project_anchor_feature(project_id, anchor_id, AnchorFeatureDef(
+        qualified_name="closure__a__f1", name="f1", feature_type=FEATURE_TYPE,
+        transformation=ExpressionTransformation("c1"), key=KEY))
+
+    def derived(name, expr, anchor_features, derived_features):
+        return r.create_project_derived_feature(project_id, DerivedFeatureDef(
+            qualified_name=f"closure__{name}", name=name, feature_type=FEATURE_TYPE,
+            transformation=ExpressionTransformation(expr), key=KEY, input_anchor_features=anchor_features,
+            input_derived_features=derived_features))
+
+    d1 = derived("d1", "f1 + 1", [f1], [])
+    d2 = derived("d2", "f1 * 2", [f1], [])
+    d3 = derived("d3", "d1 + d2", [], [d1, d2])
+    return [project_id, source_id, anchor_id, f1, d1, d2, d3]
+
+
+def traverse(r: DbRegistry, monkeypatch, id, relationship: RelationshipType, closure: bool):
+    monkeypatch.setenv(FEATHRUI_REGISTRY_CLOSURE_TABLE.name, str(closure).lower())
+    with r.ManagedSessionMaker() as sql_session:
+        entities, edges = r._bfs(sql_session, id, relationship)
+    return sorted(str(e.id) for e in entities), sorted(str(e.id) for e in edges)
+
+
+def assert_same_traversals(r: DbRegistry, monkeypatch, ids):
+    for id in ids:
+        for relationship in RELATIONSHIPS:
+            assert traverse(r, monkeypatch, id, relationship, True) == \
+                   traverse(r, monkeypatch, id, relationship, False), (id, relationship)
+    monkeypatch.setenv(FEATHRUI_REGISTRY_CLOSURE_TABLE.name, "true")
+
+
+def closure_rows(r: DbRegistry):
+    with r.ManagedSessionMaker() as sql_session:
+        return set((c.ancestor_id, c.conn_type, c.descendant_id, c.depth)
+                   for c in sql_session.query(EntityClosure).all())
+
+
+def test_closure_same_as_bfs(closure_registry, monkeypatch):
+    ids = create_diamond(closure_registry)
+    _, _, _, f1, d1, d2, d3 = ids
+    assert_same_traversals(closure_registry, monkeypatch, ids)
+
+    lineage, _ = traverse(closure_registry, monkeypatch, d3, RelationshipType.Consumes, True)
+    assert {str(f1), str(d1), str(d2)}.issubset(lineage)
+    dependents, _ = traverse(closure_registry, monkeypatch, f1, RelationshipType.Produces, True)
+    assert {str(d1), str(d2), str(d3)}.issubset(dependents)
+
+
+def test_closure_after_deleting_middle_node(closure_registry, monkeypatch):
+    ids = create_diamond(closure_registry)
+    _, _, _, f1, d1, d2, d3 = ids
+    closure_registry.delete_entity(None, d1)
+    ids.remove(d1)
+    assert_same_traversals(closure_registry, monkeypatch, ids)
+
+    # d3 still reaches f1 through d2
+    lineage, _ = traverse(closure_registry, monkeypatch, d3, RelationshipType.Consumes, True)
+    assert str(d1) not in lineage
+    assert {str(f1), str(d2)}.issubset(lineage)
+
+
+def test_rebuild_closure(closure_registry):
+    ids = create_diamond(closure_registry)
+    closure_registry.delete_entity(None, ids[4])
+    incremental = closure_rows(closure_registry)
+    assert incremental
+    assert closure_registry.rebuild_closure() == len(incremental)
+    assert closure_rows(closure_registry) == incremental
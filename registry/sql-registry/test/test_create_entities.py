@@ -0,0 +1,77 @@
+from uuid import uuid4
+
+FEATURE_TYPE = {"type": "TENSOR", "tensorCategory": "DENSE", "dimensionType": [], "valType": "INT"}
+KEY = [{"keyColumn": "k", "keyColumnType": "INT", "fullName": "k", "description": "", "keyColumnAlias": "k"}]
+
+
+def project_definition(derived_expr: str = "f1 + f2"):
+    """
+    A source, an anchor with two features and two levels of derived features referring to each other by temporary
+    guids, new ones every time
+    """
+    s, a, f1, f2, d1, d2 = [str(uuid4()) for _ in range(6)]
+    return [s, a, f1, f2, d1, d2], {
+        "sources": {s: {"name": "s", "type": "hdfs", "path": "/a"}},
+        "anchors": {a: {"name": "a", "sourceId": s}},
+        "anchorFeatures": dict([(f, {"name": name, "anchorId": a, "featureType": FEATURE_TYPE,
+                                     "transformation": {"transformExpr": name}, "key": KEY})
+                                for f, name in [(f1, "f1"), (f2, "f2")]]),
+        "derivedFeatures": {
+            d1: {"name": "d1", "featureType": FEATURE_TYPE, "transformation": {"transformExpr": derived_expr},
+                 "key": KEY, "inputAnchorFeatures": [f1, f2], "inputDerivedFeatures": []},
+            d2: {"name": "d2", "featureType": FEATURE_TYPE, "transformation": {"transformExpr": "d1 * 2"},
+                 "key": KEY, "inputAnchorFeatures": [], "inputDerivedFeatures": [d1]},
+        },
+    }
+
+
+def test_create_entities_resolves_temporary_guids(client):
+    client.post("/api/v1/projects", json={"name": "batch_create"})
+    temp_ids, definition = project_definition()
+    r = client.post("/api/v1/projects/batch_create/entities", json=definition)
+    assert r.status_code == 200
+    guids = r.json()["guids"]
+    assert set(guids) == set(temp_ids)
+    s, a, f1, f2, d1, d2 = [guids[id] for id in temp_ids]
+
+    feature = client.get(f"/api/v1/features/{f1}").json()
+    assert feature["attributes"]["qualifiedName"] == "batch_create__a__f1"
+    anchors = client.get("/api/v1/projects/batch_create/anchors").json()
+    assert [e["guid"] for e in anchors] == [a]
+    assert anchors[0]["attributes"]["source"]["guid"] == s
+    assert sorted(f["guid"] for f in anchors[0]["attributes"]["features"]) == sorted([f1, f2])
+    derived = dict([(e["guid"], e["attributes"])
+                    for e in client.get("/api/v1/projects/batch_create/derivedfeatures").json()])
+    assert sorted(f["guid"] for f in derived[d1]["inputAnchorFeatures"]) == sorted([f1, f2])
+    assert [f["guid"] for f in derived[d2]["inputDerivedFeatures"]] == [d1]
+    lineage = client.get(f"/api/v1/features/{d2}/lineage").json()
+    assert {s, f1, f2, d1, d2}.issubset(lineage["guidEntityMap"])
+
+
+def test_create_entities_idempotent(client):
+    client.post("/api/v1/projects", json={"name": "batch_idempotent"})
+    temp_ids, definition = project_definition()
+    guids = client.post("/api/v1/projects/batch_idempotent/entities", json=definition).json()["guids"]
+    project = client.get("/api/v1/projects/batch_idempotent").json()
+    version = client.get("/api/v1/projects/batch_idempotent/changes").json()["version"]
+
+    new_temp_ids, definition = project_definition()
+    r = client.post("/api/v1/projects/batch_idempotent/entities", json=definition)
+    assert r.status_code == 200
+    # The existing entities are returned for the same definitions, nothing is written
+    assert [r.json()["guids"][id] for id in new_temp_ids] == [guids[id] for id in temp_ids]
+    assert client.get("/api/v1/projects/batch_idempotent").json() == project
+    assert client.get("/api/v1/projects/batch_idempotent/changes").json()["version"] == version
+
+
+def test_create_entities_conflict(client):
+    client.post("/api/v1/projects", json={"name": "batch_conflict"})
+    _, definition = project_definition()
+    client.post("/api/v1/projects/batch_conflict/entities", json=definition)
+    project = client.get("/api/v1/projects/batch_conflict").json()
+
+    _, definition = project_definition(derived_expr="f1 - f2")
+    r = client.post("/api/v1/projects/batch_conflict/entities", json=definition)
+    assert r.status_code == 409
+    # Nothing in the batch is written
+    assert client.get("/api/v1/projects/batch_conflict").json() == project
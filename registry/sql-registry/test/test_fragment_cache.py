@@ -0,0 +1,91 @@
+import orjson
+
+from registry import DbRegistry
+from registry.environment_variables import FEATHRUI_FRAGMENT_CACHE_SIZE
+from registry.models import AnchorDef, AnchorFeatureDef, DerivedFeatureDef, ExpressionTransformation, FeatureType, \
+    ProjectDef, SourceDef, TensorCategory, TypedKey, ValueType, VectorType
+
+FEATURE_TYPE = FeatureType(type=VectorType.TENSOR, tensor_category=TensorCategory.DENSE, dimension_type=[],
+                           val_type=ValueType.INT)
+KEY = [TypedKey(key_column="c1", key_column_type=ValueType.INT)]
+
+
+def normalize(o):
+    """
+    The entities and the relations are the same no matter the order they're listed in
+    """
+    if isinstance(o, dict):
+        return dict([(k, normalize(v)) for k, v in o.items()])
+    if isinstance(o, list):
+        return sorted([normalize(v) for v in o], key=lambda v: orjson.dumps(v, option=orjson.OPT_SORT_KEYS))
+    return o
+
+
+def add_feature(r: DbRegistry, project_id, anchor_id, name: str):
+    return r.create_project_anchor_feature(project_id, anchor_id, AnchorFeatureDef(
+        qualified_name=f"fragments__a__{name}", name=name, feature_type=FEATURE_TYPE,
+        transformation=ExpressionTransformation("c1"), key=KEY))
+
+
+def create_project(r: DbRegistry):
+    project_id = r.create_project(ProjectDef("fragments"))
+    source_id = r.create_project_datasource(project_id, SourceDef(
+        qualified_name="fragments__s", name="s", path="hdfs://somewhere", type="hdfs"))
+    anchor_id = r.create_project_anchor(project_id, AnchorDef(qualified_name="fragments__a", name="a",
+                                                              source_id=source_id))
+    f1 = add_feature(r, project_id, anchor_id, "f1")
+    d1 = r.create_project_derived_feature(project_id, DerivedFeatureDef(
+        qualified_name="fragments__d1", name="d1", feature_type=FEATURE_TYPE,
+        transformation=ExpressionTransformation("f1 + 1"), key=KEY, input_anchor_features=[f1],
+        input_derived_features=[]))
+    return project_id, anchor_id, f1, d1
+
+
+def assert_same_json(r: DbRegistry, project_id, feature_ids):
+    assert normalize(orjson.loads(r.get_project_json(project_id))) == normalize(r.get_project(project_id).to_dict())
+    for id in feature_ids:
+        assert normalize(orjson.loads(r.get_lineage_json(id))) == normalize(r.get_lineage(id).to_dict())
+    changes = r.get_project_changes(project_id)
+    assert normalize(orjson.loads(r.get_project_changes_json(project_id))) == normalize(changes.to_dict())
+
+
+def test_fragments_same_as_entities(registry):
+    project_id, anchor_id, f1, d1 = create_project(registry)
+    assert_same_json(registry, project_id, [f1, d1])
+    assert len(registry.fragment_cache._fragments) > 0
+
+    # The cached anchor lists the new feature
+    f2 = add_feature(registry, project_id, anchor_id, "f2")
+    assert_same_json(registry, project_id, [f1, f2, d1])
+    anchor = orjson.loads(registry.get_project_json(project_id))["guidEntityMap"][str(anchor_id)]
+    assert str(f2) in [f["guid"] for f in anchor["attributes"]["features"]]
+
+    registry.delete_entity(None, f2)
+    assert_same_json(registry, project_id, [f1, d1])
+    anchor = orjson.loads(registry.get_project_json(project_id))["guidEntityMap"][str(anchor_id)]
+    assert str(f2) not in [f["guid"] for f in anchor["attributes"]["features"]]
+
+
+def test_fragments_written_by_other_instance(registry):
+    project_id, anchor_id, f1, d1 = create_project(registry)
+    assert_same_json(registry, project_id, [f1, d1])
+
+    # Another instance sharing the DB changes the anchor cached by the first one
+    other = DbRegistry()
+    f2 = add_feature(other, project_id, anchor_id, "f2")
+    assert_same_json(registry, project_id, [f1, f2, d1])
+    anchor = orjson.loads(registry.get_project_json(project_id))["guidEntityMap"][str(anchor_id)]
+    assert str(f2) in [f["guid"] for f in anchor["attributes"]["features"]]
+
+    other.delete_entity(None, f2)
+    assert_same_json(registry, project_id, [f1, d1])
+
+
+def test_fragment_cache_disabled(database_url, monkeypatch):
+    monkeypatch.setenv(FEATHRUI_FRAGMENT_CACHE_SIZE.name, "0")
+    registry = DbRegistry()
+    project_id, anchor_id, f1, d1 = create_project(registry)
+    assert_same_json(registry, project_id, [f1, d1])
+    add_feature(registry, project_id, anchor_id, "f2")
+    assert_same_json(registry, project_id, [f1, d1])
+    assert len(registry.fragment_cache._fragments) == 0
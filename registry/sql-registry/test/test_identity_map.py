@@ -0,0 +1,96 @@
+from uuid import UUID, uuid4
+
+import pytest
+
+from registry.identity_map import IdentityMap, current_identity_map, identity_map
+from registry.models import AnchorDef, AnchorFeatureDef, DerivedFeatureDef, ExpressionTransformation, FeatureType, \
+    ProjectDef, SourceDef, TensorCategory, TypedKey, ValueType, VectorType
+
+FEATURE_TYPE = FeatureType(type=VectorType.TENSOR, tensor_category=TensorCategory.DENSE, dimension_type=[],
+                           val_type=ValueType.INT)
+KEY = [TypedKey(key_column="c1", key_column_type=ValueType.INT)]
+
+
+def create_project(r, name: str):
+    project_id = r.create_project(ProjectDef(name))
+    source_id = r.create_project_datasource(project_id, SourceDef(
+        qualified_name=f"{name}__s", name="s", path="hdfs://somewhere", type="hdfs"))
+    anchor_id = r.create_project_anchor(project_id, AnchorDef(qualified_name=f"{name}__a", name="a",
+                                                              source_id=source_id))
+    f1 = r.create_project_anchor_feature(project_id, anchor_id, AnchorFeatureDef(
+        qualified_name=f"{name}__a__f1", name="f1", feature_type=FEATURE_TYPE,
+        transformation=ExpressionTransformation("c1"), key=KEY))
+    d1 = r.create_project_derived_feature(project_id, DerivedFeatureDef(
+        qualified_name=f"{name}__d1", name="d1", feature_type=FEATURE_TYPE,
+        transformation=ExpressionTransformation("f1 + 1"), key=KEY, input_anchor_features=[f1],
+        input_derived_features=[]))
+    return project_id, source_id, anchor_id, f1, d1
+
+
+def test_get_rows_returns_copies():
+    cache = IdentityMap()
+    id = str(uuid4())
+    cache.add_rows([{"entity_id": id, "qualified_name": "p__f1", "attributes": "{}"}])
+    rows = cache.get_rows([id, UUID(id)])
+    assert len(rows) == 1
+    rows[0]["attributes"] = {"name": "f1"}
+    assert cache.get_rows([id])[0]["attributes"] == "{}"
+
+    cache.remove(id)
+    assert cache.get_rows([id]) == []
+    assert "p__f1" not in cache.ids
+
+
+def test_identity_map_nested():
+    assert current_identity_map() is None
+    with identity_map() as outer:
+        with identity_map() as inner:
+            assert inner is outer
+        assert current_identity_map() is outer
+    assert current_identity_map() is None
+
+
+def test_entities_are_copies(registry):
+    _, _, anchor_id, _, _ = create_project(registry, "identity_copies")
+    with identity_map():
+        anchor = registry.get_entity(None, anchor_id)
+        anchor.attributes.name = "changed"
+        assert registry.get_entity(None, anchor_id).attributes.name == "a"
+
+
+def test_deleted_entity_evicted(registry):
+    _, _, _, f1, d1 = create_project(registry, "identity_delete")
+    with identity_map():
+        assert [e.id for e in registry.get_dependent_entities(f1)] == [d1]
+        registry.delete_entity(None, d1)
+        # The dependents are re-checked in the same request after deleting them
+        assert registry.get_dependent_entities(f1) == []
+        with pytest.raises(KeyError):
+            registry.get_entity(None, d1)
+        with pytest.raises(KeyError):
+            registry.get_entity_id("identity_delete__d1")
+
+
+def test_delete_empty_entities_in_request(client):
+    client.post("/api/v1/projects", json={"name": "identity_api"})
+    source_id = client.post("/api/v1/projects/identity_api/datasources",
+                            json={"name": "s", "type": "hdfs", "path": "/a"}).json()["guid"]
+    anchor_id = client.post("/api/v1/projects/identity_api/anchors",
+                            json={"name": "a", "sourceId": source_id}).json()["guid"]
+    # The anchor without features is deleted along with the source, the source's dependents are then checked again
+    assert client.delete(f"/api/v1/entity/{source_id}").status_code == 200
+    assert client.get(f"/api/v1/projects/identity_api/datasources/{source_id}").status_code == 404
+    assert anchor_id not in client.get("/api/v1/projects/identity_api").json()["guidEntityMap"]
+
+
+def test_get_entity_ids(registry):
+    project_id, source_id, _, f1, _ = create_project(registry, "identity_ids")
+    with identity_map():
+        ids = registry.get_entity_ids(["identity_ids__a__f1", source_id, str(project_id), "identity_ids__a__f1"])
+        assert [str(id) for id in ids] == [str(f1), str(source_id), str(project_id), str(f1)]
+        # The names are resolved from the identity map afterwards
+        assert "identity_ids__a__f1" in current_identity_map().ids
+        with pytest.raises(KeyError):
+            registry.get_entity_ids(["identity_ids__d1", "identity_ids__unknown"])
+    with pytest.raises(KeyError):
+        registry.get_entity_ids(["identity_ids__unknown"])
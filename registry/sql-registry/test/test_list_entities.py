@@ -0,0 +1,45 @@
+from uuid import UUID
+
+FEATURE_TYPE = {"type": "TENSOR", "tensorCategory": "DENSE", "dimensionType": [], "valType": "INT"}
+KEY = [{"keyColumn": "k", "keyColumnType": "INT", "fullName": "k", "description": "", "keyColumnAlias": "k"}]
+
+
+def create_project(client, name: str):
+    client.post("/api/v1/projects", json={"name": name})
+    source_id = client.post(f"/api/v1/projects/{name}/datasources",
+                            json={"name": "s", "type": "hdfs", "path": "/a"}).json()["guid"]
+    anchor_id = client.post(f"/api/v1/projects/{name}/anchors", json={"name": "a", "sourceId": source_id}).json()["guid"]
+    f1 = client.post(f"/api/v1/projects/{name}/anchors/{anchor_id}/features", json={
+        "name": "f1", "featureType": FEATURE_TYPE, "transformation": {"transformExpr": "x"}, "key": KEY}).json()["guid"]
+    d1 = client.post(f"/api/v1/projects/{name}/derivedfeatures", json={
+        "name": "d1", "featureType": FEATURE_TYPE, "transformation": {"transformExpr": "f1"}, "key": KEY,
+        "inputAnchorFeatures": [f1], "inputDerivedFeatures": []}).json()["guid"]
+    d2 = client.post(f"/api/v1/projects/{name}/derivedfeatures", json={
+        "name": "d2", "featureType": FEATURE_TYPE, "transformation": {"transformExpr": "d1 * 2"}, "key": KEY,
+        "inputAnchorFeatures": [], "inputDerivedFeatures": [d1]}).json()["guid"]
+    return anchor_id, f1, d1, d2
+
+
+def test_list_features_same_as_get_entities(client, registry):
+    anchor_id, f1, d1, d2 = create_project(client, "list_features")
+    listed = client.get("/api/v1/projects/list_features/features").json()
+    expected = [e.to_dict() for e in registry.get_entities(None, [UUID(f1), UUID(d1), UUID(d2)])]
+    assert sorted(listed, key=lambda e: e["guid"]) == sorted(expected, key=lambda e: e["guid"])
+
+    derived = dict([(e["guid"], e["attributes"]) for e in listed if e["typeName"] == "feathr_derived_feature_v1"])
+    assert [f["guid"] for f in derived[d1]["inputAnchorFeatures"]] == [f1]
+    assert [f["guid"] for f in derived[d2]["inputDerivedFeatures"]] == [d1]
+
+
+def test_list_derived_features_with_input_fields(client):
+    _, f1, d1, _ = create_project(client, "list_derived_features")
+    listed = client.get("/api/v1/projects/list_derived_features/derivedfeatures?fields=name,inputAnchorFeatures").json()
+    d1_attributes = [e["attributes"] for e in listed if e["guid"] == d1][0]
+    assert d1_attributes["name"] == "d1"
+    assert [f["guid"] for f in d1_attributes["inputAnchorFeatures"]] == [f1]
+
+
+def test_list_anchors_same_as_get_entities(client, registry):
+    anchor_id, _, _, _ = create_project(client, "list_anchors")
+    listed = client.get("/api/v1/projects/list_anchors/anchors").json()
+    assert listed == [registry.get_entities(None, [UUID(anchor_id)])[0].to_dict()]
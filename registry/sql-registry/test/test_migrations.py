@@ -0,0 +1,59 @@
+import sqlite3
+
+import pytest
+import sqlalchemy as db
+
+from registry import DbRegistry
+from registry.db.utils import _get_latest_schema_revision, _get_schema_version
+
+
+def create_baseline_db(path: str, duplicate_names: bool):
+    """
+    The schema of the registries before the migrations: no indexes, and duplicates they didn't prevent
+    """
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        create table entities (entity_id varchar(50) not null primary key, qualified_name varchar(200) not null,
+                               entity_type varchar(100) not null, attributes varchar(2000) not null);
+        create table edges (edge_id varchar(50) not null primary key, from_id varchar(50) not null,
+                            to_id varchar(50) not null, conn_type varchar(50) not null);
+    """)
+    conn.executemany("insert into entities values (?, ?, ?, ?)", [
+        ("e1", "p", "feathr_workspace_v1", '{"name": "p", "qualifiedName": "p"}'),
+        ("e2", "p" if duplicate_names else "p2", "feathr_workspace_v1", '{"name": "p", "qualifiedName": "p"}'),
+    ])
+    conn.executemany("insert into edges values (?, ?, ?, ?)", [
+        ("a", "e1", "e2", "Contains"),
+        ("b", "e1", "e2", "Contains"),
+        ("c", "e2", "e1", "BelongsTo"),
+    ])
+    conn.commit()
+    conn.close()
+
+
+@pytest.mark.parametrize("duplicate_names", [False, True])
+def test_upgrade_baseline_db(tmp_path, database_url, duplicate_names):
+    create_baseline_db(str(tmp_path / "registry.sqlite"), duplicate_names)
+    r = DbRegistry()
+
+    assert _get_schema_version(r.engine) == _get_latest_schema_revision()
+    inspector = db.inspect(r.engine)
+    assert {"entity_changes", "entity_closure"}.issubset(inspector.get_table_names())
+    indexes = dict([(i["name"], bool(i["unique"])) for t in ["entities", "edges", "entity_changes"]
+                    for i in inspector.get_indexes(t)])
+    assert indexes == {
+        # Entities sharing a qualified name can't be merged, the index is not unique then
+        "uq_entities_qualified_name": not duplicate_names,
+        "ix_entities_entity_type": False,
+        "uq_edges_from_id_to_id_conn_type": True,
+        "ix_edges_from_id_conn_type": False,
+        "ix_edges_to_id_conn_type": False,
+        "ix_entity_changes_project_id_change_id": False,
+    }
+    # Only one of the duplicated edges is kept
+    with r.engine.connect() as conn:
+        assert sorted(conn.execute(db.text("select edge_id from edges")).scalars()) == ["a", "c"]
+
+    # Upgrading an upgraded DB changes nothing
+    DbRegistry()
+    assert _get_schema_version(r.engine) == _get_latest_schema_revision()